@@ -0,0 +1,114 @@
+"""
+Utilitários compartilhados pelos benchmarks
+
+Cada benchmark grava um JSON em benchmarks/results/ com metadados da execução
+(commit, máquina, parâmetros) e as métricas medidas, para comparação entre execuções
+com compare_results.py.
+"""
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+APP_DIR = BENCHMARKS_DIR.parent
+RESULTS_DIR = BENCHMARKS_DIR / "results"
+RAW_DATA_DIR = APP_DIR / "data" / "raw"
+
+# Permite importar services.* ao rodar os scripts diretamente
+if str(APP_DIR) not in sys.path:
+    sys.path.insert(0, str(APP_DIR))
+
+
+@contextmanager
+def cronometro():
+    """
+    Mede o tempo de parede de um bloco.
+
+    Uso:
+        with cronometro() as t:
+            ...
+        t["segundos"]
+    """
+    medida = {"segundos": 0.0}
+    inicio = time.perf_counter()
+    try:
+        yield medida
+    finally:
+        medida["segundos"] = time.perf_counter() - inicio
+
+
+def vazao(quantidade: float, segundos: float) -> Optional[float]:
+    """Quantidade por segundo (None se o tempo for zero)."""
+    return round(quantidade / segundos, 2) if segundos > 0 else None
+
+
+def percentis(amostras_segundos: List[float]) -> Dict:
+    """Resumo de latências em milissegundos (p50/p95/p99, média, mínimo e máximo)."""
+    if not amostras_segundos:
+        return {"n": 0}
+    ms = np.asarray(amostras_segundos, dtype=float) * 1000.0
+    return {
+        "n": int(ms.size),
+        "media_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "min_ms": round(float(ms.min()), 3),
+        "max_ms": round(float(ms.max()), 3),
+    }
+
+
+def _commit_atual() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=APP_DIR, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return None
+
+
+def metadados_execucao(parametros: Optional[Dict] = None) -> Dict:
+    """Informações da máquina e do código usadas para comparar execuções."""
+    return {
+        "data_execucao": datetime.now().isoformat(timespec="seconds"),
+        "commit": _commit_atual(),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+        "parametros": parametros or {},
+    }
+
+
+def salvar_resultado(nome: str, metricas: Dict, parametros: Optional[Dict] = None,
+                     saida: Optional[Path] = None) -> Path:
+    """
+    Grava o resultado do benchmark em JSON e retorna o caminho do arquivo.
+    Por padrão: benchmarks/results/<nome>_<AAAAMMDD_HHMMSS>.json
+    """
+    if saida is None:
+        RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+        saida = RESULTS_DIR / f"{nome}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    else:
+        saida = Path(saida)
+        saida.parent.mkdir(parents=True, exist_ok=True)
+
+    resultado = {
+        "benchmark": nome,
+        **metadados_execucao(parametros),
+        "metricas": metricas,
+    }
+    with open(saida, "w", encoding="utf-8") as f:
+        json.dump(resultado, f, indent=2, ensure_ascii=False, default=str)
+
+    print(f"💾 Resultado salvo em {saida}")
+    return saida
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Compara dois resultados de benchmark (JSON gerado por common.salvar_resultado)
+
+Métricas de tempo (segundos, *_ms) pioram quando sobem; métricas de vazão (*_por_s)
+pioram quando descem. Variações piores que --limite (%) são marcadas como regressão
+e o script termina com código 1 (útil em CI).
+
+Uso:
+    python benchmarks/compare_results.py base.json novo.json
+    python benchmarks/compare_results.py --ultimos ingestao      # dois últimos de results/
+    python benchmarks/compare_results.py base.json novo.json --limite 5
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from common import RESULTS_DIR
+
+
+def carregar(caminho: Path) -> Dict:
+    with open(caminho, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def achatar(dados, prefixo: str = "") -> Dict[str, float]:
+    """Transforma o dicionário de métricas em {caminho.da.metrica: valor numérico}."""
+    valores = {}
+    if isinstance(dados, dict):
+        for chave, valor in dados.items():
+            valores.update(achatar(valor, f"{prefixo}.{chave}" if prefixo else str(chave)))
+    elif isinstance(dados, (int, float)) and not isinstance(dados, bool):
+        valores[prefixo] = float(dados)
+    return valores
+
+
+def sentido(metrica: str) -> Optional[int]:
+    """+1 se maior é melhor, -1 se menor é melhor, None se a métrica não é de desempenho."""
+    nome = metrica.rsplit(".", 1)[-1]
+    if nome.endswith("_por_s") or nome in ("vazao", "throughput_rps", "speedup"):
+        return 1
+    if nome == "segundos" or nome.endswith("_ms") or nome.endswith("_s"):
+        return -1
+    return None
+
+
+def ultimos_dois(nome: str) -> Tuple[Path, Path]:
+    arquivos = sorted(RESULTS_DIR.glob(f"{nome}_*.json"))
+    if len(arquivos) < 2:
+        raise SystemExit(f"São necessários ao menos dois resultados '{nome}' em {RESULTS_DIR}")
+    return arquivos[-2], arquivos[-1]
+
+
+def comparar(base: Dict, novo: Dict, limite: float) -> int:
+    """Imprime a comparação e retorna o número de regressões."""
+    metricas_base = achatar(base.get("metricas", {}))
+    metricas_novo = achatar(novo.get("metricas", {}))
+
+    print(f"Base: {base.get('data_execucao')} (commit {base.get('commit')})")
+    print(f"Novo: {novo.get('data_execucao')} (commit {novo.get('commit')})")
+    if base.get("parametros") != novo.get("parametros"):
+        print("⚠️  Parâmetros diferentes entre as execuções; compare com cautela")
+    print()
+    print(f"{'métrica':<60} {'base':>14} {'novo':>14} {'variação':>10}")
+
+    regressoes = 0
+    for metrica in sorted(set(metricas_base) & set(metricas_novo)):
+        direcao = sentido(metrica)
+        if direcao is None:
+            continue
+        antes, depois = metricas_base[metrica], metricas_novo[metrica]
+        if antes == 0:
+            continue
+        variacao = (depois - antes) / abs(antes) * 100
+        piora = -variacao * direcao
+        marca = ""
+        if piora > limite:
+            marca = " ❌ regressão"
+            regressoes += 1
+        elif -piora > limite:
+            marca = " ✅ melhora"
+        print(f"{metrica:<60} {antes:>14.4f} {depois:>14.4f} {variacao:>+9.1f}%{marca}")
+
+    apenas_base = set(metricas_base) - set(metricas_novo)
+    if apenas_base:
+        print(f"\nMétricas ausentes no novo resultado: {', '.join(sorted(apenas_base))}")
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara resultados de benchmark")
+    parser.add_argument("arquivos", nargs="*", type=Path, help="base.json novo.json")
+    parser.add_argument("--ultimos", metavar="NOME",
+                        help="Compara os dois resultados mais recentes do benchmark NOME")
+    parser.add_argument("--limite", type=float, default=10.0,
+                        help="Piora percentual considerada regressão (padrão: 10)")
+    args = parser.parse_args()
+
+    if args.ultimos:
+        caminho_base, caminho_novo = ultimos_dois(args.ultimos)
+    elif len(args.arquivos) == 2:
+        caminho_base, caminho_novo = args.arquivos
+    else:
+        parser.error("Informe dois arquivos ou --ultimos NOME")
+
+    regressoes = comparar(carregar(caminho_base), carregar(caminho_novo), args.limite)
+    print(f"\n{regressoes} regressão(ões) acima de {args.limite:.0f}%")
+    sys.exit(1 if regressoes else 0)
+
+
+if __name__ == "__main__":
+    main()
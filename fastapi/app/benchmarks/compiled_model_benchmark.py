@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Benchmark do modelo compilado (services/model_compiler.py) contra o sklearn
+
+Para cada modelo (RandomForest e GradientBoosting treinados com os dados sintéticos
+do benchmark de inferência, ou um arquivo joblib com --modelo):
+
+- conformidade: probabilidades e classes do ModeloCompilado contra scaler.transform +
+  predict_proba do sklearn em --linhas-conformidade linhas, também depois de exportar
+  e recarregar o .npz (código de saída 1 se a diferença passar de --tolerancia);
+- latência de uma linha (p50/p95/p99) do modelo isolado e de mlflow_service.predict
+  (com e sem compilação);
+- lotes de vários tamanhos: tempo por lote e linhas/s, para achar o ponto em que o
+  predict do sklearn volta a ser mais rápido (MODELO_COMPILADO_MAX_LINHAS).
+
+Uso:
+    python benchmarks/compiled_model_benchmark.py
+    python benchmarks/compiled_model_benchmark.py --lotes 1,10,100,1000,10000 --repeticoes 1000
+    python benchmarks/compiled_model_benchmark.py --modelo modelo.joblib
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from common import cronometro, percentis, salvar_resultado, vazao
+from inference_benchmark import gerar_dados_sinteticos
+
+
+def preparar_modelos(caminho, amostras: int) -> Dict[str, Tuple]:
+    """{nome: (modelo, scaler)} de um arquivo joblib ou treinados com dados sintéticos."""
+    if caminho is not None:
+        import joblib
+        carregado = joblib.load(caminho)
+        if isinstance(carregado, dict):
+            return {caminho.stem: (carregado["model"], carregado.get("scaler"))}
+        return {caminho.stem: (carregado, None)}
+
+    from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+    from sklearn.preprocessing import LabelEncoder, StandardScaler
+    from services.classification import classificar_intensidade
+    from services.feature_store import FEATURE_ORDER
+
+    dados = gerar_dados_sinteticos(amostras)
+    X = np.column_stack([dados[f] for f in FEATURE_ORDER]).astype(float)
+    y = LabelEncoder().fit_transform(classificar_intensidade(dados['precipitacao_mm']))
+    scaler = StandardScaler().fit(X)
+    X_escalado = scaler.transform(X)
+
+    modelos = {}
+    for nome, modelo in (
+        ("RandomForest", RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=1)),
+        ("RandomForest_d12", RandomForestClassifier(n_estimators=100, max_depth=12, random_state=42, n_jobs=1)),
+        ("GradientBoosting", GradientBoostingClassifier(n_estimators=100, random_state=42)),
+    ):
+        with cronometro() as t:
+            modelo.fit(X_escalado, y)
+        print(f"🤖 {nome} treinado em {t['segundos']:.1f}s")
+        modelos[nome] = (modelo, scaler)
+    return modelos
+
+
+def matriz_teste(n: int, seed: int = 7) -> np.ndarray:
+    from services.feature_store import FEATURE_ORDER
+    dados = gerar_dados_sinteticos(n, seed=seed)
+    return np.column_stack([dados[f] for f in FEATURE_ORDER]).astype(float)
+
+
+def _sklearn_proba(modelo, scaler, X: np.ndarray) -> np.ndarray:
+    return modelo.predict_proba(scaler.transform(X) if scaler is not None else X)
+
+
+def medir_conformidade(modelo, scaler, compilado, X: np.ndarray, tolerancia: float) -> Dict:
+    """Diferença máxima de probabilidades e concordância das classes (compilado e .npz)."""
+    from services.model_compiler import carregar_modelo_compilado
+
+    esperado = _sklearn_proba(modelo, scaler, X)
+    classes_esperadas = modelo.classes_.take(np.argmax(esperado, axis=1))
+    resultado = {"linhas": len(X)}
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = compilado.salvar(Path(pasta) / "modelo.npz")
+        resultado["npz_bytes"] = caminho.stat().st_size
+        recarregado = carregar_modelo_compilado(caminho)
+        for nome, candidato in (("compilado", compilado), ("npz", recarregado)):
+            proba = candidato.predict_proba(X)
+            resultado[nome] = {
+                "max_diff_proba": float(np.abs(proba - esperado).max()),
+                "concordancia_classes": float((candidato.predict(X) == classes_esperadas).mean()),
+            }
+    resultado["ok"] = all(
+        resultado[nome]["max_diff_proba"] <= tolerancia and resultado[nome]["concordancia_classes"] == 1.0
+        for nome in ("compilado", "npz")
+    )
+    return resultado
+
+
+def _latencias(funcao, linhas: List[np.ndarray]) -> List[float]:
+    amostras = []
+    for x in linhas:
+        t0 = time.perf_counter()
+        funcao(x)
+        amostras.append(time.perf_counter() - t0)
+    return amostras
+
+
+def medir_linha(modelo, scaler, compilado, X: np.ndarray) -> Dict:
+    """Latência de uma linha por chamada: sklearn (scaler + predict_proba) x compilado."""
+    linhas = [X[i:i + 1] for i in range(len(X))]
+    # Aquece caches e o pool do joblib antes de medir
+    _latencias(lambda x: _sklearn_proba(modelo, scaler, x), linhas[:20])
+    _latencias(compilado.predict_proba, linhas[:20])
+    sklearn = percentis(_latencias(lambda x: _sklearn_proba(modelo, scaler, x), linhas))
+    comp = percentis(_latencias(compilado.predict_proba, linhas))
+    return {"sklearn": sklearn, "compilado": comp, "ganho_p50": round(sklearn["p50_ms"] / comp["p50_ms"], 1)}
+
+
+def medir_servico(modelo, scaler, X: np.ndarray) -> Dict:
+    """mlflow_service.predict (features, escala, modelo, classe) com e sem compilação."""
+    from services import mlflow_service
+    from services.feature_store import FEATURE_ORDER
+    from services.prediction_cache import obter_cache_predicoes
+
+    payloads = [dict(zip(FEATURE_ORDER, linha)) for linha in X]
+    mlflow_service.usar_modelo_local(modelo, scaler, model_name=type(modelo).__name__)
+    publicado = mlflow_service.obter_modelo()
+    # Mede o modelo, não o cache de predições
+    cache = obter_cache_predicoes()
+    tamanho_cache, cache.tamanho = cache.tamanho, 0
+    resultado = {}
+    for nome, ativo in (("sklearn", None), ("compilado", publicado.compilado)):
+        mlflow_service._modelo = publicado._replace(compilado=ativo)
+        _latencias(mlflow_service.predict, payloads[:20])
+        resultado[nome] = percentis(_latencias(mlflow_service.predict, payloads))
+    mlflow_service._modelo = publicado
+    cache.tamanho = tamanho_cache
+    resultado["ganho_p50"] = round(resultado["sklearn"]["p50_ms"] / resultado["compilado"]["p50_ms"], 1)
+    return resultado
+
+
+def medir_lotes(modelo, scaler, compilado, X: np.ndarray, tamanhos: List[int]) -> Dict:
+    """Mediana do tempo por lote e linhas/s para cada tamanho de lote."""
+    resultado = {}
+    for tamanho in tamanhos:
+        lote = X[:tamanho]
+        repeticoes = max(3, min(50, 20000 // max(tamanho, 1)))
+        medidas = {}
+        for nome, funcao in (("sklearn", lambda x: _sklearn_proba(modelo, scaler, x)),
+                             ("compilado", compilado.predict_proba)):
+            funcao(lote)
+            mediana = float(np.median(_latencias(funcao, [lote] * repeticoes)))
+            medidas[nome] = {"ms_por_lote": round(mediana * 1000, 3), "linhas_por_s": vazao(len(lote), mediana)}
+        medidas["ganho"] = round(medidas["sklearn"]["ms_por_lote"] / medidas["compilado"]["ms_por_lote"], 2)
+        resultado[str(len(lote))] = medidas
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do modelo compilado para NumPy x sklearn")
+    parser.add_argument("--modelo", type=Path, default=None,
+                        help="Arquivo joblib com o modelo (ou dict model/scaler)")
+    parser.add_argument("--amostras-treino", type=int, default=20000)
+    parser.add_argument("--linhas-conformidade", type=int, default=20000)
+    parser.add_argument("--repeticoes", type=int, default=500, help="Chamadas de uma linha")
+    parser.add_argument("--lotes", default="1,10,100,1000,10000", help="Tamanhos de lote")
+    parser.add_argument("--tolerancia", type=float, default=1e-9)
+    parser.add_argument("--saida", type=Path, default=None)
+    args = parser.parse_args()
+
+    from services.model_compiler import compilar_modelo
+
+    tamanhos = [int(t) for t in args.lotes.split(",") if t.strip()]
+    X = matriz_teste(max(args.linhas_conformidade, args.repeticoes, max(tamanhos)))
+
+    metricas = {}
+    conforme = True
+    for nome, (modelo, scaler) in preparar_modelos(args.modelo, args.amostras_treino).items():
+        with cronometro() as t:
+            compilado = compilar_modelo(modelo, scaler)
+        print(f"\n⚡ {nome}: {compilado.n_arvores} árvores, {compilado.n_nos} nós, "
+              f"profundidade {compilado.profundidade} (compilado em {t['segundos'] * 1000:.0f} ms)")
+
+        m = {
+            "tipo": type(modelo).__name__,
+            "arvores": compilado.n_arvores,
+            "nos": compilado.n_nos,
+            "compilacao_ms": round(t["segundos"] * 1000, 1),
+            "conformidade": medir_conformidade(modelo, scaler, compilado, X[:args.linhas_conformidade],
+                                               args.tolerancia),
+        }
+        c = m["conformidade"]
+        conforme &= c["ok"]
+        print(f"   {'✅' if c['ok'] else '❌'} conformidade: diferença máx. {c['compilado']['max_diff_proba']:.2e}, "
+              f"classes {c['compilado']['concordancia_classes'] * 100:.2f}% iguais (.npz {c['npz_bytes'] / 1024:.0f} KiB)")
+
+        m["uma_linha"] = medir_linha(modelo, scaler, compilado, X[:args.repeticoes])
+        u = m["uma_linha"]
+        print(f"   1 linha: sklearn p50 {u['sklearn']['p50_ms']:.3f} ms  compilado p50 "
+              f"{u['compilado']['p50_ms']:.3f} ms  ({u['ganho_p50']}x)")
+
+        m["servico_predict"] = medir_servico(modelo, scaler, X[:args.repeticoes])
+        sv = m["servico_predict"]
+        print(f"   mlflow_service.predict: sklearn p50 {sv['sklearn']['p50_ms']:.3f} ms  compilado p50 "
+              f"{sv['compilado']['p50_ms']:.3f} ms  ({sv['ganho_p50']}x)")
+
+        m["lotes"] = medir_lotes(modelo, scaler, compilado, X, tamanhos)
+        for tamanho, medidas in m["lotes"].items():
+            print(f"   lote {tamanho:>6}: sklearn {medidas['sklearn']['ms_por_lote']:>9.3f} ms  "
+                  f"compilado {medidas['compilado']['ms_por_lote']:>9.3f} ms  ({medidas['ganho']}x)")
+        metricas[nome] = m
+
+    salvar_resultado(
+        "modelo_compilado",
+        metricas,
+        parametros={
+            "modelo": str(args.modelo) if args.modelo else None,
+            "amostras_treino": args.amostras_treino,
+            "linhas_conformidade": args.linhas_conformidade,
+            "repeticoes": args.repeticoes,
+            "lotes": tamanhos,
+            "tolerancia": args.tolerancia,
+        },
+        saida=args.saida
+    )
+    if not conforme:
+        print("❌ O modelo compilado divergiu do sklearn")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
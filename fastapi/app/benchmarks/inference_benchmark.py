@@ -0,0 +1,431 @@
+#!/usr/bin/env python3
+"""
+Benchmark de inferência: latência e vazão de /predict, /predict/batch e /predict-from-db
+
+Usa um modelo sklearn local no lugar do servidor MLFlow: treina um RandomForest pequeno
+com dados sintéticos (classes pelos mesmos limites de services/classification.py) ou
+carrega um arquivo joblib com --modelo. Mede:
+
+- etapas de /predict, chamando em sequência as mesmas funções do endpoint:
+  validação (pydantic), montagem das features, normalização, modelo e log no banco;
+- endpoints em processo (função do FastAPI chamada diretamente, sem HTTP);
+- endpoints via HTTP com clientes concorrentes (uvicorn em thread neste processo,
+  ou uma API já em execução com --url).
+
+Uso:
+    python benchmarks/inference_benchmark.py
+    python benchmarks/inference_benchmark.py --requisicoes 1000 --concorrencia 1,8,32
+    python benchmarks/inference_benchmark.py --url http://localhost:8000 --modos http
+    python benchmarks/inference_benchmark.py --sem-banco      # sem Postgres: não grava nem consulta o banco
+"""
+import argparse
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from common import cronometro, percentis, salvar_resultado, vazao
+
+ETAPAS = ["validacao", "features", "normalizacao", "modelo", "log_banco"]
+
+
+# ============================================================================
+# Modelo local
+# ============================================================================
+
+def gerar_dados_sinteticos(n: int, seed: int = 42) -> Dict[str, np.ndarray]:
+    """Gera medições horárias plausíveis para o sertão/agreste de PE."""
+    rng = np.random.default_rng(seed)
+    chove = rng.random(n) < 0.15
+    precipitacao = np.where(chove, np.round(rng.exponential(3.0, n), 1), 0.0)
+    pressao = rng.normal(960, 5, n)
+    temperatura = rng.normal(26, 4, n)
+    umidade = np.clip(rng.normal(70, 15, n) + chove * 15, 5, 100)
+    vento = np.abs(rng.normal(2.5, 1.2, n))
+    return {
+        'precipitacao_mm': precipitacao,
+        'pressao_estacao_mb': pressao,
+        'pressao_max_mb': pressao + np.abs(rng.normal(0.4, 0.2, n)),
+        'pressao_min_mb': pressao - np.abs(rng.normal(0.4, 0.2, n)),
+        'temperatura_ar_c': temperatura,
+        'temperatura_max_c': temperatura + np.abs(rng.normal(0.5, 0.3, n)),
+        'temperatura_min_c': temperatura - np.abs(rng.normal(0.5, 0.3, n)),
+        'umidade_rel_horaria_pct': umidade,
+        'umidade_rel_max_pct': np.clip(umidade + 3, 0, 100),
+        'umidade_rel_min_pct': np.clip(umidade - 3, 0, 100),
+        'vento_velocidade_ms': vento,
+        'vento_direcao_graus': rng.uniform(0, 360, n),
+        'vento_rajada_max_ms': vento * rng.uniform(1.2, 2.5, n),
+        'radiacao_global_kjm2': np.clip(rng.normal(1200, 900, n), 0, None),
+        'ano': rng.integers(2024, 2026, n),
+        'mes': rng.integers(1, 13, n),
+        'dia': rng.integers(1, 29, n),
+        'hora': rng.integers(0, 24, n),
+        'dia_semana': rng.integers(0, 7, n),
+    }
+
+
+def preparar_modelo(caminho: Optional[Path], amostras: int) -> Dict:
+    """
+    Carrega o modelo de um arquivo joblib (modelo ou dict com model/scaler/label_encoder)
+    ou treina um RandomForest local, e o instala em mlflow_service.
+    """
+    from services.mlflow_service import FEATURE_ORDER, usar_modelo_local
+
+    if caminho is not None:
+        import joblib
+        carregado = joblib.load(caminho)
+        if isinstance(carregado, dict):
+            model = carregado["model"]
+            scaler = carregado.get("scaler")
+            label_encoder = carregado.get("label_encoder")
+        else:
+            model, scaler, label_encoder = carregado, None, None
+        usar_modelo_local(model, scaler, label_encoder, model_name=caminho.stem)
+        return {"origem": str(caminho), "tipo": type(model).__name__}
+
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.preprocessing import LabelEncoder, StandardScaler
+    from services.classification import classificar_intensidade
+
+    dados = gerar_dados_sinteticos(amostras)
+    X = np.column_stack([dados[f] for f in FEATURE_ORDER]).astype(float)
+    y_nomes = classificar_intensidade(dados['precipitacao_mm'])
+
+    label_encoder = LabelEncoder().fit(y_nomes)
+    scaler = StandardScaler().fit(X)
+    with cronometro() as t:
+        model = RandomForestClassifier(n_estimators=100, max_depth=12, random_state=42, n_jobs=1)
+        model.fit(scaler.transform(X), label_encoder.transform(y_nomes))
+
+    usar_modelo_local(model, scaler, label_encoder, model_name="RandomForest_local")
+    return {
+        "origem": "treinado localmente (dados sintéticos)",
+        "tipo": type(model).__name__,
+        "amostras_treino": amostras,
+        "treino_segundos": round(t["segundos"], 3),
+    }
+
+
+# ============================================================================
+# Requisições
+# ============================================================================
+
+def gerar_payloads(n: int, codigos: List[str], seed: int = 7) -> List[Dict]:
+    """Corpos de /predict (SimplePredictionRequest) com valores variados."""
+    dados = gerar_dados_sinteticos(n, seed=seed)
+    payloads = []
+    for i in range(n):
+        payload = {
+            campo: round(float(dados[campo][i]), 2)
+            for campo in (
+                'precipitacao_mm', 'pressao_estacao_mb', 'temperatura_ar_c',
+                'umidade_rel_horaria_pct', 'vento_velocidade_ms', 'vento_direcao_graus',
+                'vento_rajada_max_ms', 'radiacao_global_kjm2'
+            )
+        }
+        if codigos:
+            payload['codigo_wmo'] = codigos[i % len(codigos)]
+        payloads.append(payload)
+    return payloads
+
+
+def payload_batch(payloads: List[Dict]) -> List[Dict]:
+    """Corpo de /predict/batch (PredictionRequest) a partir dos payloads simples."""
+    return [{k: v for k, v in p.items() if k != 'codigo_wmo'} for p in payloads]
+
+
+def listar_codigos_estacoes() -> List[str]:
+    try:
+        from services.station_registry import get_station_registry
+        return get_station_registry().codigos()
+    except Exception as e:
+        print(f"⚠️  Estações indisponíveis ({e}); requisições sem codigo_wmo")
+        return []
+
+
+# ============================================================================
+# Medições
+# ============================================================================
+
+@contextmanager
+def sem_log_no_banco(ativo: bool = True):
+    """
+    Troca o log de /predict em predicoes_intensidade por uma função vazia enquanto o
+    bloco executa (vale para as chamadas em processo e para o uvicorn em thread).
+    """
+    from services import main as api
+
+    original = api._salvar_predicao_simples
+    if ativo:
+        api._salvar_predicao_simples = lambda request, result: None
+    try:
+        yield
+    finally:
+        api._salvar_predicao_simples = original
+
+
+def medir_etapas(payloads: List[Dict], com_banco: bool) -> Dict:
+    """
+    Executa o caminho de /predict etapa por etapa (mesmas funções do endpoint)
+    e resume a latência de cada etapa.
+    """
+    from datetime import datetime
+    from services import mlflow_service
+    from services.main import SimplePredictionRequest, _dados_predicao_simples, _salvar_predicao_simples
+
+    amostras = {etapa: [] for etapa in ETAPAS}
+    for payload in payloads:
+        t0 = time.perf_counter()
+        request = SimplePredictionRequest(**payload)
+        t1 = time.perf_counter()
+        X = mlflow_service.montar_features(_dados_predicao_simples(request, datetime.now()))
+        t2 = time.perf_counter()
+        X = mlflow_service.escalar_features(X)
+        t3 = time.perf_counter()
+        codigo, probabilidades = mlflow_service.executar_modelo(X)
+        result = {
+            "prediction": mlflow_service.nome_classe(codigo),
+            "probabilities": probabilidades,
+            "model_name": mlflow_service.obter_modelo().nome,
+        }
+        t4 = time.perf_counter()
+        amostras["validacao"].append(t1 - t0)
+        amostras["features"].append(t2 - t1)
+        amostras["normalizacao"].append(t3 - t2)
+        amostras["modelo"].append(t4 - t3)
+
+        if com_banco:
+            try:
+                _salvar_predicao_simples(request, result)
+                amostras["log_banco"].append(time.perf_counter() - t4)
+            except Exception as e:
+                print(f"⚠️  Log no banco desativado: {e}")
+                com_banco = False
+
+    total = sum(sum(v) for v in amostras.values())
+    resumo = {}
+    for etapa, valores in amostras.items():
+        if not valores:
+            continue
+        resumo[etapa] = {
+            **percentis(valores),
+            "fracao": round(sum(valores) / total, 4) if total else None,
+        }
+    return resumo
+
+
+def medir_em_processo(payloads: List[Dict], batch_size: int, limite_db: int, com_banco: bool) -> Dict:
+    """Chama as funções dos endpoints diretamente (sem HTTP)."""
+    from services.main import (
+        PredictionRequest, SimplePredictionRequest,
+        simple_predict, make_batch_predictions, predict_from_db
+    )
+
+    resultado = {}
+
+    latencias = []
+    with sem_log_no_banco(not com_banco), cronometro() as total:
+        for payload in payloads:
+            t0 = time.perf_counter()
+            simple_predict(SimplePredictionRequest(**payload))
+            latencias.append(time.perf_counter() - t0)
+    resultado["predict"] = {**percentis(latencias), "throughput_rps": vazao(len(payloads), total["segundos"])}
+
+    latencias = []
+    lotes = [payload_batch(payloads[i:i + batch_size]) for i in range(0, len(payloads), batch_size)]
+    with cronometro() as total:
+        for lote in lotes:
+            t0 = time.perf_counter()
+            make_batch_predictions([PredictionRequest(**item) for item in lote])
+            latencias.append(time.perf_counter() - t0)
+    resultado["predict_batch"] = {
+        **percentis(latencias),
+        "batch_size": batch_size,
+        "linhas_por_s": vazao(len(payloads), total["segundos"]),
+    }
+
+    if not com_banco:
+        resultado["predict_from_db"] = {"ignorado": "sem banco"}
+        return resultado
+
+    try:
+        latencias = []
+        retornadas = 0
+        for _ in range(5):
+            t0 = time.perf_counter()
+            resposta = predict_from_db(limit=limite_db)
+            latencias.append(time.perf_counter() - t0)
+            retornadas = resposta.get("total", 0)
+        resultado["predict_from_db"] = {**percentis(latencias), "limit": limite_db, "predicoes": retornadas}
+    except Exception as e:
+        resultado["predict_from_db"] = {"erro": str(e)}
+
+    return resultado
+
+
+def _porta_livre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def iniciar_servidor():
+    """Sobe a API (services.main:app) com uvicorn em uma thread deste processo."""
+    import uvicorn
+    from services.main import app
+
+    porta = _porta_livre()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=porta, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    for _ in range(100):
+        if server.started:
+            break
+        time.sleep(0.1)
+    else:
+        raise RuntimeError("uvicorn não iniciou")
+    return server, thread, f"http://127.0.0.1:{porta}"
+
+
+def carga_http(url: str, corpos: List, concorrencia: int, timeout: float = 30.0) -> Dict:
+    """Dispara as requisições com `concorrencia` clientes e mede latência e vazão."""
+    import requests
+
+    local = threading.local()
+
+    def enviar(corpo) -> Optional[float]:
+        if not hasattr(local, "sessao"):
+            local.sessao = requests.Session()
+        t0 = time.perf_counter()
+        try:
+            resposta = local.sessao.post(url, json=corpo, timeout=timeout) if corpo is not None \
+                else local.sessao.post(url, timeout=timeout)
+            if resposta.status_code >= 400:
+                return None
+        except requests.RequestException:
+            return None
+        return time.perf_counter() - t0
+
+    with cronometro() as total:
+        with ThreadPoolExecutor(max_workers=concorrencia) as pool:
+            latencias = list(pool.map(enviar, corpos))
+
+    sucesso = [l for l in latencias if l is not None]
+    return {
+        **percentis(sucesso),
+        "erros": len(latencias) - len(sucesso),
+        "throughput_rps": vazao(len(sucesso), total["segundos"]),
+    }
+
+
+def medir_http(base_url: str, payloads: List[Dict], concorrencias: List[int],
+               batch_size: int, limite_db: int, com_banco: bool = True) -> Dict:
+    lotes = [payload_batch(payloads[i:i + batch_size]) for i in range(0, len(payloads), batch_size)]
+    resultado = {}
+    for c in concorrencias:
+        print(f"   HTTP com {c} cliente(s)...")
+        resultado[f"c{c}"] = {
+            "predict": carga_http(f"{base_url}/predict", payloads, c),
+            "predict_batch": {**carga_http(f"{base_url}/predict/batch", lotes, c), "batch_size": batch_size},
+        }
+        if com_banco:
+            resultado[f"c{c}"]["predict_from_db"] = {
+                **carga_http(f"{base_url}/predict-from-db?limit={limite_db}", [None] * max(c, 5), c),
+                "limit": limite_db,
+            }
+    return resultado
+
+
+def _imprimir(titulo: str, medidas: Dict):
+    print(f"\n{titulo}")
+    for nome, m in medidas.items():
+        if "p50_ms" in m:
+            extra = f"  {m['throughput_rps']:>9.1f} req/s" if m.get("throughput_rps") else ""
+            fracao = f"  {m['fracao'] * 100:5.1f}%" if m.get("fracao") is not None else ""
+            print(f"   {nome:<16} p50 {m['p50_ms']:>9.3f} ms  p95 {m['p95_ms']:>9.3f} ms  "
+                  f"p99 {m['p99_ms']:>9.3f} ms{fracao}{extra}")
+        elif "erro" in m:
+            print(f"   {nome:<16} erro: {m['erro']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de inferência dos endpoints de ML")
+    parser.add_argument("--modelo", type=Path, default=None,
+                        help="Arquivo joblib com o modelo (ou dict model/scaler/label_encoder)")
+    parser.add_argument("--amostras-treino", type=int, default=20000)
+    parser.add_argument("--requisicoes", type=int, default=500)
+    parser.add_argument("--concorrencia", default="1,4,16", help="Clientes HTTP simultâneos")
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--limit-db", type=int, default=100, help="limit de /predict-from-db")
+    parser.add_argument("--modos", default="etapas,processo,http",
+                        help="Subconjunto de etapas,processo,http")
+    parser.add_argument("--url", default=None,
+                        help="Usa uma API já em execução (o modelo é o carregado nela)")
+    parser.add_argument("--sem-banco", action="store_true",
+                        help="Não grava as predições nem mede /predict-from-db (roda sem Postgres)")
+    parser.add_argument("--saida", type=Path, default=None)
+    args = parser.parse_args()
+
+    modos = [m.strip() for m in args.modos.split(",") if m.strip()]
+    concorrencias = [int(c) for c in args.concorrencia.split(",") if c.strip()]
+
+    metricas = {}
+    if args.url is None or {"etapas", "processo"} & set(modos):
+        metricas["modelo"] = preparar_modelo(args.modelo, args.amostras_treino)
+        print(f"🤖 Modelo: {metricas['modelo']}")
+
+    codigos = [] if args.sem_banco else listar_codigos_estacoes()
+    payloads = gerar_payloads(args.requisicoes, codigos)
+
+    if "etapas" in modos:
+        metricas["etapas_predict"] = medir_etapas(payloads, com_banco=not args.sem_banco)
+        _imprimir("⏱️  Etapas de /predict", metricas["etapas_predict"])
+
+    if "processo" in modos:
+        metricas["em_processo"] = medir_em_processo(payloads, args.batch_size, args.limit_db,
+                                                    com_banco=not args.sem_banco)
+        _imprimir("🧪 Endpoints em processo", metricas["em_processo"])
+
+    if "http" in modos:
+        server = None
+        base_url = args.url
+        if base_url is None:
+            server, thread, base_url = iniciar_servidor()
+        elif args.sem_banco:
+            print("⚠️  --sem-banco não se aplica ao /predict de uma API externa (--url): ela grava no próprio banco")
+        try:
+            # O uvicorn roda em thread deste processo: a troca do log vale para ele
+            with sem_log_no_banco(args.sem_banco and server is not None):
+                metricas["http"] = medir_http(base_url, payloads, concorrencias, args.batch_size,
+                                              args.limit_db, com_banco=not args.sem_banco)
+        finally:
+            if server is not None:
+                server.should_exit = True
+                thread.join(timeout=10)
+        for nome, medidas in metricas["http"].items():
+            _imprimir(f"🌐 HTTP {nome}", medidas)
+
+    salvar_resultado(
+        "inferencia",
+        metricas,
+        parametros={
+            "requisicoes": args.requisicoes,
+            "concorrencia": concorrencias,
+            "batch_size": args.batch_size,
+            "limit_db": args.limit_db,
+            "modos": modos,
+            "url": args.url,
+            "com_banco": not args.sem_banco,
+        },
+        saida=args.saida
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Benchmark de ingestão: parse → conversão → carga no PostgreSQL → upload S3
+
+Usa os CSVs do INMET em data/raw e réplicas sintéticas (10x, 100x estações: cada réplica
+é uma cópia dos arquivos com outro CODIGO (WMO)). Cada arquivo passa pelas mesmas funções
+da API, uma etapa por vez, e o tempo de cada etapa é acumulado:
+
+- parse:     services.csv_processor.abrir_inmet_csv (lotes colunares do weather_batch)
+- conversao: services.weather_batch.lote_para_csv (lote → CSV do COPY)
+- banco:     services.db_service.insert_lote_dados_meteorologicos (inclui a conversão,
+             COPY, partições e rollups, como na ingestão real)
+- s3:        services.s3_service.upload_to_minio (MinIO local ou moto)
+
+Uso (dentro do container da API ou com o .env apontando para os serviços locais):
+    python benchmarks/ingestion_benchmark.py
+    python benchmarks/ingestion_benchmark.py --escalas 1,10,100 --s3 moto
+    python benchmarks/ingestion_benchmark.py --etapas parse,conversao
+
+As estações sintéticas são removidas do banco ao final (exceto com --manter-dados).
+"""
+import argparse
+import os
+import re
+import tempfile
+from pathlib import Path
+from typing import Dict, List
+
+from common import RAW_DATA_DIR, cronometro, salvar_resultado, vazao
+
+ETAPAS = ["parse", "conversao", "banco", "s3"]
+BATCH_SIZE = 1000
+BUCKET_BENCHMARK = "inmet-benchmark"
+
+_PADRAO_CODIGO = re.compile(rb"^(CODIGO \(WMO\):;)([^\r\n;]*)", re.MULTILINE)
+_PADRAO_ESTACAO = re.compile(rb"^(ESTACAO:;)([^\r\n;]*)", re.MULTILINE)
+
+
+def listar_csvs() -> List[Path]:
+    arquivos = sorted(set(RAW_DATA_DIR.glob("*.csv")) | set(RAW_DATA_DIR.glob("*.CSV")))
+    if not arquivos:
+        raise FileNotFoundError(f"Nenhum CSV encontrado em {RAW_DATA_DIR}")
+    return arquivos
+
+
+def gerar_csvs_sinteticos(arquivos: List[Path], escala: int, destino: Path) -> List[Path]:
+    """
+    Retorna os arquivos originais mais (escala - 1) réplicas com códigos de estação sintéticos
+    (ex: A301 → A301S001), gravadas em `destino`.
+    """
+    gerados = list(arquivos)
+    for replica in range(1, escala):
+        for arquivo in arquivos:
+            conteudo = arquivo.read_bytes()
+            sufixo = f"S{replica:03d}".encode()
+            conteudo = _PADRAO_CODIGO.sub(lambda m: m.group(1) + m.group(2).strip() + sufixo, conteudo, count=1)
+            conteudo = _PADRAO_ESTACAO.sub(lambda m: m.group(1) + m.group(2).strip() + b" " + sufixo, conteudo, count=1)
+            novo = destino / f"{arquivo.stem}_{sufixo.decode()}{arquivo.suffix}"
+            novo.write_bytes(conteudo)
+            gerados.append(novo)
+    return gerados
+
+
+def preparar_s3(modo: str):
+    """
+    Configura o destino dos uploads. Em modo moto, o S3 é simulado em memória
+    (requer o pacote moto) e precisa ser iniciado antes de importar s3_service.
+    """
+    os.environ["S3_BUCKET_NAME"] = BUCKET_BENCHMARK
+    if modo != "moto":
+        return None
+
+    try:
+        from moto import mock_aws
+    except ImportError:
+        raise SystemExit("❌ Pacote moto não instalado (pip install moto) — ou use --s3 minio")
+    os.environ["S3_ENDPOINT_URL"] = "https://s3.amazonaws.com"
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "benchmark")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "benchmark")
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    mock = mock_aws()
+    mock.start()
+    return mock
+
+
+def limpar_estacoes_sinteticas(codigos: List[str]):
+    """Remove do banco os dados e as estações sintéticas criadas pelo benchmark."""
+    if not codigos:
+        return
+    from services.db_service import get_db_connection
+    from services.station_registry import invalidar_estacoes
+
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute("DELETE FROM dados_meteorologicos WHERE codigo_wmo = ANY(%s)", (codigos,))
+        cur.execute("SELECT to_regclass('rollup_dados_meteorologicos') IS NOT NULL")
+        if cur.fetchone()[0]:
+            cur.execute("DELETE FROM rollup_dados_meteorologicos WHERE codigo_wmo = ANY(%s)", (codigos,))
+        cur.execute("DELETE FROM estacoes WHERE codigo_wmo = ANY(%s)", (codigos,))
+        conn.commit()
+        print(f"🧹 {len(codigos)} estações sintéticas removidas do banco")
+    finally:
+        cur.close()
+        conn.close()
+    invalidar_estacoes()
+
+
+def executar_escala(arquivos: List[Path], etapas: List[str]) -> Dict:
+    """Roda as etapas selecionadas sobre todos os arquivos e acumula os tempos."""
+    from services.csv_processor import abrir_inmet_csv
+    from services.db_service import insert_lote_dados_meteorologicos
+    from services.weather_batch import lote_para_csv
+    from services.station_registry import registrar_estacao
+
+    tempos = {etapa: 0.0 for etapa in etapas}
+    erros = {}
+    linhas = 0
+    total_bytes = 0
+    estacoes = set()
+
+    for arquivo in arquivos:
+        total_bytes += arquivo.stat().st_size
+
+        with cronometro() as t:
+            estacao, iterador = abrir_inmet_csv(arquivo, chunksize=BATCH_SIZE)
+            lotes = list(iterador)
+        tempos["parse"] += t["segundos"]
+
+        linhas += sum(lote.num_rows for lote in lotes)
+        estacoes.add(estacao["codigo_wmo"])
+
+        if "conversao" in etapas:
+            with cronometro() as t:
+                for lote in lotes:
+                    lote_para_csv(lote)
+            tempos["conversao"] += t["segundos"]
+
+        if "banco" in etapas and "banco" not in erros:
+            try:
+                with cronometro() as t:
+                    registrar_estacao(
+                        codigo_wmo=estacao["codigo_wmo"],
+                        regiao=estacao.get("regiao", ""),
+                        uf=estacao.get("uf", ""),
+                        nome=estacao.get("nome", ""),
+                        latitude=estacao.get("latitude"),
+                        longitude=estacao.get("longitude"),
+                        altitude=estacao.get("altitude"),
+                        data_fundacao=estacao.get("data_fundacao")
+                    )
+                    for lote in lotes:
+                        insert_lote_dados_meteorologicos(lote)
+                tempos["banco"] += t["segundos"]
+            except Exception as e:
+                erros["banco"] = str(e)
+                print(f"⚠️  Etapa banco desativada: {e}")
+
+        if "s3" in etapas and "s3" not in erros:
+            try:
+                from services.s3_service import upload_to_minio
+                with cronometro() as t:
+                    upload_to_minio(arquivo)
+                tempos["s3"] += t["segundos"]
+            except Exception as e:
+                erros["s3"] = str(e)
+                print(f"⚠️  Etapa s3 desativada: {e}")
+
+    resultado_etapas = {}
+    for etapa, segundos in tempos.items():
+        if etapa not in etapas or etapa in erros:
+            continue
+        medida = {
+            "segundos": round(segundos, 4),
+            "linhas_por_s": vazao(linhas, segundos),
+        }
+        if etapa in ("parse", "s3"):
+            medida["mb_por_s"] = vazao(total_bytes / 1e6, segundos)
+        resultado_etapas[etapa] = medida
+
+    return {
+        "arquivos": len(arquivos),
+        "estacoes": len(estacoes),
+        "linhas": linhas,
+        "bytes": total_bytes,
+        "etapas": resultado_etapas,
+        "erros": erros,
+        "codigos_estacoes": sorted(estacoes),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de ingestão de CSVs do INMET")
+    parser.add_argument("--escalas", default="1,10",
+                        help="Multiplicadores do número de estações (ex: 1,10,100)")
+    parser.add_argument("--etapas", default=",".join(ETAPAS),
+                        help=f"Etapas a medir (subconjunto de {','.join(ETAPAS)})")
+    parser.add_argument("--s3", choices=["minio", "moto"], default="minio",
+                        help="Destino do upload: MinIO configurado no .env ou moto em memória")
+    parser.add_argument("--manter-dados", action="store_true",
+                        help="Não remove as estações sintéticas do banco ao final")
+    parser.add_argument("--saida", type=Path, default=None, help="Arquivo JSON de saída")
+    args = parser.parse_args()
+
+    escalas = [int(e) for e in args.escalas.split(",") if e.strip()]
+    etapas = [e.strip() for e in args.etapas.split(",") if e.strip()]
+    invalidas = set(etapas) - set(ETAPAS)
+    if invalidas:
+        parser.error(f"Etapas inválidas: {', '.join(sorted(invalidas))}")
+    if "parse" not in etapas:
+        etapas.insert(0, "parse")
+
+    mock_s3 = preparar_s3(args.s3) if "s3" in etapas else None
+    originais = listar_csvs()
+    metricas = {}
+
+    try:
+        for escala in escalas:
+            print(f"\n📊 Escala {escala}x ({len(originais) * escala} arquivos)")
+            with tempfile.TemporaryDirectory(prefix="bench_ingestao_") as tmp:
+                arquivos = gerar_csvs_sinteticos(originais, escala, Path(tmp))
+                resultado = executar_escala(arquivos, etapas)
+
+            codigos = resultado.pop("codigos_estacoes")
+            if "banco" in etapas and not args.manter_dados:
+                sinteticos = [c for c in codigos if re.search(r"S\d{3}$", c)]
+                try:
+                    limpar_estacoes_sinteticas(sinteticos)
+                except Exception as e:
+                    print(f"⚠️  Não foi possível remover estações sintéticas: {e}")
+
+            metricas[f"{escala}x"] = resultado
+            for etapa, medida in resultado["etapas"].items():
+                print(f"   {etapa:<10} {medida['segundos']:>10.2f} s  {medida['linhas_por_s'] or 0:>12,.0f} linhas/s")
+    finally:
+        if mock_s3 is not None:
+            mock_s3.stop()
+
+    salvar_resultado(
+        "ingestao",
+        metricas,
+        parametros={"escalas": escalas, "etapas": etapas, "s3": args.s3, "batch_size": BATCH_SIZE},
+        saida=args.saida
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Conformidade e desempenho do leitor único dos CSVs do INMET
+
+A API (/load-to-db, /process-all-csv) e o scripts/populate_thingsboard.py usam o mesmo
+parser (services.csv_processor, conversão toda em pyarrow). Este script compara, sobre os
+CSVs de data/raw (replicados --escalas vezes, como no benchmark de ingestão), os leitores
+atuais com as implementações anteriores, copiadas aqui como referência:
+
+- legado_api:       pandas.read_csv em blocos + conversão em pandas (leitor da API antes
+                    da unificação)
+- legado_populate:  pandas.read_csv(skiprows=8) + iterrows + pd.to_datetime por linha,
+                    ausentes como 0.0 (populate_thingsboard antes da unificação)
+- streaming:        services.csv_processor.abrir_inmet_csv (sem o cache de parse)
+- mmap:             services.csv_processor.ler_inmet_mmap sobre o arquivo concatenado
+- telemetria:       streaming + populate_thingsboard.telemetria_de_lotes
+
+Conformidade (qualquer divergência termina com código 1):
+- streaming, mmap e legado_api produzem exatamente a mesma tabela tipada
+- telemetria e legado_populate têm os mesmos timestamps e valores; onde a telemetria
+  nova omite uma medida (ausente no CSV), a antiga enviava 0.0
+
+Uso:
+    python benchmarks/inmet_reader_benchmark.py
+    python benchmarks/inmet_reader_benchmark.py --escalas 1,10
+"""
+import argparse
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from common import APP_DIR, cronometro, salvar_resultado, vazao
+from ingestion_benchmark import gerar_csvs_sinteticos, listar_csvs
+
+CHUNKSIZE = 5000
+
+
+# ============================================================================
+# IMPLEMENTAÇÕES ANTERIORES (referência)
+# ============================================================================
+
+def _legado_para_numero(serie: pd.Series) -> np.ndarray:
+    texto = serie.str.strip().str.replace(',', '.', regex=False)
+    return pd.to_numeric(texto, errors='coerce').to_numpy(dtype=np.float64)
+
+
+def _legado_converter(df: pd.DataFrame, colunas: Dict[str, Optional[str]], codigo_wmo: str) -> pa.RecordBatch:
+    from services.weather_batch import criar_lote
+
+    vazio = pd.Series(np.nan, index=df.index, dtype=object)
+    data_str = df['Data'].str.strip() if 'Data' in df else vazio
+    data = pd.to_datetime(data_str, format='%Y/%m/%d', errors='coerce')
+    data = data.fillna(pd.to_datetime(data_str, format='%Y-%m-%d', errors='coerce'))
+
+    hora_str = df['Hora UTC'] if 'Hora UTC' in df else vazio
+    partes = hora_str.str.replace('UTC', '', regex=False).str.strip().str.extract(r'^(\d{2})(\d{2})')
+    horas = pd.to_numeric(partes[0], errors='coerce')
+    minutos = pd.to_numeric(partes[1], errors='coerce')
+    validos = (data.notna() & (horas <= 23) & (minutos <= 59)).to_numpy()
+
+    lote = {'timestamp_utc': (data + pd.to_timedelta(horas * 60 + minutos, unit='m')).to_numpy()[validos]}
+    for campo, coluna in colunas.items():
+        if coluna is not None:
+            lote[campo] = _legado_para_numero(df[coluna])[validos]
+    return criar_lote(lote, codigo_wmo=codigo_wmo)
+
+
+def ler_legado_api(arquivos: List[Path]) -> pa.Table:
+    from services.csv_processor import _resolver_colunas, ler_cabecalho_inmet
+
+    lotes = []
+    for arquivo in arquivos:
+        estacao, header_line, encoding = ler_cabecalho_inmet(arquivo)
+        leitor = pd.read_csv(arquivo, sep=';', skiprows=header_line, encoding=encoding,
+                             on_bad_lines='skip', dtype=str, chunksize=CHUNKSIZE)
+        colunas = None
+        with leitor:
+            for bloco in leitor:
+                bloco.columns = bloco.columns.str.strip()
+                if colunas is None:
+                    colunas = _resolver_colunas(bloco.columns)
+                lote = _legado_converter(bloco, colunas, estacao.get('codigo_wmo'))
+                if lote.num_rows:
+                    lotes.append(lote)
+    return pa.Table.from_batches(lotes)
+
+
+def _legado_valor(val) -> float:
+    if pd.isna(val) or val == '' or str(val).strip() == '':
+        return 0.0
+    try:
+        val_str = str(val).strip().replace(',', '.')
+        if val_str == '' or val_str.lower() in ['nan', 'none', 'null']:
+            return 0.0
+        return float(val_str)
+    except Exception:
+        return 0.0
+
+
+def ler_legado_populate(arquivos: List[Path]) -> List[List[Dict]]:
+    """Telemetria de cada arquivo como o populate_thingsboard montava antes."""
+    resultado = []
+    for arquivo in arquivos:
+        df = pd.read_csv(arquivo, sep=';', skiprows=8, encoding='latin-1', on_bad_lines='skip')
+        df.columns = df.columns.str.strip()
+        df = df.dropna(subset=['Data', 'Hora UTC'])
+        telemetria = []
+        for _, row in df.iterrows():
+            try:
+                data_str = str(row.get('Data', '')).strip()
+                hora_str = str(row.get('Hora UTC', '')).strip().replace(' UTC', '').replace('UTC', '').strip()
+                if not data_str or not hora_str or data_str == 'nan' or hora_str == 'nan':
+                    continue
+                timestamp = pd.to_datetime(f"{data_str} {hora_str[:2]}:{hora_str[2:]}", format='%Y/%m/%d %H:%M')
+                telemetria.append({
+                    "ts": int(timestamp.timestamp() * 1000),
+                    "values": {
+                        "precipitacao_mm": _legado_valor(row.get('PRECIPITAÇÃO TOTAL, HORÁRIO (mm)')),
+                        "temperatura_ar_c": _legado_valor(row.get('TEMPERATURA DO AR - BULBO SECO, HORARIA (°C)')),
+                        "umidade_rel_pct": _legado_valor(row.get('UMIDADE RELATIVA DO AR, HORARIA (%)')),
+                        "pressao_mb": _legado_valor(row.get('PRESSAO ATMOSFERICA AO NIVEL DA ESTACAO, HORARIA (mB)')),
+                        "vento_velocidade_ms": _legado_valor(row.get('VENTO, VELOCIDADE HORARIA (m/s)')),
+                        "vento_direcao_graus": _legado_valor(row.get('VENTO, DIREÇÃO HORARIA (gr) (° (gr))')),
+                        "radiacao_kjm2": _legado_valor(row.get('RADIACAO GLOBAL (Kj/m²)')),
+                    }
+                })
+            except Exception:
+                continue
+        resultado.append(telemetria)
+    return resultado
+
+
+# ============================================================================
+# LEITOR ÚNICO
+# ============================================================================
+
+def ler_streaming(arquivos: List[Path]) -> pa.Table:
+    from services.csv_processor import abrir_inmet_csv
+
+    lotes = []
+    for arquivo in arquivos:
+        _, iterador = abrir_inmet_csv(arquivo, chunksize=CHUNKSIZE, usar_cache=False)
+        lotes.extend(lote for lote in iterador if lote.num_rows)
+    return pa.Table.from_batches(lotes)
+
+
+def ler_mmap(concatenado: Path) -> pa.Table:
+    from services.csv_processor import ler_inmet_mmap
+
+    return pa.Table.from_batches([lote for _, lote in ler_inmet_mmap(concatenado, workers=1)])
+
+
+def ler_telemetria(arquivos: List[Path]) -> List[List[Dict]]:
+    sys.path.insert(0, str(APP_DIR / "scripts"))
+    from populate_thingsboard import telemetria_de_lotes
+    from services.csv_processor import abrir_inmet_csv
+
+    resultado = []
+    for arquivo in arquivos:
+        _, lotes = abrir_inmet_csv(arquivo, chunksize=CHUNKSIZE, usar_cache=False)
+        resultado.append(list(telemetria_de_lotes(lotes)))
+    return resultado
+
+
+# ============================================================================
+# CONFORMIDADE
+# ============================================================================
+
+def _combinar(tabela: pa.Table) -> pa.Table:
+    return tabela.combine_chunks()
+
+
+def conferir_telemetria(nova: List[List[Dict]], legada: List[List[Dict]]) -> Dict:
+    """
+    Mensagens novas x antigas, arquivo por arquivo. Uma mensagem antiga sem correspondente
+    só é aceita se todas as medidas eram 0.0 (linha sem nenhuma medida no CSV).
+    """
+    divergencias = 0
+    omitidas = 0
+    linhas_vazias = 0
+    for mensagens_novas, mensagens_legadas in zip(nova, legada):
+        por_ts = {m["ts"]: m["values"] for m in mensagens_novas}
+        if len(por_ts) != len(mensagens_novas):
+            divergencias += 1
+        for mensagem in mensagens_legadas:
+            valores = por_ts.pop(mensagem["ts"], None)
+            if valores is None:
+                if any(v != 0.0 for v in mensagem["values"].values()):
+                    divergencias += 1
+                else:
+                    linhas_vazias += 1
+                continue
+            for chave, legado in mensagem["values"].items():
+                if chave in valores:
+                    divergencias += int(valores[chave] != legado)
+                else:
+                    omitidas += 1
+                    divergencias += int(legado != 0.0)
+        # Mensagens novas sem correspondente antigo
+        divergencias += len(por_ts)
+    return {
+        "confere": divergencias == 0 and len(nova) == len(legada),
+        "divergencias": divergencias,
+        "medidas_omitidas": omitidas,
+        "linhas_sem_medidas": linhas_vazias,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Conformidade e desempenho do leitor único do INMET")
+    parser.add_argument("--escalas", default="1",
+                        help="Multiplicadores do número de estações (ex: 1,10)")
+    parser.add_argument("--saida", type=Path, default=None, help="Arquivo JSON de saída")
+    args = parser.parse_args()
+
+    escalas = [int(e) for e in args.escalas.split(",") if e.strip()]
+    originais = listar_csvs()
+    metricas = {}
+    conforme = True
+
+    for escala in escalas:
+        print(f"\n📊 Escala {escala}x ({len(originais) * escala} arquivos)")
+        with tempfile.TemporaryDirectory(prefix="bench_leitor_") as tmp:
+            arquivos = gerar_csvs_sinteticos(originais, escala, Path(tmp))
+            concatenado = Path(tmp) / "exportacao_concatenada.csv"
+            with open(concatenado, "wb") as saida:
+                for arquivo in arquivos:
+                    saida.write(arquivo.read_bytes())
+            megabytes = concatenado.stat().st_size / 1e6
+
+            leitores = {
+                "legado_api": lambda: ler_legado_api(arquivos),
+                "streaming": lambda: ler_streaming(arquivos),
+                "mmap": lambda: ler_mmap(concatenado),
+                "legado_populate": lambda: ler_legado_populate(arquivos),
+                "telemetria": lambda: ler_telemetria(arquivos),
+            }
+            saidas = {}
+            leituras = {}
+            for nome, leitor in leitores.items():
+                with cronometro() as t:
+                    saidas[nome] = leitor()
+                linhas = saidas[nome].num_rows if isinstance(saidas[nome], pa.Table) \
+                    else sum(len(m) for m in saidas[nome])
+                leituras[nome] = {
+                    "linhas": linhas,
+                    "segundos": round(t["segundos"], 4),
+                    "mb_por_s": vazao(megabytes, t["segundos"]),
+                    "linhas_por_s": vazao(linhas, t["segundos"]),
+                }
+
+        referencia = _combinar(saidas["legado_api"])
+        conferencia = {
+            "streaming": _combinar(saidas["streaming"]).equals(referencia),
+            "mmap": _combinar(saidas["mmap"]).equals(referencia),
+        }
+        telemetria = conferir_telemetria(saidas["telemetria"], saidas["legado_populate"])
+        conferencia["telemetria"] = telemetria["confere"]
+        conforme = conforme and all(conferencia.values())
+
+        ganhos = {
+            "streaming": leituras["legado_api"]["segundos"] / leituras["streaming"]["segundos"],
+            "mmap": leituras["legado_api"]["segundos"] / leituras["mmap"]["segundos"],
+            "telemetria": leituras["legado_populate"]["segundos"] / leituras["telemetria"]["segundos"],
+        }
+        for nome, leitura in leituras.items():
+            if nome in ganhos:
+                leitura["speedup"] = round(ganhos[nome], 2)
+                leitura["confere"] = conferencia[nome]
+            marca = "" if leitura.get("confere", True) else "  ❌ divergente"
+            ganho = f"  x{leitura['speedup']}" if "speedup" in leitura else ""
+            print(f"   {nome:<16} {leitura['segundos']:>8.2f} s  {leitura['mb_por_s'] or 0:>8.1f} MB/s"
+                  f"  {leitura['linhas_por_s'] or 0:>12,.0f} linhas/s{ganho}{marca}")
+        print(f"   telemetria: {telemetria['medidas_omitidas']:,} medidas ausentes omitidas "
+              f"(antes 0.0), {telemetria['linhas_sem_medidas']:,} linhas sem medidas, "
+              f"{telemetria['divergencias']} divergência(s)")
+
+        metricas[f"{escala}x"] = {
+            "megabytes": round(megabytes, 2),
+            "leituras": leituras,
+            "telemetria": telemetria,
+        }
+
+    salvar_resultado(
+        "leitor_inmet",
+        metricas,
+        parametros={"escalas": escalas, "chunksize": CHUNKSIZE},
+        saida=args.saida
+    )
+    if not conforme:
+        print("❌ Leitores divergentes")
+        sys.exit(1)
+    print("✅ Leitores conformes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Benchmark de leitura: streaming (read_csv em blocos) x mmap com faixas em paralelo
+
+Monta uma exportação concatenada com os CSVs de data/raw replicados --escalas vezes
+(cada réplica com outro CODIGO (WMO), como no benchmark de ingestão) e mede:
+
+- streaming: services.csv_processor.abrir_inmet_csv, arquivo por arquivo
+- mmap_<N>w: services.csv_processor.ler_inmet_mmap sobre o arquivo concatenado, N workers
+
+Só o parse é medido (nada é gravado no banco). As leituras são conferidas entre si
+(mesmo número de linhas e mesma soma de precipitação).
+
+Uso:
+    python benchmarks/mmap_reader_benchmark.py
+    python benchmarks/mmap_reader_benchmark.py --escalas 1,10 --workers 1,2,4
+"""
+import argparse
+import os
+import tempfile
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+from common import cronometro, salvar_resultado, vazao
+from ingestion_benchmark import gerar_csvs_sinteticos, listar_csvs
+
+
+def ler_streaming(arquivos: List[Path]) -> Dict:
+    from services.csv_processor import abrir_inmet_csv
+    from services.weather_batch import coluna_numpy
+
+    linhas = 0
+    precipitacao = 0.0
+    for arquivo in arquivos:
+        _, lotes = abrir_inmet_csv(arquivo)
+        for lote in lotes:
+            linhas += lote.num_rows
+            precipitacao += float(np.nansum(coluna_numpy(lote, 'precipitacao_mm')))
+    return {"linhas": linhas, "precipitacao": round(precipitacao, 3)}
+
+
+def ler_mmap(concatenado: Path, workers: int, tamanho_faixa: int) -> Dict:
+    from services.csv_processor import ler_inmet_mmap
+    from services.weather_batch import coluna_numpy
+
+    linhas = 0
+    precipitacao = 0.0
+    estacoes = set()
+    for estacao, lote in ler_inmet_mmap(concatenado, workers=workers, tamanho_faixa=tamanho_faixa):
+        estacoes.add(estacao.get('codigo_wmo'))
+        linhas += lote.num_rows
+        precipitacao += float(np.nansum(coluna_numpy(lote, 'precipitacao_mm')))
+    return {"linhas": linhas, "precipitacao": round(precipitacao, 3), "estacoes": len(estacoes)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de leitura via mmap dos CSVs do INMET")
+    parser.add_argument("--escalas", default="1,10",
+                        help="Multiplicadores do número de estações (ex: 1,10,50)")
+    parser.add_argument("--workers", default=None,
+                        help="Números de workers do leitor mmap (padrão: 1 e a quantidade de CPUs)")
+    parser.add_argument("--faixa-mb", type=float, default=4.0, help="Tamanho alvo de cada faixa (MB)")
+    parser.add_argument("--saida", type=Path, default=None, help="Arquivo JSON de saída")
+    args = parser.parse_args()
+
+    escalas = [int(e) for e in args.escalas.split(",") if e.strip()]
+    if args.workers:
+        lista_workers = [int(w) for w in args.workers.split(",") if w.strip()]
+    else:
+        lista_workers = sorted({1, os.cpu_count() or 1})
+    tamanho_faixa = int(args.faixa_mb * 1024 * 1024)
+
+    originais = listar_csvs()
+    metricas = {}
+
+    for escala in escalas:
+        print(f"\n📊 Escala {escala}x ({len(originais) * escala} arquivos)")
+        with tempfile.TemporaryDirectory(prefix="bench_mmap_") as tmp:
+            arquivos = gerar_csvs_sinteticos(originais, escala, Path(tmp))
+            concatenado = Path(tmp) / "exportacao_concatenada.csv"
+            with open(concatenado, "wb") as saida:
+                for arquivo in arquivos:
+                    saida.write(arquivo.read_bytes())
+            megabytes = concatenado.stat().st_size / 1e6
+
+            leituras = {}
+            with cronometro() as t:
+                resultado = ler_streaming(arquivos)
+            leituras["streaming"] = {**resultado, "segundos": round(t["segundos"], 4)}
+
+            for workers in lista_workers:
+                with cronometro() as t:
+                    resultado = ler_mmap(concatenado, workers, tamanho_faixa)
+                leituras[f"mmap_{workers}w"] = {**resultado, "segundos": round(t["segundos"], 4)}
+
+        base = leituras["streaming"]["segundos"]
+        for nome, leitura in leituras.items():
+            leitura["mb_por_s"] = vazao(megabytes, leitura["segundos"])
+            leitura["linhas_por_s"] = vazao(leitura["linhas"], leitura["segundos"])
+            leitura["speedup"] = round(base / leitura["segundos"], 2) if leitura["segundos"] else None
+            confere = (leitura["linhas"], leitura["precipitacao"]) == \
+                (leituras["streaming"]["linhas"], leituras["streaming"]["precipitacao"])
+            leitura["confere"] = confere
+            print(f"   {nome:<10} {leitura['segundos']:>8.2f} s  {leitura['mb_por_s'] or 0:>8.1f} MB/s"
+                  f"  {leitura['linhas_por_s'] or 0:>12,.0f} linhas/s  x{leitura['speedup']}"
+                  f"{'' if confere else '  ❌ divergente'}")
+
+        metricas[f"{escala}x"] = {"megabytes": round(megabytes, 2), "leituras": leituras}
+
+    salvar_resultado(
+        "leitura_mmap",
+        metricas,
+        parametros={"escalas": escalas, "workers": lista_workers, "faixa_mb": args.faixa_mb},
+        saida=args.saida
+    )
+
+
+if __name__ == "__main__":
+    main()
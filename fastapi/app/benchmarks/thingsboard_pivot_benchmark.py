@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Benchmark do pivô da telemetria do ThingsBoard: dicts por timestamp x arrays por dispositivo
+
+Gera respostas sintéticas de /values/timeseries (mesmo formato da API: {chave: [{'ts', 'value'}]},
+valores como texto) com --anos de dados horários para N estações e compara:
+
+- dicts:  o pivô antigo do /ingest-from-thingsboard (records_by_ts com **attributes em
+          cada registro + um segundo dict por registro para o INSERT)
+- arrays: services.thingsboard_service.pivotar_telemetria (ts ordenado + um array por
+          chave, atributos uma vez por dispositivo) seguido de para_lote()
+
+Mede o tempo do pivô (sem tracemalloc) e, numa segunda passada com tracemalloc, a memória
+retida pelo resultado de todas as estações e o pico durante o pivô. A resposta de cada
+dispositivo é gerada antes do pivô e descartada depois, como no endpoint.
+
+Uso:
+    python benchmarks/thingsboard_pivot_benchmark.py
+    python benchmarks/thingsboard_pivot_benchmark.py --estacoes 1,12,50 --anos 2
+"""
+import argparse
+import gc
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from common import cronometro, salvar_resultado, vazao
+
+HORA_MS = 3_600_000
+INICIO_MS = int(datetime(2024, 1, 1).timestamp() * 1000)
+
+ATRIBUTOS = {
+    "nome": "ESTACAO SINTETICA",
+    "estado": "PE",
+    "regiao": "NE",
+    "latitude": -8.05,
+    "longitude": -34.95,
+    "altitude": 10.0,
+    "data_fundacao": "2000-01-01",
+}
+
+
+def gerar_telemetria(horas: int, semente: int) -> Dict:
+    """Resposta sintética de timeseries de um dispositivo (~2% de leituras faltando por chave)."""
+    from services.thingsboard_service import CHAVES_TELEMETRIA
+
+    rng = np.random.default_rng(semente)
+    ts = INICIO_MS + np.arange(horas, dtype=np.int64) * HORA_MS
+    telemetria = {}
+    for chave in CHAVES_TELEMETRIA:
+        presentes = rng.random(horas) > 0.02
+        valores = np.round(rng.gamma(2.0, 5.0, horas), 1)
+        # A API devolve do mais recente para o mais antigo
+        telemetria[chave] = [
+            {"ts": int(t), "value": str(v)}
+            for t, v in zip(ts[presentes][::-1], valores[presentes][::-1])
+        ]
+    return telemetria
+
+
+def pivo_dicts(telemetria: Dict, device_id: str, device_name: str, atributos: Dict) -> List[Dict]:
+    """Pivô anterior: um dict por timestamp com os atributos copiados + o dict do INSERT."""
+    records_by_ts = {}
+    for key, values in telemetria.items():
+        if not isinstance(values, list):
+            continue
+        for item in values:
+            if not isinstance(item, dict) or 'ts' not in item:
+                continue
+            ts = item['ts']
+            if ts not in records_by_ts:
+                records_by_ts[ts] = {
+                    "device_id": device_id,
+                    "device_name": device_name,
+                    "timestamp": ts,
+                    **atributos
+                }
+            records_by_ts[ts][key] = item.get('value')
+
+    registros = []
+    for record in records_by_ts.values():
+        timestamp_utc = datetime.fromtimestamp(record['timestamp'] / 1000)
+        registros.append({
+            'codigo_wmo': record.get('codigo_wmo'),
+            'data': timestamp_utc.date(),
+            'hora_utc': timestamp_utc.time(),
+            'timestamp_utc': timestamp_utc,
+            'precipitacao_mm': record.get('precipitacao_mm'),
+            'temperatura_ar_c': record.get('temperatura_ar_c'),
+            'umidade_rel_horaria_pct': record.get('umidade_rel_pct'),
+            'pressao_estacao_mb': record.get('pressao_mb'),
+            'vento_velocidade_ms': record.get('vento_velocidade_ms'),
+            'vento_direcao_graus': record.get('vento_direcao_graus'),
+            'radiacao_global_kjm2': record.get('radiacao_kjm2'),
+        })
+    # records_by_ts fica vivo até o fim do endpoint antigo (all_data)
+    return [records_by_ts, registros]
+
+
+def pivo_arrays(telemetria: Dict, device_id: str, device_name: str, atributos: Dict):
+    from services.thingsboard_service import pivotar_telemetria
+
+    pivo = pivotar_telemetria(telemetria, device_id, device_name, atributos)
+    return pivo.para_lote()
+
+
+def executar(pivo: Callable, estacoes: int, horas: int, medir_memoria: bool) -> Dict:
+    """Pivota a telemetria de todas as estações, acumulando os resultados."""
+    resultados = []
+    segundos = 0.0
+    pico = 0
+    registros = 0
+    gc.collect()
+    if medir_memoria:
+        tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0] if medir_memoria else 0
+
+    for i in range(estacoes):
+        codigo = f"X{i:03d}"
+        telemetria = gerar_telemetria(horas, semente=i)
+        atributos = {**ATRIBUTOS, "codigo_wmo": codigo}
+        if medir_memoria:
+            tracemalloc.reset_peak()
+            antes = tracemalloc.get_traced_memory()[0]
+        with cronometro() as t:
+            resultado = pivo(telemetria, f"device-{i}", f"INMET_{codigo}_SINTETICA", atributos)
+        segundos += t["segundos"]
+        if medir_memoria:
+            pico = max(pico, tracemalloc.get_traced_memory()[1] - antes)
+        registros += resultado.num_rows if hasattr(resultado, "num_rows") else len(resultado[1])
+        resultados.append(resultado)
+        del telemetria
+
+    medida = {"registros": registros}
+    if medir_memoria:
+        gc.collect()
+        retida = tracemalloc.get_traced_memory()[0] - base
+        tracemalloc.stop()
+        medida.update({
+            "memoria_retida_mb": round(retida / 1e6, 2),
+            "bytes_por_registro": round(retida / registros, 1) if registros else None,
+            "pico_pivo_mb": round(pico / 1e6, 2),
+        })
+    else:
+        medida.update({
+            "segundos": round(segundos, 4),
+            "registros_por_s": vazao(registros, segundos),
+        })
+    return medida
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do pivô da telemetria do ThingsBoard")
+    parser.add_argument("--estacoes", default="1,12",
+                        help="Números de estações (dispositivos) a simular (ex: 1,12,50)")
+    parser.add_argument("--anos", type=float, default=2.0, help="Anos de dados horários por estação")
+    parser.add_argument("--saida", default=None, help="Arquivo JSON de saída")
+    args = parser.parse_args()
+
+    lista_estacoes = [int(e) for e in args.estacoes.split(",") if e.strip()]
+    horas = int(args.anos * 8760)
+    pivos = {"dicts": pivo_dicts, "arrays": pivo_arrays}
+
+    metricas = {}
+    for estacoes in lista_estacoes:
+        print(f"\n📊 {estacoes} estação(ões) × {args.anos:g} ano(s) ({horas} horas cada)")
+        por_pivo = {}
+        for nome, pivo in pivos.items():
+            tempo = executar(pivo, estacoes, horas, medir_memoria=False)
+            memoria = executar(pivo, estacoes, horas, medir_memoria=True)
+            por_pivo[nome] = {**tempo, **{k: v for k, v in memoria.items() if k != "registros"}}
+            print(f"   {nome:<7} {tempo['segundos']:>8.2f} s  {tempo['registros_por_s'] or 0:>12,.0f} registros/s"
+                  f"  {memoria['memoria_retida_mb']:>9.1f} MB retidos  pico {memoria['pico_pivo_mb']:.1f} MB")
+
+        dicts, arrays = por_pivo["dicts"], por_pivo["arrays"]
+        por_pivo["ganho"] = {
+            "tempo": round(dicts["segundos"] / arrays["segundos"], 2) if arrays["segundos"] else None,
+            "memoria": round(dicts["memoria_retida_mb"] / arrays["memoria_retida_mb"], 2)
+            if arrays["memoria_retida_mb"] else None,
+        }
+        print(f"   ganho: x{por_pivo['ganho']['tempo']} tempo, x{por_pivo['ganho']['memoria']} memória")
+        metricas[f"{estacoes}_estacoes"] = por_pivo
+
+    salvar_resultado(
+        "pivo_thingsboard",
+        metricas,
+        parametros={"estacoes": lista_estacoes, "anos": args.anos, "horas": horas},
+        saida=args.saida
+    )
+
+
+if __name__ == "__main__":
+    main()
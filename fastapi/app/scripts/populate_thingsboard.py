@@ -3,13 +3,20 @@ Script para popular o ThingsBoard com dados históricos do INMET
 Simula dispositivos IoT enviando telemetria
 """
 import requests
-import pandas as pd
+import pyarrow as pa
 import json
 import time
 from pathlib import Path
 from datetime import datetime
 import sys
 
+# Permite importar services.* (parser e cache de parse da API) ao rodar o script diretamente
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from services.csv_processor import abrir_inmet_csv, ler_cabecalho_inmet
+from services.thingsboard_service import CHAVES_TELEMETRIA
+from services.weather_batch import coluna_numpy
+
 # Configurações do ThingsBoard
 import os
 THINGSBOARD_HOST = os.getenv("THINGSBOARD_HOST", "http://thingsboard:9090")
@@ -122,73 +129,44 @@ class ThingsBoardClient:
             return False
 
 
+def telemetria_de_lotes(lotes):
+    """Converte os lotes tipados do parser em mensagens de telemetria ({"ts", "values"})"""
+    for lote in lotes:
+        # Timestamp em milissegundos e uma coluna por chave de telemetria
+        ts_ms = lote.column('timestamp_utc').cast(pa.timestamp('ms')).cast(pa.int64()).to_numpy()
+        colunas = {
+            chave: coluna_numpy(lote, campo).tolist()
+            for chave, campo in CHAVES_TELEMETRIA.items()
+        }
+        
+        for i, ts in enumerate(ts_ms.tolist()):
+            # Medidas ausentes (NaN) são omitidas, não enviadas como 0.0
+            values = {chave: valores[i] for chave, valores in colunas.items() if valores[i] == valores[i]}
+            if values:
+                yield {"ts": ts, "values": values}
+
+
 def process_csv_file(file_path, client, device_token, batch_size=100):
     """Processa arquivo CSV e envia dados para ThingsBoard"""
     print(f"\nProcessando: {file_path.name}")
     
     try:
-        # Lê CSV (pula as 8 primeiras linhas de cabeçalho)
-        df = pd.read_csv(file_path, sep=';', skiprows=8, encoding='latin-1', on_bad_lines='skip')
-        df.columns = df.columns.str.strip()
-        
-        # Filtra dados válidos
-        df = df.dropna(subset=['Data', 'Hora UTC'])
+        # Lê o CSV pelo parser da API (lotes tipados; usa o cache de parse se o arquivo já foi lido)
+        _, lotes = abrir_inmet_csv(file_path)
         
         total_sent = 0
         batch = []
         
-        for idx, row in df.iterrows():
-            try:
-                # Converte data e hora para timestamp
-                data_str = str(row.get('Data', '')).strip()
-                hora_str = str(row.get('Hora UTC', '')).strip().replace(' UTC', '').replace('UTC', '').strip()
-                
-                if not data_str or not hora_str or data_str == 'nan' or hora_str == 'nan':
-                    continue
-                
-                # Cria timestamp
-                timestamp = pd.to_datetime(f"{data_str} {hora_str[:2]}:{hora_str[2:]}", 
-                                          format='%Y/%m/%d %H:%M')
-                ts_ms = int(timestamp.timestamp() * 1000)
-                
-                # Função auxiliar para converter valores
-                def parse_value(val):
-                    if pd.isna(val) or val == '' or str(val).strip() == '':
-                        return 0.0
-                    try:
-                        val_str = str(val).strip().replace(',', '.')
-                        if val_str == '' or val_str.lower() in ['nan', 'none', 'null']:
-                            return 0.0
-                        return float(val_str)
-                    except:
-                        return 0.0
-                
-                # Prepara telemetria
-                telemetry = {
-                    "ts": ts_ms,
-                    "values": {
-                        "precipitacao_mm": parse_value(row.get('PRECIPITAÇÃO TOTAL, HORÁRIO (mm)')),
-                        "temperatura_ar_c": parse_value(row.get('TEMPERATURA DO AR - BULBO SECO, HORARIA (°C)')),
-                        "umidade_rel_pct": parse_value(row.get('UMIDADE RELATIVA DO AR, HORARIA (%)')),
-                        "pressao_mb": parse_value(row.get('PRESSAO ATMOSFERICA AO NIVEL DA ESTACAO, HORARIA (mB)')),
-                        "vento_velocidade_ms": parse_value(row.get('VENTO, VELOCIDADE HORARIA (m/s)')),
-                        "vento_direcao_graus": parse_value(row.get('VENTO, DIREÇÃO HORARIA (gr) (° (gr))')),
-                        "radiacao_kjm2": parse_value(row.get('RADIACAO GLOBAL (Kj/m²)'))
-                    }
-                }
-                
-                batch.append(telemetry)
-                
-                # Envia em lotes
-                if len(batch) >= batch_size:
-                    if client.send_telemetry(device_token, batch):
-                        total_sent += len(batch)
-                        print(f"Enviados {total_sent} registros...")
-                    batch = []
-                    time.sleep(0.1)  # Evita sobrecarga
-                
-            except Exception as e:
-                continue
+        for telemetry in telemetria_de_lotes(lotes):
+            batch.append(telemetry)
+            
+            # Envia em lotes
+            if len(batch) >= batch_size:
+                if client.send_telemetry(device_token, batch):
+                    total_sent += len(batch)
+                    print(f"Enviados {total_sent} registros...")
+                batch = []
+                time.sleep(0.1)  # Evita sobrecarga
         
         # Envia lote final
         if batch:
@@ -204,45 +182,26 @@ def process_csv_file(file_path, client, device_token, batch_size=100):
 
 
 def extract_station_info(csv_file):
-    """Extrai informações da estação do cabeçalho do CSV"""
+    """Extrai informações da estação do cabeçalho do CSV (mesmo leitor de metadados da API)"""
     try:
-        with open(csv_file, 'r', encoding='latin-1') as f:
-            lines = [f.readline().strip() for _ in range(9)]
-        
-        # Extrai informações do cabeçalho (formato: CHAVE:;VALOR)
-        info = {}
-        
-        for line in lines:
-            if ':;' in line:
-                key, value = line.split(':;', 1)
-                key = key.strip()
-                value = value.strip()
-                
-                if 'ESTACAO' in key:
-                    info['nome'] = value
-                elif 'CODIGO (WMO)' in key:
-                    info['codigo'] = value
-                    info['codigo_wmo'] = value
-                elif 'LATITUDE' in key:
-                    try:
-                        info['latitude'] = float(value.replace(',', '.'))
-                    except:
-                        info['latitude'] = 0.0
-                elif 'LONGITUDE' in key:
-                    try:
-                        info['longitude'] = float(value.replace(',', '.'))
-                    except:
-                        info['longitude'] = 0.0
-                elif 'ALTITUDE' in key:
-                    try:
-                        info['altitude'] = float(value.replace(',', '.'))
-                    except:
-                        info['altitude'] = 0.0
-        
-        return info if 'codigo' in info else None
+        estacao_info, _, _ = ler_cabecalho_inmet(csv_file)
     except Exception as e:
         print(f"Erro ao extrair informacoes de {csv_file.name}: {e}")
         return None
+    
+    codigo = estacao_info.get('codigo_wmo')
+    if not codigo:
+        return None
+    
+    # Coordenadas ausentes/inválidas ficam None (antes viravam 0.0, um ponto real no mapa)
+    return {
+        'nome': estacao_info.get('nome'),
+        'codigo': codigo,
+        'codigo_wmo': codigo,
+        'latitude': estacao_info.get('latitude'),
+        'longitude': estacao_info.get('longitude'),
+        'altitude': estacao_info.get('altitude'),
+    }
 
 
 def discover_stations(data_dir):
@@ -257,11 +216,11 @@ def discover_stations(data_dir):
             # Evita duplicatas (mesma estação com arquivos de anos diferentes)
             if codigo not in stations:
                 stations[codigo] = {
-                    'nome': info.get('nome', 'DESCONHECIDO'),
-                    'latitude': info.get('latitude', 0.0),
-                    'longitude': info.get('longitude', 0.0),
-                    'altitude': info.get('altitude', 0.0),
-                    'codigo_wmo': info.get('codigo_wmo', '')
+                    'nome': info.get('nome') or 'DESCONHECIDO',
+                    'latitude': info.get('latitude'),
+                    'longitude': info.get('longitude'),
+                    'altitude': info.get('altitude'),
+                    'codigo_wmo': info.get('codigo_wmo', codigo)
                 }
     
     return stations
@@ -351,11 +310,12 @@ def main():
                 "nome": info['nome'],
                 "latitude": info['latitude'],
                 "longitude": info['longitude'],
-                "altitude": info.get('altitude', 0.0),
+                "altitude": info.get('altitude'),
                 "estado": "PE",
                 "tipo": "Estação Automática INMET"
             }
-            client.send_attributes(device_id, attributes)
+            # Atributos desconhecidos não são enviados (em vez de 0.0)
+            client.send_attributes(device_id, {k: v for k, v in attributes.items() if v is not None})
             
             devices[codigo] = {
                 "device": device,
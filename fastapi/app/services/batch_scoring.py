@@ -0,0 +1,370 @@
+# fastapi/app/services/batch_scoring.py
+"""
+Pontuação em lote das observações da feature store, agendada.
+
+O /predict-from-db prediz as últimas 24h a cada chamada. Aqui cada versão do modelo
+(run_id do MLflow) tem uma watermark em pontuacao_watermark
+(sql_scripts/09_pontuacao_lote.sql): a última linha de features_intensidade pontuada,
+na ordem (atualizado_em, codigo_wmo, timestamp_utc). Cada execução:
+
+- lê só as linhas recalculadas depois da watermark, em blocos de
+  PONTUACAO_LINHAS_POR_BLOCO (keyset sobre idx_features_intensidade_atualizacao);
+- prediz o bloco inteiro em uma chamada ao modelo (predict_features, sem o cache);
+- grava as predições chaveadas por (codigo_wmo, timestamp da observação,
+  modelo_versao) e avança a watermark na mesma transação: repetir um bloco
+  (queda no meio, outra instância) regrava as mesmas linhas em vez de duplicá-las.
+
+Observações reingeridas ou com features recalculadas (novas medianas) ganham um
+atualizado_em novo e são pontuadas de novo. Para não pular linhas de uma ingestão
+ainda não confirmada, a execução só lê linhas com atualizado_em anterior ao início
+da transação de escrita aberta mais antiga no banco (limite_atualizacoes; sessões
+só de leitura não contam).
+
+Um modelo novo começa da watermark do run_pai (treino incremental; segue a linhagem
+do MLflow até achar um ancestral já pontuado): o histórico continua com as predições
+do pai e só as linhas recalculadas depois dela são pontuadas pela versão nova. Sem
+ancestral pontuado (treino completo, modelo do notebook), pontua só as observações
+dos últimos PONTUACAO_JANELA_DIAS dias (ou a partir de PONTUACAO_INICIO). Esse
+início fica gravado com a watermark da versão, e as execuções seguintes o respeitam.
+
+O agendador (iniciar_agendador, no startup da API) executa a cada
+PONTUACAO_INTERVALO segundos; POST /predict/scoring dispara uma execução na hora.
+"""
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from itertools import repeat
+from typing import Callable, Dict, List, Optional
+
+from .db_service import get_db_connection, gravar_predicoes_lote
+from .feature_store import FEATURE_ORDER, features_atualizadas, limite_atualizacoes, matriz_features
+from .metrics import BATCH_SCORING_CHUNK, BATCH_SCORING_ROWS
+from .mlflow_service import get_mlflow_client, modelo_ativo, obter_modelo, predict_features
+from .station_registry import obter_nome_estacao
+from .tarefas import RegistroTarefas
+
+# Segundos entre as execuções agendadas (0 desliga o agendador)
+PONTUACAO_INTERVALO = int(os.getenv("PONTUACAO_INTERVALO", "300"))
+# Observações por bloco (uma leitura, uma chamada ao modelo e uma transação)
+PONTUACAO_LINHAS_POR_BLOCO = int(os.getenv("PONTUACAO_LINHAS_POR_BLOCO", "20000"))
+# Modelos novos sem ancestral pontuado: observações a partir desta data (ISO)...
+PONTUACAO_INICIO = os.getenv("PONTUACAO_INICIO", "").strip()
+# ...ou dos últimos N dias (0 = todo o histórico)
+PONTUACAO_JANELA_DIAS = int(os.getenv("PONTUACAO_JANELA_DIAS", "30"))
+# Gerações de run_pai consultadas no MLflow ao procurar a watermark de um ancestral
+_MAX_GERACOES = 20
+
+# Entradas gravadas junto da predição (colunas de predicoes_intensidade)
+_CAMPOS_ENTRADA = ('precipitacao_mm', 'pressao_estacao_mb', 'temperatura_ar_c',
+                   'umidade_rel_horaria_pct', 'vento_velocidade_ms')
+_CLASSES_PROBABILIDADE = ("forte", "moderada", "leve", "sem_chuva")
+
+# Tarefas desta instância da API
+_registro = RegistroTarefas("Pontuação", "pontuacao")
+
+_agendador: Optional[threading.Thread] = None
+_lock = threading.Lock()
+_parar = threading.Event()
+
+# A watermark só avança (outra instância pode ter gravado uma mais adiante)
+_SQL_AVANCAR_WATERMARK = """
+    INSERT INTO pontuacao_watermark (
+        modelo_versao, modelo_usado, atualizado_em, codigo_wmo, timestamp_utc,
+        pontuar_desde, linhas_pontuadas, ultima_execucao
+    ) VALUES (%s, %s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP)
+    ON CONFLICT (modelo_versao) DO UPDATE SET
+        atualizado_em = EXCLUDED.atualizado_em,
+        codigo_wmo = EXCLUDED.codigo_wmo,
+        timestamp_utc = EXCLUDED.timestamp_utc,
+        linhas_pontuadas = pontuacao_watermark.linhas_pontuadas + EXCLUDED.linhas_pontuadas,
+        ultima_execucao = CURRENT_TIMESTAMP
+    WHERE (pontuacao_watermark.atualizado_em, pontuacao_watermark.codigo_wmo, pontuacao_watermark.timestamp_utc)
+        < (EXCLUDED.atualizado_em, EXCLUDED.codigo_wmo, EXCLUDED.timestamp_utc)
+"""
+
+
+# A versão nova herda a watermark (e o início) do ancestral mais próximo já pontuado
+_SQL_SEMEAR_WATERMARK = """
+    INSERT INTO pontuacao_watermark (
+        modelo_versao, modelo_usado, atualizado_em, codigo_wmo, timestamp_utc,
+        pontuar_desde, linhas_pontuadas, ultima_execucao
+    )
+    SELECT %s, %s, atualizado_em, codigo_wmo, timestamp_utc, pontuar_desde, 0, CURRENT_TIMESTAMP
+    FROM pontuacao_watermark
+    WHERE modelo_versao = ANY(%s)
+    ORDER BY array_position(%s, modelo_versao)
+    LIMIT 1
+    ON CONFLICT (modelo_versao) DO NOTHING
+"""
+
+
+def _inicio_padrao() -> Optional[datetime]:
+    """Início das versões sem ancestral pontuado: PONTUACAO_INICIO ou a janela de dias."""
+    if PONTUACAO_INICIO:
+        return datetime.fromisoformat(PONTUACAO_INICIO)
+    if PONTUACAO_JANELA_DIAS > 0:
+        agora = datetime.now(timezone.utc).replace(tzinfo=None)
+        return agora - timedelta(days=PONTUACAO_JANELA_DIAS)
+    return None
+
+
+def _ancestrais(versao: str) -> List[str]:
+    """run_pai, avô... da versão (tags do MLflow), do mais próximo ao mais distante."""
+    modelo = obter_modelo()
+    if modelo is None or modelo.run_id != versao:
+        return []  # modelo local, sem run no MLflow
+    client = get_mlflow_client()
+    ancestrais = []
+    run_id = versao
+    while len(ancestrais) < _MAX_GERACOES:
+        run_pai = client.get_run(run_id).data.tags.get("run_pai")
+        if not run_pai or run_pai in ancestrais:
+            break
+        ancestrais.append(run_pai)
+        run_id = run_pai
+    return ancestrais
+
+
+def linhas_predicoes(lote, resultado: Dict) -> List[tuple]:
+    """
+    Tuplas de predicoes_intensidade (formato de gravar_predicoes_lote) para um lote
+    de features_intensidade e o resultado de predict_features sobre ele.
+    """
+    n = lote.num_rows
+    codigos = lote.column('codigo_wmo').to_pylist()
+    nomes = {codigo: obter_nome_estacao(codigo) for codigo in set(codigos)}
+    entradas = [resultado["features"][:, FEATURE_ORDER.index(campo)].tolist() for campo in _CAMPOS_ENTRADA]
+    classes = resultado["classes"] or []
+    probabilidades = resultado["probabilities"]
+    colunas_proba = [
+        probabilidades[:, classes.index(classe)].tolist()
+        if probabilidades is not None and classe in classes else [None] * n
+        for classe in _CLASSES_PROBABILIDADE
+    ]
+    return list(zip(
+        codigos,
+        lote.column('timestamp_utc').to_pylist(),
+        [nomes[codigo] for codigo in codigos],
+        *entradas,
+        resultado["predictions"],
+        *colunas_proba,
+        repeat(resultado["model_name"] or "unknown"),
+        repeat(resultado["model_version"]),
+    ))
+
+
+def _ler_watermark(cur, versao: str) -> Optional[tuple]:
+    """(atualizado_em, codigo_wmo, timestamp_utc, pontuar_desde) da versão, ou None."""
+    cur.execute("""
+        SELECT atualizado_em, codigo_wmo, timestamp_utc, pontuar_desde
+        FROM pontuacao_watermark
+        WHERE modelo_versao = %s
+    """, (versao,))
+    return cur.fetchone()
+
+
+def pontuar_pendentes(linhas_por_bloco: int = PONTUACAO_LINHAS_POR_BLOCO,
+                      max_blocos: Optional[int] = None,
+                      inicio: Optional[datetime] = None,
+                      progresso: Optional[Callable[[Dict], None]] = None) -> Dict:
+    """
+    Pontua as observações de features_intensidade ainda não pontuadas pelo modelo
+    ativo, um bloco por vez, até alcançar o limite da execução (ou `max_blocos`).
+    `inicio` ignora observações anteriores; sem ele vale o gravado com a watermark
+    da versão (herdado do run_pai ou, sem ancestral pontuado, _inicio_padrao).
+    `progresso` é chamado após cada bloco com o estado acumulado.
+    """
+    nome, versao = modelo_ativo()
+    estado = {
+        "modelo": nome,
+        "modelo_versao": versao,
+        "blocos_concluidos": 0,
+        "linhas_pontuadas": 0,
+        "watermark": None,
+        "desde": None,
+        "limite": None,
+        "motivo": None,
+    }
+
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        # Uma pontuação por vez entre todas as instâncias da API
+        cur.execute("SELECT pg_try_advisory_lock(hashtext('pontuacao_lote'))")
+        if not cur.fetchone()[0]:
+            conn.rollback()
+            estado["motivo"] = "outra instância está pontuando"
+            return estado
+        try:
+            limite = limite_atualizacoes()
+            registro = _ler_watermark(cur, versao)
+            conn.commit()
+            if registro is None:
+                # Consulta o MLflow sem deixar a transação aberta
+                ancestrais = _ancestrais(versao)
+                if ancestrais:
+                    cur.execute(_SQL_SEMEAR_WATERMARK, (versao, nome, ancestrais, ancestrais))
+                    registro = _ler_watermark(cur, versao)
+                    conn.commit()
+        except Exception as e:
+            conn.rollback()
+            if "does not exist" in str(e).lower():
+                print("⚠️  Tabela pontuacao_watermark (ou a coluna pontuar_desde) não existe. "
+                      "Execute o script 09_pontuacao_lote.sql")
+            raise RuntimeError(f"Erro ao ler a watermark da pontuação: {e}")
+
+        watermark = registro[:3] if registro else None
+        pontuar_desde = registro[3] if registro else _inicio_padrao()
+        inicio = inicio or pontuar_desde
+        estado["limite"] = limite.isoformat()
+        estado["watermark"] = watermark[0].isoformat() if watermark else None
+        estado["desde"] = inicio.isoformat() if inicio else None
+        if progresso:
+            progresso(estado)
+
+        while max_blocos is None or estado["blocos_concluidos"] < max_blocos:
+            inicio_bloco = time.perf_counter()
+            lote = features_atualizadas(watermark, limite, linhas_por_bloco, inicio)
+            if lote.num_rows == 0:
+                break
+
+            resultado = predict_features(matriz_features(lote), usar_cache=False)
+            if resultado["model_version"] != versao:
+                # O bloco foi predito por outro modelo: a próxima execução segue com ele
+                estado["motivo"] = f"modelo trocado durante a pontuação ({resultado['model_version']})"
+                break
+
+            ultima = lote.num_rows - 1
+            watermark = (
+                lote.column('atualizado_em')[ultima].as_py(),
+                lote.column('codigo_wmo')[ultima].as_py(),
+                lote.column('timestamp_utc')[ultima].as_py(),
+            )
+            try:
+                gravar_predicoes_lote(cur, linhas_predicoes(lote, resultado))
+                cur.execute(_SQL_AVANCAR_WATERMARK, (versao, nome, *watermark, pontuar_desde, lote.num_rows))
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                raise RuntimeError(f"Erro ao gravar predições do bloco: {e}")
+
+            BATCH_SCORING_ROWS.inc(lote.num_rows)
+            BATCH_SCORING_CHUNK.observe(time.perf_counter() - inicio_bloco)
+            estado["blocos_concluidos"] += 1
+            estado["linhas_pontuadas"] += lote.num_rows
+            estado["watermark"] = watermark[0].isoformat()
+            if progresso:
+                progresso(estado)
+            if lote.num_rows < linhas_por_bloco:
+                break
+    finally:
+        try:
+            cur.execute("SELECT pg_advisory_unlock(hashtext('pontuacao_lote'))")
+            conn.commit()
+        except Exception:
+            pass
+        cur.close()
+        conn.close()
+
+    return estado
+
+
+def listar_watermarks() -> List[Dict]:
+    """Watermark e linhas pontuadas de cada versão do modelo (mais recente primeiro)."""
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute("""
+            SELECT modelo_versao, modelo_usado, atualizado_em, codigo_wmo, timestamp_utc,
+                   pontuar_desde, linhas_pontuadas, ultima_execucao
+            FROM pontuacao_watermark
+            ORDER BY ultima_execucao DESC
+        """)
+        nomes = [desc[0] for desc in cur.description]
+        return [
+            {k: (v.isoformat() if isinstance(v, datetime) else v) for k, v in zip(nomes, linha)}
+            for linha in cur.fetchall()
+        ]
+    except Exception as e:
+        raise RuntimeError(f"Erro ao listar watermarks da pontuação: {e}")
+    finally:
+        cur.close()
+        conn.close()
+
+
+# ============================================================================
+# EXECUÇÃO EM SEGUNDO PLANO E AGENDADOR
+# ============================================================================
+
+def _resumo(estado: Dict) -> Optional[str]:
+    if not (estado["linhas_pontuadas"] or estado["motivo"]):
+        return None
+    return (f"{estado['linhas_pontuadas']} observações com {estado['modelo']} em "
+            f"{estado['blocos_concluidos']} blocos" + (f" ({estado['motivo']})" if estado["motivo"] else ""))
+
+
+def _iniciar(origem: str, parametros: Dict, aguardar: bool) -> Dict:
+    return _registro.iniciar(pontuar_pendentes, parametros, aguardar=aguardar, resumo=_resumo,
+                             origem=origem, blocos_concluidos=0, linhas_pontuadas=0)
+
+
+def iniciar_pontuacao(linhas_por_bloco: int = PONTUACAO_LINHAS_POR_BLOCO,
+                      max_blocos: Optional[int] = None,
+                      inicio: Optional[datetime] = None,
+                      aguardar: bool = False) -> Dict:
+    """
+    Dispara uma pontuação (em uma thread, ou na hora com aguardar=True) e retorna o
+    estado da tarefa. ValueError se já houver uma em execução nesta instância.
+    """
+    parametros = {"linhas_por_bloco": linhas_por_bloco, "max_blocos": max_blocos, "inicio": inicio}
+    return _iniciar("manual", parametros, aguardar)
+
+
+def _agendar(intervalo: int):
+    while not _parar.wait(intervalo):
+        try:
+            _iniciar("agendada", {}, aguardar=True)
+        except ValueError:
+            continue  # uma execução manual ainda está rodando
+
+
+def iniciar_agendador(intervalo: int = PONTUACAO_INTERVALO) -> bool:
+    """Inicia a pontuação periódica (uma vez por processo); False se desligada."""
+    global _agendador
+    if intervalo <= 0:
+        return False
+    with _lock:
+        if _agendador is not None and _agendador.is_alive():
+            return True
+        _parar.clear()
+        _agendador = threading.Thread(target=_agendar, args=(intervalo,), daemon=True,
+                                      name="pontuacao-agendador")
+        _agendador.start()
+    print(f"🔄 Pontuação em lote agendada a cada {intervalo}s")
+    return True
+
+
+def parar_agendador():
+    """Interrompe o agendador (uma execução em andamento vai até o fim)."""
+    _parar.set()
+
+
+def estado_agendador() -> Dict:
+    return {
+        "ativo": _agendador is not None and _agendador.is_alive() and not _parar.is_set(),
+        "intervalo_segundos": PONTUACAO_INTERVALO,
+        "linhas_por_bloco": PONTUACAO_LINHAS_POR_BLOCO,
+        "inicio": PONTUACAO_INICIO or None,
+        "janela_dias": PONTUACAO_JANELA_DIAS,
+    }
+
+
+def obter_pontuacao(tarefa_id: str) -> Optional[Dict]:
+    """Estado (progresso) de uma tarefa de pontuação, ou None se não existir."""
+    return _registro.obter(tarefa_id)
+
+
+def listar_pontuacoes() -> List[Dict]:
+    """Tarefas de pontuação desta instância, da mais recente para a mais antiga."""
+    return _registro.listar()
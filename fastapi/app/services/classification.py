@@ -0,0 +1,51 @@
+# fastapi/app/services/classification.py
+"""
+Classificação de intensidade de chuva a partir da precipitação horária.
+
+Mesmos critérios de sql_scripts/03_update_intensidade_chuva.sql
+(função classificar_intensidade_chuva):
+- Sem chuva: 0 mm (ou ausente)
+- Leve: 0.1 - 2.5 mm/h
+- Moderada: 2.6 - 10 mm/h
+- Forte: > 10 mm/h
+Valores fora das faixas (ex: 0.05, 2.55, negativos) caem em sem_chuva, como no SQL.
+"""
+from typing import Dict, List
+
+import numpy as np
+
+INTENSIDADES = ['sem_chuva', 'leve', 'moderada', 'forte']
+
+
+def classificar_intensidade(precipitacao) -> np.ndarray:
+    """
+    Classifica um vetor de precipitações (mm/h) de forma vetorizada.
+    Aceita lista, Series ou array; None/NaN são tratados como sem chuva.
+    Retorna um array de strings com a classe de cada posição.
+    """
+    p = np.asarray(
+        [np.nan if v is None else v for v in precipitacao] if isinstance(precipitacao, list) else precipitacao,
+        dtype=float
+    )
+
+    condicoes = [
+        (p >= 0.1) & (p <= 2.5),
+        (p >= 2.6) & (p <= 10),
+        p > 10,
+    ]
+    return np.select(condicoes, ['leve', 'moderada', 'forte'], default='sem_chuva')
+
+
+def classificar_registros(registros: List[Dict]) -> List[Dict]:
+    """
+    Preenche 'intensidade_chuva' em uma lista de registros (in-place) a partir de 'precipitacao_mm'.
+    Registros que já têm classificação são mantidos.
+    """
+    if not registros:
+        return registros
+
+    classes = classificar_intensidade([r.get('precipitacao_mm') for r in registros])
+    for registro, classe in zip(registros, classes.tolist()):
+        if not registro.get('intensidade_chuva'):
+            registro['intensidade_chuva'] = classe
+    return registros
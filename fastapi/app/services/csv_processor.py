@@ -1,179 +1,451 @@
 # fastapi/app/services/csv_processor.py
 import pandas as pd
-import re
+import mmap
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
-from typing import Dict, List, Optional
-from datetime import datetime, time
-import numpy as np
+from typing import Dict, Iterator, List, Optional, Tuple
+import time as _relogio
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+from . import parse_cache
+from .metrics import registrar_parse
+from .weather_batch import criar_lote, lote_para_registros
 
-def parse_inmet_csv(file_path: Path) -> Dict:
+# Versão da saída do parser: incremente ao mudar o resultado do parse (invalida o cache)
+VERSAO_PARSER = "1"
+
+# Linhas por lote na leitura em streaming (memória constante por arquivo)
+CSV_CHUNK_LINHAS = int(os.getenv("CSV_CHUNK_LINHAS", "5000"))
+
+ENCODINGS = ['latin-1', 'iso-8859-1', 'windows-1252', 'utf-8']
+
+# Campo do banco → nomes possíveis da coluna no CSV do INMET (com e sem acento)
+COLUNAS_INMET = {
+    'precipitacao_mm': ('PRECIPITAÇÃO TOTAL, HORÁRIO (mm)', 'PRECIPITACAO TOTAL, HORARIO (mm)'),
+    'pressao_estacao_mb': ('PRESSAO ATMOSFERICA AO NIVEL DA ESTACAO, HORARIA (mB)',),
+    'pressao_max_mb': ('PRESSÃO ATMOSFERICA MAX.NA HORA ANT. (AUT) (mB)', 'PRESSAO ATMOSFERICA MAX.NA HORA ANT. (AUT) (mB)'),
+    'pressao_min_mb': ('PRESSÃO ATMOSFERICA MIN. NA HORA ANT. (AUT) (mB)', 'PRESSAO ATMOSFERICA MIN. NA HORA ANT. (AUT) (mB)'),
+    'radiacao_global_kjm2': ('RADIACAO GLOBAL (Kj/m²)', 'RADIACAO GLOBAL (Kj/m2)'),
+    'temperatura_ar_c': ('TEMPERATURA DO AR - BULBO SECO, HORARIA (°C)', 'TEMPERATURA DO AR - BULBO SECO, HORARIA (C)'),
+    'temperatura_orvalho_c': ('TEMPERATURA DO PONTO DE ORVALHO (°C)', 'TEMPERATURA DO PONTO DE ORVALHO (C)'),
+    'temperatura_max_c': ('TEMPERATURA MÁXIMA NA HORA ANT. (AUT) (°C)', 'TEMPERATURA MAXIMA NA HORA ANT. (AUT) (C)'),
+    'temperatura_min_c': ('TEMPERATURA MÍNIMA NA HORA ANT. (AUT) (°C)', 'TEMPERATURA MINIMA NA HORA ANT. (AUT) (C)'),
+    'temperatura_orvalho_max_c': ('TEMPERATURA ORVALHO MAX. NA HORA ANT. (AUT) (°C)', 'TEMPERATURA ORVALHO MAX. NA HORA ANT. (AUT) (C)'),
+    'temperatura_orvalho_min_c': ('TEMPERATURA ORVALHO MIN. NA HORA ANT. (AUT) (°C)', 'TEMPERATURA ORVALHO MIN. NA HORA ANT. (AUT) (C)'),
+    'umidade_rel_max_pct': ('UMIDADE REL. MAX. NA HORA ANT. (AUT) (%)',),
+    'umidade_rel_min_pct': ('UMIDADE REL. MIN. NA HORA ANT. (AUT) (%)',),
+    'umidade_rel_horaria_pct': ('UMIDADE RELATIVA DO AR, HORARIA (%)',),
+    'vento_direcao_graus': ('VENTO, DIREÇÃO HORARIA (gr) (° (gr))', 'VENTO, DIRECAO HORARIA (gr)'),
+    'vento_rajada_max_ms': ('VENTO, RAJADA MAXIMA (m/s)',),
+    'vento_velocidade_ms': ('VENTO, VELOCIDADE HORARIA (m/s)',),
+}
+
+# Estimativa (folgada) de bytes por linha de dados, para dimensionar os blocos do streaming
+_BYTES_POR_LINHA = 128
+
+# Tamanho alvo de cada faixa de bytes na leitura via mmap (ajustada ao fim de linha)
+CSV_MMAP_FAIXA_BYTES = int(os.getenv("CSV_MMAP_FAIXA_BYTES", str(4 * 1024 * 1024)))
+
+
+def _extrair_metadado(line: str, estacao_info: Dict):
+    """Preenche estacao_info com a linha de metadados (REGIAO:, UF:, ...), se for uma."""
+    if line.startswith('REGIAO:'):
+        estacao_info['regiao'] = line.split(';')[1].strip()
+    elif line.startswith('UF:'):
+        estacao_info['uf'] = line.split(';')[1].strip()
+    elif line.startswith('ESTACAO:'):
+        estacao_info['nome'] = line.split(';')[1].strip()
+    elif line.startswith('CODIGO (WMO):'):
+        estacao_info['codigo_wmo'] = line.split(';')[1].strip()
+    elif line.startswith('LATITUDE:'):
+        lat_str = line.split(';')[1].strip().replace(',', '.')
+        estacao_info['latitude'] = float(lat_str) if lat_str else None
+    elif line.startswith('LONGITUDE:'):
+        lon_str = line.split(';')[1].strip().replace(',', '.')
+        estacao_info['longitude'] = float(lon_str) if lon_str else None
+    elif line.startswith('ALTITUDE:'):
+        alt_str = line.split(';')[1].strip().replace(',', '.')
+        estacao_info['altitude'] = float(alt_str) if alt_str else None
+    elif line.startswith('DATA DE FUNDACAO:'):
+        fundacao_str = line.split(';')[1].strip()
+        estacao_info['data_fundacao'] = fundacao_str if fundacao_str else None
+
+
+def ler_cabecalho_inmet(file_path: Path) -> Tuple[Dict, int, str]:
     """
-    Processa um arquivo CSV do INMET e retorna os dados estruturados.
-    
-    Retorna um dicionário com:
-    - estacao: metadados da estação
-    - dados: lista de registros meteorológicos
+    Lê apenas o bloco de metadados do CSV do INMET (sem carregar o arquivo inteiro).
+
+    Retorna (metadados da estação, índice da linha de cabeçalho dos dados, encoding).
     """
-    # Lê o arquivo com encoding apropriado (tenta diferentes encodings)
-    lines = None
-    encodings = ['latin-1', 'iso-8859-1', 'windows-1252', 'utf-8']
-    
-    for encoding in encodings:
+    for encoding in ENCODINGS:
         try:
+            estacao_info = {}
             with open(file_path, 'r', encoding=encoding, errors='ignore') as f:
-                lines = f.readlines()
-                break
-        except Exception as e:
+                for i, line in enumerate(f):
+                    if line.startswith('Data;'):
+                        return estacao_info, i, encoding
+                    _extrair_metadado(line, estacao_info)
+        except Exception:
             continue
-    
-    if lines is None:
-        raise ValueError(f"Não foi possível ler o arquivo {file_path.name} com nenhum encoding testado")
-    
-    # Extrai metadados do cabeçalho
-    estacao_info = {}
-    header_line = None
-    
-    for i, line in enumerate(lines):
-        if line.startswith('REGIAO:'):
-            estacao_info['regiao'] = line.split(';')[1].strip()
-        elif line.startswith('UF:'):
-            estacao_info['uf'] = line.split(';')[1].strip()
-        elif line.startswith('ESTACAO:'):
-            estacao_info['nome'] = line.split(';')[1].strip()
-        elif line.startswith('CODIGO (WMO):'):
-            estacao_info['codigo_wmo'] = line.split(';')[1].strip()
-        elif line.startswith('LATITUDE:'):
-            lat_str = line.split(';')[1].strip().replace(',', '.')
-            estacao_info['latitude'] = float(lat_str) if lat_str else None
-        elif line.startswith('LONGITUDE:'):
-            lon_str = line.split(';')[1].strip().replace(',', '.')
-            estacao_info['longitude'] = float(lon_str) if lon_str else None
-        elif line.startswith('ALTITUDE:'):
-            alt_str = line.split(';')[1].strip().replace(',', '.')
-            estacao_info['altitude'] = float(alt_str) if alt_str else None
-        elif line.startswith('DATA DE FUNDACAO:'):
-            fundacao_str = line.split(';')[1].strip()
-            estacao_info['data_fundacao'] = fundacao_str if fundacao_str else None
-        elif line.startswith('Data;'):
-            header_line = i
+        # Arquivo lido sem erro mas sem cabeçalho: outro encoding não resolve
+        break
+
+    raise ValueError(f"Não foi possível encontrar o cabeçalho dos dados em {file_path.name}")
+
+
+def _resolver_colunas(colunas) -> Dict[str, Optional[str]]:
+    """Escolhe, para cada campo, o primeiro nome de coluna presente no arquivo."""
+    presentes = set(colunas)
+    return {
+        campo: next((nome for nome in nomes if nome in presentes), None)
+        for campo, nomes in COLUNAS_INMET.items()
+    }
+
+
+def _para_numero(texto: pa.Array) -> pa.Array:
+    """
+    Converte a coluna textual do INMET (vírgula decimal, vazios) em float64 com null.
+    O caminho normal é todo em Arrow (C++); se a coluna tiver valores inválidos, cai
+    na conversão tolerante do pandas (inválido vira null).
+    """
+    texto = pc.replace_substring(pc.utf8_trim_whitespace(texto), ',', '.')
+    try:
+        return pc.cast(texto, pa.float64())
+    except pa.ArrowInvalid:
+        return pa.array(pd.to_numeric(texto.to_pandas(), errors='coerce'), type=pa.float64(), from_pandas=True)
+
+
+def _para_timestamp(data: pa.Array, hora: pa.Array) -> pa.Array:
+    """
+    Data (AAAA/MM/DD ou AAAA-MM-DD) + Hora UTC ('0000 UTC', '0100 UTC', ...) em
+    timestamp; combinações inválidas (ou hora/minuto fora da faixa) viram null.
+    """
+    data = pc.replace_substring(pc.utf8_trim_whitespace(data), '/', '-')
+    hora = pc.utf8_slice_codeunits(pc.utf8_trim_whitespace(pc.replace_substring(hora, 'UTC', '')), 0, 4)
+    texto = pc.binary_join_element_wise(data, hora, ' ')
+    return pc.strptime(texto, format='%Y-%m-%d %H%M', unit='us', error_is_null=True)
+
+
+def _converter_lote(bruto, codigo_wmo: str) -> pa.RecordBatch:
+    """
+    Converte um bloco bruto do CSV (Table/RecordBatch de texto lido pelo pyarrow) em um
+    lote tipado (weather_batch): codigo_wmo, timestamp_utc, medidas (null = ausente) e
+    intensidade_chuva. Linhas sem data/hora válidas são descartadas.
+
+    É o único caminho de conversão: usado pela leitura em streaming e pela via mmap.
+    """
+    nomes = bruto.schema.names
+    colunas = dict(zip(nomes, bruto.columns))
+    vazio = pa.nulls(bruto.num_rows, pa.string())
+
+    timestamps = _para_timestamp(colunas.get('Data', vazio), colunas.get('Hora UTC', vazio))
+    validos = pc.is_valid(timestamps)
+    todos_validos = pc.all(validos).as_py() is not False
+
+    lote = {'timestamp_utc': timestamps if todos_validos else pc.filter(timestamps, validos)}
+    for campo, nome in _resolver_colunas(nomes).items():
+        if nome is not None:
+            valores = _para_numero(colunas[nome])
+            lote[campo] = valores if todos_validos else pc.filter(valores, validos)
+    return criar_lote(lote, codigo_wmo=codigo_wmo)
+
+
+def _opcoes_csv(nomes: List[str], skip_rows: int = 0, block_size: Optional[int] = None):
+    """Opções do pyarrow.csv para as linhas de dados do INMET, tudo lido como texto."""
+    read_options = pa_csv.ReadOptions(column_names=nomes, skip_rows=skip_rows)
+    if block_size:
+        read_options.block_size = block_size
+    # Linhas com número de colunas errado são ignoradas (como on_bad_lines='skip').
+    # O texto não é validado como UTF-8: medidas, data e hora são ASCII e o
+    # arquivo original é latin-1.
+    parse_options = pa_csv.ParseOptions(delimiter=';', invalid_row_handler=lambda _: 'skip')
+    convert_options = pa_csv.ConvertOptions(
+        column_types={nome: pa.string() for nome in nomes},
+        strings_can_be_null=True,
+        check_utf8=False
+    )
+    return read_options, parse_options, convert_options
+
+
+def iterar_lotes_inmet(file_path: Path, header_line: int, encoding: str,
+                       codigo_wmo: str, chunksize: int = CSV_CHUNK_LINHAS) -> Iterator[pa.RecordBatch]:
+    """
+    Lê os dados do CSV em streaming (pyarrow.csv.open_csv) e produz lotes tipados de
+    até `chunksize` linhas (ver _converter_lote). Apenas um bloco fica em memória por vez.
+    """
+    linhas = 0
+    segundos = 0.0
+    inicio = _relogio.perf_counter()
+
+    nomes = _nomes_colunas(_ler_linha(file_path, header_line, encoding))
+    leitor = pa_csv.open_csv(
+        str(file_path),
+        *_opcoes_csv(nomes, skip_rows=header_line + 1, block_size=max(chunksize * _BYTES_POR_LINHA, 1 << 16))
+    )
+    with leitor:
+        for bloco in leitor:
+            convertido = _converter_lote(bloco, codigo_wmo)
+            for deslocamento in range(0, convertido.num_rows, chunksize):
+                lote = convertido.slice(deslocamento, chunksize)
+                linhas += lote.num_rows
+                segundos += _relogio.perf_counter() - inicio
+                yield lote
+                # O tempo gasto pelo consumidor (ex: INSERT) não entra na vazão do parse
+                inicio = _relogio.perf_counter()
+
+    registrar_parse(linhas, segundos + _relogio.perf_counter() - inicio)
+
+
+def _ler_linha(file_path: Path, indice: int, encoding: str) -> str:
+    """Linha `indice` do arquivo (o cabeçalho fica nas primeiras linhas)."""
+    with open(file_path, 'r', encoding=encoding, errors='ignore') as f:
+        for i, linha in enumerate(f):
+            if i == indice:
+                return linha
+    raise ValueError(f"Linha {indice} não encontrada em {Path(file_path).name}")
+
+
+def abrir_inmet_csv(file_path: Path, chunksize: int = CSV_CHUNK_LINHAS,
+                    usar_cache: bool = True) -> Tuple[Dict, Iterator[pa.RecordBatch]]:
+    """
+    Processa um arquivo CSV do INMET em streaming.
+
+    Retorna (metadados da estação, iterador de lotes tipados). Os lotes são
+    RecordBatches (weather_batch) de até `chunksize` linhas, prontos para
+    db_service.insert_lote_dados_meteorologicos.
+
+    Com o cache de parse ativo, um arquivo já processado (mesmo conteúdo e mesma
+    VERSAO_PARSER) é lido do cache; senão é parseado e gravado no cache ao ser lido.
+    """
+    chave = None
+    if usar_cache and parse_cache.cache_ativo():
+        chave = parse_cache.chave_arquivo(file_path)
+        encontrado = parse_cache.buscar(chave, VERSAO_PARSER)
+        if encontrado is not None:
+            estacao_info, tabela = encontrado
+            return estacao_info, iter(tabela.to_batches(max_chunksize=chunksize))
+
+    estacao_info, header_line, encoding = ler_cabecalho_inmet(file_path)
+    lotes = iterar_lotes_inmet(file_path, header_line, encoding, estacao_info.get('codigo_wmo'), chunksize)
+    if chave is not None:
+        lotes = parse_cache.gravar_ao_ler(lotes, chave, VERSAO_PARSER, estacao_info, Path(file_path).name)
+    return estacao_info, lotes
+
+
+# ============================================================================
+# LEITURA VIA MMAP (exportações grandes, possivelmente várias estações concatenadas)
+# ============================================================================
+
+def _nomes_colunas(linha_cabecalho: str) -> List[str]:
+    """Nomes das colunas do cabeçalho 'Data;Hora UTC;...' (colunas vazias ganham nome próprio)."""
+    nomes = [nome.strip() for nome in linha_cabecalho.rstrip('\r\n').split(';')]
+    return [nome or f'_coluna_{i}' for i, nome in enumerate(nomes)]
+
+
+def _inicio_de_linha(mm, padrao: bytes, inicio: int, fim: int) -> int:
+    """Posição da próxima ocorrência de `padrao` no início de uma linha (ou -1)."""
+    pos = mm.find(padrao, inicio, fim)
+    while pos > 0 and mm[pos - 1] != ord('\n'):
+        pos = mm.find(padrao, pos + 1, fim)
+    return pos
+
+
+def localizar_segmentos_inmet(mm) -> List[Dict]:
+    """
+    Varre o buffer mapeado e retorna um segmento por bloco de estação:
+    {'estacao': metadados, 'colunas': nomes do cabeçalho, 'inicio'/'fim': bytes dos dados}.
+    Só o bloco de metadados e a linha de cabeçalho são decodificados.
+    """
+    segmentos = []
+    tamanho = len(mm)
+    pos = 0
+    while pos < tamanho:
+        cabecalho = _inicio_de_linha(mm, b'Data;', pos, tamanho)
+        if cabecalho == -1:
             break
-    
-    if not header_line:
+        fim_cabecalho = mm.find(b'\n', cabecalho)
+        fim_cabecalho = tamanho if fim_cabecalho == -1 else fim_cabecalho + 1
+
+        # Os dados vão até o próximo bloco de metadados (arquivos concatenados) ou o fim
+        proximo = _inicio_de_linha(mm, b'REGIAO:', fim_cabecalho, tamanho)
+        fim = tamanho if proximo == -1 else proximo
+
+        estacao_info = {}
+        for line in mm[pos:cabecalho].decode('latin-1').splitlines():
+            _extrair_metadado(line, estacao_info)
+
+        segmentos.append({
+            'estacao': estacao_info,
+            'colunas': _nomes_colunas(mm[cabecalho:fim_cabecalho].decode('latin-1')),
+            'inicio': fim_cabecalho,
+            'fim': fim,
+        })
+        pos = fim
+    return segmentos
+
+
+def dividir_em_faixas(mm, inicio: int, fim: int, tamanho_faixa: int = CSV_MMAP_FAIXA_BYTES) -> List[Tuple[int, int]]:
+    """Divide [inicio, fim) em faixas de ~tamanho_faixa bytes terminadas em fim de linha."""
+    faixas = []
+    a = inicio
+    while a < fim:
+        b = min(a + tamanho_faixa, fim)
+        if b < fim:
+            quebra = mm.find(b'\n', b, fim)
+            b = fim if quebra == -1 else quebra + 1
+        faixas.append((a, b))
+        a = b
+    return faixas
+
+
+def _parse_faixa_mmap(caminho: str, inicio: int, fim: int, nomes: List[str], codigo_wmo: str) -> pa.RecordBatch:
+    """
+    Worker: mapeia o arquivo, lê a faixa [inicio, fim) direto do buffer mapeado
+    (sem cópia para bytes/str do Python) e devolve o lote tipado.
+
+    O mapeamento é o do próprio Arrow (pa.memory_map): a fatia é um pa.Buffer com
+    contagem de referências, então fechar o arquivo não depende de o leitor CSV já
+    ter soltado o buffer (com mmap + memoryview, o fechamento falhava às vezes com
+    "cannot close exported pointers exist").
+    """
+    with pa.memory_map(caminho) as arquivo:
+        arquivo.seek(inicio)
+        buffer = arquivo.read_buffer(fim - inicio)
+        bruto = pa_csv.read_csv(buffer, *_opcoes_csv(nomes))
+        return _converter_lote(bruto, codigo_wmo)
+
+
+# Processos de parse das faixas, reaproveitados entre arquivos (um pool por número de
+# workers). Iniciados por forkserver (spawn onde não houver): a API já roda threads
+# (agendador, recarga do modelo, treino com joblib/loky) e um fork do processo pode
+# herdar travas da libpq, do OpenMP ou do logging e travar os workers.
+_pools: Dict[int, ProcessPoolExecutor] = {}
+_pools_lock = threading.Lock()
+
+
+def _contexto_processos():
+    metodo = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return multiprocessing.get_context(metodo)
+
+
+def _obter_pool(workers: int) -> ProcessPoolExecutor:
+    with _pools_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=_contexto_processos())
+            _pools[workers] = pool
+        return pool
+
+
+def _descartar_pool(workers: int, pool: ProcessPoolExecutor):
+    """Remove um pool quebrado (worker morto); o próximo arquivo cria outro."""
+    with _pools_lock:
+        if _pools.get(workers) is pool:
+            del _pools[workers]
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def encerrar_pools():
+    """Encerra os processos de parse (shutdown da API)."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def ler_inmet_mmap(file_path: Path, workers: Optional[int] = None,
+                   tamanho_faixa: int = CSV_MMAP_FAIXA_BYTES) -> Iterator[Tuple[Dict, pa.RecordBatch]]:
+    """
+    Lê um CSV do INMET (ou uma exportação com várias estações concatenadas) via mmap.
+
+    Localiza metadados e cabeçalhos no buffer mapeado, divide os dados em faixas
+    alinhadas por linha e processa as faixas em paralelo, em um pool de processos
+    reaproveitado entre arquivos (_obter_pool, forkserver). Produz pares
+    (metadados da estação, lote tipado) na ordem do arquivo.
+    """
+    file_path = Path(file_path)
+    inicio = _relogio.perf_counter()
+    with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        tamanho_bytes = len(mm)
+        segmentos = localizar_segmentos_inmet(mm)
+        tarefas = [
+            (segmento, faixa)
+            for segmento in segmentos
+            for faixa in dividir_em_faixas(mm, segmento['inicio'], segmento['fim'], tamanho_faixa)
+        ]
+    if not segmentos:
         raise ValueError(f"Não foi possível encontrar o cabeçalho dos dados em {file_path.name}")
-    
-    # Lê os dados usando pandas, pulando as linhas de metadados
-    # Tenta diferentes encodings
-    df = None
-    encodings = ['latin-1', 'iso-8859-1', 'windows-1252', 'utf-8']
-    
-    for encoding in encodings:
+
+    workers = workers or os.cpu_count() or 1
+    linhas = 0
+
+    def argumentos(segmento, faixa):
+        return (str(file_path), faixa[0], faixa[1], segmento['colunas'], segmento['estacao'].get('codigo_wmo'))
+
+    if workers <= 1 or len(tarefas) <= 1:
+        for segmento, faixa in tarefas:
+            lote = _parse_faixa_mmap(*argumentos(segmento, faixa))
+            linhas += lote.num_rows
+            if lote.num_rows:
+                yield segmento['estacao'], lote
+    else:
+        # Janela limitada de faixas em processamento: memória proporcional a workers, não ao arquivo
+        executor = _obter_pool(workers)
+        pendentes = deque()
         try:
-            df = pd.read_csv(
-                file_path,
-                sep=';',
-                skiprows=header_line,
-                encoding=encoding,
-                on_bad_lines='skip',
-                low_memory=False
-            )
-            break
-        except Exception as e:
-            continue
-    
-    if df is None:
-        raise ValueError(f"Não foi possível ler o CSV {file_path.name} com nenhum encoding testado")
-    
-    # Limpa nomes de colunas
-    df.columns = df.columns.str.strip()
-    
-    # Processa os dados
+            proximas = iter(tarefas)
+            for segmento, faixa in proximas:
+                pendentes.append((segmento, executor.submit(_parse_faixa_mmap, *argumentos(segmento, faixa))))
+                if len(pendentes) >= workers * 2:
+                    break
+            while pendentes:
+                segmento, futuro = pendentes.popleft()
+                lote = futuro.result()
+                seguinte = next(proximas, None)
+                if seguinte is not None:
+                    pendentes.append((seguinte[0], executor.submit(_parse_faixa_mmap, *argumentos(*seguinte))))
+                linhas += lote.num_rows
+                if lote.num_rows:
+                    yield segmento['estacao'], lote
+        except BrokenProcessPool:
+            _descartar_pool(workers, executor)
+            raise
+        finally:
+            # Consumidor interrompido ou erro: as faixas ainda na fila não ocupam o pool
+            for _, futuro in pendentes:
+                futuro.cancel()
+
+    segundos = _relogio.perf_counter() - inicio
+    registrar_parse(linhas, segundos)
+    if segundos > 0:
+        print(f"📈 {file_path.name}: {tamanho_bytes / 1e6:.1f} MB, {linhas} linhas em {segundos:.2f} s "
+              f"({tamanho_bytes / 1e6 / segundos:.1f} MB/s, {len(segmentos)} estação(ões), {workers} worker(s))")
+
+
+def parse_inmet_csv(file_path: Path) -> Dict:
+    """
+    Processa um arquivo CSV do INMET e retorna os dados estruturados.
+
+    Retorna um dicionário com:
+    - estacao: metadados da estação
+    - dados: lista de registros meteorológicos
+
+    Carrega o arquivo inteiro; para arquivos grandes prefira abrir_inmet_csv.
+    """
+    estacao_info, lotes = abrir_inmet_csv(file_path)
+
     dados = []
-    
-    for _, row in df.iterrows():
-        try:
-            # Data e hora
-            data_str = str(row.get('Data', '')).strip()
-            hora_str = str(row.get('Hora UTC', '')).strip().replace(' UTC', '').replace('UTC', '').strip()
-            
-            if not data_str or not hora_str or data_str == 'nan' or hora_str == 'nan':
-                continue
-            
-            # Converte data
-            try:
-                data = pd.to_datetime(data_str, format='%Y/%m/%d').date()
-            except:
-                try:
-                    data = pd.to_datetime(data_str, format='%Y-%m-%d').date()
-                except:
-                    continue
-            
-            # Converte hora (formato: 0000, 0100, etc.)
-            hora_match = re.match(r'(\d{2})(\d{2})', hora_str)
-            if hora_match:
-                hora = time(int(hora_match.group(1)), int(hora_match.group(2)))
-            else:
-                continue
-            
-            # Função auxiliar para converter valores
-            def parse_value(val, default=None):
-                if pd.isna(val) or val == '' or str(val).strip() == '':
-                    return default
-                try:
-                    val_str = str(val).strip().replace(',', '.')
-                    if val_str == '' or val_str.lower() in ['nan', 'none', 'null']:
-                        return default
-                    return float(val_str)
-                except:
-                    return default
-            
-            # Extrai valores das colunas (tenta diferentes nomes possíveis)
-            registro = {
-                'codigo_wmo': estacao_info['codigo_wmo'],
-                'data': data,
-                'hora_utc': hora,
-                'precipitacao_mm': parse_value(row.get('PRECIPITAÇÃO TOTAL, HORÁRIO (mm)', 
-                                                       row.get('PRECIPITACAO TOTAL, HORARIO (mm)', None))),
-                'pressao_estacao_mb': parse_value(row.get('PRESSAO ATMOSFERICA AO NIVEL DA ESTACAO, HORARIA (mB)',
-                                                           row.get('PRESSAO ATMOSFERICA AO NIVEL DA ESTACAO, HORARIA (mB)', None))),
-                'pressao_max_mb': parse_value(row.get('PRESSÃO ATMOSFERICA MAX.NA HORA ANT. (AUT) (mB)',
-                                                      row.get('PRESSAO ATMOSFERICA MAX.NA HORA ANT. (AUT) (mB)', None))),
-                'pressao_min_mb': parse_value(row.get('PRESSÃO ATMOSFERICA MIN. NA HORA ANT. (AUT) (mB)',
-                                                      row.get('PRESSAO ATMOSFERICA MIN. NA HORA ANT. (AUT) (mB)', None))),
-                'radiacao_global_kjm2': parse_value(row.get('RADIACAO GLOBAL (Kj/m²)',
-                                                           row.get('RADIACAO GLOBAL (Kj/m2)', None))),
-                'temperatura_ar_c': parse_value(row.get('TEMPERATURA DO AR - BULBO SECO, HORARIA (°C)',
-                                                        row.get('TEMPERATURA DO AR - BULBO SECO, HORARIA (C)', None))),
-                'temperatura_orvalho_c': parse_value(row.get('TEMPERATURA DO PONTO DE ORVALHO (°C)',
-                                                            row.get('TEMPERATURA DO PONTO DE ORVALHO (C)', None))),
-                'temperatura_max_c': parse_value(row.get('TEMPERATURA MÁXIMA NA HORA ANT. (AUT) (°C)',
-                                                        row.get('TEMPERATURA MAXIMA NA HORA ANT. (AUT) (C)', None))),
-                'temperatura_min_c': parse_value(row.get('TEMPERATURA MÍNIMA NA HORA ANT. (AUT) (°C)',
-                                                        row.get('TEMPERATURA MINIMA NA HORA ANT. (AUT) (C)', None))),
-                'temperatura_orvalho_max_c': parse_value(row.get('TEMPERATURA ORVALHO MAX. NA HORA ANT. (AUT) (°C)',
-                                                                 row.get('TEMPERATURA ORVALHO MAX. NA HORA ANT. (AUT) (C)', None))),
-                'temperatura_orvalho_min_c': parse_value(row.get('TEMPERATURA ORVALHO MIN. NA HORA ANT. (AUT) (°C)',
-                                                                row.get('TEMPERATURA ORVALHO MIN. NA HORA ANT. (AUT) (C)', None))),
-                'umidade_rel_max_pct': parse_value(row.get('UMIDADE REL. MAX. NA HORA ANT. (AUT) (%)',
-                                                           row.get('UMIDADE REL. MAX. NA HORA ANT. (AUT) (%)', None))),
-                'umidade_rel_min_pct': parse_value(row.get('UMIDADE REL. MIN. NA HORA ANT. (AUT) (%)',
-                                                           row.get('UMIDADE REL. MIN. NA HORA ANT. (AUT) (%)', None))),
-                'umidade_rel_horaria_pct': parse_value(row.get('UMIDADE RELATIVA DO AR, HORARIA (%)',
-                                                              row.get('UMIDADE RELATIVA DO AR, HORARIA (%)', None))),
-                'vento_direcao_graus': parse_value(row.get('VENTO, DIREÇÃO HORARIA (gr) (° (gr))',
-                                                          row.get('VENTO, DIRECAO HORARIA (gr)', None))),
-                'vento_rajada_max_ms': parse_value(row.get('VENTO, RAJADA MAXIMA (m/s)',
-                                                           row.get('VENTO, RAJADA MAXIMA (m/s)', None))),
-                'vento_velocidade_ms': parse_value(row.get('VENTO, VELOCIDADE HORARIA (m/s)',
-                                                          row.get('VENTO, VELOCIDADE HORARIA (m/s)', None))),
-            }
-            
-            dados.append(registro)
-        except Exception as e:
-            # Ignora linhas com erro e continua
-            continue
-    
+    for lote in lotes:
+        dados.extend(lote_para_registros(lote))
+
     return {
         'estacao': estacao_info,
         'dados': dados
     }
-
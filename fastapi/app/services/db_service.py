@@ -1,13 +1,20 @@
 # fastapi/app/services/db_service.py
+import io
 import os
+import uuid
 import psycopg2
 from psycopg2.extras import execute_values
 from psycopg2 import sql
 from pathlib import Path
 from dotenv import load_dotenv
-from typing import List, Dict, Optional
+from typing import Iterator, List, Dict, Optional
 import pandas as pd
-from datetime import datetime
+import pyarrow as pa
+from datetime import datetime, date
+from .metrics import DB_BATCH_INSERT, DB_ROWS_INSERTED, cronometrar
+from .weather_batch import (
+    CAMPOS_MEDIDAS, COLUNAS_TABELA, criar_lote, intervalos_por_estacao, lote_de_registros, lote_para_csv
+)
 
 # Carrega variáveis de ambiente
 env_path = Path(__file__).resolve().parent / ".env"
@@ -15,6 +22,9 @@ if not env_path.exists():
     env_path = Path(__file__).resolve().parents[1] / ".env"
 load_dotenv(env_path)
 
+# Linhas por ida ao servidor nas leituras em streaming (cursores nomeados)
+DB_ITERSIZE = int(os.getenv("DB_ITERSIZE", "10000"))
+
 def get_db_connection():
     """
     Cria e retorna uma conexão com o PostgreSQL.
@@ -49,12 +59,32 @@ def test_db_connection():
         print(f"❌ Erro ao conectar com PostgreSQL: {e}")
         return False
 
+def parse_data_fundacao(valor) -> Optional[date]:
+    """
+    Converte a data de fundação do cabeçalho do INMET para date.
+    Os CSVs usam DD/MM/AA (ex: 21/02/03); também aceita DD/MM/AAAA e AAAA-MM-DD.
+    """
+    if valor is None or isinstance(valor, date):
+        return valor
+    texto = str(valor).strip()
+    if not texto:
+        return None
+    for formato in ('%d/%m/%y', '%d/%m/%Y', '%Y-%m-%d', '%Y/%m/%d'):
+        try:
+            return datetime.strptime(texto, formato).date()
+        except ValueError:
+            continue
+    return None
+
 def insert_estacao(codigo_wmo: str, regiao: str, uf: str, nome: str,
                    latitude: Optional[float] = None, longitude: Optional[float] = None,
                    altitude: Optional[float] = None, data_fundacao: Optional[str] = None):
     """
     Insere ou atualiza uma estação meteorológica.
     """
+    # Converte antes de enviar ao banco: DD/MM/AA seria interpretado conforme o DateStyle
+    data_fundacao = parse_data_fundacao(data_fundacao)
+    
     conn = get_db_connection()
     cur = conn.cursor()
     
@@ -83,92 +113,101 @@ def insert_estacao(codigo_wmo: str, regiao: str, uf: str, nome: str,
         cur.close()
         conn.close()
 
+_COLUNAS_DADOS = ", ".join(COLUNAS_TABELA)
+
+# Tabela temporária do COPY; _ordem numera as linhas na ordem em que chegaram
+_SQL_CRIAR_STAGING = f"""
+    CREATE TEMP TABLE _staging_dados_meteorologicos ON COMMIT DROP AS
+    SELECT {_COLUNAS_DADOS} FROM dados_meteorologicos WITH NO DATA;
+    ALTER TABLE _staging_dados_meteorologicos
+        ADD COLUMN _ordem BIGINT GENERATED ALWAYS AS IDENTITY
+"""
+
+# Upsert a partir da tabela temporária carregada via COPY. DISTINCT ON evita
+# "ON CONFLICT DO UPDATE command cannot affect row a second time" com chaves repetidas no lote;
+# entre as repetidas, vale a última linha do lote (maior _ordem).
+_SQL_UPSERT_STAGING = f"""
+    INSERT INTO dados_meteorologicos ({_COLUNAS_DADOS})
+    SELECT DISTINCT ON (codigo_wmo, timestamp_utc) {_COLUNAS_DADOS}
+    FROM _staging_dados_meteorologicos
+    ORDER BY codigo_wmo, timestamp_utc, _ordem DESC
+    ON CONFLICT (codigo_wmo, timestamp_utc) 
+    DO UPDATE SET
+        precipitacao_mm = EXCLUDED.precipitacao_mm,
+        pressao_estacao_mb = EXCLUDED.pressao_estacao_mb,
+        pressao_max_mb = EXCLUDED.pressao_max_mb,
+        pressao_min_mb = EXCLUDED.pressao_min_mb,
+        radiacao_global_kjm2 = EXCLUDED.radiacao_global_kjm2,
+        temperatura_ar_c = EXCLUDED.temperatura_ar_c,
+        temperatura_orvalho_c = EXCLUDED.temperatura_orvalho_c,
+        temperatura_max_c = EXCLUDED.temperatura_max_c,
+        temperatura_min_c = EXCLUDED.temperatura_min_c,
+        temperatura_orvalho_max_c = EXCLUDED.temperatura_orvalho_max_c,
+        temperatura_orvalho_min_c = EXCLUDED.temperatura_orvalho_min_c,
+        umidade_rel_max_pct = EXCLUDED.umidade_rel_max_pct,
+        umidade_rel_min_pct = EXCLUDED.umidade_rel_min_pct,
+        umidade_rel_horaria_pct = EXCLUDED.umidade_rel_horaria_pct,
+        vento_direcao_graus = EXCLUDED.vento_direcao_graus,
+        vento_rajada_max_ms = EXCLUDED.vento_rajada_max_ms,
+        vento_velocidade_ms = EXCLUDED.vento_velocidade_ms,
+        intensidade_chuva = EXCLUDED.intensidade_chuva
+"""
+
 def insert_dados_meteorologicos_batch(dados: List[Dict]):
     """
     Insere múltiplos registros de dados meteorológicos de uma vez (bulk insert).
+    Registros em dicts são convertidos em um lote colunar (weather_batch).
     """
     if not dados:
         return 0
+    try:
+        lote = lote_de_registros(dados)
+    except Exception as e:
+        raise RuntimeError(f"Erro ao inserir dados meteorológicos: {e}")
+    return insert_lote_dados_meteorologicos(lote)
+
+def insert_lote_dados_meteorologicos(lote: pa.RecordBatch) -> int:
+    """
+    Insere um lote colunar (weather_batch) em dados_meteorologicos.
+    
+    O lote vai por COPY para uma tabela temporária e de lá para a tabela final com
+    INSERT ... ON CONFLICT; depois as partições e os rollups do intervalo são atualizados.
+    """
+    if lote is None or lote.num_rows == 0:
+        return 0
     
     conn = get_db_connection()
     cur = conn.cursor()
     
     try:
-        # Prepara os dados para inserção em lote
-        values = []
-        for d in dados:
-            # Usa timestamp_utc se existir, senão combina data e hora
-            if 'timestamp_utc' in d and d['timestamp_utc']:
-                timestamp_utc = d['timestamp_utc'] if isinstance(d['timestamp_utc'], datetime) else datetime.combine(d['data'], d['hora_utc'])
-            else:
-                timestamp_utc = datetime.combine(d['data'], d['hora_utc'])
-            
-            values.append((
-                d['codigo_wmo'],
-                d['data'],
-                d['hora_utc'],
-                timestamp_utc,
-                d.get('precipitacao_mm'),
-                d.get('pressao_estacao_mb'),
-                d.get('pressao_max_mb'),
-                d.get('pressao_min_mb'),
-                d.get('radiacao_global_kjm2'),
-                d.get('temperatura_ar_c'),
-                d.get('temperatura_orvalho_c'),
-                d.get('temperatura_max_c'),
-                d.get('temperatura_min_c'),
-                d.get('temperatura_orvalho_max_c'),
-                d.get('temperatura_orvalho_min_c'),
-                d.get('umidade_rel_max_pct'),
-                d.get('umidade_rel_min_pct'),
-                d.get('umidade_rel_horaria_pct'),
-                d.get('vento_direcao_graus'),
-                d.get('vento_rajada_max_ms'),
-                d.get('vento_velocidade_ms'),
-                d.get('intensidade_chuva')
-            ))
+        intervalos = intervalos_por_estacao(lote)
+        conteudo = lote_para_csv(lote)
         
-        # Insere em lote usando execute_values para melhor performance
-        execute_values(
-            cur,
-            """
-            INSERT INTO dados_meteorologicos (
-                codigo_wmo, data, hora_utc, timestamp_utc,
-                precipitacao_mm, pressao_estacao_mb, pressao_max_mb, pressao_min_mb,
-                radiacao_global_kjm2, temperatura_ar_c, temperatura_orvalho_c,
-                temperatura_max_c, temperatura_min_c, temperatura_orvalho_max_c, temperatura_orvalho_min_c,
-                umidade_rel_max_pct, umidade_rel_min_pct, umidade_rel_horaria_pct,
-                vento_direcao_graus, vento_rajada_max_ms, vento_velocidade_ms,
-                intensidade_chuva
-            ) VALUES %s
-            ON CONFLICT (codigo_wmo, data, hora_utc) 
-            DO UPDATE SET
-                precipitacao_mm = EXCLUDED.precipitacao_mm,
-                pressao_estacao_mb = EXCLUDED.pressao_estacao_mb,
-                pressao_max_mb = EXCLUDED.pressao_max_mb,
-                pressao_min_mb = EXCLUDED.pressao_min_mb,
-                radiacao_global_kjm2 = EXCLUDED.radiacao_global_kjm2,
-                temperatura_ar_c = EXCLUDED.temperatura_ar_c,
-                temperatura_orvalho_c = EXCLUDED.temperatura_orvalho_c,
-                temperatura_max_c = EXCLUDED.temperatura_max_c,
-                temperatura_min_c = EXCLUDED.temperatura_min_c,
-                temperatura_orvalho_max_c = EXCLUDED.temperatura_orvalho_max_c,
-                temperatura_orvalho_min_c = EXCLUDED.temperatura_orvalho_min_c,
-                umidade_rel_max_pct = EXCLUDED.umidade_rel_max_pct,
-                umidade_rel_min_pct = EXCLUDED.umidade_rel_min_pct,
-                umidade_rel_horaria_pct = EXCLUDED.umidade_rel_horaria_pct,
-                vento_direcao_graus = EXCLUDED.vento_direcao_graus,
-                vento_rajada_max_ms = EXCLUDED.vento_rajada_max_ms,
-                vento_velocidade_ms = EXCLUDED.vento_velocidade_ms,
-                intensidade_chuva = EXCLUDED.intensidade_chuva
-            """,
-            values,
-            page_size=1000
+        # Garante as partições mensais que cobrem o lote
+        from .partition_service import garantir_particoes
+        garantir_particoes(
+            conn,
+            min(inicio for inicio, _ in intervalos.values()),
+            max(fim for _, fim in intervalos.values())
         )
         
-        conn.commit()
-        inserted = len(values)
+        with cronometrar(DB_BATCH_INSERT):
+            cur.execute(_SQL_CRIAR_STAGING)
+            cur.copy_expert(
+                f"COPY _staging_dados_meteorologicos ({_COLUNAS_DADOS}) FROM STDIN WITH (FORMAT csv)",
+                io.BytesIO(conteudo)
+            )
+            cur.execute(_SQL_UPSERT_STAGING)
+            inserted = cur.rowcount
+            conn.commit()
+        
+        DB_ROWS_INSERTED.inc(inserted)
         print(f"✅ {inserted} registros inseridos/atualizados no banco")
+        
+        # Mantém os rollups do Grafana em dia com o lote recém-inserido
+        for codigo_wmo, (inicio, fim) in intervalos.items():
+            _atualizar_rollups(conn, codigo_wmo, inicio, fim)
+        
         return inserted
     except Exception as e:
         conn.rollback()
@@ -177,6 +216,58 @@ def insert_dados_meteorologicos_batch(dados: List[Dict]):
         cur.close()
         conn.close()
 
+def _atualizar_rollups(conn, codigo_wmo: Optional[str], inicio: datetime, fim: datetime) -> int:
+    """
+    Recalcula os rollups (dia/semana/mes) que cobrem o intervalo, usando a conexão informada.
+    Falhas não interrompem a ingestão: os rollups podem ser reconstruídos depois.
+    """
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT atualizar_rollups(%s, %s, %s)", (codigo_wmo, inicio, fim))
+        linhas = cur.fetchone()[0]
+        conn.commit()
+        return linhas
+    except Exception as e:
+        conn.rollback()
+        if "does not exist" in str(e).lower():
+            print("⚠️  Função atualizar_rollups não existe. Execute o script 06_rollups_grafana.sql")
+        else:
+            print(f"⚠️  Aviso: não foi possível atualizar rollups de {codigo_wmo}: {e}")
+        return 0
+    finally:
+        cur.close()
+
+def atualizar_rollups(codigo_wmo: Optional[str] = None,
+                      inicio: Optional[datetime] = None,
+                      fim: Optional[datetime] = None) -> int:
+    """
+    Recalcula os rollups do Grafana para uma estação (ou todas, se codigo_wmo for None).
+    Sem intervalo informado, reconstrói todo o período presente em dados_meteorologicos.
+    """
+    conn = get_db_connection()
+    cur = conn.cursor()
+    
+    try:
+        if inicio is None or fim is None:
+            cur.execute("""
+                SELECT MIN(timestamp_utc), MAX(timestamp_utc)
+                FROM dados_meteorologicos
+                WHERE %s IS NULL OR codigo_wmo = %s
+            """, (codigo_wmo, codigo_wmo))
+            min_ts, max_ts = cur.fetchone()
+            inicio = inicio or min_ts
+            fim = fim or max_ts
+        
+        if inicio is None or fim is None:
+            return 0
+        
+        linhas = _atualizar_rollups(conn, codigo_wmo, inicio, fim)
+        print(f"✅ Rollups atualizados: {linhas} períodos ({codigo_wmo or 'todas as estações'})")
+        return linhas
+    finally:
+        cur.close()
+        conn.close()
+
 def get_table_count(table_name: str) -> int:
     """
     Retorna o número de registros em uma tabela.
@@ -258,41 +349,164 @@ def insert_predicao_intensidade(
         cur.close()
         conn.close()
 
-def get_latest_weather_data(limit: int = 100):
+# Uma predição por (estação, observação, versão do modelo): regravar atualiza a linha
+# (sql_scripts/09_pontuacao_lote.sql)
+_SQL_UPSERT_PREDICOES = """
+    INSERT INTO predicoes_intensidade (
+        codigo_wmo, timestamp_utc, estacao_nome,
+        precipitacao_mm, pressao_estacao_mb, temperatura_ar_c,
+        umidade_rel_horaria_pct, vento_velocidade_ms,
+        intensidade_predita,
+        probabilidade_forte, probabilidade_moderada,
+        probabilidade_leve, probabilidade_sem_chuva,
+        modelo_usado, modelo_versao
+    ) VALUES %s
+    ON CONFLICT (codigo_wmo, timestamp_utc, modelo_versao) DO UPDATE SET
+        estacao_nome = EXCLUDED.estacao_nome,
+        precipitacao_mm = EXCLUDED.precipitacao_mm,
+        pressao_estacao_mb = EXCLUDED.pressao_estacao_mb,
+        temperatura_ar_c = EXCLUDED.temperatura_ar_c,
+        umidade_rel_horaria_pct = EXCLUDED.umidade_rel_horaria_pct,
+        vento_velocidade_ms = EXCLUDED.vento_velocidade_ms,
+        intensidade_predita = EXCLUDED.intensidade_predita,
+        probabilidade_forte = EXCLUDED.probabilidade_forte,
+        probabilidade_moderada = EXCLUDED.probabilidade_moderada,
+        probabilidade_leve = EXCLUDED.probabilidade_leve,
+        probabilidade_sem_chuva = EXCLUDED.probabilidade_sem_chuva,
+        modelo_usado = EXCLUDED.modelo_usado,
+        created_at = CURRENT_TIMESTAMP
+"""
+
+def gravar_predicoes_lote(cur, predicoes: List[tuple]):
+    """
+    Grava as predições no cursor informado, sem commit (o chamador controla a
+    transação). Mesmo formato de tupla de insert_predicoes_intensidade_lote.
     """
-    Retorna os dados meteorológicos mais recentes para fazer predições.
+    execute_values(cur, _SQL_UPSERT_PREDICOES, predicoes, page_size=1000)
+
+def insert_predicoes_intensidade_lote(predicoes: List[tuple]) -> int:
+    """
+    Insere várias predições em predicoes_intensidade de uma vez.
+    
+    Cada tupla: (codigo_wmo, timestamp_utc da observação, estacao_nome, precipitacao_mm,
+    pressao_estacao_mb, temperatura_ar_c, umidade_rel_horaria_pct, vento_velocidade_ms,
+    intensidade_predita, probabilidade_forte, probabilidade_moderada, probabilidade_leve,
+    probabilidade_sem_chuva, modelo_usado, modelo_versao)
+    
+    A predição de uma observação por uma versão do modelo é gravada uma única vez:
+    repetir o lote atualiza as linhas existentes em vez de duplicá-las.
     """
+    if not predicoes:
+        return 0
+    
     conn = get_db_connection()
     cur = conn.cursor()
     
     try:
-        cur.execute("""
-            SELECT 
-                dm.codigo_wmo,
-                e.nome as estacao_nome,
-                dm.timestamp_utc,
-                dm.precipitacao_mm,
-                dm.pressao_estacao_mb,
-                dm.temperatura_ar_c,
-                dm.umidade_rel_horaria_pct,
-                dm.vento_velocidade_ms,
-                dm.radiacao_global_kjm2
-            FROM dados_meteorologicos dm
-            JOIN estacoes e ON dm.codigo_wmo = e.codigo_wmo
-            WHERE dm.timestamp_utc >= NOW() - INTERVAL '24 hours'
-            ORDER BY dm.timestamp_utc DESC
+        gravar_predicoes_lote(cur, predicoes)
+        conn.commit()
+        return len(predicoes)
+    except Exception as e:
+        conn.rollback()
+        if "does not exist" in str(e).lower() or "relation" in str(e).lower():
+            print("⚠️  Tabela predicoes_intensidade não existe. Execute o script 04_views_grafana.sql")
+        elif "no unique or exclusion constraint" in str(e).lower() or "modelo_versao" in str(e).lower():
+            print("⚠️  Chave das predições não existe. Execute o script 09_pontuacao_lote.sql")
+        raise RuntimeError(f"Erro ao inserir predições: {e}")
+    finally:
+        cur.close()
+        conn.close()
+
+def get_latest_weather_lote(limit: int = 100) -> pa.RecordBatch:
+    """
+    Dados meteorológicos mais recentes (últimas 24h) como lote colunar (weather_batch),
+    com todas as medidas, para a predição em lote. Lido por iterar_consulta em um
+    único bloco de até `limit` linhas, sem passar por tuplas por linha no Python.
+    """
+    medidas = ", ".join(f"{campo}::double precision AS {campo}" for campo in CAMPOS_MEDIDAS)
+    try:
+        brutos = list(iterar_consulta(f"""
+            SELECT codigo_wmo, timestamp_utc, {medidas}, intensidade_chuva
+            FROM dados_meteorologicos
+            WHERE timestamp_utc >= NOW() - INTERVAL '24 hours'
+            ORDER BY timestamp_utc DESC
             LIMIT %s
-        """, (limit,))
-        
-        columns = [desc[0] for desc in cur.description]
-        results = []
-        for row in cur.fetchall():
-            results.append(dict(zip(columns, row)))
-        
-        return results
+        """, (limit,), itersize=limit))
     except Exception as e:
         raise RuntimeError(f"Erro ao buscar dados meteorológicos: {e}")
+
+    if not brutos:
+        nomes = ['codigo_wmo', 'timestamp_utc', *CAMPOS_MEDIDAS, 'intensidade_chuva']
+        return criar_lote({nome: [] for nome in nomes})
+    return criar_lote(dict(zip(brutos[0].schema.names, brutos[0].columns)))
+
+def iterar_consulta(query, params=None, itersize: Optional[int] = None,
+                    schema: Optional[pa.Schema] = None) -> Iterator[pa.RecordBatch]:
+    """
+    Executa a consulta com um cursor nomeado (do lado do servidor) e produz lotes
+    colunares (Arrow RecordBatch) de até `itersize` linhas (padrão DB_ITERSIZE).
+    Com `schema`, todos os lotes têm esses tipos (senão são inferidos por lote).
+
+    Só um bloco de linhas fica em memória por vez, no cliente e no Python; a conexão
+    é fechada quando o iterador termina ou é descartado pelo consumidor.
+    """
+    itersize = itersize or DB_ITERSIZE
+    conn = get_db_connection()
+    cur = conn.cursor(name=f"stream_{uuid.uuid4().hex[:12]}")
+    cur.itersize = itersize
+
+    try:
+        cur.execute(query, params)
+        nomes = None
+        while True:
+            linhas = cur.fetchmany(itersize)
+            if nomes is None:
+                # Em cursores nomeados a descrição só existe após o primeiro fetch
+                nomes = [desc[0] for desc in cur.description]
+            if not linhas:
+                break
+            colunas = zip(*linhas)
+            if schema is None:
+                yield pa.RecordBatch.from_arrays(
+                    [pa.array(valores, from_pandas=True) for valores in colunas], names=nomes
+                )
+            else:
+                yield pa.RecordBatch.from_arrays(
+                    [pa.array(valores, type=campo.type, from_pandas=True) for valores, campo in zip(colunas, schema)],
+                    schema=schema
+                )
+    except psycopg2.Error as e:
+        raise RuntimeError(f"Erro ao executar consulta em streaming: {e}")
     finally:
         cur.close()
         conn.close()
 
+def iterar_dados_meteorologicos(codigo_wmo: Optional[str] = None,
+                                inicio: Optional[datetime] = None,
+                                fim: Optional[datetime] = None,
+                                itersize: Optional[int] = None) -> Iterator[pa.RecordBatch]:
+    """
+    Dados meteorológicos de uma estação (ou todas) em [inicio, fim), em ordem de
+    timestamp, como lotes do weather_batch (medidas float64, null = ausente).
+    """
+    filtros = []
+    params = []
+    if codigo_wmo:
+        filtros.append("codigo_wmo = %s")
+        params.append(codigo_wmo)
+    if inicio:
+        filtros.append("timestamp_utc >= %s")
+        params.append(inicio)
+    if fim:
+        filtros.append("timestamp_utc < %s")
+        params.append(fim)
+    where = f"WHERE {' AND '.join(filtros)}" if filtros else ""
+    medidas = ", ".join(f"{campo}::double precision AS {campo}" for campo in CAMPOS_MEDIDAS)
+
+    for bruto in iterar_consulta(f"""
+        SELECT codigo_wmo, timestamp_utc, {medidas}, intensidade_chuva
+        FROM dados_meteorologicos
+        {where}
+        ORDER BY timestamp_utc, codigo_wmo
+    """, params, itersize):
+        yield criar_lote(dict(zip(bruto.schema.names, bruto.columns)))
@@ -0,0 +1,294 @@
+# fastapi/app/services/feature_store.py
+"""
+Features do modelo de intensidade de chuva: definição e materialização.
+
+- montar_features_lote: as 19 features (FEATURE_ORDER) de um lote colunar
+  (weather_batch) em memória, para dados que ainda não estão no banco;
+- features_intensidade (sql_scripts/08_features_intensidade.sql): o mesmo vetor
+  já calculado para cada observação, recalculado ao fim de cada ingestão para as
+  estações/períodos recebidos (atualizar_features). O treino e a predição em lote
+  leem a matriz direto da tabela (iterar_features / ler_matriz_features), sem
+  derivar calendário nem preencher ausentes linha a linha. A pontuação em lote lê
+  as linhas recalculadas desde a sua watermark (features_atualizadas).
+
+As duas formas seguem a mesma regra (ausentes: services/imputation.py e
+vw_dados_imputados; dia_semana com segunda = 0).
+"""
+import os
+from datetime import datetime
+from typing import Dict, Iterator, Optional, Sequence, Tuple
+
+import numpy as np
+import pyarrow as pa
+
+from .db_service import get_db_connection, iterar_consulta
+from .imputation import imputar_colunas, imputar_lote
+
+# Ordem das features esperada pelos modelos treinados no notebook 03
+FEATURE_ORDER = [
+    'precipitacao_mm',
+    'pressao_estacao_mb', 'pressao_max_mb', 'pressao_min_mb',
+    'temperatura_ar_c', 'temperatura_max_c', 'temperatura_min_c',
+    'umidade_rel_horaria_pct', 'umidade_rel_max_pct', 'umidade_rel_min_pct',
+    'vento_velocidade_ms', 'vento_direcao_graus', 'vento_rajada_max_ms',
+    'radiacao_global_kjm2',
+    'ano', 'mes', 'dia', 'hora', 'dia_semana'
+]
+
+# Medidas (as 14 primeiras features); o restante vem de timestamp_utc
+FEATURES_MEDIDAS = FEATURE_ORDER[:14]
+
+SCHEMA_FEATURES = pa.schema(
+    [('codigo_wmo', pa.string()), ('timestamp_utc', pa.timestamp('us'))]
+    + [(feat, pa.float64()) for feat in FEATURE_ORDER]
+    + [('intensidade_chuva', pa.string())]
+)
+
+
+def montar_features_lote(lote) -> np.ndarray:
+    """
+    Monta a matriz (n x n_features) de um lote colunar (weather_batch).
+
+    Ausentes são preenchidos pelo componente de imputação (services/imputation.py):
+    máximas/mínimas usam a medida horária, depois as medianas por estação/mês
+    (as mesmas da exportação de treino, vw_dados_imputados). Ano/mês/dia/hora/dia
+    da semana vêm de timestamp_utc.
+    """
+    n = lote.num_rows
+    X = np.empty((n, len(FEATURE_ORDER)), dtype=np.float64)
+    colunas = imputar_lote(lote, FEATURES_MEDIDAS)
+    for j, feat in enumerate(FEATURES_MEDIDAS):
+        X[:, j] = colunas[feat]
+
+    timestamps = lote.column('timestamp_utc').to_numpy(zero_copy_only=False).astype('datetime64[us]')
+    dias = timestamps.astype('datetime64[D]')
+    X[:, 14] = timestamps.astype('datetime64[Y]').astype(np.int64) + 1970
+    X[:, 15] = timestamps.astype('datetime64[M]').astype(np.int64) % 12 + 1
+    X[:, 16] = (dias - timestamps.astype('datetime64[M]').astype('datetime64[D]')).astype(np.int64) + 1
+    X[:, 17] = (timestamps - dias).astype('timedelta64[h]').astype(np.int64)
+    # 1970-01-01 foi quinta-feira (weekday 3)
+    X[:, 18] = (dias.astype(np.int64) + 3) % 7
+    return X
+
+
+def matriz_registros(colunas: Dict[str, Sequence], codigos_wmo) -> np.ndarray:
+    """
+    Monta a matriz (n x n_features) de registros avulsos já em colunas (ex: itens do
+    /predict/batch): {feature: valores} com todas as features de FEATURE_ORDER, None =
+    ausente. As medidas passam por imputar_colunas (mês da coluna 'mes', como no
+    treino); o calendário é usado como veio.
+    """
+    meses = np.asarray(colunas['mes'], dtype=np.intp)
+    medidas = imputar_colunas(
+        {campo: np.array(colunas[campo], dtype=np.float64) for campo in FEATURES_MEDIDAS}, codigos_wmo, meses
+    )
+    X = np.empty((len(meses), len(FEATURE_ORDER)), dtype=np.float64)
+    for j, feat in enumerate(FEATURE_ORDER):
+        X[:, j] = medidas[feat] if feat in medidas else colunas[feat]
+    return X
+
+
+def matriz_features(lote: pa.RecordBatch) -> np.ndarray:
+    """Matriz (n x n_features) de um lote lido de features_intensidade (SCHEMA_FEATURES)."""
+    X = np.empty((lote.num_rows, len(FEATURE_ORDER)), dtype=np.float64)
+    for j, feat in enumerate(FEATURE_ORDER):
+        X[:, j] = lote.column(feat).to_numpy(zero_copy_only=False)
+    return X
+
+
+# ============================================================================
+# MATERIALIZAÇÃO (features_intensidade)
+# ============================================================================
+
+def atualizar_features(codigo_wmo: Optional[str] = None,
+                       inicio: Optional[datetime] = None,
+                       fim: Optional[datetime] = None) -> int:
+    """
+    Recalcula as features de [inicio, fim] de uma estação (ou todas, se codigo_wmo
+    for None). Sem intervalo, todo o período. Retorna as linhas gravadas.
+    """
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT atualizar_features_intensidade(%s, %s, %s)", (codigo_wmo, inicio, fim))
+        linhas = cur.fetchone()[0]
+        conn.commit()
+        return linhas
+    except Exception as e:
+        conn.rollback()
+        if "does not exist" in str(e).lower():
+            print("⚠️  Função atualizar_features_intensidade não existe. Execute o script 08_features_intensidade.sql")
+        raise RuntimeError(f"Erro ao atualizar features: {e}")
+    finally:
+        cur.close()
+        conn.close()
+
+
+_COLUNAS_FEATURES = ", ".join(
+    ["codigo_wmo", "timestamp_utc"]
+    + [f"{feat}::double precision AS {feat}" for feat in FEATURE_ORDER]
+    + ["intensidade_chuva"]
+)
+
+
+def iterar_features(codigo_wmo: Optional[str] = None,
+                    inicio: Optional[datetime] = None,
+                    fim: Optional[datetime] = None,
+                    rotulados: bool = False,
+                    itersize: Optional[int] = None,
+                    atualizado_desde: Optional[datetime] = None,
+                    atualizado_ate: Optional[datetime] = None) -> Iterator[pa.RecordBatch]:
+    """
+    Features de uma estação (ou todas) em [inicio, fim), em ordem de timestamp,
+    como lotes com SCHEMA_FEATURES (use matriz_features para a matriz NumPy).
+    rotulados=True traz só observações com intensidade_chuva (treino).
+    atualizado_desde/atualizado_ate restringem a linhas recalculadas em
+    [atualizado_desde, atualizado_ate) (treino incremental).
+    """
+    filtros = []
+    params = []
+    if codigo_wmo:
+        filtros.append("codigo_wmo = %s")
+        params.append(codigo_wmo)
+    if inicio:
+        filtros.append("timestamp_utc >= %s")
+        params.append(inicio)
+    if fim:
+        filtros.append("timestamp_utc < %s")
+        params.append(fim)
+    if atualizado_desde:
+        filtros.append("atualizado_em >= %s")
+        params.append(atualizado_desde)
+    if atualizado_ate:
+        filtros.append("atualizado_em < %s")
+        params.append(atualizado_ate)
+    if rotulados:
+        filtros.append("intensidade_chuva IS NOT NULL")
+    where = f"WHERE {' AND '.join(filtros)}" if filtros else ""
+
+    yield from iterar_consulta(f"""
+        SELECT {_COLUNAS_FEATURES}
+        FROM features_intensidade
+        {where}
+        ORDER BY timestamp_utc, codigo_wmo
+    """, params, itersize, schema=SCHEMA_FEATURES)
+
+
+def ler_matriz_features(codigo_wmo: Optional[str] = None,
+                        inicio: Optional[datetime] = None,
+                        fim: Optional[datetime] = None,
+                        rotulados: bool = True,
+                        itersize: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray, pa.Table]:
+    """
+    Matriz de features pronta para o treino.
+
+    Returns:
+        (X n x n_features float64, y rótulos (intensidade_chuva),
+         chaves: tabela com codigo_wmo e timestamp_utc de cada linha)
+    """
+    lotes = list(iterar_features(codigo_wmo, inicio, fim, rotulados, itersize))
+    tabela = pa.Table.from_batches(lotes, schema=SCHEMA_FEATURES)
+    X = np.empty((tabela.num_rows, len(FEATURE_ORDER)), dtype=np.float64)
+    for j, feat in enumerate(FEATURE_ORDER):
+        X[:, j] = tabela.column(feat).to_numpy()
+    y = tabela.column('intensidade_chuva').to_numpy(zero_copy_only=False)
+    return X, y, tabela.select(['codigo_wmo', 'timestamp_utc'])
+
+
+# Segundos que uma transação de escrita pode segurar limite_atualizacoes antes do aviso
+FEATURES_LIMITE_ATRASO_AVISO = int(os.getenv("FEATURES_LIMITE_ATRASO_AVISO", "900"))
+
+# Início da transação de escrita aberta mais antiga (de outra sessão): linhas com
+# atualizado_em a partir daí podem pertencer a uma ingestão ainda não confirmada
+# (atualizado_em é o CURRENT_TIMESTAMP, o início da transação). Só contam sessões
+# que já escreveram (backend_xid): as que gravam features_intensidade começam
+# escrevendo (DELETE de atualizar_features_intensidade, UPDATE da reclassificação),
+# e uma sessão só de leitura parada em "idle in transaction" não segura o limite.
+# Sem permissão para ver as outras sessões, xact_start vem NULL e o limite é o
+# instante atual.
+_SQL_LIMITE_ATUALIZACOES = """
+    SELECT LEAST(now(), MIN(xact_start))::timestamp,
+           EXTRACT(EPOCH FROM now() - MIN(xact_start)),
+           (array_agg(pid ORDER BY xact_start))[1]
+    FROM pg_stat_activity
+    WHERE datname = current_database()
+      AND pid <> pg_backend_pid()
+      AND backend_type = 'client backend'
+      AND xact_start IS NOT NULL
+      AND backend_xid IS NOT NULL
+"""
+
+
+def limite_atualizacoes() -> datetime:
+    """
+    Limite superior seguro de atualizado_em: toda linha anterior a ele já está
+    confirmada. Leituras incrementais (pontuação em lote, treino incremental) param
+    nele e guardam-no como watermark, sem pular recálculos ainda em andamento.
+    Avisa quando uma transação de escrita o segura há mais de
+    FEATURES_LIMITE_ATRASO_AVISO segundos.
+    """
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute(_SQL_LIMITE_ATUALIZACOES)
+        limite, atraso, pid = cur.fetchone()
+        if atraso is not None and atraso > FEATURES_LIMITE_ATRASO_AVISO:
+            print(f"⚠️  Aviso: a transação do pid {pid} está aberta há {float(atraso):.0f}s e segura o "
+                  f"limite de atualizado_em em {limite}; pontuação e treino incremental não avançam além dele")
+        return limite
+    finally:
+        cur.close()
+        conn.close()
+
+
+SCHEMA_FEATURES_ATUALIZADAS = SCHEMA_FEATURES.append(pa.field('atualizado_em', pa.timestamp('us')))
+
+
+def features_atualizadas(apos: Optional[Tuple[datetime, str, datetime]],
+                         ate: datetime,
+                         limite: int,
+                         inicio: Optional[datetime] = None) -> pa.RecordBatch:
+    """
+    Próximas `limite` linhas recalculadas depois de `apos` (atualizado_em, codigo_wmo,
+    timestamp_utc) e antes de `ate`, nessa ordem (idx_features_intensidade_atualizacao),
+    com SCHEMA_FEATURES_ATUALIZADAS. `inicio` ignora observações anteriores.
+    Usado pela pontuação em lote (services/batch_scoring.py).
+    """
+    filtros = ["atualizado_em < %s"]
+    params = [ate]
+    if apos is not None:
+        filtros.append("(atualizado_em, codigo_wmo, timestamp_utc) > (%s, %s, %s)")
+        params.extend(apos)
+    if inicio:
+        filtros.append("timestamp_utc >= %s")
+        params.append(inicio)
+    params.append(limite)
+
+    lotes = list(iterar_consulta(f"""
+        SELECT {_COLUNAS_FEATURES}, atualizado_em
+        FROM features_intensidade
+        WHERE {' AND '.join(filtros)}
+        ORDER BY atualizado_em, codigo_wmo, timestamp_utc
+        LIMIT %s
+    """, params, itersize=limite, schema=SCHEMA_FEATURES_ATUALIZADAS))
+    if not lotes:
+        return pa.RecordBatch.from_pylist([], schema=SCHEMA_FEATURES_ATUALIZADAS)
+    return pa.Table.from_batches(lotes).combine_chunks().to_batches()[0]
+
+
+def ultimas_features(limit: int = 100) -> pa.RecordBatch:
+    """
+    Features das observações mais recentes (últimas 24h) de estações cadastradas,
+    para a predição em lote.
+    """
+    lotes = list(iterar_consulta(f"""
+        SELECT {_COLUNAS_FEATURES}
+        FROM features_intensidade
+        WHERE timestamp_utc >= NOW() - INTERVAL '24 hours'
+          AND codigo_wmo IN (SELECT codigo_wmo FROM estacoes)
+        ORDER BY timestamp_utc DESC
+        LIMIT %s
+    """, (limit,), schema=SCHEMA_FEATURES))
+    if not lotes:
+        return pa.RecordBatch.from_pylist([], schema=SCHEMA_FEATURES)
+    return pa.Table.from_batches(lotes).combine_chunks().to_batches()[0]
@@ -0,0 +1,266 @@
+# fastapi/app/services/imputation.py
+"""
+Imputação de medidas ausentes com medianas por estação e mês.
+
+As medianas ficam na tabela medianas_imputacao (sql_scripts/07_medianas_imputacao.sql),
+recalculadas a cada ingestão, e são carregadas uma vez em um array NumPy
+(estação x mês x variável) com os níveis de fallback já resolvidos:
+
+    (estação, mês) → (estação, todos os meses) → (todas, mês) → (todas, todos)
+
+Regra aplicada a um lote inteiro, igual à da view vw_dados_imputados (exportação
+de treino), para que treino e inferência vejam as mesmas features:
+
+1. máximas/mínimas ausentes usam a medida horária do mesmo registro;
+2. o que continua ausente recebe a mediana do nível mais específico disponível;
+3. precipitação e radiação ausentes valem 0 (sem chuva / noite), assim como
+   qualquer valor sem mediana conhecida.
+"""
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from .db_service import get_db_connection
+from .weather_batch import CAMPOS_MEDIDAS, coluna_numpy, criar_lote
+
+# Tempo de vida do cache (segundos). Outras instâncias podem recalcular as medianas.
+MEDIANAS_CACHE_TTL = int(os.getenv("MEDIANAS_CACHE_TTL", "300"))
+
+# Medidas ausentes que valem 0 em vez da mediana
+CAMPOS_ZERO = ('precipitacao_mm', 'radiacao_global_kjm2')
+
+# Colunas de medianas_imputacao (todas as medidas, exceto CAMPOS_ZERO)
+CAMPOS_IMPUTADOS = [campo for campo in CAMPOS_MEDIDAS if campo not in CAMPOS_ZERO]
+
+# Máximas/mínimas ausentes são preenchidas primeiro com a medida horária
+MEDIDA_HORARIA = {
+    'pressao_max_mb': 'pressao_estacao_mb', 'pressao_min_mb': 'pressao_estacao_mb',
+    'temperatura_max_c': 'temperatura_ar_c', 'temperatura_min_c': 'temperatura_ar_c',
+    'temperatura_orvalho_max_c': 'temperatura_orvalho_c', 'temperatura_orvalho_min_c': 'temperatura_orvalho_c',
+    'umidade_rel_max_pct': 'umidade_rel_horaria_pct', 'umidade_rel_min_pct': 'umidade_rel_horaria_pct',
+    'vento_rajada_max_ms': 'vento_velocidade_ms',
+}
+
+TODAS_ESTACOES = '*'
+
+
+class TabelaMedianas:
+    """
+    Medianas resolvidas em um array (estações + '*') x 13 meses x CAMPOS_IMPUTADOS.
+    Estações desconhecidas usam a linha '*' (medianas de todas as estações).
+    """
+
+    def __init__(self, linhas: Iterable[Sequence]):
+        """`linhas`: tuplas (codigo_wmo, mes, *CAMPOS_IMPUTADOS) de medianas_imputacao."""
+        linhas = list(linhas)
+        self.codigos = sorted({linha[0] for linha in linhas if linha[0] != TODAS_ESTACOES})
+        indice = {codigo: i for i, codigo in enumerate(self.codigos)}
+        todas = len(self.codigos)
+
+        bruto = np.full((todas + 1, 13, len(CAMPOS_IMPUTADOS)), np.nan)
+        for codigo, mes, *valores in linhas:
+            bruto[indice.get(codigo, todas), mes] = np.array(valores, dtype=np.float64)
+
+        # Resolve o fallback uma vez: estação/mês → estação → todas/mês → global
+        estacoes, geral = bruto[:todas], bruto[todas:]
+        for alternativa in (estacoes[:, :1], geral, geral[:, :1]):
+            estacoes = np.where(np.isnan(estacoes), alternativa, estacoes)
+        geral = np.where(np.isnan(geral), geral[:, :1], geral)
+        self.valores = np.concatenate([estacoes, geral])
+        self.n_linhas = len(linhas)
+        self._codigos_arrow = pa.array(self.codigos, type=pa.string())
+
+    def indices(self, codigos) -> np.ndarray:
+        """Linha do array de cada código WMO (estações desconhecidas → '*')."""
+        if isinstance(codigos, str):
+            codigos = [codigos]
+        if not isinstance(codigos, (pa.Array, pa.ChunkedArray)):
+            codigos = pa.array(codigos, type=pa.string(), from_pandas=True)
+        posicoes = pc.index_in(codigos, value_set=self._codigos_arrow)
+        return posicoes.fill_null(len(self.codigos)).to_numpy(zero_copy_only=False).astype(np.intp)
+
+    def medianas(self, codigos, meses: np.ndarray) -> np.ndarray:
+        """Matriz (n x CAMPOS_IMPUTADOS) com a mediana aplicável a cada registro."""
+        return self.valores[self.indices(codigos), np.asarray(meses, dtype=np.intp)]
+
+
+class MedianasImputacao:
+    """Cache da tabela medianas_imputacao, compartilhado pela inferência e pela exportação."""
+
+    def __init__(self, ttl: int = MEDIANAS_CACHE_TTL):
+        self.ttl = ttl
+        self._tabela: Optional[TabelaMedianas] = None
+        self._carregado_em: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def _expirado(self) -> bool:
+        return self._carregado_em is None or time.monotonic() - self._carregado_em > self.ttl
+
+    def _carregar(self):
+        """
+        Lê as medianas do banco (chamado com o lock adquirido). Se a tabela não existir
+        ou o banco estiver fora, segue sem medianas (ausentes viram 0) até o próximo TTL.
+        """
+        linhas = []
+        try:
+            conn = get_db_connection()
+            cur = conn.cursor()
+            try:
+                cur.execute(f"SELECT codigo_wmo, mes, {', '.join(CAMPOS_IMPUTADOS)} FROM medianas_imputacao")
+                linhas = cur.fetchall()
+            finally:
+                cur.close()
+                conn.close()
+        except Exception as e:
+            if "does not exist" in str(e).lower():
+                print("⚠️  Tabela medianas_imputacao não existe. Execute o script 07_medianas_imputacao.sql")
+            else:
+                print(f"⚠️  Aviso: não foi possível carregar as medianas de imputação: {e}")
+        self._tabela = TabelaMedianas(linhas)
+        self._carregado_em = time.monotonic()
+
+    def tabela(self) -> TabelaMedianas:
+        if self._expirado():
+            with self._lock:
+                if self._expirado():
+                    self._carregar()
+        return self._tabela
+
+    def invalidar(self):
+        """Descarta o cache; a próxima imputação recarrega do banco."""
+        with self._lock:
+            self._tabela = None
+            self._carregado_em = None
+
+
+# Instância única da API
+_medianas = MedianasImputacao()
+
+
+def obter_medianas() -> TabelaMedianas:
+    """Tabela de medianas em cache (recarregada após MEDIANAS_CACHE_TTL)."""
+    return _medianas.tabela()
+
+
+def invalidar_medianas():
+    _medianas.invalidar()
+
+
+def atualizar_medianas(codigos_wmo: Optional[Iterable[str]] = None) -> int:
+    """
+    Recalcula as medianas no banco e invalida o cache. Com `codigos_wmo`, só as das
+    estações informadas (o que a ingestão acabou de gravar); sem, todas, inclusive
+    as medianas gerais ('*'). Retorna o número de linhas gravadas.
+    """
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        linhas = 0
+        for codigo_wmo in (sorted(set(codigos_wmo)) if codigos_wmo is not None else [None]):
+            cur.execute("SELECT atualizar_medianas_imputacao(%s)", (codigo_wmo,))
+            linhas += cur.fetchone()[0]
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        raise RuntimeError(f"Erro ao atualizar medianas de imputação: {e}")
+    finally:
+        cur.close()
+        conn.close()
+    invalidar_medianas()
+    return linhas
+
+
+def imputar_colunas(colunas: Dict[str, np.ndarray], codigos_wmo, meses: np.ndarray,
+                    tabela: Optional[TabelaMedianas] = None) -> Dict[str, np.ndarray]:
+    """
+    Preenche os ausentes (NaN) das colunas informadas e retorna novas colunas.
+
+    Args:
+        colunas: {medida: array float64} (qualquer subconjunto de CAMPOS_MEDIDAS;
+                 as medidas horárias presentes são usadas para as máximas/mínimas)
+        codigos_wmo: código de cada registro (array/lista) ou um único código
+        meses: mês (1-12) de cada registro
+        tabela: medianas a usar (padrão: as do banco, em cache)
+    """
+    tabela = tabela or obter_medianas()
+    n = len(meses)
+    if isinstance(codigos_wmo, str):
+        codigos_wmo = [codigos_wmo] * n
+
+    medianas = None
+    resultado = {}
+    for campo, originais in colunas.items():
+        valores = np.array(originais, dtype=np.float64)
+        ausentes = np.isnan(valores)
+        if not ausentes.any():
+            resultado[campo] = valores
+            continue
+
+        if campo in CAMPOS_ZERO:
+            valores[ausentes] = 0.0
+            resultado[campo] = valores
+            continue
+
+        base = MEDIDA_HORARIA.get(campo)
+        if base is not None and base in colunas:
+            valores[ausentes] = np.asarray(colunas[base], dtype=np.float64)[ausentes]
+            ausentes = np.isnan(valores)
+
+        if campo in CAMPOS_IMPUTADOS and ausentes.any():
+            if medianas is None:
+                medianas = tabela.medianas(codigos_wmo, meses)
+            valores[ausentes] = medianas[ausentes, CAMPOS_IMPUTADOS.index(campo)]
+
+        resultado[campo] = np.where(np.isnan(valores), 0.0, valores)
+    return resultado
+
+
+def imputar_registros(registros: List[Dict], codigos_wmo, meses: Sequence[int],
+                      campos: Optional[Sequence[str]] = None) -> List[Dict]:
+    """
+    Registros avulsos (dicts, ex: requisições da API) com as medidas ausentes (None)
+    preenchidas pela mesma regra de imputar_colunas. Retorna cópias dos dicts.
+    `campos`: medidas a preencher (padrão: todas).
+    """
+    campos = list(campos or CAMPOS_MEDIDAS)
+    colunas = {
+        campo: np.array([np.nan if r.get(campo) is None else r[campo] for r in registros], dtype=np.float64)
+        for campo in campos
+    }
+    imputadas = imputar_colunas(colunas, codigos_wmo, np.asarray(meses, dtype=np.intp))
+    return [{**registro, **{campo: float(imputadas[campo][i]) for campo in campos}}
+            for i, registro in enumerate(registros)]
+
+
+def meses_do_lote(lote: pa.RecordBatch) -> np.ndarray:
+    """Mês (1-12) de cada registro a partir de timestamp_utc."""
+    timestamps = lote.column('timestamp_utc').to_numpy(zero_copy_only=False).astype('datetime64[M]')
+    return timestamps.astype(np.int64) % 12 + 1
+
+
+def imputar_lote(lote: pa.RecordBatch, campos: Optional[List[str]] = None,
+                 tabela: Optional[TabelaMedianas] = None) -> Dict[str, np.ndarray]:
+    """
+    Colunas de um lote colunar (weather_batch) com os ausentes preenchidos.
+    `campos`: medidas desejadas (padrão: todas). As horárias usadas pelas
+    máximas/mínimas são lidas do lote mesmo que não estejam em `campos`.
+    """
+    campos = list(campos or CAMPOS_MEDIDAS)
+    necessarios = campos + [MEDIDA_HORARIA[c] for c in campos if c in MEDIDA_HORARIA and MEDIDA_HORARIA[c] not in campos]
+    colunas = {campo: coluna_numpy(lote, campo) for campo in necessarios}
+    imputadas = imputar_colunas(colunas, lote.column('codigo_wmo'), meses_do_lote(lote), tabela)
+    return {campo: imputadas[campo] for campo in campos}
+
+
+def lote_imputado(lote: pa.RecordBatch, tabela: Optional[TabelaMedianas] = None) -> pa.RecordBatch:
+    """O mesmo lote, com todas as medidas preenchidas (exportação para treino)."""
+    colunas = imputar_lote(lote, tabela=tabela)
+    colunas['codigo_wmo'] = lote.column('codigo_wmo')
+    colunas['timestamp_utc'] = lote.column('timestamp_utc')
+    colunas['intensidade_chuva'] = lote.column('intensidade_chuva')
+    return criar_lote(colunas)
@@ -1,34 +1,166 @@
 # fastapi/app/services/main.py
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
 from pathlib import Path
 from datetime import datetime
 from typing import List, Dict, Optional
 from pydantic import BaseModel
 from .data_loader import load_local_data
-from .s3_service import upload_to_minio, test_connection, ensure_bucket_exists
+from .s3_service import upload_lotes_parquet, test_connection, ensure_bucket_exists
 from .db_service import (
-    test_db_connection, get_table_count, insert_estacao, 
-    insert_dados_meteorologicos_batch, insert_predicao_intensidade,
-    get_latest_weather_data, get_db_connection
+    test_db_connection, get_table_count,
+    insert_lote_dados_meteorologicos,
+    insert_predicao_intensidade,
+    insert_predicoes_intensidade_lote,
+    get_latest_weather_lote, atualizar_rollups,
+    iterar_dados_meteorologicos
+)
+from .weather_batch import FORMATOS_EXPORTACAO, serializar_lotes, intervalos_por_estacao
+from .csv_processor import abrir_inmet_csv, ler_inmet_mmap, encerrar_pools
+from . import parse_cache
+from . import prediction_cache
+from .batch_scoring import (
+    iniciar_agendador,
+    parar_agendador,
+    estado_agendador,
+    iniciar_pontuacao,
+    obter_pontuacao,
+    listar_pontuacoes,
+    listar_watermarks,
+    PONTUACAO_LINHAS_POR_BLOCO
+)
+from .imputation import atualizar_medianas, lote_imputado, imputar_registros
+from .feature_store import atualizar_features, ultimas_features, matriz_features, matriz_registros, FEATURES_MEDIDAS
+from .reclassification import (
+    iniciar_reclassificacao,
+    obter_tarefa,
+    listar_tarefas,
+    RECLASSIFICACAO_DIAS_POR_BLOCO
+)
+from .training import (
+    iniciar_treino,
+    iniciar_treino_incremental,
+    treinar_modelos,
+    treinar_incremental,
+    obter_treino,
+    listar_treinos,
+    TREINO_N_JOBS,
+    TREINO_INCREMENTAL_ESTIMADORES,
+    TREINO_INCREMENTAL_MIN_LINHAS
+)
+from .station_registry import registrar_estacao, obter_nome_estacao, invalidar_estacoes
+from .partition_service import (
+    criar_particoes_futuras,
+    listar_particoes,
+    desanexar_particoes_antigas,
+    anexar_particao
 )
-from .csv_processor import parse_inmet_csv
 from .thingsboard_service import (
     test_connection as test_tb_connection,
     get_all_weather_data,
-    ThingsBoardService
+    ThingsBoardService,
+    CHAVES_TELEMETRIA,
+    atributos_para_dict,
+    pivotar_telemetria
 )
 from .mlflow_service import (
     list_models,
     load_best_model,
     predict,
     predict_batch,
-    get_model_info
+    predict_lote,
+    predict_features,
+    get_model_info,
+    iniciar_recarga,
+    parar_recarga,
+    FEATURE_ORDER
+)
+from .metrics import REQUEST_LATENCY, exportar_metricas, fila_predicoes
+from .profiling import (
+    perfilavel,
+    requisicao_pede_perfil,
+    iniciar_perfil_requisicao,
+    listar_perfis,
+    caminho_perfil
 )
+import itertools
+import math
 import subprocess
 import sys
+import time
 
 app = FastAPI(title="INMET Data Pipeline - Dados Locais 2024/2025")
 
+@app.middleware("http")
+async def medir_latencia(request: Request, call_next):
+    """
+    Registra a latência de cada requisição por endpoint (rota, não a URL concreta).
+    """
+    inicio = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        rota = request.scope.get("route")
+        endpoint = getattr(rota, "path", "desconhecido")
+        if endpoint != "/metrics":
+            REQUEST_LATENCY.labels(request.method, endpoint, str(status)).observe(time.perf_counter() - inicio)
+
+@app.middleware("http")
+async def perfil_sob_demanda(request: Request, call_next):
+    """
+    Ativa o profiling da requisição com `X-Profile: 1` ou `?profile=1`.
+    O id do perfil gerado volta no header `X-Profile-Id`.
+    """
+    if not requisicao_pede_perfil(request.headers, request.query_params):
+        return await call_next(request)
+    
+    estado = iniciar_perfil_requisicao()
+    response = await call_next(request)
+    if "perfil_id" in estado:
+        response.headers["X-Profile-Id"] = estado["perfil_id"]
+    return response
+
+@app.on_event("startup")
+def preparar_particoes():
+    """
+    Cria as partições dos próximos meses antes que a ingestão precise delas.
+    """
+    try:
+        criar_particoes_futuras()
+    except Exception as e:
+        # O banco pode ainda não estar pronto; a ingestão cria as partições sob demanda
+        print(f"⚠️  Aviso: não foi possível criar partições futuras: {e}")
+
+@app.on_event("startup")
+def agendar_pontuacao():
+    """
+    Inicia a pontuação em lote periódica das observações novas (PONTUACAO_INTERVALO).
+    """
+    iniciar_agendador()
+
+@app.on_event("shutdown")
+def parar_pontuacao():
+    parar_agendador()
+
+@app.on_event("startup")
+def vigiar_versoes_modelo():
+    """
+    Verifica em segundo plano, a cada MODELO_RECARGA_INTERVALO, se o treino
+    incremental gerou uma versão nova do modelo carregado.
+    """
+    iniciar_recarga()
+
+@app.on_event("shutdown")
+def parar_vigia_modelo():
+    parar_recarga()
+
+@app.on_event("shutdown")
+def encerrar_processos_csv():
+    encerrar_pools()
+
 @app.get("/")
 def home():
     return {
@@ -44,11 +176,27 @@ def home():
             "devices_telemetry": "/devices/telemetry",
             "ingest_from_thingsboard": "/ingest-from-thingsboard",
             "stats": "/stats",
+            "export": "/export (dados de uma estação em NDJSON/CSV/Parquet, em streaming)",
+            "metrics": "/metrics (Prometheus)",
+            "profiles": "/profiles (perfis gerados com X-Profile: 1 ou ?profile=1)",
+            "parse_cache": "/parse-cache (GET estatísticas, DELETE limpa)",
+            "rollups_refresh": "/rollups/refresh",
+            "imputation_refresh": "/imputation/refresh (recalcula as medianas por estação/mês)",
+            "features_refresh": "/features/refresh (recalcula a feature store features_intensidade)",
+            "pipeline_reclassify": "/pipeline/reclassify (POST inicia, GET /pipeline/reclassify/{id} progresso)",
+            "partitions": "/partitions",
+            "partitions_maintain": "/partitions/maintain",
+            "partitions_attach": "/partitions/attach",
+            "stations_refresh": "/stations/refresh",
             "models": "/models",
             "models_load": "/models/load",
             "models_info": "/models/info",
+            "models_train": "/models/train (POST treina os candidatos em paralelo, GET /models/train/{id} progresso)",
+            "models_train_incremental": "/models/train/incremental (atualiza o modelo com as observações novas)",
             "predict": "/predict",
             "predict_batch": "/predict/batch",
+            "predict_cache": "/predict/cache (GET estatísticas e taxa de acerto, DELETE limpa)",
+            "predict_scoring": "/predict/scoring (POST pontua as observações novas, GET watermarks e execuções)",
             "predict_simple": "/predict (predição simplificada)",
             "predict_from_db": "/predict-from-db (predições em lote a partir do banco)"
         }
@@ -109,11 +257,70 @@ def test_db():
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def _registrar_estacao_csv(estacao_info: Dict):
+    """
+    Insere a estação do CSV (apenas se nova ou com metadados alterados).
+    """
+    registrar_estacao(
+        codigo_wmo=estacao_info['codigo_wmo'],
+        regiao=estacao_info.get('regiao', ''),
+        uf=estacao_info.get('uf', ''),
+        nome=estacao_info.get('nome', ''),
+        latitude=estacao_info.get('latitude'),
+        longitude=estacao_info.get('longitude'),
+        altitude=estacao_info.get('altitude'),
+        data_fundacao=estacao_info.get('data_fundacao')
+    )
+
+def _acumular_intervalos(intervalos: Dict, lote):
+    """Estende {codigo_wmo: (inicio, fim)} com o intervalo de cada estação do lote."""
+    for codigo_wmo, (inicio, fim) in intervalos_por_estacao(lote).items():
+        atual = intervalos.get(codigo_wmo)
+        intervalos[codigo_wmo] = (min(inicio, atual[0]), max(fim, atual[1])) if atual else (inicio, fim)
+
+def _atualizar_derivados_ingestao(intervalos: Dict):
+    """
+    Depois da ingestão: recalcula as medianas de imputação das estações recebidas e,
+    com elas, as features (features_intensidade) dos períodos recebidos.
+    Falhas não interrompem a ingestão: ambos podem ser recalculados depois.
+    """
+    if not intervalos:
+        return
+    try:
+        atualizar_medianas(list(intervalos))
+        print(f"✅ Medianas de imputação atualizadas: {len(intervalos)} estações")
+    except Exception as e:
+        print(f"⚠️  Aviso: não foi possível atualizar as medianas de imputação: {e}")
+    try:
+        linhas = sum(atualizar_features(codigo_wmo, inicio, fim) for codigo_wmo, (inicio, fim) in intervalos.items())
+        print(f"✅ Features atualizadas: {linhas} observações")
+    except Exception as e:
+        print(f"⚠️  Aviso: não foi possível atualizar as features: {e}")
+
+def _lotes_do_arquivo(file_path: Path, leitor: str):
+    """
+    Pares (metadados da estação, lote tipado) de um CSV.
+    'streaming' lê um arquivo de estação em blocos; 'mmap' também aceita exportações
+    com várias estações concatenadas e processa as faixas do arquivo em paralelo.
+    """
+    if leitor == "mmap":
+        yield from ler_inmet_mmap(file_path)
+        return
+    estacao_info, lotes = abrir_inmet_csv(file_path)
+    for lote in lotes:
+        yield estacao_info, lote
+
 @app.post("/load-to-db")
-def load_to_database():
+@perfilavel
+def load_to_database(leitor: str = "streaming"):
     """
     Processa arquivos CSV locais e carrega no PostgreSQL.
+    
+    leitor: 'streaming' (padrão) ou 'mmap' (exportações grandes/concatenadas).
     """
+    if leitor not in ("streaming", "mmap"):
+        raise HTTPException(status_code=400, detail="leitor deve ser 'streaming' ou 'mmap'")
+    
     try:
         # Testa conexões
         if not test_db_connection():
@@ -126,41 +333,30 @@ def load_to_database():
         total_estacoes = 0
         total_registros = 0
         processed_files = []
+        intervalos_ingeridos = {}
         
         for file_path in files:
             try:
                 print(f"\n📄 Processando: {file_path.name}")
                 
-                # Processa o CSV
-                resultado = parse_inmet_csv(file_path)
-                estacao_info = resultado['estacao']
-                dados = resultado['dados']
-                
-                # Insere estação
-                insert_estacao(
-                    codigo_wmo=estacao_info['codigo_wmo'],
-                    regiao=estacao_info.get('regiao', ''),
-                    uf=estacao_info.get('uf', ''),
-                    nome=estacao_info.get('nome', ''),
-                    latitude=estacao_info.get('latitude'),
-                    longitude=estacao_info.get('longitude'),
-                    altitude=estacao_info.get('altitude'),
-                    data_fundacao=estacao_info.get('data_fundacao')
-                )
-                total_estacoes += 1
-                
-                # Insere dados em lotes
-                if dados:
-                    batch_size = 1000
-                    for i in range(0, len(dados), batch_size):
-                        batch = dados[i:i + batch_size]
-                        inserted = insert_dados_meteorologicos_batch(batch)
-                        total_registros += inserted
+                # Cada lote tipado vai direto para o banco: memória constante por arquivo
+                registros_arquivo = 0
+                estacoes_arquivo = []
+                for estacao_info, lote in _lotes_do_arquivo(file_path, leitor):
+                    if not estacoes_arquivo or estacoes_arquivo[-1] is not estacao_info:
+                        _registrar_estacao_csv(estacao_info)
+                        estacoes_arquivo.append(estacao_info)
+                        total_estacoes += 1
+                    
+                    inserted = insert_lote_dados_meteorologicos(lote)
+                    registros_arquivo += len(lote)
+                    total_registros += inserted
+                    _acumular_intervalos(intervalos_ingeridos, lote)
                 
                 processed_files.append({
                     "arquivo": file_path.name,
-                    "estacao": estacao_info.get('nome', ''),
-                    "registros": len(dados)
+                    "estacao": ", ".join(e.get('nome', '') for e in estacoes_arquivo),
+                    "registros": registros_arquivo
                 })
                 
             except Exception as e:
@@ -171,6 +367,9 @@ def load_to_database():
                 })
                 continue
         
+        # Medianas de imputação e features das estações/períodos carregados
+        _atualizar_derivados_ingestao(intervalos_ingeridos)
+        
         return {
             "status": "success",
             "total_arquivos": len(files),
@@ -199,6 +398,266 @@ def get_stats():
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/export")
+def export_dados(codigo_wmo: str, inicio: Optional[datetime] = None, fim: Optional[datetime] = None,
+                 formato: str = "ndjson", itersize: Optional[int] = None, imputar: bool = False):
+    """
+    Exporta os dados meteorológicos de uma estação em [inicio, fim) como NDJSON, CSV
+    ou Parquet, em streaming: as linhas vêm do banco por um cursor do lado do servidor
+    em blocos de `itersize` linhas e cada bloco é enviado assim que é serializado.
+    
+    imputar=true preenche os ausentes com a mesma regra da inferência (medianas por
+    estação/mês), para montar conjuntos de treino.
+    """
+    if formato not in FORMATOS_EXPORTACAO:
+        raise HTTPException(status_code=400, detail=f"formato deve ser um de: {', '.join(FORMATOS_EXPORTACAO)}")
+    if inicio and fim and inicio >= fim:
+        raise HTTPException(status_code=400, detail="inicio deve ser anterior a fim")
+    if itersize is not None and itersize <= 0:
+        raise HTTPException(status_code=400, detail="itersize deve ser positivo")
+    
+    try:
+        lotes = iterar_dados_meteorologicos(codigo_wmo, inicio, fim, itersize)
+        # Busca o primeiro bloco aqui para que erros de conexão/consulta virem 500
+        primeiro = next(lotes, None)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    if primeiro is not None:
+        lotes = itertools.chain([primeiro], lotes)
+    if imputar:
+        lotes = (lote_imputado(lote) for lote in lotes)
+    periodo = "_".join(d.strftime("%Y%m%d%H") for d in (inicio, fim) if d)
+    nome_arquivo = f"dados_{codigo_wmo}{'_' + periodo if periodo else ''}.{formato}"
+    return StreamingResponse(
+        serializar_lotes(lotes, formato),
+        media_type=FORMATOS_EXPORTACAO[formato],
+        headers={"Content-Disposition": f'attachment; filename="{nome_arquivo}"'}
+    )
+
+@app.get("/metrics")
+def metrics():
+    """
+    Métricas do pipeline no formato Prometheus (latência, vazão de parse/S3,
+    inserts, ThingsBoard, inferência e fila de predições).
+    """
+    conteudo, content_type = exportar_metricas()
+    return Response(content=conteudo, media_type=content_type)
+
+@app.get("/profiles")
+def list_profiles():
+    """
+    Lista os perfis (cProfile) gerados pelos endpoints do pipeline.
+    """
+    try:
+        perfis = listar_perfis()
+        return {
+            "status": "success",
+            "total": len(perfis),
+            "profiles": perfis
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/profiles/{perfil_id}")
+def download_profile(perfil_id: str, formato: str = "prof"):
+    """
+    Baixa um perfil: formato=prof (pstats/snakeviz) ou formato=txt (resumo).
+    """
+    try:
+        caminho = caminho_perfil(perfil_id, formato)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    media_type = "text/plain; charset=utf-8" if formato == "txt" else "application/octet-stream"
+    return FileResponse(caminho, media_type=media_type, filename=caminho.name)
+
+@app.get("/parse-cache")
+def parse_cache_stats():
+    """
+    Estatísticas do cache de parse dos CSVs (entradas, tamanho, versões do parser).
+    """
+    try:
+        return {"status": "success", **parse_cache.estatisticas()}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.delete("/parse-cache")
+def parse_cache_clear():
+    """
+    Remove todas as entradas do cache de parse (os CSVs serão parseados de novo).
+    """
+    try:
+        removidas = parse_cache.limpar()
+        return {"status": "success", "entradas_removidas": removidas}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/rollups/refresh")
+def refresh_rollups(codigo_wmo: Optional[str] = None):
+    """
+    Reconstrói os rollups diários/semanais/mensais usados pelo Grafana.
+    Normalmente não é necessário: a ingestão já mantém os rollups atualizados.
+    """
+    try:
+        periodos = atualizar_rollups(codigo_wmo)
+        return {
+            "status": "success",
+            "codigo_wmo": codigo_wmo,
+            "periodos_atualizados": periodos
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/imputation/refresh")
+def refresh_imputation(codigo_wmo: Optional[str] = None):
+    """
+    Recalcula as medianas de imputação (por estação/mês) usadas na inferência e na
+    exportação de treino. Sem codigo_wmo, recalcula todas, inclusive as gerais.
+    Normalmente não é necessário: a ingestão já atualiza as estações recebidas.
+    """
+    try:
+        linhas = atualizar_medianas([codigo_wmo] if codigo_wmo else None)
+        return {
+            "status": "success",
+            "codigo_wmo": codigo_wmo,
+            "medianas_atualizadas": linhas
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/features/refresh")
+def refresh_features(codigo_wmo: Optional[str] = None, inicio: Optional[datetime] = None,
+                     fim: Optional[datetime] = None):
+    """
+    Recalcula a feature store (features_intensidade) de uma estação e/ou intervalo
+    [inicio, fim]; sem parâmetros, tudo. Use após /imputation/refresh para aplicar
+    as novas medianas às observações antigas. A ingestão já atualiza o que recebe.
+    """
+    if inicio and fim and inicio > fim:
+        raise HTTPException(status_code=400, detail="inicio deve ser anterior a fim")
+    try:
+        linhas = atualizar_features(codigo_wmo, inicio, fim)
+        return {
+            "status": "success",
+            "codigo_wmo": codigo_wmo,
+            "observacoes_atualizadas": linhas
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/pipeline/reclassify")
+def reclassify(inicio: Optional[datetime] = None, fim: Optional[datetime] = None,
+               codigo_wmo: Optional[str] = None,
+               dias_por_bloco: int = RECLASSIFICACAO_DIAS_POR_BLOCO,
+               aguardar: bool = False):
+    """
+    Reclassifica intensidade_chuva no banco (UPDATE por bloco de tempo, só as linhas
+    que mudam), de uma estação ou de todas, em [inicio, fim).
+    
+    Roda em segundo plano e retorna o id da tarefa; o progresso fica em
+    GET /pipeline/reclassify/{id}. Com aguardar=true, executa e retorna a tarefa concluída.
+    Só uma reclassificação roda por vez (409 se já houver uma, inclusive com aguardar).
+    Rollups e features das linhas alteradas são recalculados em cada bloco.
+    Pode rodar junto com a ingestão (transações curtas, lock_timeout por bloco).
+    """
+    if dias_por_bloco <= 0:
+        raise HTTPException(status_code=400, detail="dias_por_bloco deve ser positivo")
+    if inicio and fim and inicio >= fim:
+        raise HTTPException(status_code=400, detail="inicio deve ser anterior a fim")
+    
+    try:
+        tarefa = iniciar_reclassificacao(inicio, fim, codigo_wmo, dias_por_bloco, aguardar)
+        if tarefa["estado"] == "erro":
+            raise HTTPException(status_code=500, detail=tarefa["erro"])
+        return {"status": "success", "tarefa": tarefa}
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/pipeline/reclassify")
+def list_reclassifications():
+    """
+    Lista as reclassificações desta instância da API (mais recente primeiro).
+    """
+    tarefas = listar_tarefas()
+    return {"status": "success", "total": len(tarefas), "tarefas": tarefas}
+
+@app.get("/pipeline/reclassify/{tarefa_id}")
+def reclassification_progress(tarefa_id: str):
+    """
+    Progresso de uma reclassificação: blocos concluídos/total, percentual e linhas atualizadas.
+    """
+    tarefa = obter_tarefa(tarefa_id)
+    if tarefa is None:
+        raise HTTPException(status_code=404, detail=f"Reclassificação {tarefa_id} não encontrada")
+    return {"status": "success", "tarefa": tarefa}
+
+@app.get("/partitions")
+def list_partitions():
+    """
+    Lista as partições mensais de dados_meteorologicos (anexadas e desanexadas).
+    """
+    try:
+        particoes = listar_particoes()
+        return {
+            "status": "success",
+            "total": len(particoes),
+            "anexadas": sum(1 for p in particoes if p["anexada"]),
+            "particoes": particoes
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/partitions/maintain")
+def maintain_partitions(meses_futuros: int = 3, manter_meses: Optional[int] = None):
+    """
+    Cria partições para os próximos meses e, se manter_meses for informado,
+    desanexa as partições mais antigas que esse número de meses.
+    """
+    try:
+        criadas = criar_particoes_futuras(meses_futuros)
+        desanexadas = desanexar_particoes_antigas(manter_meses) if manter_meses else []
+        return {
+            "status": "success",
+            "particoes_criadas": criadas,
+            "particoes_desanexadas": desanexadas
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/partitions/attach")
+def attach_partition(nome: str):
+    """
+    Reanexa uma partição desanexada anteriormente (ex: dados_meteorologicos_p2024_01).
+    """
+    try:
+        anexada = anexar_particao(nome)
+        return {
+            "status": "success",
+            "particao": nome,
+            "anexada": anexada
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/stations/refresh")
+def refresh_stations():
+    """
+    Invalida o cache de estações (após alterações manuais na tabela estacoes).
+    """
+    invalidar_estacoes()
+    return {
+        "status": "success",
+        "message": "Cache de estações invalidado"
+    }
+
 @app.get("/test-thingsboard")
 def test_thingsboard():
     """
@@ -381,6 +840,7 @@ def check_telemetry():
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/populate-thingsboard")
+@perfilavel
 def populate_thingsboard():
     """
     Popula o ThingsBoard com dados históricos dos CSVs.
@@ -464,6 +924,7 @@ def populate_thingsboard():
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/ingest-from-thingsboard")
+@perfilavel
 def ingest_from_thingsboard():
     """
     Coleta dados do ThingsBoard e armazena no S3 e PostgreSQL.
@@ -500,153 +961,61 @@ def ingest_from_thingsboard():
                 "message": "Nenhum dispositivo encontrado no ThingsBoard. Execute /populate-thingsboard primeiro."
             }
         
-        # Telemetria keys esperadas
-        telemetry_keys = [
-            "precipitacao_mm",
-            "temperatura_ar_c",
-            "umidade_rel_pct",
-            "pressao_mb",
-            "vento_velocidade_ms",
-            "vento_direcao_graus",
-            "radiacao_kjm2"
-        ]
+        # Telemetria keys esperadas (mapeadas para as colunas em CHAVES_TELEMETRIA)
+        telemetry_keys = list(CHAVES_TELEMETRIA)
         
-        all_data = []
+        lotes = []
         total_records = 0
+        estacoes_processadas = set()
         
-        # Processa cada dispositivo
+        # Processa cada dispositivo: telemetria pivotada em arrays → lote colunar
         for device in devices:
             device_id = device['id']['id']
-            device_name = device['name']
             
-            # Busca atributos (informações da estação)
-            attributes_raw = service.get_device_attributes(device_id)
+            # Busca atributos (informações da estação, guardadas uma vez por dispositivo)
+            attributes = atributos_para_dict(service.get_device_attributes(device_id))
             
-            # Converte atributos para dicionário (pode vir como lista ou dict)
-            attributes = {}
-            if isinstance(attributes_raw, dict):
-                attributes = attributes_raw
-            elif isinstance(attributes_raw, list):
-                # Se for lista, converte para dict
-                for attr in attributes_raw:
-                    if isinstance(attr, dict) and 'key' in attr and 'value' in attr:
-                        attributes[attr['key']] = attr['value']
-            
-            # Busca telemetria (dados meteorológicos)
+            # Busca telemetria (dados meteorológicos) e pivota por timestamp
             telemetry = service.get_device_telemetry(device_id, telemetry_keys)
+            pivo = pivotar_telemetria(telemetry, device_id, device['name'], attributes)
+            if pivo is None or not pivo.codigo_wmo:
+                continue
+            codigo_wmo = pivo.codigo_wmo
             
-            # Processa telemetria e agrupa por timestamp
-            records_by_ts = {}
-            for key, values in telemetry.items():
-                if not isinstance(values, list):
-                    continue
-                for item in values:
-                    if not isinstance(item, dict) or 'ts' not in item:
-                        continue
-                    ts = item['ts']
-                    if ts not in records_by_ts:
-                        records_by_ts[ts] = {
-                            "device_id": device_id,
-                            "device_name": device_name,
-                            "timestamp": ts,
-                            **attributes  # Adiciona atributos da estação
-                        }
-                    records_by_ts[ts][key] = item.get('value')
+            # Insere estação uma vez por dispositivo (se os metadados mudaram)
+            if codigo_wmo not in estacoes_processadas:
+                registrar_estacao(
+                    codigo_wmo=codigo_wmo,
+                    regiao=attributes.get('regiao', 'NORDESTE'),
+                    uf=attributes.get('estado', 'PE'),
+                    nome=attributes.get('nome', pivo.device_name),
+                    latitude=attributes.get('latitude'),
+                    longitude=attributes.get('longitude'),
+                    altitude=attributes.get('altitude')
+                )
+                estacoes_processadas.add(codigo_wmo)
             
-            all_data.extend(records_by_ts.values())
-            total_records += len(records_by_ts)
+            lotes.append(pivo.para_lote())
+            total_records += len(pivo)
         
-        if not all_data:
+        if not lotes:
             return {
                 "status": "warning",
                 "message": "Nenhum dado de telemetria encontrado no ThingsBoard"
             }
         
-        # Salva dados no S3 (formato JSON)
-        import json
-        import tempfile
-        
-        ensure_bucket_exists()
-        s3_filename = f"thingsboard_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-        temp_file = Path(tempfile.gettempdir()) / s3_filename
-        
-        # Salva arquivo temporário
-        with open(temp_file, 'w', encoding='utf-8') as f:
-            json.dump(all_data, f, indent=2, ensure_ascii=False, default=str)
-        
-        # Upload para S3
-        from .s3_service import upload_to_minio
-        upload_to_minio(temp_file)
-        s3_key = f"raw/{s3_filename}"
-        
-        # Remove arquivo temporário após upload
-        try:
-            temp_file.unlink()
-        except:
-            pass
+        # Salva os lotes no S3 (formato Parquet)
+        s3_key = upload_lotes_parquet(
+            lotes, f"thingsboard_{datetime.now().strftime('%Y%m%d_%H%M%S')}.parquet"
+        )
         
-        # Processa e insere no PostgreSQL
-        estacoes_processadas = set()
-        batch_data = []
-        batch_size = 1000
+        # Insere no PostgreSQL (COPY por lote)
         registros_inseridos = 0
-        
-        for record in all_data:
-            try:
-                # Extrai informações da estação
-                codigo_wmo = record.get('codigo_wmo') or record.get('device_name', '').split('_')[1] if '_' in record.get('device_name', '') else None
-                
-                if not codigo_wmo:
-                    continue
-                
-                # Insere estação (se ainda não foi inserida)
-                if codigo_wmo not in estacoes_processadas:
-                    insert_estacao(
-                        codigo_wmo=codigo_wmo,
-                        regiao=record.get('regiao', 'NORDESTE'),
-                        uf=record.get('estado', 'PE'),
-                        nome=record.get('nome', record.get('device_name', '')),
-                        latitude=record.get('latitude'),
-                        longitude=record.get('longitude'),
-                        altitude=record.get('altitude')
-                    )
-                    estacoes_processadas.add(codigo_wmo)
-                
-                # Prepara dados meteorológicos
-                from datetime import datetime as dt, time
-                timestamp_utc = dt.fromtimestamp(record['timestamp'] / 1000)
-                
-                dados_meteorologicos = {
-                    'codigo_wmo': codigo_wmo,
-                    'data': timestamp_utc.date(),
-                    'hora_utc': timestamp_utc.time(),
-                    'timestamp_utc': timestamp_utc,  # Adiciona timestamp_utc explicitamente
-                    'precipitacao_mm': record.get('precipitacao_mm'),
-                    'temperatura_ar_c': record.get('temperatura_ar_c'),
-                    'umidade_rel_horaria_pct': record.get('umidade_rel_pct'),
-                    'pressao_estacao_mb': record.get('pressao_mb'),
-                    'vento_velocidade_ms': record.get('vento_velocidade_ms'),
-                    'vento_direcao_graus': record.get('vento_direcao_graus'),
-                    'radiacao_global_kjm2': record.get('radiacao_kjm2')
-                }
-                
-                # Adiciona à lista para inserção em lote
-                batch_data.append(dados_meteorologicos)
-                
-                # Insere em lotes
-                if len(batch_data) >= batch_size:
-                    inserted = insert_dados_meteorologicos_batch(batch_data)
-                    registros_inseridos += inserted
-                    batch_data = []
-                
-            except Exception as e:
-                print(f"Erro ao processar registro: {e}")
-                continue
-        
-        # Insere lote final
-        if batch_data:
-            inserted = insert_dados_meteorologicos_batch(batch_data)
-            registros_inseridos += inserted
+        intervalos_ingeridos = {}
+        for lote in lotes:
+            registros_inseridos += insert_lote_dados_meteorologicos(lote)
+            _acumular_intervalos(intervalos_ingeridos, lote)
+        _atualizar_derivados_ingestao(intervalos_ingeridos)
         
         return {
             "status": "success",
@@ -665,21 +1034,26 @@ def ingest_from_thingsboard():
 # ============================================================================
 
 class PredictionRequest(BaseModel):
-    """Modelo de requisição para predição única"""
+    """
+    Modelo de requisição para predição única.
+    Medidas ausentes são imputadas como no treino (services/imputation.py);
+    o calendário ausente usa o momento da requisição.
+    """
+    codigo_wmo: Optional[str] = None
     precipitacao_mm: float
     pressao_estacao_mb: float
-    pressao_max_mb: Optional[float] = 0.0
-    pressao_min_mb: Optional[float] = 0.0
+    pressao_max_mb: Optional[float] = None
+    pressao_min_mb: Optional[float] = None
     temperatura_ar_c: float
-    temperatura_max_c: Optional[float] = 0.0
-    temperatura_min_c: Optional[float] = 0.0
+    temperatura_max_c: Optional[float] = None
+    temperatura_min_c: Optional[float] = None
     umidade_rel_horaria_pct: float
-    umidade_rel_max_pct: Optional[float] = 0.0
-    umidade_rel_min_pct: Optional[float] = 0.0
+    umidade_rel_max_pct: Optional[float] = None
+    umidade_rel_min_pct: Optional[float] = None
     vento_velocidade_ms: float
-    vento_direcao_graus: Optional[float] = 0.0
-    vento_rajada_max_ms: Optional[float] = 0.0
-    radiacao_global_kjm2: Optional[float] = 0.0
+    vento_direcao_graus: Optional[float] = None
+    vento_rajada_max_ms: Optional[float] = None
+    radiacao_global_kjm2: Optional[float] = None
     ano: Optional[int] = None
     mes: Optional[int] = None
     dia: Optional[int] = None
@@ -740,24 +1114,205 @@ def get_model_information():
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/models/train")
+def train_models(inicio: Optional[datetime] = None, fim: Optional[datetime] = None,
+                 candidatos: Optional[str] = None,
+                 n_jobs: int = TREINO_N_JOBS,
+                 cv: int = 0,
+                 carregar: bool = True,
+                 aguardar: bool = False):
+    """
+    Treina os modelos de intensidade com as observações rotuladas da feature store
+    em [inicio, fim). `candidatos`: nomes separados por vírgula (padrão: todos).
+    
+    As grades de hiperparâmetros são expandidas e os candidatos treinados em paralelo
+    (n_jobs processos); cada um vira um run no MLflow com o tempo de treino, e o de
+    maior test_accuracy é carregado (carregar=true). Roda em segundo plano e retorna
+    o id da tarefa (GET /models/train/{id}); com aguardar=true, executa e retorna o resultado.
+    """
+    if inicio and fim and inicio >= fim:
+        raise HTTPException(status_code=400, detail="inicio deve ser anterior a fim")
+    if cv == 1 or cv < 0:
+        raise HTTPException(status_code=400, detail="cv deve ser 0 (sem validação cruzada) ou pelo menos 2")
+    nomes = [nome.strip() for nome in candidatos.split(",") if nome.strip()] if candidatos else None
+    
+    try:
+        if aguardar:
+            return {"status": "success", **treinar_modelos(inicio, fim, nomes, n_jobs, cv, carregar)}
+        return {"status": "success", "tarefa": iniciar_treino(inicio, fim, nomes, n_jobs, cv, carregar)}
+    except ValueError as e:
+        raise HTTPException(status_code=409 if "em execução" in str(e) else 400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/models/train/incremental")
+def train_incremental(run_id: Optional[str] = None,
+                      inicio: Optional[datetime] = None,
+                      novos_estimadores: int = TREINO_INCREMENTAL_ESTIMADORES,
+                      min_linhas: int = TREINO_INCREMENTAL_MIN_LINHAS,
+                      carregar: bool = True,
+                      aguardar: bool = False):
+    """
+    Atualiza um modelo já registrado (run_id; padrão: o carregado) só com as observações
+    rotuladas posteriores à watermark do run (ou a partir de `inicio`).
+    
+    Estimadores com partial_fit são atualizados no lugar; RandomForest/GradientBoosting/XGBoost
+    ganham `novos_estimadores` árvores/estágios. O resultado vira um novo run com a linhagem
+    (run_pai) e é carregado (carregar=true); as outras instâncias o recarregam sozinhas.
+    """
+    if novos_estimadores <= 0:
+        raise HTTPException(status_code=400, detail="novos_estimadores deve ser positivo")
+    if min_linhas <= 0:
+        raise HTTPException(status_code=400, detail="min_linhas deve ser positivo")
+    
+    try:
+        if aguardar:
+            return {"status": "success", **treinar_incremental(run_id, inicio, novos_estimadores, min_linhas, carregar)}
+        return {"status": "success",
+                "tarefa": iniciar_treino_incremental(run_id, inicio, novos_estimadores, min_linhas, carregar)}
+    except ValueError as e:
+        raise HTTPException(status_code=409 if "em execução" in str(e) else 400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/models/train")
+def list_trainings():
+    """
+    Lista os treinos desta instância da API (mais recente primeiro).
+    """
+    tarefas = listar_treinos()
+    return {"status": "success", "total": len(tarefas), "tarefas": tarefas}
+
+@app.get("/models/train/{tarefa_id}")
+def training_progress(tarefa_id: str):
+    """
+    Progresso de um treino: candidatos concluídos/total, tempo e métricas de cada um e o selecionado.
+    """
+    tarefa = obter_treino(tarefa_id)
+    if tarefa is None:
+        raise HTTPException(status_code=404, detail=f"Treino {tarefa_id} não encontrado")
+    return {"status": "success", "tarefa": tarefa}
+
+@app.get("/predict/cache")
+def prediction_cache_stats():
+    """
+    Estatísticas do cache de predições (entradas, versão do modelo, acertos e faltas).
+    """
+    try:
+        return {"status": "success", **prediction_cache.estatisticas()}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.delete("/predict/cache")
+def prediction_cache_clear():
+    """
+    Remove todas as entradas do cache de predições (o modelo volta a ser executado).
+    """
+    try:
+        removidas = prediction_cache.limpar()
+        return {"status": "success", "entradas_removidas": removidas}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/predict/scoring")
+def run_batch_scoring(linhas_por_bloco: int = PONTUACAO_LINHAS_POR_BLOCO,
+                      max_blocos: Optional[int] = None,
+                      inicio: Optional[datetime] = None,
+                      aguardar: bool = False):
+    """
+    Pontua com o modelo ativo as observações da feature store ainda não pontuadas por
+    ele (depois da watermark da versão do modelo), em blocos de `linhas_por_bloco`.
+    
+    As predições são gravadas uma vez por (estação, observação, versão do modelo) e a
+    watermark avança junto com cada bloco. O agendador faz o mesmo a cada
+    PONTUACAO_INTERVALO segundos. Roda em segundo plano e retorna o id da tarefa
+    (GET /predict/scoring/{id}); com aguardar=true, executa e retorna o resultado.
+    """
+    if linhas_por_bloco <= 0:
+        raise HTTPException(status_code=400, detail="linhas_por_bloco deve ser positivo")
+    if max_blocos is not None and max_blocos <= 0:
+        raise HTTPException(status_code=400, detail="max_blocos deve ser positivo")
+    
+    try:
+        tarefa = iniciar_pontuacao(linhas_por_bloco, max_blocos, inicio, aguardar)
+        if tarefa["estado"] == "erro":
+            raise HTTPException(status_code=500, detail=tarefa["erro"])
+        return {"status": "success", "tarefa": tarefa}
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/predict/scoring")
+def batch_scoring_status():
+    """
+    Agendador, watermark de cada versão do modelo e execuções desta instância
+    (mais recente primeiro).
+    """
+    try:
+        watermarks = listar_watermarks()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {
+        "status": "success",
+        "agendador": estado_agendador(),
+        "watermarks": watermarks,
+        "tarefas": listar_pontuacoes()
+    }
+
+@app.get("/predict/scoring/{tarefa_id}")
+def batch_scoring_progress(tarefa_id: str):
+    """
+    Progresso de uma pontuação: blocos, observações pontuadas e watermark atual.
+    """
+    tarefa = obter_pontuacao(tarefa_id)
+    if tarefa is None:
+        raise HTTPException(status_code=404, detail=f"Pontuação {tarefa_id} não encontrada")
+    return {"status": "success", "tarefa": tarefa}
+
+# Faixas válidas do calendário informado nos itens do /predict/batch
+_LIMITES_CALENDARIO = {'mes': (1, 12), 'dia': (1, 31), 'hora': (0, 23), 'dia_semana': (0, 6)}
+
+def _validar_item(req: PredictionRequest) -> Optional[str]:
+    """Erro de validação de um item do /predict/batch (None se válido)."""
+    for campo, (minimo, maximo) in _LIMITES_CALENDARIO.items():
+        valor = getattr(req, campo)
+        if valor is not None and not minimo <= valor <= maximo:
+            return f"{campo} fora do intervalo [{minimo}, {maximo}]: {valor}"
+    for campo in FEATURES_MEDIDAS:
+        valor = getattr(req, campo)
+        if valor is not None and not math.isfinite(valor):
+            return f"{campo} não é um número finito"
+    return None
+
 @app.post("/predict/batch")
 def make_batch_predictions(requests: List[PredictionRequest]):
     """
     Faz predições em lote para múltiplos registros.
     
-    Útil para processar grandes volumes de dados de uma vez.
+    Os itens válidos viram colunas e uma única matriz (medidas ausentes imputadas
+    como no treino, calendário ausente = momento da requisição), predita em uma
+    chamada ao modelo. Itens inválidos (calendário fora da faixa, medidas não
+    finitas) retornam o erro na própria posição.
     """
     try:
-        data_list = []
-        for req in requests:
-            data = req.dict()
-            # Preenche valores None
-            for key, value in data.items():
-                if value is None:
-                    data[key] = 0.0
-            data_list.append(data)
+        calendario = _calendario(datetime.now())
+        erros = {i: erro for i, req in enumerate(requests) if (erro := _validar_item(req))}
+        validos = [req for i, req in enumerate(requests) if i not in erros]
+        
+        colunas = {campo: [getattr(req, campo) for req in validos] for campo in FEATURES_MEDIDAS}
+        for campo, padrao in calendario.items():
+            colunas[campo] = [padrao if getattr(req, campo) is None else getattr(req, campo) for req in validos]
+        features = matriz_registros(colunas, [req.codigo_wmo for req in validos])
         
-        results = predict_batch(data_list)
+        with fila_predicoes(len(validos)):
+            preditos = iter(predict_batch(features))
+        results = [
+            {"error": erros[i], "prediction": None} if i in erros else next(preditos)
+            for i in range(len(requests))
+        ]
         return {
             "status": "success",
             "total": len(results),
@@ -789,6 +1344,49 @@ class SimplePredictionRequest(BaseModel):
     vento_rajada_max_ms: Optional[float] = None
     radiacao_global_kjm2: Optional[float] = None
 
+def _calendario(now: datetime) -> Dict:
+    """Features de calendário do momento informado (dia_semana com segunda = 0)."""
+    return {
+        'ano': now.year,
+        'mes': now.month,
+        'dia': now.day,
+        'hora': now.hour,
+        'dia_semana': now.weekday()
+    }
+
+def _dados_predicao_simples(request: SimplePredictionRequest, now: datetime) -> Dict:
+    """
+    Monta as 19 features do modelo a partir da requisição simplificada.
+    Campos opcionais ausentes passam pela imputação do treino (services/imputation.py):
+    máximas/mínimas usam a medida horária, o resto a mediana da estação/mês.
+    """
+    medidas = {campo: getattr(request, campo) for campo in FEATURES_MEDIDAS}
+    dados, = imputar_registros([medidas], [request.codigo_wmo], [now.month], FEATURES_MEDIDAS)
+    return {**dados, **_calendario(now)}
+
+def _salvar_predicao_simples(request: SimplePredictionRequest, result: Dict):
+    """
+    Salva a predição em predicoes_intensidade (para o Grafana).
+    """
+    # Busca nome da estação (cache em memória) se codigo_wmo foi fornecido
+    estacao_nome = obter_nome_estacao(request.codigo_wmo) if request.codigo_wmo else None
+    
+    insert_predicao_intensidade(
+        codigo_wmo=request.codigo_wmo or "UNKNOWN",
+        precipitacao_mm=request.precipitacao_mm,
+        pressao_estacao_mb=request.pressao_estacao_mb,
+        temperatura_ar_c=request.temperatura_ar_c,
+        umidade_rel_horaria_pct=request.umidade_rel_horaria_pct,
+        vento_velocidade_ms=request.vento_velocidade_ms,
+        intensidade_predita=result.get("prediction", "unknown"),
+        probabilidade_forte=result.get("probabilities", {}).get("forte"),
+        probabilidade_moderada=result.get("probabilities", {}).get("moderada"),
+        probabilidade_leve=result.get("probabilities", {}).get("leve"),
+        probabilidade_sem_chuva=result.get("probabilities", {}).get("sem_chuva"),
+        modelo_usado=result.get("model_name", "unknown"),
+        estacao_nome=estacao_nome
+    )
+
 @app.post("/predict")
 def simple_predict(request: SimplePredictionRequest):
     """
@@ -799,65 +1397,16 @@ def simple_predict(request: SimplePredictionRequest):
     """
     try:
         # Prepara dados para predição
-        from datetime import datetime
         now = datetime.now()
-        
-        prediction_data = {
-            'precipitacao_mm': request.precipitacao_mm,
-            'pressao_estacao_mb': request.pressao_estacao_mb,
-            'pressao_max_mb': request.pressao_max_mb or request.pressao_estacao_mb,
-            'pressao_min_mb': request.pressao_min_mb or request.pressao_estacao_mb,
-            'temperatura_ar_c': request.temperatura_ar_c,
-            'temperatura_max_c': request.temperatura_max_c or request.temperatura_ar_c,
-            'temperatura_min_c': request.temperatura_min_c or request.temperatura_ar_c,
-            'umidade_rel_horaria_pct': request.umidade_rel_horaria_pct,
-            'umidade_rel_max_pct': request.umidade_rel_max_pct or request.umidade_rel_horaria_pct,
-            'umidade_rel_min_pct': request.umidade_rel_min_pct or request.umidade_rel_horaria_pct,
-            'vento_velocidade_ms': request.vento_velocidade_ms,
-            'vento_direcao_graus': request.vento_direcao_graus or 0.0,
-            'vento_rajada_max_ms': request.vento_rajada_max_ms or request.vento_velocidade_ms,
-            'radiacao_global_kjm2': request.radiacao_global_kjm2 or 0.0,
-            'ano': now.year,
-            'mes': now.month,
-            'dia': now.day,
-            'hora': now.hour,
-            'dia_semana': now.weekday()
-        }
+        prediction_data = _dados_predicao_simples(request, now)
         
         # Faz predição
-        result = predict(prediction_data)
+        with fila_predicoes():
+            result = predict(prediction_data)
         
         # Salva predição no banco de dados
         try:
-            # Busca nome da estação se codigo_wmo foi fornecido
-            estacao_nome = None
-            if request.codigo_wmo:
-                conn = get_db_connection()
-                cur = conn.cursor()
-                try:
-                    cur.execute("SELECT nome FROM estacoes WHERE codigo_wmo = %s", (request.codigo_wmo,))
-                    row = cur.fetchone()
-                    if row:
-                        estacao_nome = row[0]
-                finally:
-                    cur.close()
-                    conn.close()
-            
-            insert_predicao_intensidade(
-                codigo_wmo=request.codigo_wmo or "UNKNOWN",
-                precipitacao_mm=request.precipitacao_mm,
-                pressao_estacao_mb=request.pressao_estacao_mb,
-                temperatura_ar_c=request.temperatura_ar_c,
-                umidade_rel_horaria_pct=request.umidade_rel_horaria_pct,
-                vento_velocidade_ms=request.vento_velocidade_ms,
-                intensidade_predita=result.get("prediction", "unknown"),
-                probabilidade_forte=result.get("probabilities", {}).get("forte"),
-                probabilidade_moderada=result.get("probabilities", {}).get("moderada"),
-                probabilidade_leve=result.get("probabilities", {}).get("leve"),
-                probabilidade_sem_chuva=result.get("probabilities", {}).get("sem_chuva"),
-                modelo_usado=result.get("model_name", "unknown"),
-                estacao_nome=estacao_nome
-            )
+            _salvar_predicao_simples(request, result)
         except Exception as save_error:
             # Não falha a requisição se não conseguir salvar
             print(f"⚠️  Aviso: Não foi possível salvar predição no banco: {save_error}")
@@ -877,86 +1426,77 @@ def simple_predict(request: SimplePredictionRequest):
         raise HTTPException(status_code=500, detail=f"Erro ao fazer predição: {str(e)}")
 
 @app.post("/predict-from-db")
+@perfilavel
 def predict_from_db(limit: int = 10):
     """
     Busca dados recentes do banco e faz predições para todos.
     Útil para popular dashboards com predições em lote.
+    
+    As features vêm prontas da feature store (features_intensidade); se ela não
+    estiver disponível, são montadas a partir de dados_meteorologicos.
     """
     try:
-        # Busca dados recentes
-        weather_data = get_latest_weather_data(limit=limit)
+        # Busca as features recentes como lote colunar (matriz pronta)
+        try:
+            lote = ultimas_features(limit=limit)
+            features = matriz_features(lote)
+        except Exception as e:
+            print(f"⚠️  Feature store indisponível, montando features dos dados brutos: {e}")
+            lote = get_latest_weather_lote(limit=limit)
+            features = None
         
-        if not weather_data:
+        if lote.num_rows == 0:
             return {
                 "status": "warning",
                 "message": "Nenhum dado meteorológico recente encontrado",
                 "predictions": []
             }
         
+        # Uma única chamada ao modelo para o lote inteiro
+        with fila_predicoes(lote.num_rows):
+            resultado = predict_features(features) if features is not None else predict_lote(lote)
+        
+        codigos = lote.column('codigo_wmo').to_pylist()
+        timestamps = lote.column('timestamp_utc').to_pylist()
+        nomes = {codigo: obter_nome_estacao(codigo) for codigo in set(codigos)}
+        # Entradas salvas junto da predição: as features efetivamente usadas pelo modelo
+        entradas = [
+            resultado["features"][:, FEATURE_ORDER.index(campo)]
+            for campo in ('precipitacao_mm', 'pressao_estacao_mb', 'temperatura_ar_c',
+                          'umidade_rel_horaria_pct', 'vento_velocidade_ms')
+        ]
+        classes = resultado["classes"] or []
+        probabilidades = resultado["probabilities"]
+        
         predictions = []
-        for data in weather_data:
-            try:
-                # Prepara dados para predição
-                from datetime import datetime
-                timestamp = data.get('timestamp_utc', datetime.now())
-                if isinstance(timestamp, str):
-                    timestamp = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-                
-                prediction_data = {
-                    'precipitacao_mm': data.get('precipitacao_mm', 0.0) or 0.0,
-                    'pressao_estacao_mb': data.get('pressao_estacao_mb', 1013.0) or 1013.0,
-                    'pressao_max_mb': data.get('pressao_estacao_mb', 1013.0) or 1013.0,
-                    'pressao_min_mb': data.get('pressao_estacao_mb', 1013.0) or 1013.0,
-                    'temperatura_ar_c': data.get('temperatura_ar_c', 25.0) or 25.0,
-                    'temperatura_max_c': data.get('temperatura_ar_c', 25.0) or 25.0,
-                    'temperatura_min_c': data.get('temperatura_ar_c', 25.0) or 25.0,
-                    'umidade_rel_horaria_pct': data.get('umidade_rel_horaria_pct', 70.0) or 70.0,
-                    'umidade_rel_max_pct': data.get('umidade_rel_horaria_pct', 70.0) or 70.0,
-                    'umidade_rel_min_pct': data.get('umidade_rel_horaria_pct', 70.0) or 70.0,
-                    'vento_velocidade_ms': data.get('vento_velocidade_ms', 0.0) or 0.0,
-                    'vento_direcao_graus': 0.0,
-                    'vento_rajada_max_ms': data.get('vento_velocidade_ms', 0.0) or 0.0,
-                    'radiacao_global_kjm2': data.get('radiacao_global_kjm2', 0.0) or 0.0,
-                    'ano': timestamp.year,
-                    'mes': timestamp.month,
-                    'dia': timestamp.day,
-                    'hora': timestamp.hour,
-                    'dia_semana': timestamp.weekday()
-                }
-                
-                # Faz predição
-                result = predict(prediction_data)
-                
-                # Salva no banco
-                try:
-                    insert_predicao_intensidade(
-                        codigo_wmo=data.get('codigo_wmo', 'UNKNOWN'),
-                        precipitacao_mm=prediction_data['precipitacao_mm'],
-                        pressao_estacao_mb=prediction_data['pressao_estacao_mb'],
-                        temperatura_ar_c=prediction_data['temperatura_ar_c'],
-                        umidade_rel_horaria_pct=prediction_data['umidade_rel_horaria_pct'],
-                        vento_velocidade_ms=prediction_data['vento_velocidade_ms'],
-                        intensidade_predita=result.get("prediction", "unknown"),
-                        probabilidade_forte=result.get("probabilities", {}).get("forte"),
-                        probabilidade_moderada=result.get("probabilities", {}).get("moderada"),
-                        probabilidade_leve=result.get("probabilities", {}).get("leve"),
-                        probabilidade_sem_chuva=result.get("probabilities", {}).get("sem_chuva"),
-                        modelo_usado=result.get("model_name", "unknown"),
-                        estacao_nome=data.get('estacao_nome')
-                    )
-                except Exception as save_error:
-                    print(f"⚠️  Aviso ao salvar predição: {save_error}")
-                
-                predictions.append({
-                    "codigo_wmo": data.get('codigo_wmo'),
-                    "estacao_nome": data.get('estacao_nome'),
-                    "timestamp": timestamp.isoformat(),
-                    "intensidade_chuva": result.get("prediction"),
-                    "probabilidades": result.get("probabilities", {})
-                })
-            except Exception as e:
-                print(f"Erro ao processar predição para {data.get('codigo_wmo')}: {e}")
-                continue
+        linhas_banco = []
+        for i, codigo_wmo in enumerate(codigos):
+            probs = (
+                {classe: float(probabilidades[i, j]) for j, classe in enumerate(classes)}
+                if probabilidades is not None else None
+            )
+            linhas_banco.append((
+                codigo_wmo, timestamps[i], nomes[codigo_wmo],
+                *(float(valores[i]) for valores in entradas),
+                resultado["predictions"][i],
+                *((probs or {}).get(classe) for classe in ("forte", "moderada", "leve", "sem_chuva")),
+                resultado["model_name"] or "unknown",
+                resultado["model_version"]
+            ))
+            predictions.append({
+                "codigo_wmo": codigo_wmo,
+                "estacao_nome": nomes[codigo_wmo],
+                "timestamp": timestamps[i].isoformat(),
+                "intensidade_chuva": resultado["predictions"][i],
+                "probabilidades": probs or {}
+            })
+        
+        # Salva todas as predições em um único INSERT (chaveado pela observação e
+        # versão do modelo: chamar de novo não duplica linhas)
+        try:
+            insert_predicoes_intensidade_lote(linhas_banco)
+        except Exception as save_error:
+            print(f"⚠️  Aviso ao salvar predições: {save_error}")
         
         return {
             "status": "success",
@@ -0,0 +1,164 @@
+# fastapi/app/services/metrics.py
+"""
+Métricas do pipeline no formato Prometheus (expostas em /metrics).
+
+Os serviços registram aqui os tempos de cada etapa; o Prometheus coleta a API
+e o Grafana exibe os painéis de desempenho ao lado dos dados de chuva.
+"""
+import time
+from contextlib import contextmanager
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+# Faixas de vazão: de centenas a milhões por segundo
+_BUCKETS_VAZAO = (100, 500, 1_000, 2_500, 5_000, 10_000, 25_000, 50_000,
+                  100_000, 250_000, 500_000, 1_000_000, 5_000_000)
+_BUCKETS_BYTES_S = (1e4, 1e5, 5e5, 1e6, 5e6, 1e7, 5e7, 1e8, 5e8)
+_BUCKETS_MODELO = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+_BUCKETS_FILA = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+REQUEST_LATENCY = Histogram(
+    "inmet_http_request_duration_seconds",
+    "Latência das requisições HTTP por endpoint",
+    ["method", "endpoint", "status"]
+)
+
+CSV_ROWS_PARSED = Counter(
+    "inmet_csv_rows_parsed_total",
+    "Linhas de CSV do INMET processadas"
+)
+CSV_PARSE_RATE = Histogram(
+    "inmet_csv_rows_parsed_per_second",
+    "Vazão do parse de CSV (linhas por segundo, por arquivo)",
+    buckets=_BUCKETS_VAZAO
+)
+PARSE_CACHE_CONSULTAS = Counter(
+    "inmet_parse_cache_lookups_total",
+    "Consultas ao cache de parse dos CSVs",
+    ["resultado"]
+)
+
+DB_BATCH_INSERT = Histogram(
+    "inmet_db_batch_insert_duration_seconds",
+    "Duração do INSERT em lote em dados_meteorologicos"
+)
+DB_ROWS_INSERTED = Counter(
+    "inmet_db_rows_inserted_total",
+    "Linhas inseridas/atualizadas em dados_meteorologicos"
+)
+
+S3_UPLOAD_RATE = Histogram(
+    "inmet_s3_upload_bytes_per_second",
+    "Vazão dos uploads para o S3/MinIO (bytes por segundo, por arquivo)",
+    buckets=_BUCKETS_BYTES_S
+)
+S3_UPLOAD_BYTES = Counter(
+    "inmet_s3_upload_bytes_total",
+    "Bytes enviados ao S3/MinIO"
+)
+
+RECLASSIFICATION_ROWS = Counter(
+    "inmet_reclassification_rows_updated_total",
+    "Linhas com intensidade_chuva corrigida pela reclassificação em lote"
+)
+RECLASSIFICATION_BLOCK = Histogram(
+    "inmet_reclassification_block_duration_seconds",
+    "Duração do UPDATE de cada bloco da reclassificação (transação)"
+)
+
+TRAINING_CANDIDATE_DURATION = Histogram(
+    "inmet_training_candidate_duration_seconds",
+    "Tempo de treino e avaliação de cada candidato (processo do pool)",
+    ["candidato"],
+    buckets=(1, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+)
+
+BATCH_SCORING_ROWS = Counter(
+    "inmet_batch_scoring_rows_total",
+    "Observações pontuadas e gravadas pela pontuação em lote"
+)
+BATCH_SCORING_CHUNK = Histogram(
+    "inmet_batch_scoring_chunk_duration_seconds",
+    "Duração de cada bloco da pontuação em lote (leitura, modelo e gravação)",
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+)
+
+THINGSBOARD_FETCH = Histogram(
+    "inmet_thingsboard_fetch_duration_seconds",
+    "Latência da busca de telemetria no ThingsBoard por dispositivo",
+    ["device"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+)
+
+MODEL_INFERENCE = Histogram(
+    "inmet_model_inference_duration_seconds",
+    "Latência da chamada ao modelo (predict/predict_proba) por linha",
+    ["model"],
+    buckets=_BUCKETS_MODELO
+)
+
+PREDICTION_QUEUE = Gauge(
+    "inmet_prediction_queue_depth",
+    "Predições aguardando ou em execução"
+)
+PREDICTION_QUEUE_DEPTH = Histogram(
+    "inmet_prediction_queue_depth_observed",
+    "Profundidade da fila de predições observada a cada chegada",
+    buckets=_BUCKETS_FILA
+)
+
+PREDICTION_CACHE_REQUESTS = Counter(
+    "inmet_prediction_cache_requests_total",
+    "Linhas consultadas no cache de predições, por resultado (hit/miss)",
+    ["resultado"]
+)
+PREDICTION_CACHE_SIZE = Gauge(
+    "inmet_prediction_cache_entries",
+    "Entradas no cache de predições"
+)
+PREDICTION_CACHE_EVICTIONS = Counter(
+    "inmet_prediction_cache_evictions_total",
+    "Entradas removidas do cache de predições por falta de espaço (LRU)"
+)
+
+
+def registrar_parse(linhas: int, segundos: float):
+    """Registra um arquivo processado pelo parser."""
+    CSV_ROWS_PARSED.inc(linhas)
+    if segundos > 0:
+        CSV_PARSE_RATE.observe(linhas / segundos)
+
+
+def registrar_upload(tamanho_bytes: int, segundos: float):
+    """Registra um upload para o S3."""
+    S3_UPLOAD_BYTES.inc(tamanho_bytes)
+    if segundos > 0:
+        S3_UPLOAD_RATE.observe(tamanho_bytes / segundos)
+
+
+@contextmanager
+def fila_predicoes(quantidade: int = 1):
+    """
+    Conta `quantidade` predições na fila enquanto o bloco executa.
+    """
+    PREDICTION_QUEUE.inc(quantidade)
+    PREDICTION_QUEUE_DEPTH.observe(PREDICTION_QUEUE._value.get())
+    try:
+        yield
+    finally:
+        PREDICTION_QUEUE.dec(quantidade)
+
+
+@contextmanager
+def cronometrar(histograma: Histogram, **labels):
+    """Observa a duração do bloco no histograma informado."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        (histograma.labels(**labels) if labels else histograma).observe(time.perf_counter() - inicio)
+
+
+def exportar_metricas():
+    """Retorna (conteúdo, content-type) no formato texto do Prometheus."""
+    return generate_latest(), CONTENT_TYPE_LATEST
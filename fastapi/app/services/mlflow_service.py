@@ -2,15 +2,27 @@
 Serviço para carregar modelos do MLFlow e fazer predições
 """
 import os
+import threading
+import time
 import mlflow
 import mlflow.sklearn
-from typing import Dict, List, Optional
+from typing import Dict, List, NamedTuple, Optional, Tuple
 import numpy as np
 from sklearn.preprocessing import StandardScaler, LabelEncoder
+from .metrics import MODEL_INFERENCE, cronometrar
+from .feature_store import FEATURE_ORDER, montar_features_lote
+from .model_compiler import ModeloCompilado, compilar_modelo
+from .prediction_cache import obter_cache_predicoes
 
 # Configurações
 MLFLOW_TRACKING_URI = os.getenv("MLFLOW_TRACKING_URI", "http://mlflow:5000")
 EXPERIMENT_NAME = "intensidade_chuva_classificacao"
+# Intervalo (segundos) entre verificações de versões novas do modelo carregado (0 desliga)
+MODELO_RECARGA_INTERVALO = int(os.getenv("MODELO_RECARGA_INTERVALO", "60"))
+# Serve ensembles de árvores compilados para NumPy (services/model_compiler.py)
+MODELO_COMPILADO = os.getenv("MODELO_COMPILADO", "1").strip().lower() not in ("0", "false", "no", "nao", "off")
+# Acima disso por chamada, o predict do sklearn (Cython) é mais rápido que o compilado
+MODELO_COMPILADO_MAX_LINHAS = int(os.getenv("MODELO_COMPILADO_MAX_LINHAS", "50"))
 
 # Configuração S3 (MinIO)
 os.environ['AWS_ACCESS_KEY_ID'] = os.getenv('AWS_ACCESS_KEY_ID', 'minioadmin')
@@ -18,11 +30,30 @@ os.environ['AWS_SECRET_ACCESS_KEY'] = os.getenv('AWS_SECRET_ACCESS_KEY', 'minioa
 os.environ['MLFLOW_S3_ENDPOINT_URL'] = os.getenv('MLFLOW_S3_ENDPOINT_URL', 'http://minio:9000')
 os.environ['AWS_S3_FORCE_PATH_STYLE'] = os.getenv('AWS_S3_FORCE_PATH_STYLE', 'true')
 
-# Cache do modelo carregado
-_loaded_model = None
-_loaded_model_name = None
-_scaler = None
-_label_encoder = None
+
+class ModeloAtivo(NamedTuple):
+    """
+    Tudo o que uma predição lê do modelo em uso. É publicado inteiro, de uma vez
+    (_publicar_modelo), e cada predição lê a referência uma única vez: estimador,
+    scaler, label encoder, compilado e versão do cache são sempre do mesmo run.
+    """
+    estimador: object
+    nome: str
+    run_id: Optional[str]
+    scaler: object
+    label_encoder: object
+    compilado: Optional[ModeloCompilado]
+    versao: str                # versão do modelo no cache de predições
+
+
+# Modelo carregado (None até o primeiro carregamento)
+_modelo: Optional[ModeloAtivo] = None
+_trocas_modelo = 0
+_troca_lock = threading.Lock()
+_recarga_lock = threading.Lock()
+# Thread que verifica versões novas do modelo (fora do caminho das requisições)
+_recarregador: Optional[threading.Thread] = None
+_parar_recarga = threading.Event()
 
 
 def get_mlflow_client():
@@ -43,7 +74,8 @@ def list_models() -> List[Dict]:
         runs = client.search_runs(
             experiment_ids=[experiment.experiment_id],
             order_by=["metrics.test_accuracy DESC"],
-            max_results=10
+            max_results=10,
+            output_format="list"
         )
         
         models = []
@@ -66,18 +98,17 @@ def list_models() -> List[Dict]:
         return []
 
 
-def load_best_model(model_name: Optional[str] = None) -> bool:
+def load_best_model(model_name: Optional[str] = None, run_id: Optional[str] = None) -> bool:
     """
     Carrega o melhor modelo do MLFlow
     
     Args:
         model_name: Nome do modelo específico (opcional). Se None, carrega o melhor por accuracy.
+        run_id: Run específico (opcional, ex: o selecionado pelo treino da API). Tem precedência sobre model_name.
     
     Returns:
         True se o modelo foi carregado com sucesso
     """
-    global _loaded_model, _loaded_model_name, _scaler, _label_encoder
-    
     try:
         client = get_mlflow_client()
         experiment = client.get_experiment_by_name(EXPERIMENT_NAME)
@@ -87,18 +118,22 @@ def load_best_model(model_name: Optional[str] = None) -> bool:
             return False
         
         # Busca runs
-        if model_name:
+        if run_id:
+            runs = [client.get_run(run_id)]
+        elif model_name:
             runs = client.search_runs(
                 experiment_ids=[experiment.experiment_id],
                 filter_string=f"tags.mlflow.runName = '{model_name}'",
-                max_results=1
+                max_results=1,
+                output_format="list"
             )
         else:
             # Busca melhor modelo por accuracy
             runs = client.search_runs(
                 experiment_ids=[experiment.experiment_id],
                 order_by=["metrics.test_accuracy DESC"],
-                max_results=1
+                max_results=1,
+                output_format="list"
             )
         
         if not runs:
@@ -107,28 +142,29 @@ def load_best_model(model_name: Optional[str] = None) -> bool:
         
         run = runs[0]
         run_id = run.info.run_id
+        nome = run.data.tags.get('mlflow.runName', run_id)
         
-        # Carrega modelo
+        # Baixa tudo antes de publicar: as requisições seguem com o modelo anterior
         model_uri = f"runs:/{run_id}/model"
-        _loaded_model = mlflow.sklearn.load_model(model_uri)
-        _loaded_model_name = run.data.tags.get('mlflow.runName', run_id)
+        modelo = mlflow.sklearn.load_model(model_uri)
         
         # Tenta carregar scaler e label encoder se disponíveis
         try:
             scaler_uri = f"runs:/{run_id}/scaler"
-            _scaler = mlflow.sklearn.load_model(scaler_uri)
+            scaler = mlflow.sklearn.load_model(scaler_uri)
         except:
-            _scaler = None
+            scaler = None
             print("⚠️  Scaler não encontrado no run. Será necessário normalizar manualmente.")
         
         try:
             le_uri = f"runs:/{run_id}/label_encoder"
-            _label_encoder = mlflow.sklearn.load_model(le_uri)
+            label_encoder = mlflow.sklearn.load_model(le_uri)
         except:
-            _label_encoder = None
+            label_encoder = None
             print("⚠️  LabelEncoder não encontrado. Usando mapeamento padrão.")
         
-        print(f"✅ Modelo carregado: {_loaded_model_name} (run_id: {run_id})")
+        _publicar_modelo(modelo, nome, run_id, scaler, label_encoder)
+        print(f"✅ Modelo carregado: {nome} (run_id: {run_id})")
         print(f"   Accuracy: {run.data.metrics.get('test_accuracy', 'N/A')}")
         return True
         
@@ -139,116 +175,375 @@ def load_best_model(model_name: Optional[str] = None) -> bool:
         return False
 
 
-def predict(data: Dict) -> Dict:
+# Mapeamento de classes (padrão se label_encoder não estiver disponível)
+CLASS_MAPPING = {
+    0: "forte",
+    1: "leve",
+    2: "moderada",
+    3: "sem_chuva"
+}
+
+def usar_modelo_local(model, scaler=None, label_encoder=None, model_name: Optional[str] = None):
     """
-    Faz predição usando o modelo carregado
+    Usa um modelo já instanciado (ex: treinado localmente ou lido de arquivo) no lugar do MLFlow.
+    """
+    _publicar_modelo(model, model_name or type(model).__name__, None, scaler, label_encoder)
+
+
+def _publicar_modelo(modelo, nome: str, run_id: Optional[str], scaler, label_encoder) -> ModeloAtivo:
+    """
+    Troca o modelo ativo: compila o modelo + scaler (ModeloCompilado) quando o
+    estimador é suportado (nos demais, as predições seguem pelo sklearn) e publica
+    tudo em uma única atribuição. O cache de predições muda de versão antes, então
+    resultados de requisições ainda com o modelo anterior não entram no cache.
+    """
+    global _modelo, _trocas_modelo
+    
+    compilado = None
+    if MODELO_COMPILADO:
+        try:
+            compilado = compilar_modelo(modelo, scaler)
+            print(f"⚡ Modelo compilado: {compilado.n_arvores} árvores, {compilado.n_nos} nós")
+        except ValueError as e:
+            print(f"   Sem compilação: {e}")
+    
+    with _troca_lock:
+        _trocas_modelo += 1
+        novo = ModeloAtivo(modelo, nome, run_id, scaler, label_encoder, compilado,
+                           f"{run_id or nome}#{_trocas_modelo}")
+        obter_cache_predicoes().definir_versao(novo.versao)
+        _modelo = novo
+    return novo
+
+
+def obter_modelo() -> Optional[ModeloAtivo]:
+    """Modelo ativo (referência imutável), ou None se nenhum foi carregado."""
+    return _modelo
+
+
+def recarregar_se_atualizado() -> bool:
+    """
+    Troca o modelo carregado pela versão mais recente derivada dele (runs com a tag
+    run_pai, gravados pelo treino incremental em services/training.py), seguindo a
+    linhagem até o último descendente. Chamada pela thread de recarga (iniciar_recarga)
+    a cada MODELO_RECARGA_INTERVALO segundos, então todas as instâncias da API passam a
+    usar o modelo atualizado sem reinício e sem que uma requisição espere pelo MLflow.
     
-    Args:
-        data: Dicionário com features do modelo
-        
     Returns:
-        Dicionário com predição e probabilidades
+        True se um modelo novo foi carregado
     """
-    global _loaded_model, _loaded_model_name
+    atual = _modelo
+    if atual is None or atual.run_id is None:
+        return False
+    # Uma verificação por vez
+    if not _recarga_lock.acquire(blocking=False):
+        return False
     
-    if _loaded_model is None:
+    try:
+        client = get_mlflow_client()
+        experiment = client.get_experiment_by_name(EXPERIMENT_NAME)
+        run_id = atual.run_id
+        descendente = None
+        while experiment:
+            filhos = client.search_runs(
+                experiment_ids=[experiment.experiment_id],
+                filter_string=f"tags.run_pai = '{run_id}' AND attributes.status = 'FINISHED'",
+                order_by=["attributes.start_time DESC"],
+                max_results=1,
+                output_format="list"
+            )
+            if not filhos:
+                break
+            descendente = run_id = filhos[0].info.run_id
+        
+        if descendente is None:
+            return False
+        print(f"🔄 Nova versão do modelo {atual.nome}: {descendente}")
+        return load_best_model(run_id=descendente)
+    except Exception as e:
+        print(f"⚠️  Aviso: não foi possível verificar versões novas do modelo: {e}")
+        return False
+    finally:
+        _recarga_lock.release()
+
+
+def _vigiar_modelo(intervalo: int):
+    while not _parar_recarga.wait(intervalo):
+        recarregar_se_atualizado()
+
+
+def iniciar_recarga(intervalo: int = MODELO_RECARGA_INTERVALO) -> bool:
+    """Inicia a verificação periódica de versões novas (uma vez por processo); False se desligada."""
+    global _recarregador
+    if intervalo <= 0:
+        return False
+    with _recarga_lock:
+        if _recarregador is not None and _recarregador.is_alive():
+            return True
+        _parar_recarga.clear()
+        _recarregador = threading.Thread(target=_vigiar_modelo, args=(intervalo,), daemon=True,
+                                         name="modelo-recarga")
+        _recarregador.start()
+    return True
+
+
+def parar_recarga():
+    """Interrompe a verificação periódica (uma recarga em andamento vai até o fim)."""
+    _parar_recarga.set()
+
+
+def _garantir_modelo() -> ModeloAtivo:
+    """
+    Modelo ativo; carrega o melhor do MLFlow se nenhum estiver carregado. Versões
+    novas são trocadas pela thread de recarga, nunca aqui.
+    """
+    modelo = _modelo
+    if modelo is None:
         # Tenta carregar automaticamente
         if not load_best_model():
             raise ValueError("Nenhum modelo carregado e não foi possível carregar automaticamente")
-    
-    # Mapeamento de classes (padrão se label_encoder não estiver disponível)
-    class_mapping = {
-        0: "forte",
-        1: "leve",
-        2: "moderada",
-        3: "sem_chuva"
-    }
-    
-    # Prepara features na ordem esperada
-    feature_order = [
-        'precipitacao_mm',
-        'pressao_estacao_mb', 'pressao_max_mb', 'pressao_min_mb',
-        'temperatura_ar_c', 'temperatura_max_c', 'temperatura_min_c',
-        'umidade_rel_horaria_pct', 'umidade_rel_max_pct', 'umidade_rel_min_pct',
-        'vento_velocidade_ms', 'vento_direcao_graus', 'vento_rajada_max_ms',
-        'radiacao_global_kjm2',
-        'ano', 'mes', 'dia', 'hora', 'dia_semana'
-    ]
-    
-    # Extrai features na ordem correta
+        modelo = _modelo
+    return modelo
+
+
+def modelo_ativo() -> Tuple[str, str]:
+    """
+    (nome, versão) do modelo em uso, carregando o melhor se necessário. A versão é
+    o run_id do MLflow (ou o nome, para modelos locais) e vai para modelo_versao
+    das predições gravadas.
+    """
+    modelo = _garantir_modelo()
+    return modelo.nome, modelo.run_id or modelo.nome
+
+
+def montar_features(data: Dict) -> np.ndarray:
+    """
+    Monta a matriz (1 x n_features) na ordem esperada pelo modelo.
+    Valores ausentes viram 0.0.
+    """
     features = []
-    for feat in feature_order:
+    for feat in FEATURE_ORDER:
         value = data.get(feat, 0.0)
         if value is None:
             value = 0.0
         features.append(float(value))
     
-    X = np.array([features])
-    
-    # Normaliza se scaler estiver disponível
-    if _scaler is not None:
-        X = _scaler.transform(X)
-    
-    # Faz predição
-    prediction = _loaded_model.predict(X)[0]
-    probabilities = None
-    
-    # Tenta obter probabilidades se o modelo suportar
-    try:
-        if hasattr(_loaded_model, 'predict_proba'):
-            proba = _loaded_model.predict_proba(X)[0]
-            probabilities = {
-                class_mapping.get(i, f"class_{i}"): float(prob)
-                for i, prob in enumerate(proba)
-            }
-    except:
-        pass
+    return np.array([features])
+
+
+def escalar_features(X: np.ndarray, modelo: Optional[ModeloAtivo] = None) -> np.ndarray:
+    """Normaliza as features com o scaler do run, se disponível."""
+    modelo = modelo or _modelo
+    if modelo.compilado is not None:
+        return modelo.compilado.escalar(X)
+    if modelo.scaler is not None:
+        return modelo.scaler.transform(X)
+    return X
+
+
+def _executar_linha(X: np.ndarray, modelo: ModeloAtivo):
+    """
+    Executa o modelo sobre uma linha já normalizada.
+    Retorna (código da classe, vetor de probabilidades ou None): o que fica no cache.
+    """
+    with cronometrar(MODEL_INFERENCE, model=modelo.nome or "desconhecido"):
+        if modelo.compilado is not None:
+            proba = modelo.compilado.predict_proba_escalado(X)[0]
+            return modelo.compilado.classes_[int(np.argmax(proba))], proba
+        
+        prediction = modelo.estimador.predict(X)[0]
+        proba = None
+        
+        # Tenta obter probabilidades se o modelo suportar
+        try:
+            if hasattr(modelo.estimador, 'predict_proba'):
+                proba = modelo.estimador.predict_proba(X)[0]
+        except:
+            pass
     
-    # Converte predição para nome da classe
-    if _label_encoder is not None:
+    return prediction, proba
+
+
+def _probabilidades_por_classe(proba: Optional[np.ndarray]) -> Optional[Dict[str, float]]:
+    if proba is None:
+        return None
+    return {CLASS_MAPPING.get(i, f"class_{i}"): float(prob) for i, prob in enumerate(proba)}
+
+
+def executar_modelo(X: np.ndarray, modelo: Optional[ModeloAtivo] = None):
+    """
+    Executa o modelo sobre uma linha já normalizada.
+    Retorna (código da classe, probabilidades por classe ou None).
+    """
+    prediction, proba = _executar_linha(X, modelo or _modelo)
+    return prediction, _probabilidades_por_classe(proba)
+
+
+def nome_classe(prediction, modelo: Optional[ModeloAtivo] = None) -> str:
+    """Converte o código previsto no nome da classe."""
+    modelo = modelo or _modelo
+    if modelo is not None and modelo.label_encoder is not None:
         try:
-            class_name = _label_encoder.inverse_transform([prediction])[0]
+            return modelo.label_encoder.inverse_transform([prediction])[0]
         except:
-            class_name = class_mapping.get(prediction, f"class_{prediction}")
-    else:
-        class_name = class_mapping.get(prediction, f"class_{prediction}")
+            return CLASS_MAPPING.get(prediction, f"class_{prediction}")
+    return CLASS_MAPPING.get(prediction, f"class_{prediction}")
+
+
+def predict(data: Dict) -> Dict:
+    """
+    Faz predição usando o modelo carregado
+    
+    Args:
+        data: Dicionário com features do modelo
+        
+    Returns:
+        Dicionário com predição e probabilidades
+    """
+    modelo = _garantir_modelo()
+    
+    # Extrai features na ordem correta; payloads repetidos saem do cache
+    X = montar_features(data)
+    cache = obter_cache_predicoes()
+    chaves = cache.chaves(X) if cache.ativo else []
+    resultado = cache.buscar(chaves, modelo.versao)[0] if chaves else None
+    if resultado is None:
+        # Normaliza e faz predição
+        resultado = _executar_linha(escalar_features(X, modelo), modelo)
+        if chaves:
+            cache.guardar(chaves, [resultado], modelo.versao)
+    prediction, proba = resultado
     
     return {
-        "prediction": class_name,
+        "prediction": nome_classe(prediction, modelo),
         "prediction_code": int(prediction),
-        "probabilities": probabilities,
-        "model_name": _loaded_model_name
+        "probabilities": _probabilidades_por_classe(proba),
+        "model_name": modelo.nome
     }
 
 
-def predict_batch(data_list: List[Dict]) -> List[Dict]:
+def predict_batch(features: np.ndarray) -> List[Dict]:
     """
-    Faz predições em lote
+    Predições de uma matriz de features já montada (n x n_features, na ordem de
+    FEATURE_ORDER), uma por linha no formato de predict(), com uma única chamada
+    ao modelo (predict_features).
+    """
+    if len(features) == 0:
+        return []
+    resultado = predict_features(features)
+    probabilidades = resultado["probabilities"]
+    return [
+        {
+            "prediction": nome,
+            "prediction_code": int(codigo),
+            "probabilities": _probabilidades_por_classe(None if probabilidades is None else probabilidades[i]),
+            "model_name": resultado["model_name"]
+        }
+        for i, (nome, codigo) in enumerate(zip(resultado["predictions"], resultado["prediction_codes"]))
+    ]
+
+
+def predict_lote(lote) -> Dict:
+    """
+    Predição vetorizada para um lote colunar inteiro (weather_batch): monta as
+    features (montar_features_lote) e chama predict_features.
+    """
+    return predict_features(montar_features_lote(lote))
+
+
+def _executar_lote(X: np.ndarray, modelo: ModeloAtivo):
+    """
+    Executa o modelo sobre uma matriz já normalizada.
+    Retorna (códigos das classes, matriz de probabilidades ou None).
+    """
+    n = max(len(X), 1)
+    inicio = time.perf_counter()
+    compilado = modelo.compilado
+    if compilado is not None and len(X) <= MODELO_COMPILADO_MAX_LINHAS:
+        probabilidades = compilado.predict_proba_escalado(X)
+        codigos = compilado.classes_.take(np.argmax(probabilidades, axis=1))
+    else:
+        codigos = modelo.estimador.predict(X)
+        probabilidades = None
+        try:
+            if hasattr(modelo.estimador, 'predict_proba'):
+                probabilidades = modelo.estimador.predict_proba(X)
+        except:
+            pass
+    # Histograma é por linha: registra o tempo médio de cada linha do lote
+    MODEL_INFERENCE.labels(model=modelo.nome or "desconhecido").observe((time.perf_counter() - inicio) / n)
+    return codigos, probabilidades
+
+
+def predict_features(features: np.ndarray, usar_cache: bool = True) -> Dict:
+    """
+    Predição vetorizada para uma matriz de features já montada (n x n_features, na
+    ordem de FEATURE_ORDER), ex: lida de features_intensidade. Uma chamada ao modelo,
+    só com as linhas que não estão no cache de predições. usar_cache=False ignora o
+    cache (pontuação em lote, que não repete linhas e o encheria).
     
-    Args:
-        data_list: Lista de dicionários com features
-        
     Returns:
-        Lista de predições
+        Dicionário com 'predictions' (nomes das classes), 'prediction_codes',
+        'probabilities' (matriz n x classes ou None), 'classes', 'features'
+        (matriz antes da normalização), 'model_name' e 'model_version' (run_id do
+        MLflow, ou o nome do modelo local)
     """
-    results = []
-    for data in data_list:
+    modelo = _garantir_modelo()
+    
+    # Linhas já pontuadas por este modelo saem do cache; o modelo roda só nas demais
+    cache = obter_cache_predicoes()
+    chaves = cache.chaves(features) if usar_cache and cache.ativo and len(features) else []
+    em_cache = cache.buscar(chaves, modelo.versao) if chaves else [None] * len(features)
+    faltantes = [i for i, r in enumerate(em_cache) if r is None]
+    
+    if len(faltantes) == len(em_cache):
+        codigos, probabilidades = _executar_lote(escalar_features(features, modelo), modelo)
+    elif not faltantes:
+        codigos = np.array([r[0] for r in em_cache])
+        probabilidades = None if em_cache[0][1] is None else np.vstack([r[1] for r in em_cache])
+    else:
+        novos_codigos, novas_proba = _executar_lote(escalar_features(features[faltantes], modelo), modelo)
+        novos = iter(zip(novos_codigos, novas_proba if novas_proba is not None else [None] * len(faltantes)))
+        # Mesma versão do modelo: linhas do cache e novas têm o mesmo formato
+        linhas = [r if r is not None else next(novos) for r in em_cache]
+        codigos = np.array([r[0] for r in linhas])
+        probabilidades = None if novas_proba is None else np.vstack([r[1] for r in linhas])
+    
+    if chaves and faltantes:
+        cache.guardar(
+            [chaves[i] for i in faltantes],
+            [(codigos[i], None if probabilidades is None else probabilidades[i].copy()) for i in faltantes],
+            modelo.versao
+        )
+    
+    if modelo.label_encoder is not None:
         try:
-            result = predict(data)
-            results.append(result)
-        except Exception as e:
-            results.append({
-                "error": str(e),
-                "prediction": None
-            })
-    return results
+            nomes = list(modelo.label_encoder.inverse_transform(codigos))
+        except:
+            nomes = [CLASS_MAPPING.get(int(c), f"class_{c}") for c in codigos]
+    else:
+        nomes = [CLASS_MAPPING.get(int(c), f"class_{c}") for c in codigos]
+    
+    classes = None
+    if probabilidades is not None:
+        classes = [CLASS_MAPPING.get(i, f"class_{i}") for i in range(probabilidades.shape[1])]
+    
+    return {
+        "predictions": nomes,
+        "prediction_codes": np.asarray(codigos).astype(int),
+        "probabilities": probabilidades,
+        "classes": classes,
+        "features": features,
+        "model_name": modelo.nome,
+        "model_version": modelo.run_id or modelo.nome
+    }
 
 
 def get_model_info() -> Dict:
     """Retorna informações sobre o modelo carregado"""
-    global _loaded_model, _loaded_model_name
+    modelo = _modelo
     
-    if _loaded_model is None:
+    if modelo is None:
         return {
             "loaded": False,
             "message": "Nenhum modelo carregado"
@@ -256,9 +551,10 @@ def get_model_info() -> Dict:
     
     return {
         "loaded": True,
-        "model_name": _loaded_model_name,
-        "model_type": type(_loaded_model).__name__,
-        "has_scaler": _scaler is not None,
-        "has_label_encoder": _label_encoder is not None
+        "model_name": modelo.nome,
+        "run_id": modelo.run_id,
+        "model_type": type(modelo.estimador).__name__,
+        "has_scaler": modelo.scaler is not None,
+        "has_label_encoder": modelo.label_encoder is not None,
+        "compiled": modelo.compilado is not None
     }
-
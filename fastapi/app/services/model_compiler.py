@@ -0,0 +1,245 @@
+# fastapi/app/services/model_compiler.py
+"""
+Compilação do modelo servido (ensemble de árvores + scaler) para arrays NumPy.
+
+O predict/predict_proba do sklearn valida a entrada e percorre as árvores uma a uma
+(RandomForest ainda despacha as árvores pelo joblib): com uma linha por chamada,
+esse custo fixo é quase todo o tempo de /predict. O ModeloCompilado guarda todas as
+árvores em arrays planos (feature, limiar, filho esquerdo/direito, valor da folha)
+e percorre todas ao mesmo tempo, um nível por iteração, com operações vetorizadas.
+
+O resultado é o mesmo do sklearn: a normalização repete as operações do
+StandardScaler em float64, as comparações usam a entrada em float32 (como as árvores
+do sklearn) e as somas seguem a ordem das árvores. Suporta RandomForest/ExtraTrees
+e GradientBoosting (log_loss); para os outros estimadores compilar_modelo levanta
+ValueError e o mlflow_service segue com o modelo do sklearn.
+"""
+from pathlib import Path
+from typing import Optional, Union
+
+import numpy as np
+
+# Linhas avaliadas por vez (limita os arrays linhas x árvores em lotes grandes)
+LINHAS_POR_BLOCO = 4096
+
+
+class ModeloCompilado:
+    """
+    Ensemble de árvores em arrays planos, com o scaler embutido.
+
+    Todas as árvores ficam concatenadas; `raizes` tem o nó inicial de cada uma.
+    Nas folhas, os filhos apontam para a própria folha (é assim que se reconhece
+    uma folha) e o limiar é +inf.
+    """
+
+    def __init__(self, tipo: str, classes: np.ndarray, raizes: np.ndarray,
+                 feature: np.ndarray, limiar: np.ndarray,
+                 esquerda: np.ndarray, direita: np.ndarray, valor: np.ndarray,
+                 profundidade: int, media: np.ndarray, escala: np.ndarray,
+                 raw_inicial: Optional[np.ndarray] = None, arvores_por_classe: int = 1):
+        self.tipo = tipo                      # 'floresta' ou 'gradient_boosting'
+        self.classes_ = classes
+        self.raizes = raizes
+        self.feature = feature
+        self.limiar = limiar
+        self.esquerda = esquerda
+        self.direita = direita
+        self.valor = valor                    # floresta: (nós x classes); boosting: (nós,)
+        self.profundidade = int(profundidade)
+        self.media = media
+        self.escala = escala
+        self.raw_inicial = raw_inicial        # boosting: predição inicial (por coluna de raw)
+        self.arvores_por_classe = int(arvores_por_classe)
+
+    @property
+    def n_arvores(self) -> int:
+        return len(self.raizes)
+
+    @property
+    def n_nos(self) -> int:
+        return len(self.feature)
+
+    def escalar(self, X: np.ndarray) -> np.ndarray:
+        """Mesmas operações do StandardScaler.transform (X - média) / escala."""
+        X = np.array(X, dtype=np.float64)
+        X -= self.media
+        X /= self.escala
+        return X
+
+    def _folhas(self, X32: np.ndarray) -> np.ndarray:
+        """
+        Folha de cada (linha, árvore) para uma matriz já normalizada em float32.
+        A cada nível só os caminhos que ainda não chegaram a uma folha são avançados.
+        """
+        n, n_features = X32.shape
+        nos = np.tile(self.raizes, n)
+        base = np.repeat(np.arange(n) * n_features, self.n_arvores)
+        valores = X32.ravel()
+        ativos = np.flatnonzero(self.esquerda[nos] != nos)
+        while ativos.size:
+            atuais = nos[ativos]
+            novos = np.where(valores[base[ativos] + self.feature[atuais]] <= self.limiar[atuais],
+                             self.esquerda[atuais], self.direita[atuais])
+            nos[ativos] = novos
+            ativos = ativos[self.esquerda[novos] != novos]
+        return nos.reshape(n, self.n_arvores)
+
+    def _proba_bloco(self, X32: np.ndarray) -> np.ndarray:
+        # Soma acumulada ao longo das árvores: mesma ordem das somas do sklearn
+        valores = self.valor[self._folhas(X32)]
+        if self.tipo == 'floresta':
+            # Média das probabilidades das árvores
+            proba = np.cumsum(valores, axis=1)[:, -1]
+            proba /= self.n_arvores
+            return proba
+
+        # Boosting: raw = inicial + soma(learning_rate * valor) por estágio e classe
+        k = self.arvores_por_classe
+        valores = valores.reshape(len(X32), -1, k)
+        inicial = np.broadcast_to(self.raw_inicial, (len(X32), 1, k))
+        raw = np.cumsum(np.concatenate([inicial, valores], axis=1), axis=1)[:, -1]
+        if k == 1:
+            p = 1.0 / (1.0 + np.exp(-raw[:, 0]))
+            return np.column_stack([1.0 - p, p])
+        raw -= raw.max(axis=1, keepdims=True)
+        np.exp(raw, out=raw)
+        raw /= raw.sum(axis=1, keepdims=True)
+        return raw
+
+    def predict_proba_escalado(self, X: np.ndarray) -> np.ndarray:
+        """Probabilidades (n x classes) de uma matriz já normalizada (escalar)."""
+        X32 = np.asarray(X, dtype=np.float32)
+        if X32.ndim == 1:
+            X32 = X32.reshape(1, -1)
+        if len(X32) <= LINHAS_POR_BLOCO:
+            return self._proba_bloco(X32)
+        return np.concatenate([self._proba_bloco(X32[i:i + LINHAS_POR_BLOCO])
+                               for i in range(0, len(X32), LINHAS_POR_BLOCO)])
+
+    def predict_escalado(self, X: np.ndarray) -> np.ndarray:
+        return self.classes_.take(np.argmax(self.predict_proba_escalado(X), axis=1))
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """Probabilidades a partir das features originais (normaliza antes)."""
+        return self.predict_proba_escalado(self.escalar(X))
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self.predict_escalado(self.escalar(X))
+
+    def salvar(self, caminho: Union[str, Path]) -> Path:
+        """Exporta os arrays em um .npz (carregar_modelo_compilado lê de volta)."""
+        caminho = Path(caminho)
+        np.savez_compressed(
+            caminho,
+            tipo=np.array(self.tipo), classes=self.classes_, raizes=self.raizes,
+            feature=self.feature, limiar=self.limiar, esquerda=self.esquerda,
+            direita=self.direita, valor=self.valor, profundidade=np.array(self.profundidade),
+            media=self.media, escala=self.escala,
+            raw_inicial=self.raw_inicial if self.raw_inicial is not None else np.empty(0),
+            arvores_por_classe=np.array(self.arvores_por_classe),
+        )
+        return caminho if caminho.suffix == '.npz' else caminho.with_suffix(caminho.suffix + '.npz')
+
+
+def carregar_modelo_compilado(caminho: Union[str, Path]) -> ModeloCompilado:
+    """Lê um modelo exportado por ModeloCompilado.salvar."""
+    with np.load(caminho, allow_pickle=False) as dados:
+        raw_inicial = dados['raw_inicial']
+        return ModeloCompilado(
+            tipo=str(dados['tipo']), classes=dados['classes'], raizes=dados['raizes'],
+            feature=dados['feature'], limiar=dados['limiar'], esquerda=dados['esquerda'],
+            direita=dados['direita'], valor=dados['valor'], profundidade=int(dados['profundidade']),
+            media=dados['media'], escala=dados['escala'],
+            raw_inicial=raw_inicial if raw_inicial.size else None,
+            arvores_por_classe=int(dados['arvores_por_classe']),
+        )
+
+
+def _achatar(arvores, valor_folha) -> dict:
+    """
+    Concatena as árvores (sklearn tree_) em arrays planos, com os índices dos filhos
+    deslocados para a posição global. `valor_folha(tree_)` dá o valor de cada nó.
+    """
+    raizes, features, limiares, esquerdas, direitas, valores = [], [], [], [], [], []
+    deslocamento = 0
+    profundidade = 0
+    for arvore in arvores:
+        t = arvore.tree_
+        folha = t.children_left == -1
+        indices = np.arange(t.node_count)
+        raizes.append(deslocamento)
+        features.append(np.where(folha, 0, t.feature))
+        limiares.append(np.where(folha, np.inf, t.threshold))
+        esquerdas.append(np.where(folha, indices, t.children_left) + deslocamento)
+        direitas.append(np.where(folha, indices, t.children_right) + deslocamento)
+        valores.append(valor_folha(t))
+        profundidade = max(profundidade, t.max_depth)
+        deslocamento += t.node_count
+    return {
+        "raizes": np.array(raizes, dtype=np.intp),
+        "feature": np.concatenate(features).astype(np.intp),
+        "limiar": np.concatenate(limiares).astype(np.float64),
+        "esquerda": np.concatenate(esquerdas).astype(np.intp),
+        "direita": np.concatenate(direitas).astype(np.intp),
+        "valor": np.concatenate(valores),
+        "profundidade": profundidade,
+    }
+
+
+def _proba_folhas(t) -> np.ndarray:
+    """Probabilidade por classe em cada nó, normalizada como no DecisionTreeClassifier."""
+    proba = np.array(t.value[:, 0, :], dtype=np.float64)
+    normalizador = proba.sum(axis=1, keepdims=True)
+    normalizador[normalizador == 0.0] = 1.0
+    return proba / normalizador
+
+
+def compilar_modelo(modelo, scaler=None) -> ModeloCompilado:
+    """
+    Converte o modelo (e o StandardScaler, se houver) em um ModeloCompilado.
+
+    Raises:
+        ValueError: se o estimador não for um ensemble de árvores suportado
+    """
+    from sklearn.dummy import DummyClassifier
+    from sklearn.ensemble import (ExtraTreesClassifier, GradientBoostingClassifier,
+                                  RandomForestClassifier)
+
+    n_features = getattr(modelo, 'n_features_in_', None)
+    if n_features is None:
+        raise ValueError(f"{type(modelo).__name__} não está treinado")
+
+    media = np.zeros(n_features)
+    escala = np.ones(n_features)
+    if scaler is not None:
+        if getattr(scaler, 'mean_', None) is None and getattr(scaler, 'scale_', None) is None:
+            raise ValueError(f"Scaler {type(scaler).__name__} não suportado (use StandardScaler)")
+        if getattr(scaler, 'mean_', None) is not None and getattr(scaler, 'with_mean', True):
+            media = np.asarray(scaler.mean_, dtype=np.float64)
+        if getattr(scaler, 'scale_', None) is not None and getattr(scaler, 'with_std', True):
+            escala = np.asarray(scaler.scale_, dtype=np.float64)
+
+    if isinstance(modelo, (RandomForestClassifier, ExtraTreesClassifier)):
+        if getattr(modelo, 'n_outputs_', 1) != 1:
+            raise ValueError("Florestas com múltiplas saídas não são suportadas")
+        arrays = _achatar(modelo.estimators_, _proba_folhas)
+        return ModeloCompilado('floresta', np.asarray(modelo.classes_), media=media, escala=escala, **arrays)
+
+    if isinstance(modelo, GradientBoostingClassifier):
+        perda = type(getattr(modelo, '_loss', None)).__name__
+        if perda not in ('HalfMultinomialLoss', 'HalfBinomialLoss'):
+            raise ValueError(f"GradientBoosting com perda {perda} não suportado (use log_loss)")
+        if not (isinstance(modelo.init_, str) and modelo.init_ == 'zero') and not isinstance(modelo.init_, DummyClassifier):
+            raise ValueError("GradientBoosting com estimador inicial próprio não é suportado")
+        # Com init 'zero' ou DummyClassifier (priors), a predição inicial não depende de X
+        raw_inicial = modelo._raw_predict_init(np.zeros((1, n_features), dtype=np.float32))[0]
+        estagios, k = modelo.estimators_.shape
+        taxa = modelo.learning_rate
+        # Ordem estágio a estágio, classe a classe (a mesma de predict_stages)
+        arvores = [modelo.estimators_[i, j] for i in range(estagios) for j in range(k)]
+        arrays = _achatar(arvores, lambda t: taxa * t.value[:, 0, 0])
+        return ModeloCompilado('gradient_boosting', np.asarray(modelo.classes_), media=media, escala=escala,
+                               raw_inicial=np.asarray(raw_inicial, dtype=np.float64), arvores_por_classe=k,
+                               **arrays)
+
+    raise ValueError(f"{type(modelo).__name__} não é compilável (suportados: RandomForest, ExtraTrees, GradientBoosting)")
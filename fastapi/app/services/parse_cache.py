@@ -0,0 +1,159 @@
+# fastapi/app/services/parse_cache.py
+"""
+Cache do parse dos CSVs do INMET em formato binário (Feather/Arrow IPC).
+
+A chave é o hash do conteúdo do arquivo: o mesmo CSV lido pelo /load-to-db, pelo
+populate_thingsboard ou pelos notebooks é parseado uma vez e depois carregado do
+cache já tipado (schema do weather_batch), com os metadados da estação no schema.
+
+- Os arquivos ficam em PARSE_CACHE_DIR como <hash>.v<versão do parser>.feather
+- Entradas de outra versão do parser são ignoradas e removidas na próxima gravação
+- O tamanho total é limitado a PARSE_CACHE_MAX_MB (remove as menos usadas)
+- PARSE_CACHE_ENABLED=0 desliga o cache
+"""
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from .metrics import PARSE_CACHE_CONSULTAS
+from .weather_batch import SCHEMA_DADOS_METEOROLOGICOS
+
+PARSE_CACHE_DIR = Path(os.getenv("PARSE_CACHE_DIR", Path(__file__).resolve().parents[1] / "data" / "cache"))
+PARSE_CACHE_MAX_MB = float(os.getenv("PARSE_CACHE_MAX_MB", "512"))
+
+_EXTENSAO = ".feather"
+_BLOCO_HASH = 1024 * 1024
+
+
+def cache_ativo() -> bool:
+    """False se PARSE_CACHE_ENABLED estiver desligado."""
+    return os.getenv("PARSE_CACHE_ENABLED", "1").strip().lower() not in ("0", "false", "no", "nao", "off")
+
+
+def chave_arquivo(file_path: Path) -> str:
+    """Hash (BLAKE2b, 128 bits) do conteúdo do arquivo."""
+    h = hashlib.blake2b(digest_size=16)
+    with open(file_path, "rb") as f:
+        for bloco in iter(lambda: f.read(_BLOCO_HASH), b""):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+def _caminho(chave: str, versao: str) -> Path:
+    return PARSE_CACHE_DIR / f"{chave}.v{versao}{_EXTENSAO}"
+
+
+def _versao(caminho: Path) -> str:
+    return caminho.name[:-len(_EXTENSAO)].rsplit(".v", 1)[-1]
+
+
+def buscar(chave: str, versao: str) -> Optional[Tuple[Dict, pa.Table]]:
+    """
+    (metadados da estação, tabela tipada) do cache, ou None se não houver entrada
+    para este conteúdo nesta versão do parser.
+    """
+    caminho = _caminho(chave, versao)
+    try:
+        tabela = feather.read_table(caminho, memory_map=True)
+    except (FileNotFoundError, OSError, pa.ArrowInvalid):
+        PARSE_CACHE_CONSULTAS.labels(resultado="miss").inc()
+        return None
+
+    metadados = tabela.schema.metadata or {}
+    estacao = json.loads(metadados.get(b"estacao", b"{}"))
+    # Marca como usada recentemente (ordem de remoção)
+    try:
+        os.utime(caminho)
+    except OSError:
+        pass
+    PARSE_CACHE_CONSULTAS.labels(resultado="hit").inc()
+    return estacao, tabela.replace_schema_metadata(None)
+
+
+def gravar_ao_ler(lotes: Iterator[pa.RecordBatch], chave: str, versao: str,
+                  estacao: Dict, origem: str = "") -> Iterator[pa.RecordBatch]:
+    """
+    Repassa os lotes do parser e os grava no cache ao mesmo tempo.
+    A entrada só é publicada se o iterador for consumido até o fim; se o consumidor
+    parar antes (ou houver erro), o arquivo temporário é descartado.
+    """
+    PARSE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    destino = _caminho(chave, versao)
+    temporario = destino.with_name(f".{destino.name}.{os.getpid()}.tmp")
+    schema = SCHEMA_DADOS_METEOROLOGICOS.with_metadata({
+        "estacao": json.dumps(estacao, ensure_ascii=False, default=str),
+        "versao_parser": versao,
+        "origem": origem,
+    })
+
+    concluido = False
+    try:
+        with pa.OSFile(str(temporario), "wb") as sink:
+            with pa.ipc.new_file(sink, schema, options=pa.ipc.IpcWriteOptions(compression="lz4")) as writer:
+                for lote in lotes:
+                    writer.write_batch(lote)
+                    yield lote
+        os.replace(temporario, destino)
+        concluido = True
+    finally:
+        if not concluido:
+            temporario.unlink(missing_ok=True)
+
+    try:
+        aplicar_limite(versao)
+    except Exception as e:
+        print(f"⚠️  Aviso: não foi possível limpar o cache de parse: {e}")
+
+
+def _entradas() -> List[Path]:
+    if not PARSE_CACHE_DIR.exists():
+        return []
+    return list(PARSE_CACHE_DIR.glob(f"*{_EXTENSAO}"))
+
+
+def aplicar_limite(versao_atual: str, max_mb: Optional[float] = None):
+    """
+    Remove entradas de outras versões do parser e, se o cache passar de max_mb
+    (padrão PARSE_CACHE_MAX_MB), as menos usadas recentemente.
+    """
+    limite = (PARSE_CACHE_MAX_MB if max_mb is None else max_mb) * 1e6
+    restantes = []
+    for caminho in _entradas():
+        if _versao(caminho) != versao_atual:
+            caminho.unlink(missing_ok=True)
+        else:
+            stat = caminho.stat()
+            restantes.append((stat.st_mtime, stat.st_size, caminho))
+
+    total = sum(tamanho for _, tamanho, _ in restantes)
+    for _, tamanho, caminho in sorted(restantes):
+        if total <= limite:
+            break
+        caminho.unlink(missing_ok=True)
+        total -= tamanho
+
+
+def estatisticas() -> Dict:
+    """Quantidade de entradas, tamanho total e versões do parser presentes."""
+    entradas = _entradas()
+    return {
+        "diretorio": str(PARSE_CACHE_DIR),
+        "ativo": cache_ativo(),
+        "entradas": len(entradas),
+        "tamanho_mb": round(sum(c.stat().st_size for c in entradas) / 1e6, 2),
+        "limite_mb": PARSE_CACHE_MAX_MB,
+        "versoes": sorted({_versao(c) for c in entradas}),
+    }
+
+
+def limpar() -> int:
+    """Remove todas as entradas do cache; retorna quantas foram removidas."""
+    entradas = _entradas()
+    for caminho in entradas:
+        caminho.unlink(missing_ok=True)
+    return len(entradas)
@@ -0,0 +1,176 @@
+# fastapi/app/services/partition_service.py
+"""
+Gerenciador de partições mensais de dados_meteorologicos.
+
+A tabela é particionada por mês em timestamp_utc. Este módulo:
+- garante que as partições existam antes de cada lote de ingestão (a função
+  criar_particoes_mensais é idempotente e segura entre processos, então não há
+  cache local que possa ficar desatualizado após um DETACH em outro worker);
+- cria partições futuras com antecedência (na inicialização da API);
+- desanexa partições antigas (que continuam como tabelas avulsas) e as reanexa
+  sob pedido (anexar_particao). A ingestão nunca reanexa um mês desanexado: o
+  lote falha com erro explícito até a partição ser reanexada.
+"""
+import os
+import re
+from datetime import datetime, timezone
+from typing import Dict, List
+
+from .db_service import get_db_connection
+
+TABELA_PADRAO = "dados_meteorologicos"
+
+# Quantos meses à frente manter criados
+PARTICOES_FUTURAS_MESES = int(os.getenv("PARTICOES_FUTURAS_MESES", "3"))
+
+_PADRAO_NOME = re.compile(r"^(?P<tabela>.+)_p(?P<ano>\d{4})_(?P<mes>\d{2})$")
+
+
+def _proximo_mes(ano: int, mes: int) -> datetime:
+    return datetime(ano + 1, 1, 1) if mes == 12 else datetime(ano, mes + 1, 1)
+
+
+def garantir_particoes(conn, inicio: datetime, fim: datetime, tabela: str = TABELA_PADRAO) -> int:
+    """
+    Garante que existam partições para todo o intervalo [inicio, fim], usando a conexão
+    informada (criar_particoes_mensais, com commit). Quando todas já existem, é uma
+    única consulta ao catálogo, sem lock. RuntimeError se algum mês estiver desanexado.
+    """
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT criar_particoes_mensais(%s, %s, %s)", (tabela, inicio, fim))
+        criadas = cur.fetchone()[0]
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        raise RuntimeError(f"Erro ao criar partições de {tabela}: {e}")
+    finally:
+        cur.close()
+
+    if criadas:
+        print(f"🧩 {criadas} partição(ões) criada(s) em {tabela}")
+    return criadas
+
+
+def criar_particoes_futuras(meses: int = PARTICOES_FUTURAS_MESES, tabela: str = TABELA_PADRAO) -> int:
+    """
+    Cria as partições do mês atual até `meses` meses à frente.
+    """
+    hoje = datetime.now(timezone.utc)
+    ano, mes = hoje.year, hoje.month
+    for _ in range(meses):
+        ano, mes = (ano + 1, 1) if mes == 12 else (ano, mes + 1)
+
+    conn = get_db_connection()
+    try:
+        return garantir_particoes(conn, datetime(hoje.year, hoje.month, 1), datetime(ano, mes, 1), tabela)
+    finally:
+        conn.close()
+
+
+def listar_particoes(tabela: str = TABELA_PADRAO) -> List[Dict]:
+    """
+    Lista as partições (anexadas ou não) de uma tabela, com estimativa de linhas e tamanho.
+    """
+    conn = get_db_connection()
+    cur = conn.cursor()
+
+    try:
+        cur.execute("""
+            SELECT
+                c.relname,
+                i.inhparent IS NOT NULL AS anexada,
+                c.reltuples::BIGINT AS linhas_estimadas,
+                pg_total_relation_size(c.oid) AS tamanho_bytes
+            FROM pg_class c
+            LEFT JOIN pg_inherits i ON i.inhrelid = c.oid AND i.inhparent = to_regclass(%s)
+            WHERE c.relkind = 'r'
+              AND c.relname LIKE %s
+            ORDER BY c.relname
+        """, (tabela, f"{tabela}_p%"))
+
+        particoes = []
+        for nome, anexada, linhas, tamanho in cur.fetchall():
+            match = _PADRAO_NOME.match(nome)
+            if not match or match.group("tabela") != tabela:
+                continue
+            ano, mes = int(match.group("ano")), int(match.group("mes"))
+            particoes.append({
+                "nome": nome,
+                "inicio": datetime(ano, mes, 1).isoformat(),
+                "fim": _proximo_mes(ano, mes).isoformat(),
+                "anexada": anexada,
+                "linhas_estimadas": max(linhas, 0),
+                "tamanho_bytes": tamanho
+            })
+        return particoes
+    except Exception as e:
+        raise RuntimeError(f"Erro ao listar partições de {tabela}: {e}")
+    finally:
+        cur.close()
+        conn.close()
+
+
+def desanexar_particoes_antigas(manter_meses: int, tabela: str = TABELA_PADRAO) -> List[str]:
+    """
+    Desanexa partições que terminam antes de `manter_meses` meses atrás.
+    As partições viram tabelas avulsas (podem ser arquivadas ou reanexadas com anexar_particao).
+    Usa DETACH ... CONCURRENTLY para não bloquear leituras e ingestão.
+    """
+    hoje = datetime.now(timezone.utc)
+    ano, mes = hoje.year, hoje.month
+    for _ in range(manter_meses):
+        ano, mes = (ano - 1, 12) if mes == 1 else (ano, mes - 1)
+    limite = datetime(ano, mes, 1)
+
+    candidatas = [p for p in listar_particoes(tabela)
+                  if p["anexada"] and datetime.fromisoformat(p["fim"]) <= limite]
+    if not candidatas:
+        return []
+
+    conn = get_db_connection()
+    # DETACH CONCURRENTLY não pode rodar dentro de um bloco de transação
+    conn.autocommit = True
+    cur = conn.cursor()
+    desanexadas = []
+
+    try:
+        for particao in candidatas:
+            cur.execute(f'ALTER TABLE "{tabela}" DETACH PARTITION "{particao["nome"]}" CONCURRENTLY')
+            desanexadas.append(particao["nome"])
+            print(f"📦 Partição desanexada: {particao['nome']}")
+    except Exception as e:
+        raise RuntimeError(f"Erro ao desanexar partições de {tabela}: {e}")
+    finally:
+        cur.close()
+        conn.close()
+
+    return desanexadas
+
+
+def anexar_particao(nome: str, tabela: str = TABELA_PADRAO) -> bool:
+    """
+    Reanexa uma partição desanexada (<tabela>_pAAAA_MM) ao seu intervalo mensal.
+    Retorna False se ela já estava anexada. O ATTACH valida todas as linhas da partição.
+    """
+    match = _PADRAO_NOME.match(nome)
+    if not match or match.group("tabela") != tabela:
+        raise ValueError(f"Nome de partição inválido: {nome}")
+
+    inicio = datetime(int(match.group("ano")), int(match.group("mes")), 1)
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT anexar_particao_mensal(%s, %s)", (tabela, inicio))
+        anexada = cur.fetchone()[0]
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        raise RuntimeError(f"Erro ao anexar a partição {nome}: {e}")
+    finally:
+        cur.close()
+        conn.close()
+
+    if anexada:
+        print(f"🧩 Partição reanexada: {nome}")
+    return anexada
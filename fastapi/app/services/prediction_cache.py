@@ -0,0 +1,167 @@
+# fastapi/app/services/prediction_cache.py
+"""
+Cache em memória dos resultados do modelo (LRU com TTL).
+
+Gateways reenviam o mesmo payload ao /predict e os dashboards repontuam as mesmas
+observações estação-hora pelo /predict-from-db. A chave é a versão do modelo em uso
+mais o hash do vetor de features (antes da normalização), opcionalmente arredondado
+em PREDICAO_CACHE_CASAS casas decimais: vetores que só diferem abaixo disso
+compartilham o resultado. Quando o modelo ativo muda (load_best_model, recarga do
+treino incremental, usar_modelo_local), o cache é esvaziado.
+
+Guarda o resultado bruto do modelo por linha: (código da classe, probabilidades).
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from .metrics import PREDICTION_CACHE_EVICTIONS, PREDICTION_CACHE_REQUESTS, PREDICTION_CACHE_SIZE
+
+# Entradas mantidas (0 desliga o cache)
+PREDICAO_CACHE_TAMANHO = int(os.getenv("PREDICAO_CACHE_TAMANHO", "10000"))
+# Tempo de vida de cada entrada (segundos)
+PREDICAO_CACHE_TTL = int(os.getenv("PREDICAO_CACHE_TTL", "600"))
+# Casas decimais das features na chave (vazio = valores exatos)
+PREDICAO_CACHE_CASAS = os.getenv("PREDICAO_CACHE_CASAS", "").strip()
+
+# (código da classe, probabilidades por classe ou None)
+Resultado = Tuple[object, Optional[np.ndarray]]
+
+
+def chaves_features(X: np.ndarray, casas: Optional[int] = None) -> List[bytes]:
+    """Hash de cada linha da matriz de features (arredondada em `casas`, se informado)."""
+    X = np.asarray(X, dtype=np.float64)
+    if X.ndim == 1:
+        X = X.reshape(1, -1)
+    if casas is not None:
+        X = np.round(X, casas)
+    # -0.0 e 0.0 viram a mesma chave
+    X = np.ascontiguousarray(X + 0.0)
+    return [hashlib.blake2b(linha.tobytes(), digest_size=16).digest() for linha in X]
+
+
+class CachePredicoes:
+    """LRU com TTL dos resultados do modelo, por versão do modelo."""
+
+    def __init__(self, tamanho: int = PREDICAO_CACHE_TAMANHO, ttl: int = PREDICAO_CACHE_TTL,
+                 casas: Optional[int] = int(PREDICAO_CACHE_CASAS) if PREDICAO_CACHE_CASAS else None):
+        self.tamanho = tamanho
+        self.ttl = ttl
+        self.casas = casas
+        self._entradas: "OrderedDict[Tuple[Hashable, bytes], Tuple[float, Resultado]]" = OrderedDict()
+        self._versao: Hashable = None
+        self._acertos = 0
+        self._faltas = 0
+        self._lock = threading.Lock()
+
+    @property
+    def ativo(self) -> bool:
+        return self.tamanho > 0
+
+    def chaves(self, X: np.ndarray) -> List[bytes]:
+        return chaves_features(X, self.casas)
+
+    def definir_versao(self, versao: Hashable):
+        """Troca a versão do modelo; as entradas da versão anterior são descartadas."""
+        with self._lock:
+            if versao != self._versao:
+                self._versao = versao
+                self._esvaziar()
+
+    def _esvaziar(self) -> int:
+        removidas = len(self._entradas)
+        self._entradas.clear()
+        PREDICTION_CACHE_SIZE.set(0)
+        return removidas
+
+    def buscar(self, chaves: List[bytes], versao: Hashable = None) -> List[Optional[Resultado]]:
+        """
+        Resultado em cache de cada chave (None quando ausente ou expirado). Com `versao`
+        (o modelo que vai atender a requisição), tudo é falta se ela não for a atual.
+        """
+        if not self.ativo:
+            return [None] * len(chaves)
+        agora = time.monotonic()
+        encontrados = []
+        with self._lock:
+            atual = versao is None or versao == self._versao
+            for chave in chaves:
+                entrada = self._entradas.get((self._versao, chave)) if atual else None
+                if entrada is not None and entrada[0] < agora:
+                    del self._entradas[(self._versao, chave)]
+                    entrada = None
+                if entrada is None:
+                    encontrados.append(None)
+                else:
+                    self._entradas.move_to_end((self._versao, chave))
+                    encontrados.append(entrada[1])
+            acertos = sum(1 for e in encontrados if e is not None)
+            self._acertos += acertos
+            self._faltas += len(chaves) - acertos
+            PREDICTION_CACHE_SIZE.set(len(self._entradas))
+        PREDICTION_CACHE_REQUESTS.labels(resultado="hit").inc(acertos)
+        PREDICTION_CACHE_REQUESTS.labels(resultado="miss").inc(len(chaves) - acertos)
+        return encontrados
+
+    def guardar(self, chaves: List[bytes], resultados: List[Resultado], versao: Hashable):
+        """
+        Guarda os resultados calculados com o modelo `versao` (ignorados se o modelo
+        tiver mudado durante a predição).
+        """
+        if not self.ativo:
+            return
+        expira_em = time.monotonic() + self.ttl
+        with self._lock:
+            if versao != self._versao:
+                return
+            for chave, resultado in zip(chaves, resultados):
+                self._entradas[(versao, chave)] = (expira_em, resultado)
+                self._entradas.move_to_end((versao, chave))
+            excesso = len(self._entradas) - self.tamanho
+            for _ in range(max(excesso, 0)):
+                self._entradas.popitem(last=False)
+            PREDICTION_CACHE_SIZE.set(len(self._entradas))
+        if excesso > 0:
+            PREDICTION_CACHE_EVICTIONS.inc(excesso)
+
+    def limpar(self) -> int:
+        """Remove todas as entradas e retorna quantas havia."""
+        with self._lock:
+            return self._esvaziar()
+
+    def estatisticas(self) -> Dict:
+        with self._lock:
+            total = self._acertos + self._faltas
+            return {
+                "ativo": self.ativo,
+                "entradas": len(self._entradas),
+                "tamanho_maximo": self.tamanho,
+                "ttl_segundos": self.ttl,
+                "casas_decimais": self.casas,
+                "versao_modelo": str(self._versao) if self._versao is not None else None,
+                "acertos": self._acertos,
+                "faltas": self._faltas,
+                "taxa_acerto": round(self._acertos / total, 4) if total else None,
+            }
+
+
+# Instância única da API
+_cache = CachePredicoes()
+
+
+def obter_cache_predicoes() -> CachePredicoes:
+    return _cache
+
+
+def estatisticas() -> Dict:
+    """Entradas, configuração e taxa de acerto do cache de predições."""
+    return _cache.estatisticas()
+
+
+def limpar() -> int:
+    return _cache.limpar()
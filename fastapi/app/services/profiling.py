@@ -0,0 +1,144 @@
+# fastapi/app/services/profiling.py
+"""
+Profiling sob demanda dos endpoints do pipeline (cProfile).
+
+Ativação, por requisição:
+    - header `X-Profile: 1`
+    - query string `?profile=1`
+ou para todas as chamadas dos endpoints marcados com @perfilavel:
+    - variável de ambiente PROFILING_ENABLED=1
+
+Cada perfil é salvo em PROFILING_DIR como <id>.prof (formato pstats, abre no
+snakeviz/pstats) e <id>.txt (resumo: funções mais caras e as de services.*).
+Com o profiling desligado o custo é uma leitura de contextvar por chamada.
+"""
+import cProfile
+import io
+import os
+import pstats
+import re
+import time
+from contextvars import ContextVar
+from datetime import datetime
+from functools import wraps
+from pathlib import Path
+from typing import Dict, List, Optional
+
+PROFILING_DIR = Path(os.getenv("PROFILING_DIR", Path(__file__).resolve().parents[1] / "profiles"))
+PROFILING_MAX_ARQUIVOS = int(os.getenv("PROFILING_MAX_ARQUIVOS", "50"))
+HEADER_PROFILE = "x-profile"
+QUERY_PROFILE = "profile"
+
+_VALORES_ATIVOS = {"1", "true", "yes", "sim", "on"}
+_ID_VALIDO = re.compile(r"^[\w.-]+$")
+
+# Preenchido pelo middleware quando a requisição pediu profiling. É um dicionário
+# (e não um valor simples) porque endpoints síncronos rodam no threadpool com uma
+# cópia do contexto: o id do perfil gerado volta ao middleware por ele.
+_perfil_requisicao: ContextVar[Optional[Dict]] = ContextVar("perfil_requisicao", default=None)
+
+
+def _ativo(valor: Optional[str]) -> bool:
+    return valor is not None and valor.strip().lower() in _VALORES_ATIVOS
+
+
+def profiling_global() -> bool:
+    """True se PROFILING_ENABLED está ligado (perfila todas as chamadas marcadas)."""
+    return _ativo(os.getenv("PROFILING_ENABLED"))
+
+
+def requisicao_pede_perfil(headers, query_params) -> bool:
+    """True se a requisição pediu profiling via header ou query string."""
+    return _ativo(headers.get(HEADER_PROFILE)) or _ativo(query_params.get(QUERY_PROFILE))
+
+
+def iniciar_perfil_requisicao() -> Dict:
+    """Marca a requisição atual para profiling; retorna o estado compartilhado."""
+    estado = {}
+    _perfil_requisicao.set(estado)
+    return estado
+
+
+def _limpar_antigos():
+    perfis = sorted(PROFILING_DIR.glob("*.prof"), key=lambda p: p.stat().st_mtime)
+    for antigo in perfis[:max(0, len(perfis) - PROFILING_MAX_ARQUIVOS)]:
+        antigo.unlink(missing_ok=True)
+        antigo.with_suffix(".txt").unlink(missing_ok=True)
+
+
+def _resumo(profiler: cProfile.Profile, nome: str, segundos: float) -> str:
+    """Texto com as funções mais caras no total e as funções dos services."""
+    saida = io.StringIO()
+    saida.write(f"Perfil de {nome}: {segundos:.3f} s\n\n")
+    stats = pstats.Stats(profiler, stream=saida)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE)
+    saida.write("=== Top 40 por tempo acumulado ===\n")
+    stats.print_stats(40)
+    saida.write("\n=== Funções de services/ (db_service, csv_processor, ...) ===\n")
+    stats.print_stats(r"services[/\\]", 40)
+    return saida.getvalue()
+
+
+def _salvar_perfil(profiler: cProfile.Profile, nome: str, segundos: float) -> str:
+    PROFILING_DIR.mkdir(parents=True, exist_ok=True)
+    perfil_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}_{nome}"
+    profiler.dump_stats(str(PROFILING_DIR / f"{perfil_id}.prof"))
+    (PROFILING_DIR / f"{perfil_id}.txt").write_text(_resumo(profiler, nome, segundos), encoding="utf-8")
+    _limpar_antigos()
+    print(f"🔬 Perfil salvo: {perfil_id} ({segundos:.2f} s)")
+    return perfil_id
+
+
+def perfilavel(func):
+    """
+    Decorator para endpoints (síncronos) que podem ser perfilados.
+    Roda a função sob cProfile quando a requisição pediu ou PROFILING_ENABLED=1.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        estado = _perfil_requisicao.get()
+        if estado is None and not profiling_global():
+            return func(*args, **kwargs)
+
+        profiler = cProfile.Profile()
+        inicio = time.perf_counter()
+        profiler.enable()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profiler.disable()
+            try:
+                perfil_id = _salvar_perfil(profiler, func.__name__, time.perf_counter() - inicio)
+                if estado is not None:
+                    estado["perfil_id"] = perfil_id
+            except Exception as e:
+                print(f"⚠️  Aviso: não foi possível salvar o perfil de {func.__name__}: {e}")
+    return wrapper
+
+
+def listar_perfis() -> List[Dict]:
+    """Perfis disponíveis, do mais recente para o mais antigo."""
+    if not PROFILING_DIR.exists():
+        return []
+    perfis = []
+    for arquivo in sorted(PROFILING_DIR.glob("*.prof"), key=lambda p: p.stat().st_mtime, reverse=True):
+        stat = arquivo.stat()
+        perfis.append({
+            "id": arquivo.stem,
+            "criado_em": datetime.fromtimestamp(stat.st_mtime).isoformat(timespec="seconds"),
+            "tamanho_bytes": stat.st_size,
+        })
+    return perfis
+
+
+def caminho_perfil(perfil_id: str, formato: str = "prof") -> Path:
+    """
+    Caminho do arquivo do perfil (formato 'prof' ou 'txt').
+    Lança ValueError para id/formato inválido e FileNotFoundError se não existir.
+    """
+    if formato not in ("prof", "txt") or not _ID_VALIDO.match(perfil_id):
+        raise ValueError(f"Perfil inválido: {perfil_id}.{formato}")
+    caminho = PROFILING_DIR / f"{perfil_id}.{formato}"
+    if not caminho.exists():
+        raise FileNotFoundError(f"Perfil não encontrado: {perfil_id}")
+    return caminho
@@ -0,0 +1,207 @@
+# fastapi/app/services/reclassification.py
+"""
+Reclassificação de intensidade_chuva em lote, dentro do banco.
+
+Em vez de um UPDATE por id (execute_batch com iterrows no notebook 02), cada bloco
+de tempo recebe um único UPDATE baseado em conjunto com classificar_intensidade_chuva()
+(sql_scripts/03_update_intensidade_chuva.sql):
+
+- blocos de RECLASSIFICACAO_DIAS_POR_BLOCO dias, sem atravessar o limite das partições
+  mensais (cada UPDATE toca uma partição);
+- cada bloco é uma transação curta e só altera linhas cuja classe muda;
+- lock_timeout curto com novas tentativas: com a ingestão rodando ao mesmo tempo,
+  nenhum dos dois fica esperando pelo outro mais do que um bloco;
+- na mesma transação do bloco, as tabelas derivadas de intensidade_chuva
+  (rollup_dados_meteorologicos e o rótulo em features_intensidade) são recalculadas
+  para as estações e horas que mudaram de classe.
+
+A execução roda em segundo plano (ou na hora, com aguardar) e o progresso é
+consultado por id (obter_tarefa), como no /pipeline/reclassify. Só uma
+reclassificação roda por vez nesta instância.
+"""
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from psycopg2 import errors
+
+from .db_service import get_db_connection
+from .metrics import RECLASSIFICATION_BLOCK, RECLASSIFICATION_ROWS, cronometrar
+from .tarefas import RegistroTarefas
+
+RECLASSIFICACAO_DIAS_POR_BLOCO = int(os.getenv("RECLASSIFICACAO_DIAS_POR_BLOCO", "7"))
+RECLASSIFICACAO_LOCK_TIMEOUT = os.getenv("RECLASSIFICACAO_LOCK_TIMEOUT", "2s")
+RECLASSIFICACAO_TENTATIVAS = int(os.getenv("RECLASSIFICACAO_TENTATIVAS", "5"))
+
+# Tarefas desta instância da API
+_registro = RegistroTarefas("Reclassificação", "reclassificacao")
+
+# Intervalo alterado por estação: (codigo_wmo, primeira hora, última hora, linhas)
+_SQL_RECLASSIFICAR = """
+    WITH alteradas AS (
+        UPDATE dados_meteorologicos
+        SET intensidade_chuva = classificar_intensidade_chuva(precipitacao_mm)
+        WHERE timestamp_utc >= %s AND timestamp_utc < %s
+          {filtro_estacao}
+          AND intensidade_chuva IS DISTINCT FROM classificar_intensidade_chuva(precipitacao_mm)
+        RETURNING codigo_wmo, timestamp_utc
+    )
+    SELECT codigo_wmo, MIN(timestamp_utc), MAX(timestamp_utc), COUNT(*)
+    FROM alteradas
+    GROUP BY codigo_wmo
+"""
+
+
+def _proximo_mes(momento: datetime) -> datetime:
+    return datetime(momento.year + 1, 1, 1) if momento.month == 12 else datetime(momento.year, momento.month + 1, 1)
+
+
+def dividir_em_blocos(inicio: datetime, fim: datetime, dias: int = RECLASSIFICACAO_DIAS_POR_BLOCO) -> List[Tuple[datetime, datetime]]:
+    """
+    Divide [inicio, fim) em blocos de até `dias` dias que não atravessam a virada
+    do mês (limite das partições de dados_meteorologicos).
+    """
+    blocos = []
+    a = inicio
+    passo = timedelta(days=max(dias, 1))
+    while a < fim:
+        b = min(a + passo, _proximo_mes(a), fim)
+        blocos.append((a, b))
+        a = b
+    return blocos
+
+
+def _intervalo_dados(codigo_wmo: Optional[str]) -> Optional[Tuple[datetime, datetime]]:
+    """(primeiro timestamp, último timestamp + 1h) dos dados, ou None se não houver."""
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        if codigo_wmo:
+            cur.execute("SELECT MIN(timestamp_utc), MAX(timestamp_utc) FROM dados_meteorologicos WHERE codigo_wmo = %s",
+                        (codigo_wmo,))
+        else:
+            cur.execute("SELECT MIN(timestamp_utc), MAX(timestamp_utc) FROM dados_meteorologicos")
+        inicio, fim = cur.fetchone()
+        if inicio is None:
+            return None
+        return inicio, fim + timedelta(hours=1)
+    finally:
+        cur.close()
+        conn.close()
+
+
+def reclassificar_bloco(conn, inicio: datetime, fim: datetime, codigo_wmo: Optional[str] = None) -> int:
+    """
+    Reclassifica [inicio, fim) em uma transação; retorna as linhas alteradas.
+    Rollups e features das estações alteradas são recalculados antes do commit, então
+    dashboards e treino nunca veem a classe nova sem os derivados.
+    Se não conseguir os locks em RECLASSIFICACAO_LOCK_TIMEOUT (ex: um INSERT da ingestão
+    nas mesmas linhas) ou houver deadlock, desfaz e tenta de novo.
+    """
+    sql = _SQL_RECLASSIFICAR.format(filtro_estacao="AND codigo_wmo = %s" if codigo_wmo else "")
+    params = (inicio, fim, codigo_wmo) if codigo_wmo else (inicio, fim)
+
+    for tentativa in range(1, RECLASSIFICACAO_TENTATIVAS + 1):
+        cur = conn.cursor()
+        try:
+            with cronometrar(RECLASSIFICATION_BLOCK):
+                cur.execute("SET LOCAL lock_timeout = %s", (RECLASSIFICACAO_LOCK_TIMEOUT,))
+                cur.execute(sql, params)
+                intervalos = cur.fetchall()
+                for codigo, primeira, ultima, _ in intervalos:
+                    cur.execute("SELECT atualizar_rollups(%s, %s, %s)", (codigo, primeira, ultima))
+                    cur.execute("SELECT atualizar_features_intensidade(%s, %s, %s)", (codigo, primeira, ultima))
+                alteradas = sum(linhas for *_, linhas in intervalos)
+                conn.commit()
+            RECLASSIFICATION_ROWS.inc(alteradas)
+            return alteradas
+        except (errors.LockNotAvailable, errors.DeadlockDetected) as e:
+            conn.rollback()
+            if tentativa == RECLASSIFICACAO_TENTATIVAS:
+                raise RuntimeError(f"Erro ao reclassificar {inicio:%Y-%m-%d}..{fim:%Y-%m-%d}: {e}")
+            print(f"⚠️  Bloco {inicio:%Y-%m-%d} ocupado pela ingestão, nova tentativa ({tentativa})")
+            time.sleep(0.5 * tentativa)
+        except Exception as e:
+            conn.rollback()
+            raise RuntimeError(f"Erro ao reclassificar {inicio:%Y-%m-%d}..{fim:%Y-%m-%d}: {e}")
+        finally:
+            cur.close()
+
+
+def reclassificar_intensidade(inicio: Optional[datetime] = None, fim: Optional[datetime] = None,
+                              codigo_wmo: Optional[str] = None,
+                              dias_por_bloco: int = RECLASSIFICACAO_DIAS_POR_BLOCO,
+                              progresso: Optional[Callable[[Dict], None]] = None) -> Dict:
+    """
+    Reclassifica intensidade_chuva de uma estação (ou todas) em [inicio, fim), um
+    bloco por vez. Sem inicio/fim, cobre todo o período com dados.
+    `progresso` é chamado após cada bloco com o estado acumulado.
+    """
+    intervalo = _intervalo_dados(codigo_wmo)
+    estado = {
+        "blocos_total": 0,
+        "blocos_concluidos": 0,
+        "linhas_atualizadas": 0,
+        "bloco_atual": None,
+    }
+    if intervalo is None:
+        return estado
+
+    inicio = max(inicio or intervalo[0], intervalo[0])
+    fim = min(fim or intervalo[1], intervalo[1])
+    blocos = dividir_em_blocos(inicio, fim, dias_por_bloco)
+    estado["blocos_total"] = len(blocos)
+    if progresso:
+        progresso(estado)
+
+    conn = get_db_connection()
+    try:
+        for a, b in blocos:
+            estado["bloco_atual"] = f"{a.isoformat()} .. {b.isoformat()}"
+            estado["linhas_atualizadas"] += reclassificar_bloco(conn, a, b, codigo_wmo)
+            estado["blocos_concluidos"] += 1
+            if progresso:
+                progresso(estado)
+    finally:
+        conn.close()
+
+    estado["bloco_atual"] = None
+    return estado
+
+
+# ============================================================================
+# EXECUÇÃO EM SEGUNDO PLANO
+# ============================================================================
+
+def _campos_progresso(estado: Dict) -> Dict:
+    total = estado["blocos_total"]
+    return {**estado, "percentual": round(100.0 * estado["blocos_concluidos"] / total, 1) if total else 100.0}
+
+
+def _resumo(estado: Dict) -> str:
+    return f"{estado['linhas_atualizadas']} linhas em {estado['blocos_total']} blocos"
+
+
+def iniciar_reclassificacao(inicio: Optional[datetime] = None, fim: Optional[datetime] = None,
+                            codigo_wmo: Optional[str] = None,
+                            dias_por_bloco: int = RECLASSIFICACAO_DIAS_POR_BLOCO,
+                            aguardar: bool = False) -> Dict:
+    """
+    Dispara a reclassificação (em uma thread, ou na hora com aguardar=True) e retorna o
+    estado da tarefa. ValueError se já houver uma em execução nesta instância.
+    """
+    parametros = {"inicio": inicio, "fim": fim, "codigo_wmo": codigo_wmo, "dias_por_bloco": dias_por_bloco}
+    return _registro.iniciar(reclassificar_intensidade, parametros, aguardar=aguardar,
+                             campos=_campos_progresso, resumo=_resumo,
+                             blocos_total=None, blocos_concluidos=0, linhas_atualizadas=0, percentual=0.0)
+
+
+def obter_tarefa(tarefa_id: str) -> Optional[Dict]:
+    """Estado (progresso) de uma tarefa de reclassificação, ou None se não existir."""
+    return _registro.obter(tarefa_id)
+
+
+def listar_tarefas() -> List[Dict]:
+    """Tarefas de reclassificação desta instância, da mais recente para a mais antiga."""
+    return _registro.listar()
@@ -1,9 +1,11 @@
 # fastapi/app/services/s3_service.py
 import boto3
 import os
+import time
 from pathlib import Path
 from dotenv import load_dotenv
 from botocore.exceptions import ClientError
+from .metrics import registrar_upload
 
 # Carrega as variáveis de ambiente do .env
 # Tenta carregar do diretório atual (services/) primeiro, depois do diretório pai
@@ -69,7 +71,31 @@ def upload_to_minio(file_path: Path):
     ensure_bucket_exists(bucket)
 
     try:
+        inicio = time.perf_counter()
         s3.upload_file(str(file_path), bucket, key)
+        registrar_upload(file_path.stat().st_size, time.perf_counter() - inicio)
         print(f"✅ Enviado: {file_path.name} → s3://{bucket}/{key}")
     except Exception as e:
         raise RuntimeError(f"Erro ao enviar {file_path.name}: {e}")
+
+def upload_lotes_parquet(lotes, nome_arquivo: str) -> str:
+    """
+    Serializa lotes colunares (weather_batch) em um único Parquet e envia para raw/.
+    Retorna a chave do objeto no bucket.
+    """
+    from .weather_batch import lotes_para_parquet
+
+    bucket = os.getenv("S3_BUCKET_NAME", "inmet-data")
+    key = f"raw/{nome_arquivo}"
+
+    ensure_bucket_exists(bucket)
+
+    try:
+        conteudo = lotes_para_parquet(lotes)
+        inicio = time.perf_counter()
+        s3.put_object(Bucket=bucket, Key=key, Body=conteudo, ContentType="application/vnd.apache.parquet")
+        registrar_upload(len(conteudo), time.perf_counter() - inicio)
+        print(f"✅ Enviado: {nome_arquivo} → s3://{bucket}/{key}")
+        return key
+    except Exception as e:
+        raise RuntimeError(f"Erro ao enviar {nome_arquivo}: {e}")
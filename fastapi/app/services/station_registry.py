@@ -0,0 +1,155 @@
+# fastapi/app/services/station_registry.py
+"""
+Registro em memória das estações meteorológicas.
+
+Carrega a tabela estacoes uma vez e a mantém em cache com TTL, evitando uma consulta
+por predição (nome da estação) e um upsert por arquivo/dispositivo na ingestão:
+a estação só é gravada no banco quando seus metadados mudam.
+"""
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+from .db_service import get_db_connection, insert_estacao, parse_data_fundacao
+
+# Tempo de vida do cache (segundos). Outras instâncias podem alterar estacoes.
+ESTACOES_CACHE_TTL = int(os.getenv("ESTACOES_CACHE_TTL", "300"))
+
+CAMPOS_ESTACAO = ('regiao', 'uf', 'nome', 'latitude', 'longitude', 'altitude', 'data_fundacao')
+
+# Casas decimais das colunas DECIMAL de estacoes (para comparar com o que está no banco)
+_ESCALAS = {'latitude': 8, 'longitude': 8, 'altitude': 2}
+
+
+def _normalizar(campo: str, valor):
+    """Normaliza um valor de metadado para o tipo/precisão armazenado no banco."""
+    if valor is None or valor == '':
+        return None
+    if campo in _ESCALAS:
+        try:
+            return round(float(valor), _ESCALAS[campo])
+        except (TypeError, ValueError):
+            return None
+    if campo == 'data_fundacao':
+        return parse_data_fundacao(valor)
+    return str(valor).strip()
+
+
+class StationRegistry:
+    """
+    Cache das estações (codigo_wmo -> metadados), compartilhado pela ingestão e pela predição.
+    """
+
+    def __init__(self, ttl: int = ESTACOES_CACHE_TTL):
+        self.ttl = ttl
+        self._estacoes: Dict[str, Dict] = {}
+        self._carregado_em: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def _expirado(self) -> bool:
+        return self._carregado_em is None or time.monotonic() - self._carregado_em > self.ttl
+
+    def _carregar(self):
+        """Lê todas as estações do banco (chamado com o lock adquirido)."""
+        conn = get_db_connection()
+        cur = conn.cursor()
+        try:
+            cur.execute("""
+                SELECT codigo_wmo, regiao, uf, nome, latitude, longitude, altitude, data_fundacao
+                FROM estacoes
+            """)
+            self._estacoes = {
+                row[0]: {campo: _normalizar(campo, valor) for campo, valor in zip(CAMPOS_ESTACAO, row[1:])}
+                for row in cur.fetchall()
+            }
+            self._carregado_em = time.monotonic()
+        finally:
+            cur.close()
+            conn.close()
+
+    def _garantir_carregado(self):
+        if self._expirado():
+            with self._lock:
+                if self._expirado():
+                    self._carregar()
+
+    def invalidar(self):
+        """Descarta o cache; a próxima consulta recarrega do banco."""
+        with self._lock:
+            self._estacoes = {}
+            self._carregado_em = None
+
+    def obter(self, codigo_wmo: str) -> Optional[Dict]:
+        """Retorna os metadados da estação (ou None se não existir)."""
+        if not codigo_wmo:
+            return None
+        self._garantir_carregado()
+        estacao = self._estacoes.get(codigo_wmo)
+        return dict(estacao) if estacao else None
+
+    def codigos(self) -> List[str]:
+        """Códigos WMO de todas as estações conhecidas."""
+        self._garantir_carregado()
+        return sorted(self._estacoes)
+
+    def obter_nome(self, codigo_wmo: str) -> Optional[str]:
+        """Retorna o nome da estação (ou None se não existir)."""
+        estacao = self.obter(codigo_wmo)
+        return estacao['nome'] if estacao else None
+
+    def registrar(self, codigo_wmo: str, **metadados) -> bool:
+        """
+        Garante que a estação exista no banco com os metadados informados.
+        Só faz o upsert se a estação for nova ou se algum metadado mudou; campos
+        None/vazios não sobrescrevem o valor já conhecido.
+        Retorna True se a estação foi gravada no banco.
+        """
+        self._garantir_carregado()
+
+        with self._lock:
+            atual = self._estacoes.get(codigo_wmo)
+            novo = dict(atual) if atual else {campo: None for campo in CAMPOS_ESTACAO}
+            for campo in CAMPOS_ESTACAO:
+                valor = _normalizar(campo, metadados.get(campo))
+                if valor is not None:
+                    novo[campo] = valor
+
+            if atual == novo:
+                return False
+
+            insert_estacao(
+                codigo_wmo=codigo_wmo,
+                regiao=novo['regiao'] or '',
+                uf=novo['uf'] or '',
+                nome=novo['nome'] or '',
+                latitude=novo['latitude'],
+                longitude=novo['longitude'],
+                altitude=novo['altitude'],
+                data_fundacao=novo['data_fundacao']
+            )
+            self._estacoes[codigo_wmo] = novo
+            return True
+
+
+_registry = StationRegistry()
+
+
+def get_station_registry() -> StationRegistry:
+    """Retorna o registro de estações compartilhado pelo processo."""
+    return _registry
+
+
+def obter_nome_estacao(codigo_wmo: str) -> Optional[str]:
+    """Nome da estação a partir do cache."""
+    return _registry.obter_nome(codigo_wmo)
+
+
+def registrar_estacao(codigo_wmo: str, **metadados) -> bool:
+    """Upsert da estação apenas se os metadados mudaram."""
+    return _registry.registrar(codigo_wmo, **metadados)
+
+
+def invalidar_estacoes():
+    """Invalida o cache de estações."""
+    _registry.invalidar()
@@ -0,0 +1,108 @@
+# fastapi/app/services/tarefas.py
+"""
+Tarefas em segundo plano de uma instância da API (pontuação, reclassificação, treino).
+
+Cada serviço tem o seu RegistroTarefas: só uma tarefa dele roda por vez, o estado
+(progresso, erro, duração) fica em memória para GET /.../{id}, e só as últimas
+max_tarefas finalizadas são mantidas. Nada é compartilhado entre instâncias.
+"""
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+# Tarefas finalizadas mantidas para consulta, por registro
+MAX_TAREFAS = 20
+
+
+class RegistroTarefas:
+    """Registro (id → estado) e execução das tarefas de um serviço."""
+
+    def __init__(self, nome: str, prefixo_thread: str, max_tarefas: int = MAX_TAREFAS):
+        self.nome = nome
+        self.prefixo_thread = prefixo_thread
+        self.max_tarefas = max_tarefas
+        self._tarefas: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def registrar(self, parametros: Dict, **iniciais) -> str:
+        """Registra a tarefa como executando (ValueError se já houver uma)."""
+        with self._lock:
+            for tarefa in self._tarefas.values():
+                if tarefa["estado"] == "executando":
+                    raise ValueError(f"{self.nome} {tarefa['id']} já está em execução")
+
+            tarefa_id = uuid.uuid4().hex[:12]
+            self._tarefas[tarefa_id] = {
+                "id": tarefa_id,
+                "estado": "executando",
+                "parametros": {k: (v.isoformat() if isinstance(v, datetime) else v)
+                               for k, v in parametros.items()},
+                "iniciada_em": datetime.now(timezone.utc).isoformat(),
+                **iniciais,
+            }
+            # Descarta as tarefas finalizadas mais antigas
+            for antigo in list(self._tarefas)[:-self.max_tarefas]:
+                if self._tarefas[antigo]["estado"] != "executando":
+                    del self._tarefas[antigo]
+            return tarefa_id
+
+    def atualizar(self, tarefa_id: str, **campos):
+        with self._lock:
+            self._tarefas[tarefa_id].update(campos)
+
+    def executar(self, tarefa_id: str, funcao: Callable[..., Dict], parametros: Dict,
+                 campos: Optional[Callable[[Dict], Dict]] = None,
+                 resumo: Optional[Callable[[Dict], Optional[str]]] = None):
+        """
+        Executa funcao(progresso=..., **parametros) e grava o resultado na tarefa.
+        `campos` converte o estado recebido no progresso nos campos gravados;
+        `resumo` monta a linha do log de sucesso (None não imprime nada).
+        """
+        inicio = time.perf_counter()
+
+        def progresso(estado: Dict):
+            atual = campos(estado) if campos else dict(estado)
+            atual["segundos"] = round(time.perf_counter() - inicio, 2)
+            self.atualizar(tarefa_id, **atual)
+
+        try:
+            estado = funcao(progresso=progresso, **parametros)
+            progresso(estado)
+            self.atualizar(tarefa_id, estado="concluida", concluida_em=datetime.now(timezone.utc).isoformat())
+            mensagem = resumo(estado) if resumo else None
+            if mensagem:
+                print(f"✅ {self.nome} {tarefa_id}: {mensagem}")
+        except Exception as e:
+            self.atualizar(tarefa_id, estado="erro", erro=str(e), segundos=round(time.perf_counter() - inicio, 2))
+            print(f"❌ {self.nome} {tarefa_id}: {e}")
+
+    def iniciar(self, funcao: Callable[..., Dict], parametros: Dict, aguardar: bool = False,
+                campos: Optional[Callable[[Dict], Dict]] = None,
+                resumo: Optional[Callable[[Dict], Optional[str]]] = None,
+                **iniciais) -> Dict:
+        """
+        Registra e dispara a tarefa (em uma thread, ou na hora com aguardar=True) e
+        retorna o seu estado. ValueError se já houver uma em execução.
+        """
+        tarefa_id = self.registrar(parametros, **iniciais)
+        if aguardar:
+            self.executar(tarefa_id, funcao, parametros, campos, resumo)
+            return self.obter(tarefa_id)
+
+        estado = self.obter(tarefa_id)
+        threading.Thread(target=self.executar, args=(tarefa_id, funcao, parametros, campos, resumo),
+                         daemon=True, name=f"{self.prefixo_thread}-{tarefa_id}").start()
+        return estado
+
+    def obter(self, tarefa_id: str) -> Optional[Dict]:
+        """Estado de uma tarefa, ou None se não existir."""
+        with self._lock:
+            tarefa = self._tarefas.get(tarefa_id)
+            return dict(tarefa) if tarefa else None
+
+    def listar(self) -> List[Dict]:
+        """Tarefas do registro, da mais recente para a mais antiga."""
+        with self._lock:
+            return [dict(t) for t in reversed(list(self._tarefas.values()))]
@@ -6,11 +6,26 @@ import requests
 import os
 from typing import List, Dict, Optional
 from datetime import datetime, timedelta
+from operator import itemgetter, methodcaller
+import numpy as np
+import pandas as pd
+from .metrics import THINGSBOARD_FETCH, cronometrar
 
 THINGSBOARD_HOST = os.getenv("THINGSBOARD_HOST", "http://thingsboard:9090")
 THINGSBOARD_USER = os.getenv("THINGSBOARD_USER", "tenant@thingsboard.org")
 THINGSBOARD_PASSWORD = os.getenv("THINGSBOARD_PASSWORD", "tenant")
 
+# Chaves de telemetria publicadas pelo populate_thingsboard → colunas de dados_meteorologicos
+CHAVES_TELEMETRIA = {
+    "precipitacao_mm": "precipitacao_mm",
+    "temperatura_ar_c": "temperatura_ar_c",
+    "umidade_rel_pct": "umidade_rel_horaria_pct",
+    "pressao_mb": "pressao_estacao_mb",
+    "vento_velocidade_ms": "vento_velocidade_ms",
+    "vento_direcao_graus": "vento_direcao_graus",
+    "radiacao_kjm2": "radiacao_global_kjm2",
+}
+
 
 class ThingsBoardService:
     def __init__(self):
@@ -87,8 +102,9 @@ class ThingsBoardService:
         }
         
         try:
-            response = requests.get(url, headers=self._get_headers(), 
-                                   params=params, timeout=60)  # Aumentado para 60s (busca muitos dados)
+            with cronometrar(THINGSBOARD_FETCH, device=device_id):
+                response = requests.get(url, headers=self._get_headers(), 
+                                       params=params, timeout=60)  # Aumentado para 60s (busca muitos dados)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.Timeout:
@@ -148,10 +164,107 @@ def test_connection() -> bool:
         return False
 
 
-def get_all_weather_data() -> List[Dict]:
+class TelemetriaDispositivo:
+    """
+    Telemetria de um dispositivo pivotada em arrays.
+    
+    - ts: timestamps (ms) ordenados e sem repetição, a união de todas as chaves
+    - colunas: um array float64 por chave, alinhado a ts (NaN onde a chave não tem leitura)
+    - atributos: informações da estação, guardadas uma única vez por dispositivo
+    """
+    __slots__ = ("device_id", "device_name", "atributos", "ts", "colunas")
+    
+    def __init__(self, device_id: str, device_name: str, atributos: Dict,
+                 ts: np.ndarray, colunas: Dict[str, np.ndarray]):
+        self.device_id = device_id
+        self.device_name = device_name
+        self.atributos = atributos
+        self.ts = ts
+        self.colunas = colunas
+    
+    def __len__(self) -> int:
+        return len(self.ts)
+    
+    @property
+    def codigo_wmo(self) -> Optional[str]:
+        """Código WMO dos atributos ou do nome do dispositivo (INMET_<codigo>_<nome>)."""
+        return self.atributos.get("codigo_wmo") or (
+            self.device_name.split("_")[1] if "_" in self.device_name else None
+        )
+    
+    def nbytes(self) -> int:
+        """Memória ocupada pelos arrays (ts + colunas)."""
+        return self.ts.nbytes + sum(coluna.nbytes for coluna in self.colunas.values())
+    
+    def para_lote(self):
+        """Lote colunar (weather_batch) com as colunas mapeadas para dados_meteorologicos."""
+        import pyarrow as pa
+        from .weather_batch import criar_lote
+        
+        colunas = {"timestamp_utc": pa.array(self.ts, type=pa.timestamp("ms"))}
+        for chave, valores in self.colunas.items():
+            campo = CHAVES_TELEMETRIA.get(chave)
+            if campo is not None:
+                colunas[campo] = valores
+        return criar_lote(colunas, codigo_wmo=self.codigo_wmo)
+
+
+def atributos_para_dict(atributos_raw) -> Dict:
+    """Atributos do ThingsBoard (dict ou lista de {'key', 'value'}) como dicionário."""
+    if isinstance(atributos_raw, dict):
+        return atributos_raw
+    atributos = {}
+    if isinstance(atributos_raw, list):
+        for attr in atributos_raw:
+            if isinstance(attr, dict) and "key" in attr and "value" in attr:
+                atributos[attr["key"]] = attr["value"]
+    return atributos
+
+
+_pegar_ts = itemgetter("ts")
+_pegar_valor = methodcaller("get", "value")
+
+
+def pivotar_telemetria(telemetria: Dict, device_id: str, device_name: str,
+                       atributos: Optional[Dict] = None) -> Optional[TelemetriaDispositivo]:
+    """
+    Pivota a resposta de timeseries ({chave: [{'ts': ms, 'value': v}, ...]}) em arrays:
+    os timestamps de todas as chaves são unidos e ordenados e cada chave é alinhada
+    a eles com searchsorted. Retorna None se não houver leituras.
+    """
+    series = {}
+    for chave, itens in telemetria.items():
+        if not isinstance(itens, list) or not itens:
+            continue
+        try:
+            # Caminho rápido: itens bem formados, valores numéricos (o ThingsBoard devolve texto)
+            ts = np.fromiter(map(_pegar_ts, itens), dtype=np.int64, count=len(itens))
+            valores = np.array(list(map(_pegar_valor, itens)), dtype=np.float64)
+        except (KeyError, TypeError, ValueError):
+            itens = [item for item in itens if isinstance(item, dict) and "ts" in item]
+            if not itens:
+                continue
+            ts = np.fromiter((item["ts"] for item in itens), dtype=np.int64, count=len(itens))
+            valores = pd.to_numeric(pd.Series([item.get("value") for item in itens], dtype=object),
+                                    errors="coerce").to_numpy(dtype=np.float64)
+        series[chave] = (ts, valores)
+    
+    if not series:
+        return None
+    
+    todos_ts = np.unique(np.concatenate([ts for ts, _ in series.values()]))
+    colunas = {}
+    for chave, (ts, valores) in series.items():
+        coluna = np.full(len(todos_ts), np.nan)
+        coluna[np.searchsorted(todos_ts, ts)] = valores
+        colunas[chave] = coluna
+    return TelemetriaDispositivo(device_id, device_name, atributos or {}, todos_ts, colunas)
+
+
+def get_all_weather_data() -> List[TelemetriaDispositivo]:
     """
     Busca dados de todas as estações meteorológicas
-    Retorna lista de dicionários com dados processados
+    Retorna a telemetria pivotada de cada dispositivo (TelemetriaDispositivo)
     """
     service = ThingsBoardService()
     
@@ -161,38 +274,15 @@ def get_all_weather_data() -> List[Dict]:
     devices = service.get_all_devices()
     all_data = []
     
-    telemetry_keys = [
-        "precipitacao_mm",
-        "temperatura_ar_c",
-        "umidade_rel_pct",
-        "pressao_mb",
-        "vento_velocidade_ms",
-        "vento_direcao_graus",
-        "radiacao_kjm2"
-    ]
-    
     for device in devices:
         device_id = device['id']['id']
-        device_name = device['name']
-        
-        # Busca atributos
-        attributes = service.get_device_attributes(device_id)
         
-        # Busca telemetria
-        telemetry = service.get_device_telemetry(device_id, telemetry_keys)
+        # Busca atributos e telemetria
+        attributes = atributos_para_dict(service.get_device_attributes(device_id))
+        telemetry = service.get_device_telemetry(device_id, list(CHAVES_TELEMETRIA))
         
-        # Processa dados
-        for key, values in telemetry.items():
-            for item in values:
-                data_point = {
-                    "device_id": device_id,
-                    "device_name": device_name,
-                    "timestamp": item['ts'],
-                    "key": key,
-                    "value": item['value']
-                }
-                # Adiciona atributos
-                data_point.update(attributes)
-                all_data.append(data_point)
+        pivo = pivotar_telemetria(telemetry, device_id, device['name'], attributes)
+        if pivo is not None:
+            all_data.append(pivo)
     
     return all_data
@@ -0,0 +1,501 @@
+# fastapi/app/services/training.py
+"""
+Treino dos modelos de intensidade de chuva a partir da API.
+
+Faz o mesmo que o notebook 03 (RandomForest, GradientBoosting, LogisticRegression
+e XGBoost, se instalado), mas:
+
+- lê a matriz da feature store (features_intensidade) em blocos por um cursor do
+  lado do servidor, sem pd.read_sql;
+- expande as grades de hiperparâmetros de cada candidato e treina os candidatos
+  em paralelo, em processos (joblib/loky, TREINO_N_JOBS), medindo o tempo de cada um;
+- registra cada candidato como um run do MLflow no formato que o mlflow_service
+  espera (artefatos model, scaler e label_encoder; métricas test_accuracy, test_f1)
+  e carrega o melhor com load_best_model.
+
+O treino incremental (treinar_incremental) parte de um run já registrado e usa só
+as observações recalculadas depois da sua watermark (limite de atualizado_em da
+leitura de features_intensidade, como na pontuação em lote; observações antigas
+reingeridas também entram):
+partial_fit nos estimadores que o suportam, árvores/estágios novos nos ensembles
+(warm start). O resultado é um novo run com a linhagem (run_pai, geracao) e a nova
+watermark, que o mlflow_service recarrega (recarregar_se_atualizado).
+
+A execução roda em segundo plano (iniciar_treino / iniciar_treino_incremental) e o
+progresso é consultado por id (obter_treino), como no /models/train.
+"""
+import os
+import time
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score
+from sklearn.model_selection import ParameterGrid, cross_val_score, train_test_split
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+from .feature_store import iterar_features, limite_atualizacoes, matriz_features
+from .metrics import TRAINING_CANDIDATE_DURATION
+from .tarefas import RegistroTarefas
+
+# Processos usados para treinar os candidatos (-1 = todos os núcleos)
+TREINO_N_JOBS = int(os.getenv("TREINO_N_JOBS", "-1"))
+TREINO_TAMANHO_TESTE = float(os.getenv("TREINO_TAMANHO_TESTE", "0.2"))
+TREINO_ITERSIZE = int(os.getenv("TREINO_ITERSIZE", "50000"))
+# Árvores (RandomForest) ou estágios/rodadas (GradientBoosting, XGBoost) somados por atualização
+TREINO_INCREMENTAL_ESTIMADORES = int(os.getenv("TREINO_INCREMENTAL_ESTIMADORES", "20"))
+# Menos observações novas que isso: o modelo não é atualizado
+TREINO_INCREMENTAL_MIN_LINHAS = int(os.getenv("TREINO_INCREMENTAL_MIN_LINHAS", "500"))
+
+# Candidato → (estimador, grade de hiperparâmetros). Os estimadores usam um núcleo
+# cada (n_jobs=1): o paralelismo é entre candidatos.
+CANDIDATOS = {
+    'RandomForest': (RandomForestClassifier, {
+        'n_estimators': [100], 'max_depth': [None, 20], 'random_state': [42], 'n_jobs': [1],
+    }),
+    'GradientBoosting': (GradientBoostingClassifier, {
+        'n_estimators': [100], 'learning_rate': [0.1], 'random_state': [42],
+    }),
+    'LogisticRegression': (LogisticRegression, {
+        'C': [0.1, 1.0], 'max_iter': [1000], 'random_state': [42],
+    }),
+    # Linear com partial_fit: base para o treino incremental sem crescer o modelo
+    'SGD': (SGDClassifier, {
+        'loss': ['log_loss'], 'alpha': [1e-4], 'random_state': [42],
+    }),
+}
+
+try:
+    import xgboost as xgb
+
+    CANDIDATOS['XGBoost'] = (xgb.XGBClassifier, {
+        'n_estimators': [100], 'max_depth': [6], 'random_state': [42], 'n_jobs': [1],
+    })
+except ImportError:
+    pass
+
+# Tarefas desta instância da API
+_registro = RegistroTarefas("Treino", "treino")
+
+
+def expandir_candidatos(nomes: Optional[List[str]] = None) -> List[Tuple[str, Callable, Dict]]:
+    """
+    (nome do run, estimador, parâmetros) de cada combinação das grades. Com mais de
+    uma combinação, o nome do run ganha um sufixo (RandomForest_1, RandomForest_2...).
+    """
+    nomes = nomes or list(CANDIDATOS)
+    desconhecidos = [nome for nome in nomes if nome not in CANDIDATOS]
+    if desconhecidos:
+        raise ValueError(f"Candidatos desconhecidos: {', '.join(desconhecidos)} (use {', '.join(CANDIDATOS)})")
+
+    expandidos = []
+    for nome in nomes:
+        estimador, grade = CANDIDATOS[nome]
+        combinacoes = list(ParameterGrid(grade))
+        for i, params in enumerate(combinacoes, 1):
+            expandidos.append((nome if len(combinacoes) == 1 else f"{nome}_{i}", estimador, params))
+    return expandidos
+
+
+def carregar_dados_treino(inicio: Optional[datetime] = None, fim: Optional[datetime] = None,
+                          atualizado_desde: Optional[datetime] = None,
+                          itersize: int = TREINO_ITERSIZE) -> Tuple[np.ndarray, np.ndarray, datetime]:
+    """
+    (X, y, watermark) das observações rotuladas em [inicio, fim), lidas da feature
+    store em blocos. Só entram linhas com atualizado_em anterior ao limite da leitura
+    (limite_atualizacoes) e, com `atualizado_desde`, a partir dele. watermark é esse
+    limite: a próxima leitura incremental começa nele sem pular nem repetir linhas.
+    """
+    watermark = limite_atualizacoes()
+    partes_X, partes_y = [], []
+    for lote in iterar_features(inicio=inicio, fim=fim, rotulados=True, itersize=itersize,
+                                atualizado_desde=atualizado_desde, atualizado_ate=watermark):
+        partes_X.append(matriz_features(lote))
+        partes_y.append(lote.column('intensidade_chuva').to_numpy(zero_copy_only=False))
+    if not partes_X:
+        return np.empty((0, 0)), np.empty(0, dtype=object), watermark
+    return np.concatenate(partes_X), np.concatenate(partes_y), watermark
+
+
+def _treinar_candidato(nome: str, estimador: Callable, params: Dict,
+                       X_train: np.ndarray, y_train: np.ndarray,
+                       X_test: np.ndarray, y_test: np.ndarray, cv: int) -> Dict:
+    """Treina e avalia um candidato (executa em um processo do pool)."""
+    inicio = time.perf_counter()
+    try:
+        modelo = estimador(**params)
+        modelo.fit(X_train, y_train)
+        segundos_fit = time.perf_counter() - inicio
+
+        y_pred = modelo.predict(X_test)
+        metricas = {
+            'train_accuracy': accuracy_score(y_train, modelo.predict(X_train)),
+            'test_accuracy': accuracy_score(y_test, y_pred),
+            'test_precision': precision_score(y_test, y_pred, average='weighted', zero_division=0),
+            'test_recall': recall_score(y_test, y_pred, average='weighted', zero_division=0),
+            'test_f1': f1_score(y_test, y_pred, average='weighted', zero_division=0),
+        }
+        if cv > 1:
+            scores = cross_val_score(estimador(**params), X_train, y_train, cv=cv, scoring='accuracy')
+            metricas['cv_accuracy_mean'] = scores.mean()
+            metricas['cv_accuracy_std'] = scores.std()
+        metricas['tempo_fit_s'] = segundos_fit
+        metricas['tempo_total_s'] = time.perf_counter() - inicio
+        return {"nome": nome, "modelo": modelo, "params": params, "metricas": metricas}
+    except Exception as e:
+        return {"nome": nome, "params": params, "erro": str(e),
+                "metricas": {"tempo_total_s": time.perf_counter() - inicio}}
+
+
+def _registrar_run(resultado: Dict, scaler, label_encoder, tags: Dict) -> str:
+    """
+    Registra o candidato no MLflow (model, scaler e label_encoder) e retorna o run_id.
+    `resultado`: nome, modelo, params e metricas.
+    """
+    import mlflow
+    import mlflow.sklearn
+    from .mlflow_service import EXPERIMENT_NAME, get_mlflow_client
+
+    client = get_mlflow_client()
+    client.set_experiment(EXPERIMENT_NAME)
+    with mlflow.start_run(run_name=resultado["nome"]) as run:
+        mlflow.set_tags(tags)
+        mlflow.log_params(resultado["params"])
+        mlflow.log_metrics(resultado["metricas"])
+        # cloudpickle: o formato que load_best_model carrega sem lista de tipos confiáveis
+        for artefato, objeto in (("model", resultado["modelo"]), ("scaler", scaler), ("label_encoder", label_encoder)):
+            mlflow.sklearn.log_model(
+                sk_model=objeto,
+                name=artefato,
+                serialization_format=mlflow.sklearn.SERIALIZATION_FORMAT_CLOUDPICKLE
+            )
+        return run.info.run_id
+
+
+def treinar_modelos(inicio: Optional[datetime] = None, fim: Optional[datetime] = None,
+                    candidatos: Optional[List[str]] = None,
+                    n_jobs: int = TREINO_N_JOBS, cv: int = 0,
+                    carregar: bool = True,
+                    progresso: Optional[Callable[[Dict], None]] = None) -> Dict:
+    """
+    Treina os candidatos (com as grades expandidas) em paralelo sobre as observações
+    rotuladas em [inicio, fim), registra cada um no MLflow e, com carregar=True,
+    carrega o de maior test_accuracy para a inferência.
+    `progresso` é chamado após cada candidato com o estado acumulado.
+    """
+    from .mlflow_service import load_best_model
+
+    expandidos = expandir_candidatos(candidatos)
+    treino_id = uuid.uuid4().hex[:12]
+    inicio_execucao = time.perf_counter()
+    estado = {
+        "treino_id": treino_id,
+        "candidatos_total": len(expandidos),
+        "candidatos_concluidos": 0,
+        "candidatos": [],
+        "melhor": None,
+    }
+
+    X, y, watermark = carregar_dados_treino(inicio, fim)
+    estado["linhas"] = len(y)
+    estado["watermark"] = watermark.isoformat()
+    estado["segundos_leitura"] = round(time.perf_counter() - inicio_execucao, 2)
+    if len(np.unique(y)) < 2:
+        raise ValueError("São necessárias observações rotuladas de pelo menos duas classes em features_intensidade")
+    if progresso:
+        progresso(estado)
+
+    label_encoder = LabelEncoder()
+    y_cod = label_encoder.fit_transform(y)
+    # Estratifica quando todas as classes têm exemplos suficientes para os dois lados
+    estratificar = y_cod if np.bincount(y_cod).min() >= 2 else None
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y_cod, test_size=TREINO_TAMANHO_TESTE, random_state=42, stratify=estratificar
+    )
+    del X, y
+    scaler = StandardScaler()
+    X_train = scaler.fit_transform(X_train)
+    X_test = scaler.transform(X_test)
+    estado["n_treino"], estado["n_teste"] = len(y_train), len(y_test)
+
+    tags = {"treino_id": treino_id, "origem": "api", "fonte_features": "features_intensidade",
+            "modo_treino": "completo", "geracao": "0", "watermark_features": estado["watermark"]}
+    # Os processos recebem X/y por memmap (joblib) e devolvem o modelo treinado;
+    # o registro no MLflow fica no processo da API, na ordem em que terminam
+    tarefas = Parallel(n_jobs=n_jobs, backend="loky", return_as="generator_unordered")(
+        delayed(_treinar_candidato)(nome, estimador, params, X_train, y_train, X_test, y_test, cv)
+        for nome, estimador, params in expandidos
+    )
+    melhor = None
+    for resultado in tarefas:
+        resumo = {
+            "nome": resultado["nome"],
+            "params": {k: v for k, v in resultado["params"].items() if k not in ("n_jobs", "random_state")},
+            "segundos": round(resultado["metricas"]["tempo_total_s"], 2),
+        }
+        if "erro" in resultado:
+            resumo["erro"] = resultado["erro"]
+            print(f"❌ Candidato {resultado['nome']}: {resultado['erro']}")
+        else:
+            TRAINING_CANDIDATE_DURATION.labels(candidato=resultado["nome"]).observe(resultado["metricas"]["tempo_total_s"])
+            resumo["test_accuracy"] = round(resultado["metricas"]["test_accuracy"], 4)
+            resumo["test_f1"] = round(resultado["metricas"]["test_f1"], 4)
+            try:
+                resumo["run_id"] = _registrar_run(resultado, scaler, label_encoder, {**tags, "candidato": resultado["nome"]})
+            except Exception as e:
+                resumo["erro_mlflow"] = str(e)
+                print(f"⚠️  Aviso: {resultado['nome']} não foi registrado no MLflow: {e}")
+            if "run_id" in resumo and (melhor is None or resumo["test_accuracy"] > melhor["test_accuracy"]):
+                melhor = resumo
+            print(f"✅ {resultado['nome']}: accuracy {resumo['test_accuracy']:.4f} em {resumo['segundos']:.1f}s")
+
+        estado["candidatos"].append(resumo)
+        estado["candidatos_concluidos"] += 1
+        if progresso:
+            progresso(estado)
+
+    if melhor is not None:
+        estado["melhor"] = {k: melhor[k] for k in ("nome", "run_id", "test_accuracy", "test_f1")}
+        if carregar:
+            estado["melhor"]["carregado"] = load_best_model(run_id=melhor["run_id"])
+    estado["segundos"] = round(time.perf_counter() - inicio_execucao, 2)
+    return estado
+
+
+# ============================================================================
+# TREINO INCREMENTAL
+# ============================================================================
+
+def _run_pai(run_id: Optional[str] = None):
+    """Run a atualizar: o informado, o do modelo carregado ou o de maior test_accuracy."""
+    from .mlflow_service import EXPERIMENT_NAME, get_mlflow_client, get_model_info
+
+    client = get_mlflow_client()
+    run_id = run_id or get_model_info().get("run_id")
+    if run_id:
+        return client.get_run(run_id)
+    experiment = client.get_experiment_by_name(EXPERIMENT_NAME)
+    runs = client.search_runs(
+        experiment_ids=[experiment.experiment_id],
+        order_by=["metrics.test_accuracy DESC"],
+        max_results=1,
+        output_format="list"
+    ) if experiment else []
+    if not runs:
+        raise ValueError(f"Nenhum run no experimento '{EXPERIMENT_NAME}' para atualizar")
+    return runs[0]
+
+
+def atualizar_modelo(modelo, X: np.ndarray, y: np.ndarray,
+                     novos_estimadores: int = TREINO_INCREMENTAL_ESTIMADORES) -> str:
+    """
+    Atualiza `modelo` (já treinado) com as observações novas e retorna o modo usado:
+
+    - partial_fit: estimadores online (SGDClassifier...), qualquer subconjunto de classes;
+    - warm_start: RandomForest/GradientBoosting ganham `novos_estimadores` árvores/estágios
+      treinados só em (X, y);
+    - xgboost: `novos_estimadores` rodadas a partir do booster atual.
+
+    Nos ensembles o sklearn/XGBoost recalculam as classes a partir de y, então o lote
+    novo precisa ter todas as classes do modelo (ValueError caso contrário).
+    """
+    if hasattr(modelo, 'partial_fit'):
+        modelo.partial_fit(X, y)
+        return "partial_fit"
+
+    classes = getattr(modelo, 'classes_', None)
+    if classes is not None and not np.array_equal(np.unique(y), np.sort(classes)):
+        raise ValueError(
+            f"As observações novas não têm todas as classes do modelo ({len(np.unique(y))} de {len(classes)}); "
+            "aguarde mais dados ou use um modelo com partial_fit"
+        )
+
+    if hasattr(modelo, 'get_booster'):
+        modelo.set_params(n_estimators=novos_estimadores)
+        modelo.fit(X, y, xgb_model=modelo.get_booster())
+        return "xgboost"
+    if 'warm_start' in modelo.get_params() and 'n_estimators' in modelo.get_params():
+        modelo.set_params(warm_start=True, n_estimators=modelo.get_params()['n_estimators'] + novos_estimadores)
+        modelo.fit(X, y)
+        return "warm_start"
+    raise ValueError(f"{type(modelo).__name__} não suporta treino incremental (partial_fit ou warm start); "
+                     "use o treino completo")
+
+
+def treinar_incremental(run_id: Optional[str] = None,
+                        inicio: Optional[datetime] = None,
+                        novos_estimadores: int = TREINO_INCREMENTAL_ESTIMADORES,
+                        min_linhas: int = TREINO_INCREMENTAL_MIN_LINHAS,
+                        carregar: bool = True,
+                        progresso: Optional[Callable[[Dict], None]] = None) -> Dict:
+    """
+    Atualiza o modelo de um run com as observações rotuladas recalculadas em
+    features_intensidade depois da watermark do run (ou com timestamp_utc a partir de
+    `inicio`, para runs sem watermark, como os do notebook).
+
+    O scaler e o label encoder do run pai são mantidos (o modelo continua valendo
+    para as observações antigas). 20% das observações novas ficam de fora para comparar
+    pai e filho (test_accuracy_pai x test_accuracy). O novo run registra run_pai,
+    geracao e a nova watermark; com carregar=True, passa a ser o modelo da API.
+    """
+    import mlflow.sklearn
+    from .mlflow_service import load_best_model
+
+    inicio_execucao = time.perf_counter()
+    pai = _run_pai(run_id)
+    tags_pai = pai.data.tags
+    nome_pai = tags_pai.get("candidato") or tags_pai.get("mlflow.runName", pai.info.run_id)
+    geracao = int(tags_pai.get("geracao", "0")) + 1
+    estado = {
+        "treino_id": uuid.uuid4().hex[:12],
+        "run_pai": pai.info.run_id,
+        "modelo": nome_pai,
+        "geracao": geracao,
+        "atualizado": False,
+    }
+
+    watermark_pai = tags_pai.get("watermark_features")
+    atualizado_desde = None
+    if inicio is None:
+        if not watermark_pai:
+            raise ValueError(f"O run {pai.info.run_id} não tem watermark_features; informe inicio")
+        # O pai leu atualizado_em < watermark: a leitura nova começa nela
+        atualizado_desde = datetime.fromisoformat(watermark_pai)
+        estado["desde"] = watermark_pai
+    else:
+        estado["desde"] = inicio.isoformat()
+
+    X, y, watermark = carregar_dados_treino(inicio=inicio, atualizado_desde=atualizado_desde)
+    estado["linhas"] = len(y)
+    if progresso:
+        progresso(estado)
+    if len(y) < min_linhas:
+        estado["motivo"] = f"{len(y)} observações novas (mínimo {min_linhas})"
+        estado["segundos"] = round(time.perf_counter() - inicio_execucao, 2)
+        return estado
+
+    base_uri = f"runs:/{pai.info.run_id}"
+    modelo = mlflow.sklearn.load_model(f"{base_uri}/model")
+    scaler = mlflow.sklearn.load_model(f"{base_uri}/scaler")
+    label_encoder = mlflow.sklearn.load_model(f"{base_uri}/label_encoder")
+
+    # Rótulos que o modelo pai não conhece não podem ser aprendidos incrementalmente
+    conhecidos = np.isin(y, label_encoder.classes_)
+    if not conhecidos.all():
+        print(f"⚠️  Aviso: {int((~conhecidos).sum())} observações com classes desconhecidas pelo run pai foram ignoradas")
+        X, y = X[conhecidos], y[conhecidos]
+    y_cod = label_encoder.transform(y)
+    estratificar = y_cod if len(np.unique(y_cod)) > 1 and np.bincount(y_cod).min() >= 2 else None
+    X_train, X_test, y_train, y_test = train_test_split(
+        scaler.transform(X), y_cod, test_size=TREINO_TAMANHO_TESTE, random_state=42, stratify=estratificar
+    )
+    del X, y
+
+    acuracia_pai = accuracy_score(y_test, modelo.predict(X_test))
+    inicio_fit = time.perf_counter()
+    modo = atualizar_modelo(modelo, X_train, y_train, novos_estimadores)
+    segundos_fit = time.perf_counter() - inicio_fit
+    y_pred = modelo.predict(X_test)
+    metricas = {
+        'test_accuracy': accuracy_score(y_test, y_pred),
+        'test_precision': precision_score(y_test, y_pred, average='weighted', zero_division=0),
+        'test_recall': recall_score(y_test, y_pred, average='weighted', zero_division=0),
+        'test_f1': f1_score(y_test, y_pred, average='weighted', zero_division=0),
+        'test_accuracy_pai': acuracia_pai,
+        'tempo_fit_s': segundos_fit,
+        'n_treino': len(y_train),
+        'n_teste': len(y_test),
+    }
+    params = {'novos_estimadores': novos_estimadores} if modo != "partial_fit" else {}
+    tags = {
+        "treino_id": estado["treino_id"], "origem": "api", "fonte_features": "features_intensidade",
+        "modo_treino": f"incremental_{modo}", "candidato": nome_pai, "geracao": str(geracao),
+        "run_pai": pai.info.run_id, "watermark_anterior": watermark_pai or "",
+        "watermark_features": watermark.isoformat(),
+    }
+    run_id_novo = _registrar_run(
+        {"nome": f"{nome_pai}_g{geracao}", "modelo": modelo, "params": params, "metricas": metricas},
+        scaler, label_encoder, tags
+    )
+    TRAINING_CANDIDATE_DURATION.labels(candidato=f"{nome_pai}_incremental").observe(segundos_fit)
+    print(f"✅ {nome_pai} geração {geracao} ({modo}): accuracy {acuracia_pai:.4f} → "
+          f"{metricas['test_accuracy']:.4f} com {len(y_train)} observações novas")
+
+    estado.update({
+        "atualizado": True,
+        "run_id": run_id_novo,
+        "modo": modo,
+        "watermark": watermark.isoformat(),
+        "test_accuracy_pai": round(acuracia_pai, 4),
+        "test_accuracy": round(metricas['test_accuracy'], 4),
+        "test_f1": round(metricas['test_f1'], 4),
+        "segundos_fit": round(segundos_fit, 2),
+    })
+    if carregar:
+        estado["carregado"] = load_best_model(run_id=run_id_novo)
+    estado["segundos"] = round(time.perf_counter() - inicio_execucao, 2)
+    return estado
+
+
+# ============================================================================
+# EXECUÇÃO EM SEGUNDO PLANO
+# ============================================================================
+
+def _campos_progresso(estado: Dict) -> Dict:
+    campos = {k: (list(v) if isinstance(v, list) else v) for k, v in estado.items()}
+    if "candidatos_total" in estado:
+        total = estado["candidatos_total"]
+        campos["percentual"] = round(100.0 * estado["candidatos_concluidos"] / total, 1) if total else 100.0
+    return campos
+
+
+def _resumo(estado: Dict) -> str:
+    if "melhor" in estado:
+        resumo = f"melhor {estado['melhor']['nome'] if estado['melhor'] else 'nenhum'}"
+    else:
+        resumo = f"run {estado['run_id']}" if estado["atualizado"] else estado["motivo"]
+    return f"{resumo} em {estado['segundos']}s"
+
+
+def _iniciar(tipo: str, funcao: Callable[..., Dict], parametros: Dict, **iniciais) -> Dict:
+    """Registra a tarefa e dispara a thread; só um treino (de qualquer tipo) roda por vez."""
+    return _registro.iniciar(funcao, parametros, campos=_campos_progresso, resumo=_resumo,
+                             tipo=tipo, **iniciais)
+
+
+def iniciar_treino(inicio: Optional[datetime] = None, fim: Optional[datetime] = None,
+                   candidatos: Optional[List[str]] = None,
+                   n_jobs: int = TREINO_N_JOBS, cv: int = 0, carregar: bool = True) -> Dict:
+    """
+    Inicia o treino em uma thread e retorna o estado inicial da tarefa.
+    Só um treino roda por vez (ValueError se já houver um em execução).
+    """
+    expandir_candidatos(candidatos)  # valida os nomes antes de criar a tarefa
+    parametros = {"inicio": inicio, "fim": fim, "candidatos": candidatos,
+                  "n_jobs": n_jobs, "cv": cv, "carregar": carregar}
+    return _iniciar("completo", treinar_modelos, parametros,
+                    candidatos_total=None, candidatos_concluidos=0, percentual=0.0)
+
+
+def iniciar_treino_incremental(run_id: Optional[str] = None, inicio: Optional[datetime] = None,
+                               novos_estimadores: int = TREINO_INCREMENTAL_ESTIMADORES,
+                               min_linhas: int = TREINO_INCREMENTAL_MIN_LINHAS,
+                               carregar: bool = True) -> Dict:
+    """Inicia o treino incremental em uma thread (ValueError se já houver um treino em execução)."""
+    parametros = {"run_id": run_id, "inicio": inicio, "novos_estimadores": novos_estimadores,
+                  "min_linhas": min_linhas, "carregar": carregar}
+    return _iniciar("incremental", treinar_incremental, parametros)
+
+
+def obter_treino(tarefa_id: str) -> Optional[Dict]:
+    """Estado (progresso e candidatos) de uma tarefa de treino, ou None se não existir."""
+    return _registro.obter(tarefa_id)
+
+
+def listar_treinos() -> List[Dict]:
+    """Tarefas de treino desta instância, da mais recente para a mais antiga."""
+    return _registro.listar()
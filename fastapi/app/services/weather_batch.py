@@ -0,0 +1,245 @@
+# fastapi/app/services/weather_batch.py
+"""
+Lote colunar (Arrow RecordBatch) com o schema canônico de dados_meteorologicos.
+
+É o formato interno de troca do pipeline: os parsers (CSV do INMET, ThingsBoard)
+produzem lotes, e a carga no PostgreSQL (COPY), o arquivamento no S3 (Parquet) e a
+inferência em lote consomem os mesmos lotes, sem passar por um dict por registro.
+
+Schema: codigo_wmo, timestamp_utc, as 17 medidas (float64, null = ausente) e
+intensidade_chuva. data e hora_utc da tabela são derivadas de timestamp_utc.
+"""
+import io
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from .classification import classificar_intensidade
+
+CAMPOS_MEDIDAS = [
+    'precipitacao_mm',
+    'pressao_estacao_mb',
+    'pressao_max_mb',
+    'pressao_min_mb',
+    'radiacao_global_kjm2',
+    'temperatura_ar_c',
+    'temperatura_orvalho_c',
+    'temperatura_max_c',
+    'temperatura_min_c',
+    'temperatura_orvalho_max_c',
+    'temperatura_orvalho_min_c',
+    'umidade_rel_max_pct',
+    'umidade_rel_min_pct',
+    'umidade_rel_horaria_pct',
+    'vento_direcao_graus',
+    'vento_rajada_max_ms',
+    'vento_velocidade_ms',
+]
+
+SCHEMA_DADOS_METEOROLOGICOS = pa.schema(
+    [
+        ('codigo_wmo', pa.string()),
+        ('timestamp_utc', pa.timestamp('us')),
+    ]
+    + [(campo, pa.float64()) for campo in CAMPOS_MEDIDAS]
+    + [('intensidade_chuva', pa.string())]
+)
+
+# Colunas de dados_meteorologicos na ordem do COPY/INSERT
+COLUNAS_TABELA = ['codigo_wmo', 'data', 'hora_utc', 'timestamp_utc'] + CAMPOS_MEDIDAS + ['intensidade_chuva']
+
+
+def criar_lote(colunas: Dict, codigo_wmo: Optional[str] = None) -> pa.RecordBatch:
+    """
+    Monta um lote a partir de colunas (arrays NumPy, listas, Series ou arrays Arrow).
+
+    - timestamp_utc é obrigatório; as demais medidas ausentes viram null
+    - codigo_wmo pode ser uma coluna ou um valor único para o lote inteiro
+    - NaN vira null; intensidade_chuva é classificada se não for informada
+    """
+    n = len(colunas['timestamp_utc'])
+    arrays = []
+    for campo in SCHEMA_DADOS_METEOROLOGICOS:
+        valores = colunas.get(campo.name)
+        if campo.name == 'codigo_wmo' and valores is None:
+            valores = pa.repeat(pa.scalar(codigo_wmo, pa.string()), n)
+        elif campo.name == 'intensidade_chuva' and valores is None:
+            precipitacao = colunas.get('precipitacao_mm')
+            valores = classificar_intensidade(
+                np.full(n, np.nan) if precipitacao is None else _para_float(precipitacao)
+            )
+
+        if valores is None:
+            arrays.append(pa.nulls(n, campo.type))
+        elif isinstance(valores, pa.ChunkedArray):
+            arrays.append(valores.combine_chunks().cast(campo.type))
+        elif isinstance(valores, pa.Array):
+            arrays.append(valores.cast(campo.type))
+        else:
+            arrays.append(pa.array(valores, type=campo.type, from_pandas=True))
+    return pa.RecordBatch.from_arrays(arrays, schema=SCHEMA_DADOS_METEOROLOGICOS)
+
+
+def _para_float(valores) -> np.ndarray:
+    if isinstance(valores, (pa.Array, pa.ChunkedArray)):
+        return valores.to_numpy(zero_copy_only=False).astype(np.float64)
+    return np.asarray([np.nan if v is None else v for v in valores] if isinstance(valores, list) else valores,
+                      dtype=np.float64)
+
+
+def lote_de_registros(dados: List[Dict]) -> pa.RecordBatch:
+    """
+    Converte registros legados (dicts com data/hora_utc ou timestamp_utc) em um lote.
+    Usado apenas nas bordas que ainda recebem dicts.
+    """
+    timestamps = [
+        d['timestamp_utc'] if isinstance(d.get('timestamp_utc'), datetime)
+        else datetime.combine(d['data'], d['hora_utc'])
+        for d in dados
+    ]
+    colunas = {
+        'codigo_wmo': [d['codigo_wmo'] for d in dados],
+        'timestamp_utc': timestamps,
+    }
+    for campo in CAMPOS_MEDIDAS:
+        colunas[campo] = [d.get(campo) for d in dados]
+    if all(d.get('intensidade_chuva') for d in dados):
+        colunas['intensidade_chuva'] = [d['intensidade_chuva'] for d in dados]
+    return criar_lote(colunas)
+
+
+def coluna_numpy(lote: pa.RecordBatch, campo: str) -> np.ndarray:
+    """Coluna numérica como float64 (null → NaN)."""
+    return lote.column(campo).to_numpy(zero_copy_only=False).astype(np.float64, copy=False)
+
+
+def intervalos_por_estacao(lote: pa.RecordBatch) -> Dict[str, Tuple[datetime, datetime]]:
+    """{codigo_wmo: (primeiro, último timestamp)} do lote (partições e rollups)."""
+    agregado = pa.Table.from_batches([lote]).group_by('codigo_wmo').aggregate(
+        [('timestamp_utc', 'min'), ('timestamp_utc', 'max')]
+    ).to_pydict()
+    return {
+        codigo: (inicio, fim)
+        for codigo, inicio, fim in zip(agregado['codigo_wmo'], agregado['timestamp_utc_min'], agregado['timestamp_utc_max'])
+    }
+
+
+def tabela_para_banco(lote: pa.RecordBatch) -> pa.Table:
+    """Lote com as colunas de dados_meteorologicos (data e hora_utc derivadas), na ordem do COPY."""
+    timestamps = lote.column('timestamp_utc')
+    colunas = {nome: lote.column(nome) for nome in SCHEMA_DADOS_METEOROLOGICOS.names}
+    colunas['data'] = pc.cast(timestamps, pa.date32())
+    colunas['hora_utc'] = pc.cast(timestamps, pa.time64('us'))
+    return pa.table({nome: colunas[nome] for nome in COLUNAS_TABELA})
+
+
+def lote_para_csv(lote: pa.RecordBatch) -> bytes:
+    """CSV sem cabeçalho para COPY ... FROM STDIN (FORMAT csv); null vira campo vazio."""
+    import pyarrow.csv as pa_csv
+
+    buffer = io.BytesIO()
+    pa_csv.write_csv(tabela_para_banco(lote), buffer, pa_csv.WriteOptions(include_header=False))
+    return buffer.getvalue()
+
+
+def lotes_para_parquet(lotes: Iterable[pa.RecordBatch]) -> bytes:
+    """Serializa os lotes em um único arquivo Parquet (compressão zstd)."""
+    import pyarrow.parquet as pq
+
+    buffer = io.BytesIO()
+    with pq.ParquetWriter(buffer, SCHEMA_DADOS_METEOROLOGICOS, compression='zstd') as writer:
+        for lote in lotes:
+            writer.write_batch(lote)
+    return buffer.getvalue()
+
+
+# Formatos da exportação em streaming → media type
+FORMATOS_EXPORTACAO = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+
+class _SaidaIncremental(io.RawIOBase):
+    """Destino de escrita que acumula os bytes até serem drenados (writers do pyarrow)."""
+
+    def __init__(self):
+        super().__init__()
+        self._partes = []
+        self._posicao = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, dados) -> int:
+        self._partes.append(bytes(dados))
+        self._posicao += len(dados)
+        return len(dados)
+
+    def tell(self) -> int:
+        return self._posicao
+
+    def drenar(self) -> bytes:
+        dados = b"".join(self._partes)
+        self._partes = []
+        return dados
+
+
+def _writer_exportacao(saida, schema: pa.Schema, formato: str):
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+
+    if formato == 'parquet':
+        return pq.ParquetWriter(saida, schema, compression='zstd')
+    return pa_csv.CSVWriter(saida, schema)
+
+
+def serializar_lotes(lotes: Iterable[pa.RecordBatch], formato: str,
+                     schema: pa.Schema = SCHEMA_DADOS_METEOROLOGICOS) -> Iterator[bytes]:
+    """
+    Serializa os lotes em NDJSON, CSV (com cabeçalho) ou Parquet (zstd), produzindo
+    os bytes de cada lote assim que ele é escrito: a memória não cresce com o total
+    exportado. No Parquet cada lote vira um row group; o rodapé sai no fim.
+    `schema` só é usado se não houver nenhum lote (CSV só com cabeçalho, Parquet vazio).
+    """
+    if formato not in FORMATOS_EXPORTACAO:
+        raise ValueError(f"Formato inválido: {formato} (use {', '.join(FORMATOS_EXPORTACAO)})")
+
+    if formato == 'ndjson':
+        for lote in lotes:
+            if lote.num_rows:
+                texto = lote.to_pandas().to_json(orient='records', lines=True, date_format='iso')
+                yield (texto if texto.endswith('\n') else texto + '\n').encode('utf-8')
+        return
+
+    saida = _SaidaIncremental()
+    writer = None
+    try:
+        for lote in lotes:
+            if writer is None:
+                writer = _writer_exportacao(saida, lote.schema, formato)
+            writer.write_batch(lote)
+            yield saida.drenar()
+        if writer is None:
+            writer = _writer_exportacao(saida, schema, formato)
+    finally:
+        if writer is not None:
+            writer.close()
+    yield saida.drenar()
+
+
+def lote_para_registros(lote: pa.RecordBatch) -> List[Dict]:
+    """
+    Converte o lote em registros legados (dicts com data/hora_utc, None para ausentes).
+    Mantido só para compatibilidade (parse_inmet_csv); o pipeline não usa.
+    """
+    registros = lote.to_pylist()
+    for registro in registros:
+        timestamp = registro.pop('timestamp_utc')
+        registro['data'] = timestamp.date()
+        registro['hora_utc'] = timestamp.time()
+    return registros
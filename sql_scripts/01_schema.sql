@@ -16,8 +16,9 @@ CREATE TABLE IF NOT EXISTS estacoes (
 );
 
 -- Tabela de dados meteorológicos horários
+-- Particionada por mês em timestamp_utc (partições criadas por criar_particoes_mensais)
 CREATE TABLE IF NOT EXISTS dados_meteorologicos (
-    id SERIAL PRIMARY KEY,
+    id BIGSERIAL,
     codigo_wmo VARCHAR(10) NOT NULL REFERENCES estacoes(codigo_wmo),
     data DATE NOT NULL,
     hora_utc TIME NOT NULL,
@@ -57,8 +58,123 @@ CREATE TABLE IF NOT EXISTS dados_meteorologicos (
     
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     
-    -- Índices para performance
-    CONSTRAINT unique_estacao_data_hora UNIQUE (codigo_wmo, data, hora_utc)
+    -- Chave natural: uma observação por estação e hora.
+    -- Em tabelas particionadas a chave precisa conter a coluna de partição.
+    CONSTRAINT pk_dados_meteorologicos PRIMARY KEY (codigo_wmo, timestamp_utc)
+) PARTITION BY RANGE (timestamp_utc);
+
+-- ============================================================
+-- Gerenciamento de partições mensais
+-- ============================================================
+
+-- Cria as partições mensais que cobrem [p_inicio, p_fim].
+-- Partições se chamam <tabela>_pAAAA_MM. Retorna quantas foram criadas.
+-- Pode ser chamada a cada lote por vários processos: quando falta alguma
+-- partição, a criação é serializada por um advisory lock da tabela e cada
+-- mês é conferido de novo depois do lock.
+-- Um mês desanexado (desanexar_particoes_antigas) não é reanexado aqui: a
+-- ingestão falha com erro explícito em vez de trazer de volta, sem aviso, um
+-- mês arquivado (e validá-lo inteiro dentro da transação da ingestão).
+-- A reanexação é explícita: anexar_particao_mensal (POST /partitions/attach).
+CREATE OR REPLACE FUNCTION criar_particoes_mensais(
+    p_tabela TEXT,
+    p_inicio TIMESTAMP,
+    p_fim TIMESTAMP
+)
+RETURNS INTEGER AS $$
+DECLARE
+    v_mes TIMESTAMP;
+    v_nome TEXT;
+    v_total INTEGER := 0;
+BEGIN
+    IF p_inicio IS NULL OR p_fim IS NULL THEN
+        RETURN 0;
+    END IF;
+
+    -- Caso comum: todas as partições já existem e estão anexadas (sem lock)
+    IF NOT EXISTS (
+        SELECT 1
+        FROM generate_series(date_trunc('month', p_inicio), p_fim, INTERVAL '1 month') AS m(mes)
+        WHERE NOT EXISTS (
+            SELECT 1 FROM pg_inherits
+            WHERE inhrelid = to_regclass(format('%s_p%s', p_tabela, to_char(m.mes, 'YYYY_MM')))
+              AND inhparent = to_regclass(p_tabela)
+        )
+    ) THEN
+        RETURN 0;
+    END IF;
+
+    -- Processos concorrentes esperam aqui e encontram as partições já criadas
+    PERFORM pg_advisory_xact_lock(hashtext('criar_particoes_mensais:' || p_tabela));
+
+    v_mes := date_trunc('month', p_inicio);
+    WHILE v_mes <= p_fim LOOP
+        v_nome := format('%s_p%s', p_tabela, to_char(v_mes, 'YYYY_MM'));
+
+        IF to_regclass(v_nome) IS NULL THEN
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                v_nome, p_tabela, v_mes, v_mes + INTERVAL '1 month'
+            );
+            v_total := v_total + 1;
+        ELSIF NOT EXISTS (
+            SELECT 1 FROM pg_inherits
+            WHERE inhrelid = to_regclass(v_nome) AND inhparent = to_regclass(p_tabela)
+        ) THEN
+            RAISE EXCEPTION 'A partição % está desanexada; reanexe-a com POST /partitions/attach antes de gravar nesse mês', v_nome
+                USING ERRCODE = 'object_not_in_prerequisite_state';
+        END IF;
+
+        v_mes := v_mes + INTERVAL '1 month';
+    END LOOP;
+
+    RETURN v_total;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION criar_particoes_mensais(TEXT, TIMESTAMP, TIMESTAMP) IS 'Cria as partições mensais <tabela>_pAAAA_MM que cobrem o intervalo (erro se algum mês estiver desanexado)';
+
+-- Reanexa a partição desanexada do mês de p_mes. Retorna FALSE se ela já
+-- estava anexada. O ATTACH valida todas as linhas da partição (varredura
+-- completa), por isso só roda quando pedido explicitamente.
+CREATE OR REPLACE FUNCTION anexar_particao_mensal(
+    p_tabela TEXT,
+    p_mes TIMESTAMP
+)
+RETURNS BOOLEAN AS $$
+DECLARE
+    v_mes TIMESTAMP := date_trunc('month', p_mes);
+    v_nome TEXT := format('%s_p%s', p_tabela, to_char(date_trunc('month', p_mes), 'YYYY_MM'));
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext('criar_particoes_mensais:' || p_tabela));
+
+    IF to_regclass(v_nome) IS NULL THEN
+        RAISE EXCEPTION 'A partição % não existe', v_nome
+            USING ERRCODE = 'undefined_table';
+    END IF;
+    IF EXISTS (
+        SELECT 1 FROM pg_inherits
+        WHERE inhrelid = to_regclass(v_nome) AND inhparent = to_regclass(p_tabela)
+    ) THEN
+        RETURN FALSE;
+    END IF;
+
+    EXECUTE format(
+        'ALTER TABLE %I ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+        p_tabela, v_nome, v_mes, v_mes + INTERVAL '1 month'
+    );
+    RETURN TRUE;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION anexar_particao_mensal(TEXT, TIMESTAMP) IS 'Reanexa a partição mensal <tabela>_pAAAA_MM desanexada (POST /partitions/attach)';
+
+-- Partições iniciais: dois anos para trás e três meses à frente.
+-- A ingestão (partition_service) cria as demais sob demanda.
+SELECT criar_particoes_mensais(
+    'dados_meteorologicos',
+    date_trunc('month', CURRENT_TIMESTAMP::TIMESTAMP) - INTERVAL '24 months',
+    date_trunc('month', CURRENT_TIMESTAMP::TIMESTAMP) + INTERVAL '3 months'
 );
 
 -- Tabela de predições ML (Machine Learning)
@@ -80,21 +196,25 @@ CREATE TABLE IF NOT EXISTS predicoes_intensidade (
     probabilidade_leve DECIMAL(5, 4),
     probabilidade_sem_chuva DECIMAL(5, 4),
     modelo_usado VARCHAR(100),
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    modelo_versao VARCHAR(100),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    -- Chave da junção com a observação (vw_comparacao_ml_sql)
+    hora_observacao TIMESTAMP GENERATED ALWAYS AS (date_trunc('hour', timestamp_utc)) STORED
 );
 
 -- Índices para melhorar performance de consultas
+-- (codigo_wmo, timestamp_utc) já é atendido pela chave primária
 CREATE INDEX IF NOT EXISTS idx_dados_timestamp ON dados_meteorologicos(timestamp_utc);
-CREATE INDEX IF NOT EXISTS idx_dados_codigo_data ON dados_meteorologicos(codigo_wmo, data);
 CREATE INDEX IF NOT EXISTS idx_dados_intensidade ON dados_meteorologicos(intensidade_chuva);
 CREATE INDEX IF NOT EXISTS idx_dados_precipitacao ON dados_meteorologicos(precipitacao_mm);
 CREATE INDEX IF NOT EXISTS idx_predicoes_timestamp ON predicoes_intensidade(timestamp_utc);
-CREATE INDEX IF NOT EXISTS idx_predicoes_codigo ON predicoes_intensidade(codigo_wmo);
+CREATE INDEX IF NOT EXISTS idx_predicoes_estacao_hora ON predicoes_intensidade(codigo_wmo, hora_observacao);
+CREATE INDEX IF NOT EXISTS idx_predicoes_hora_estacao ON predicoes_intensidade(hora_observacao, codigo_wmo);
 CREATE INDEX IF NOT EXISTS idx_predicoes_intensidade ON predicoes_intensidade(intensidade_predita);
 
 -- Comentários nas tabelas
 COMMENT ON TABLE estacoes IS 'Metadados das estações meteorológicas do INMET';
-COMMENT ON TABLE dados_meteorologicos IS 'Dados meteorológicos horários coletados das estações';
+COMMENT ON TABLE dados_meteorologicos IS 'Dados meteorológicos horários coletados das estações (particionada por mês)';
 COMMENT ON TABLE predicoes_intensidade IS 'Predições de intensidade de chuva geradas por modelos ML';
 
 COMMENT ON COLUMN dados_meteorologicos.intensidade_chuva IS 'Classificação: sem_chuva, leve, moderada, forte';
@@ -1,38 +1,65 @@
--- Script para atualizar a classificação de intensidade de chuva no banco de dados
+-- Classificação de intensidade de chuva no banco de dados
 -- Baseado nos critérios do problema 7.8:
 -- Sem chuva: 0 mm
 -- Leve: 0.1 - 2.5 mm/h
 -- Moderada: 2.6 - 10 mm/h
 -- Forte: > 10 mm/h
+--
+-- A ingestão (API) já grava a classe no INSERT (services/classification.py).
+-- Este script cria a função reutilizável e um trigger que classifica qualquer
+-- linha inserida sem classe, de modo que não é mais necessário um UPDATE na tabela inteira.
 
--- Atualiza a coluna intensidade_chuva com base na precipitação
+-- Função de classificação (mesmos limites de services/classification.py)
+CREATE OR REPLACE FUNCTION classificar_intensidade_chuva(p_precipitacao NUMERIC)
+RETURNS VARCHAR(20) AS $$
+    SELECT CASE
+        WHEN p_precipitacao IS NULL OR p_precipitacao = 0 THEN 'sem_chuva'
+        WHEN p_precipitacao >= 0.1 AND p_precipitacao <= 2.5 THEN 'leve'
+        WHEN p_precipitacao >= 2.6 AND p_precipitacao <= 10 THEN 'moderada'
+        WHEN p_precipitacao > 10 THEN 'forte'
+        ELSE 'sem_chuva'
+    END::VARCHAR(20);
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE;
+
+COMMENT ON FUNCTION classificar_intensidade_chuva(NUMERIC) IS 'Classe de intensidade (sem_chuva, leve, moderada, forte) a partir da precipitação horária em mm';
+
+-- Trigger: preenche a classe quando ausente e a recalcula quando só a precipitação muda
+CREATE OR REPLACE FUNCTION trg_classificar_intensidade_chuva()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.intensidade_chuva IS NULL OR NEW.intensidade_chuva = ''
+       OR (TG_OP = 'UPDATE'
+           AND NEW.precipitacao_mm IS DISTINCT FROM OLD.precipitacao_mm
+           AND NEW.intensidade_chuva IS NOT DISTINCT FROM OLD.intensidade_chuva) THEN
+        NEW.intensidade_chuva := classificar_intensidade_chuva(NEW.precipitacao_mm);
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_dados_intensidade_chuva ON dados_meteorologicos;
+CREATE TRIGGER trg_dados_intensidade_chuva
+    BEFORE INSERT OR UPDATE OF precipitacao_mm, intensidade_chuva ON dados_meteorologicos
+    FOR EACH ROW
+    EXECUTE FUNCTION trg_classificar_intensidade_chuva();
+
+-- Classifica apenas linhas antigas que ainda estejam sem classe
+-- (bancos carregados antes do trigger; em instalações novas não atualiza nada)
 UPDATE dados_meteorologicos
-SET intensidade_chuva = CASE
-    WHEN precipitacao_mm IS NULL OR precipitacao_mm = 0 THEN 'sem_chuva'
-    WHEN precipitacao_mm >= 0.1 AND precipitacao_mm <= 2.5 THEN 'leve'
-    WHEN precipitacao_mm >= 2.6 AND precipitacao_mm <= 10 THEN 'moderada'
-    WHEN precipitacao_mm > 10 THEN 'forte'
-    ELSE 'sem_chuva'
-END
+SET intensidade_chuva = classificar_intensidade_chuva(precipitacao_mm)
 WHERE intensidade_chuva IS NULL OR intensidade_chuva = '';
 
 -- Verifica a distribuição das classes
-SELECT 
+SELECT
     intensidade_chuva,
     COUNT(*) as total_registros,
     ROUND(COUNT(*) * 100.0 / (SELECT COUNT(*) FROM dados_meteorologicos), 2) as percentual
 FROM dados_meteorologicos
 GROUP BY intensidade_chuva
-ORDER BY 
+ORDER BY
     CASE intensidade_chuva
         WHEN 'sem_chuva' THEN 1
         WHEN 'leve' THEN 2
         WHEN 'moderada' THEN 3
         WHEN 'forte' THEN 4
     END;
-
-
-
-
-
-
@@ -23,13 +23,25 @@ CREATE TABLE IF NOT EXISTS predicoes_intensidade (
     probabilidade_leve DECIMAL(5, 4),
     probabilidade_sem_chuva DECIMAL(5, 4),
     modelo_usado VARCHAR(100),
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    modelo_versao VARCHAR(100),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    hora_observacao TIMESTAMP GENERATED ALWAYS AS (date_trunc('hour', timestamp_utc)) STORED
 );
 
+-- Bancos criados antes destas colunas
+ALTER TABLE predicoes_intensidade ADD COLUMN IF NOT EXISTS modelo_versao VARCHAR(100);
+ALTER TABLE predicoes_intensidade ADD COLUMN IF NOT EXISTS hora_observacao TIMESTAMP
+    GENERATED ALWAYS AS (date_trunc('hour', timestamp_utc)) STORED;
+
 -- Cria índices se não existirem
 CREATE INDEX IF NOT EXISTS idx_predicoes_timestamp ON predicoes_intensidade(timestamp_utc);
-CREATE INDEX IF NOT EXISTS idx_predicoes_codigo ON predicoes_intensidade(codigo_wmo);
 CREATE INDEX IF NOT EXISTS idx_predicoes_intensidade ON predicoes_intensidade(intensidade_predita);
+-- Junção com a observação (dados_meteorologicos é horária): por estação e hora,
+-- e por hora para consultas de um intervalo que partem das predições.
+-- O índice composto substitui o de codigo_wmo sozinho.
+CREATE INDEX IF NOT EXISTS idx_predicoes_estacao_hora ON predicoes_intensidade(codigo_wmo, hora_observacao);
+CREATE INDEX IF NOT EXISTS idx_predicoes_hora_estacao ON predicoes_intensidade(hora_observacao, codigo_wmo);
+DROP INDEX IF EXISTS idx_predicoes_codigo;
 
 -- Remove views antigas se existirem (para recriar)
 DROP VIEW IF EXISTS vw_predicoes_ml CASCADE;
@@ -62,6 +74,19 @@ ORDER BY timestamp_utc DESC;
 
 -- ============================================================
 -- VIEW 11: Comparação ML vs Classificação SQL
+-- A predição é ligada à observação pela hora (hora_observacao =
+-- timestamp_utc da observação), coberta pelos índices compostos: filtrando
+-- por time, o Postgres lê só as partições do intervalo e busca as predições
+-- de cada observação pelo índice (estação, hora), sem percorrer o histórico
+-- de predições (a junção por DATE/EXTRACT lia a tabela inteira).
+-- Uma linha por observação: a pontuação em lote grava uma predição por
+-- versão do modelo, e a junção pega só a mais recente (created_at, que a
+-- regravação atualiza), então as linhas não se multiplicam a cada geração do
+-- modelo. Como cada versão herda a watermark da anterior, a mais recente é a
+-- da versão ativa para o que ela já pontuou e a do pai para o histórico.
+-- A busca é um LATERAL ... LIMIT 1 por observação em idx_predicoes_estacao_hora.
+-- Observações sem predição vêm com 'sem_predicao'; painéis que só olham
+-- observações com predição filtram também hora_predicao pelo mesmo intervalo.
 -- ============================================================
 CREATE VIEW vw_comparacao_ml_sql AS
 SELECT 
@@ -72,6 +97,7 @@ SELECT
     dm.intensidade_chuva as classificacao_sql,
     pi.intensidade_predita as classificacao_ml,
     CASE 
+        WHEN pi.id IS NULL THEN 'sem_predicao'
         WHEN dm.intensidade_chuva = pi.intensidade_predita THEN 'match'
         ELSE 'diferenca'
     END as status_comparacao,
@@ -79,13 +105,19 @@ SELECT
     pi.probabilidade_moderada,
     pi.probabilidade_leve,
     pi.probabilidade_sem_chuva,
-    pi.modelo_usado
+    pi.modelo_usado,
+    pi.modelo_versao,
+    pi.hora_observacao as hora_predicao
 FROM dados_meteorologicos dm
 JOIN estacoes e ON dm.codigo_wmo = e.codigo_wmo
-LEFT JOIN predicoes_intensidade pi ON 
-    dm.codigo_wmo = pi.codigo_wmo 
-    AND DATE(dm.timestamp_utc) = DATE(pi.timestamp_utc)
-    AND EXTRACT(HOUR FROM dm.timestamp_utc) = EXTRACT(HOUR FROM pi.timestamp_utc)
+LEFT JOIN LATERAL (
+    SELECT p.*
+    FROM predicoes_intensidade p
+    WHERE p.codigo_wmo = dm.codigo_wmo
+      AND p.hora_observacao = dm.timestamp_utc
+    ORDER BY p.created_at DESC, p.id DESC
+    LIMIT 1
+) pi ON TRUE
 WHERE dm.intensidade_chuva IS NOT NULL
 ORDER BY dm.timestamp_utc DESC;
 
@@ -113,6 +145,7 @@ FROM predicoes_intensidade;
 -- Comentários
 COMMENT ON TABLE predicoes_intensidade IS 'Predições de intensidade de chuva geradas por modelos ML';
 COMMENT ON VIEW vw_predicoes_ml IS 'Predições de intensidade geradas por modelos de Machine Learning';
-COMMENT ON VIEW vw_comparacao_ml_sql IS 'Comparação entre classificação SQL (regras) e predições ML';
+COMMENT ON VIEW vw_comparacao_ml_sql IS 'Comparação entre classificação SQL (regras) e a predição ML mais recente de cada observação, ligadas pela hora da observação';
+COMMENT ON COLUMN predicoes_intensidade.hora_observacao IS 'Hora da observação (timestamp_utc truncado na hora): chave da junção com dados_meteorologicos';
 COMMENT ON VIEW vw_estatisticas_predicoes_ml IS 'Estatísticas gerais das predições ML';
 
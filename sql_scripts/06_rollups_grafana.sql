@@ -0,0 +1,426 @@
+-- ============================================================
+-- ROLLUPS MULTI-RESOLUÇÃO PARA GRAFANA
+-- Agregados diários, semanais e mensais por estação e classe de intensidade
+-- ============================================================
+-- Os painéis de série temporal agregavam dados_meteorologicos hora a hora
+-- a cada refresh. Este script mantém agregados pré-calculados (soma,
+-- contagem, mínimo e máximo de cada variável) que são atualizados na
+-- ingestão pela função atualizar_rollups(), chamada pelo db_service.
+--
+-- Resoluções: 'dia', 'semana' e 'mes'. A resolução 'hora' é servida
+-- diretamente de dados_meteorologicos.
+
+CREATE TABLE IF NOT EXISTS rollup_dados_meteorologicos (
+    resolucao VARCHAR(10) NOT NULL,          -- dia, semana, mes
+    codigo_wmo VARCHAR(10) NOT NULL,
+    intensidade_chuva VARCHAR(20) NOT NULL,  -- 'nao_classificado' quando NULL na origem
+    inicio_periodo TIMESTAMP NOT NULL,       -- date_trunc(resolucao, timestamp_utc)
+    total_registros INTEGER NOT NULL DEFAULT 0,
+
+    precipitacao_mm_soma DOUBLE PRECISION,
+    precipitacao_mm_n INTEGER NOT NULL DEFAULT 0,
+    precipitacao_mm_min DOUBLE PRECISION,
+    precipitacao_mm_max DOUBLE PRECISION,
+    pressao_estacao_mb_soma DOUBLE PRECISION,
+    pressao_estacao_mb_n INTEGER NOT NULL DEFAULT 0,
+    pressao_estacao_mb_min DOUBLE PRECISION,
+    pressao_estacao_mb_max DOUBLE PRECISION,
+    pressao_max_mb_soma DOUBLE PRECISION,
+    pressao_max_mb_n INTEGER NOT NULL DEFAULT 0,
+    pressao_max_mb_min DOUBLE PRECISION,
+    pressao_max_mb_max DOUBLE PRECISION,
+    pressao_min_mb_soma DOUBLE PRECISION,
+    pressao_min_mb_n INTEGER NOT NULL DEFAULT 0,
+    pressao_min_mb_min DOUBLE PRECISION,
+    pressao_min_mb_max DOUBLE PRECISION,
+    radiacao_global_kjm2_soma DOUBLE PRECISION,
+    radiacao_global_kjm2_n INTEGER NOT NULL DEFAULT 0,
+    radiacao_global_kjm2_min DOUBLE PRECISION,
+    radiacao_global_kjm2_max DOUBLE PRECISION,
+    temperatura_ar_c_soma DOUBLE PRECISION,
+    temperatura_ar_c_n INTEGER NOT NULL DEFAULT 0,
+    temperatura_ar_c_min DOUBLE PRECISION,
+    temperatura_ar_c_max DOUBLE PRECISION,
+    temperatura_orvalho_c_soma DOUBLE PRECISION,
+    temperatura_orvalho_c_n INTEGER NOT NULL DEFAULT 0,
+    temperatura_orvalho_c_min DOUBLE PRECISION,
+    temperatura_orvalho_c_max DOUBLE PRECISION,
+    temperatura_max_c_soma DOUBLE PRECISION,
+    temperatura_max_c_n INTEGER NOT NULL DEFAULT 0,
+    temperatura_max_c_min DOUBLE PRECISION,
+    temperatura_max_c_max DOUBLE PRECISION,
+    temperatura_min_c_soma DOUBLE PRECISION,
+    temperatura_min_c_n INTEGER NOT NULL DEFAULT 0,
+    temperatura_min_c_min DOUBLE PRECISION,
+    temperatura_min_c_max DOUBLE PRECISION,
+    temperatura_orvalho_max_c_soma DOUBLE PRECISION,
+    temperatura_orvalho_max_c_n INTEGER NOT NULL DEFAULT 0,
+    temperatura_orvalho_max_c_min DOUBLE PRECISION,
+    temperatura_orvalho_max_c_max DOUBLE PRECISION,
+    temperatura_orvalho_min_c_soma DOUBLE PRECISION,
+    temperatura_orvalho_min_c_n INTEGER NOT NULL DEFAULT 0,
+    temperatura_orvalho_min_c_min DOUBLE PRECISION,
+    temperatura_orvalho_min_c_max DOUBLE PRECISION,
+    umidade_rel_max_pct_soma DOUBLE PRECISION,
+    umidade_rel_max_pct_n INTEGER NOT NULL DEFAULT 0,
+    umidade_rel_max_pct_min DOUBLE PRECISION,
+    umidade_rel_max_pct_max DOUBLE PRECISION,
+    umidade_rel_min_pct_soma DOUBLE PRECISION,
+    umidade_rel_min_pct_n INTEGER NOT NULL DEFAULT 0,
+    umidade_rel_min_pct_min DOUBLE PRECISION,
+    umidade_rel_min_pct_max DOUBLE PRECISION,
+    umidade_rel_horaria_pct_soma DOUBLE PRECISION,
+    umidade_rel_horaria_pct_n INTEGER NOT NULL DEFAULT 0,
+    umidade_rel_horaria_pct_min DOUBLE PRECISION,
+    umidade_rel_horaria_pct_max DOUBLE PRECISION,
+    vento_direcao_graus_soma DOUBLE PRECISION,
+    vento_direcao_graus_n INTEGER NOT NULL DEFAULT 0,
+    vento_direcao_graus_min DOUBLE PRECISION,
+    vento_direcao_graus_max DOUBLE PRECISION,
+    vento_rajada_max_ms_soma DOUBLE PRECISION,
+    vento_rajada_max_ms_n INTEGER NOT NULL DEFAULT 0,
+    vento_rajada_max_ms_min DOUBLE PRECISION,
+    vento_rajada_max_ms_max DOUBLE PRECISION,
+    vento_velocidade_ms_soma DOUBLE PRECISION,
+    vento_velocidade_ms_n INTEGER NOT NULL DEFAULT 0,
+    vento_velocidade_ms_min DOUBLE PRECISION,
+    vento_velocidade_ms_max DOUBLE PRECISION,
+
+    atualizado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+
+    CONSTRAINT pk_rollup_dados_meteorologicos
+        PRIMARY KEY (resolucao, codigo_wmo, intensidade_chuva, inicio_periodo),
+    CONSTRAINT ck_rollup_resolucao CHECK (resolucao IN ('dia', 'semana', 'mes'))
+);
+
+-- Consultas do Grafana filtram por resolução e intervalo de tempo (todas as estações)
+CREATE INDEX IF NOT EXISTS idx_rollup_resolucao_periodo
+    ON rollup_dados_meteorologicos(resolucao, inicio_periodo);
+
+COMMENT ON TABLE rollup_dados_meteorologicos IS 'Agregados diários/semanais/mensais por estação e intensidade, mantidos na ingestão';
+COMMENT ON COLUMN rollup_dados_meteorologicos.resolucao IS 'Resolução do agregado: dia, semana ou mes';
+
+-- ============================================================
+-- Converte o nome da resolução para o campo aceito por date_trunc
+-- ============================================================
+CREATE OR REPLACE FUNCTION campo_resolucao_rollup(p_resolucao TEXT)
+RETURNS TEXT AS $$
+    SELECT CASE p_resolucao
+        WHEN 'hora' THEN 'hour'
+        WHEN 'dia' THEN 'day'
+        WHEN 'semana' THEN 'week'
+        WHEN 'mes' THEN 'month'
+    END;
+$$ LANGUAGE sql IMMUTABLE;
+
+-- ============================================================
+-- Medidas em que 0 é o valor gravado quando a estação não leu o sensor
+-- (pressão, umidade e vento): ficam fora de somas, contagens, mínimos e
+-- máximos, como os painéis faziam com "<> 0" antes dos rollups.
+-- ============================================================
+CREATE OR REPLACE FUNCTION zero_sem_leitura_rollup(p_variavel TEXT)
+RETURNS BOOLEAN AS $$
+    SELECT p_variavel IN (
+        'pressao_estacao_mb', 'pressao_max_mb', 'pressao_min_mb',
+        'umidade_rel_max_pct', 'umidade_rel_min_pct', 'umidade_rel_horaria_pct',
+        'vento_rajada_max_ms', 'vento_velocidade_ms'
+    );
+$$ LANGUAGE sql IMMUTABLE;
+
+-- ============================================================
+-- Recalcula os agregados que cobrem [p_inicio, p_fim] de uma estação
+-- (ou de todas, quando p_codigo_wmo é NULL).
+-- Só os dias tocados pelo intervalo são relidos de dados_meteorologicos;
+-- semanas e meses que contêm esses dias são remontados a partir dos
+-- rollups diários (soma das somas, mínimo dos mínimos...), sem reler o
+-- mês inteiro de dados brutos a cada lote. Os períodos afetados são
+-- apagados e recalculados, então reprocessar o mesmo arquivo (upsert)
+-- não duplica somas.
+-- ============================================================
+CREATE OR REPLACE FUNCTION atualizar_rollups(
+    p_codigo_wmo VARCHAR,
+    p_inicio TIMESTAMP,
+    p_fim TIMESTAMP
+)
+RETURNS INTEGER AS $$
+DECLARE
+    v_resolucao TEXT;
+    v_campo TEXT;
+    v_inicio TIMESTAMP;
+    v_fim TIMESTAMP;
+    v_linhas INTEGER;
+    v_total INTEGER := 0;
+BEGIN
+    IF p_inicio IS NULL OR p_fim IS NULL THEN
+        RETURN 0;
+    END IF;
+
+    -- Serializa recálculos da mesma estação (DELETE + INSERT nos mesmos períodos).
+    -- Estações diferentes recalculam em paralelo; a reconstrução de todas as
+    -- estações (p_codigo_wmo NULL) espera as demais e as bloqueia.
+    IF p_codigo_wmo IS NULL THEN
+        PERFORM pg_advisory_xact_lock(hashtext('atualizar_rollups'));
+    ELSE
+        PERFORM pg_advisory_xact_lock_shared(hashtext('atualizar_rollups'));
+        PERFORM pg_advisory_xact_lock(hashtext('atualizar_rollups:' || p_codigo_wmo));
+    END IF;
+
+    -- Dias tocados: relidos dos dados brutos
+    v_inicio := date_trunc('day', p_inicio);
+    v_fim := date_trunc('day', p_fim) + INTERVAL '1 day';
+
+    DELETE FROM rollup_dados_meteorologicos
+    WHERE resolucao = 'dia'
+      AND (p_codigo_wmo IS NULL OR codigo_wmo = p_codigo_wmo)
+      AND inicio_periodo >= v_inicio
+      AND inicio_periodo < v_fim;
+
+    INSERT INTO rollup_dados_meteorologicos (
+        resolucao, codigo_wmo, intensidade_chuva, inicio_periodo, total_registros,
+        precipitacao_mm_soma, precipitacao_mm_n, precipitacao_mm_min, precipitacao_mm_max,
+        pressao_estacao_mb_soma, pressao_estacao_mb_n, pressao_estacao_mb_min, pressao_estacao_mb_max,
+        pressao_max_mb_soma, pressao_max_mb_n, pressao_max_mb_min, pressao_max_mb_max,
+        pressao_min_mb_soma, pressao_min_mb_n, pressao_min_mb_min, pressao_min_mb_max,
+        radiacao_global_kjm2_soma, radiacao_global_kjm2_n, radiacao_global_kjm2_min, radiacao_global_kjm2_max,
+        temperatura_ar_c_soma, temperatura_ar_c_n, temperatura_ar_c_min, temperatura_ar_c_max,
+        temperatura_orvalho_c_soma, temperatura_orvalho_c_n, temperatura_orvalho_c_min, temperatura_orvalho_c_max,
+        temperatura_max_c_soma, temperatura_max_c_n, temperatura_max_c_min, temperatura_max_c_max,
+        temperatura_min_c_soma, temperatura_min_c_n, temperatura_min_c_min, temperatura_min_c_max,
+        temperatura_orvalho_max_c_soma, temperatura_orvalho_max_c_n, temperatura_orvalho_max_c_min, temperatura_orvalho_max_c_max,
+        temperatura_orvalho_min_c_soma, temperatura_orvalho_min_c_n, temperatura_orvalho_min_c_min, temperatura_orvalho_min_c_max,
+        umidade_rel_max_pct_soma, umidade_rel_max_pct_n, umidade_rel_max_pct_min, umidade_rel_max_pct_max,
+        umidade_rel_min_pct_soma, umidade_rel_min_pct_n, umidade_rel_min_pct_min, umidade_rel_min_pct_max,
+        umidade_rel_horaria_pct_soma, umidade_rel_horaria_pct_n, umidade_rel_horaria_pct_min, umidade_rel_horaria_pct_max,
+        vento_direcao_graus_soma, vento_direcao_graus_n, vento_direcao_graus_min, vento_direcao_graus_max,
+        vento_rajada_max_ms_soma, vento_rajada_max_ms_n, vento_rajada_max_ms_min, vento_rajada_max_ms_max,
+        vento_velocidade_ms_soma, vento_velocidade_ms_n, vento_velocidade_ms_min, vento_velocidade_ms_max
+    )
+    SELECT
+        'dia',
+        codigo_wmo,
+        COALESCE(intensidade_chuva, 'nao_classificado'),
+        date_trunc('day', timestamp_utc),
+        COUNT(*),
+        SUM(precipitacao_mm), COUNT(precipitacao_mm), MIN(precipitacao_mm), MAX(precipitacao_mm),
+        SUM(NULLIF(pressao_estacao_mb, 0)), COUNT(NULLIF(pressao_estacao_mb, 0)), MIN(NULLIF(pressao_estacao_mb, 0)), MAX(NULLIF(pressao_estacao_mb, 0)),
+        SUM(NULLIF(pressao_max_mb, 0)), COUNT(NULLIF(pressao_max_mb, 0)), MIN(NULLIF(pressao_max_mb, 0)), MAX(NULLIF(pressao_max_mb, 0)),
+        SUM(NULLIF(pressao_min_mb, 0)), COUNT(NULLIF(pressao_min_mb, 0)), MIN(NULLIF(pressao_min_mb, 0)), MAX(NULLIF(pressao_min_mb, 0)),
+        SUM(radiacao_global_kjm2), COUNT(radiacao_global_kjm2), MIN(radiacao_global_kjm2), MAX(radiacao_global_kjm2),
+        SUM(temperatura_ar_c), COUNT(temperatura_ar_c), MIN(temperatura_ar_c), MAX(temperatura_ar_c),
+        SUM(temperatura_orvalho_c), COUNT(temperatura_orvalho_c), MIN(temperatura_orvalho_c), MAX(temperatura_orvalho_c),
+        SUM(temperatura_max_c), COUNT(temperatura_max_c), MIN(temperatura_max_c), MAX(temperatura_max_c),
+        SUM(temperatura_min_c), COUNT(temperatura_min_c), MIN(temperatura_min_c), MAX(temperatura_min_c),
+        SUM(temperatura_orvalho_max_c), COUNT(temperatura_orvalho_max_c), MIN(temperatura_orvalho_max_c), MAX(temperatura_orvalho_max_c),
+        SUM(temperatura_orvalho_min_c), COUNT(temperatura_orvalho_min_c), MIN(temperatura_orvalho_min_c), MAX(temperatura_orvalho_min_c),
+        SUM(NULLIF(umidade_rel_max_pct, 0)), COUNT(NULLIF(umidade_rel_max_pct, 0)), MIN(NULLIF(umidade_rel_max_pct, 0)), MAX(NULLIF(umidade_rel_max_pct, 0)),
+        SUM(NULLIF(umidade_rel_min_pct, 0)), COUNT(NULLIF(umidade_rel_min_pct, 0)), MIN(NULLIF(umidade_rel_min_pct, 0)), MAX(NULLIF(umidade_rel_min_pct, 0)),
+        SUM(NULLIF(umidade_rel_horaria_pct, 0)), COUNT(NULLIF(umidade_rel_horaria_pct, 0)), MIN(NULLIF(umidade_rel_horaria_pct, 0)), MAX(NULLIF(umidade_rel_horaria_pct, 0)),
+        SUM(vento_direcao_graus), COUNT(vento_direcao_graus), MIN(vento_direcao_graus), MAX(vento_direcao_graus),
+        SUM(NULLIF(vento_rajada_max_ms, 0)), COUNT(NULLIF(vento_rajada_max_ms, 0)), MIN(NULLIF(vento_rajada_max_ms, 0)), MAX(NULLIF(vento_rajada_max_ms, 0)),
+        SUM(NULLIF(vento_velocidade_ms, 0)), COUNT(NULLIF(vento_velocidade_ms, 0)), MIN(NULLIF(vento_velocidade_ms, 0)), MAX(NULLIF(vento_velocidade_ms, 0))
+    FROM dados_meteorologicos
+    WHERE (p_codigo_wmo IS NULL OR codigo_wmo = p_codigo_wmo)
+      AND timestamp_utc >= v_inicio
+      AND timestamp_utc < v_fim
+    GROUP BY codigo_wmo, COALESCE(intensidade_chuva, 'nao_classificado'), date_trunc('day', timestamp_utc);
+
+    GET DIAGNOSTICS v_linhas = ROW_COUNT;
+    v_total := v_linhas;
+
+    -- Semanas e meses que contêm os dias tocados: remontados dos rollups diários
+    FOREACH v_resolucao IN ARRAY ARRAY['semana', 'mes'] LOOP
+        v_campo := campo_resolucao_rollup(v_resolucao);
+        v_inicio := date_trunc(v_campo, p_inicio);
+        v_fim := date_trunc(v_campo, p_fim) + ('1 ' || v_campo)::INTERVAL;
+
+        DELETE FROM rollup_dados_meteorologicos
+        WHERE resolucao = v_resolucao
+          AND (p_codigo_wmo IS NULL OR codigo_wmo = p_codigo_wmo)
+          AND inicio_periodo >= v_inicio
+          AND inicio_periodo < v_fim;
+
+        INSERT INTO rollup_dados_meteorologicos (
+            resolucao, codigo_wmo, intensidade_chuva, inicio_periodo, total_registros,
+            precipitacao_mm_soma, precipitacao_mm_n, precipitacao_mm_min, precipitacao_mm_max,
+            pressao_estacao_mb_soma, pressao_estacao_mb_n, pressao_estacao_mb_min, pressao_estacao_mb_max,
+            pressao_max_mb_soma, pressao_max_mb_n, pressao_max_mb_min, pressao_max_mb_max,
+            pressao_min_mb_soma, pressao_min_mb_n, pressao_min_mb_min, pressao_min_mb_max,
+            radiacao_global_kjm2_soma, radiacao_global_kjm2_n, radiacao_global_kjm2_min, radiacao_global_kjm2_max,
+            temperatura_ar_c_soma, temperatura_ar_c_n, temperatura_ar_c_min, temperatura_ar_c_max,
+            temperatura_orvalho_c_soma, temperatura_orvalho_c_n, temperatura_orvalho_c_min, temperatura_orvalho_c_max,
+            temperatura_max_c_soma, temperatura_max_c_n, temperatura_max_c_min, temperatura_max_c_max,
+            temperatura_min_c_soma, temperatura_min_c_n, temperatura_min_c_min, temperatura_min_c_max,
+            temperatura_orvalho_max_c_soma, temperatura_orvalho_max_c_n, temperatura_orvalho_max_c_min, temperatura_orvalho_max_c_max,
+            temperatura_orvalho_min_c_soma, temperatura_orvalho_min_c_n, temperatura_orvalho_min_c_min, temperatura_orvalho_min_c_max,
+            umidade_rel_max_pct_soma, umidade_rel_max_pct_n, umidade_rel_max_pct_min, umidade_rel_max_pct_max,
+            umidade_rel_min_pct_soma, umidade_rel_min_pct_n, umidade_rel_min_pct_min, umidade_rel_min_pct_max,
+            umidade_rel_horaria_pct_soma, umidade_rel_horaria_pct_n, umidade_rel_horaria_pct_min, umidade_rel_horaria_pct_max,
+            vento_direcao_graus_soma, vento_direcao_graus_n, vento_direcao_graus_min, vento_direcao_graus_max,
+            vento_rajada_max_ms_soma, vento_rajada_max_ms_n, vento_rajada_max_ms_min, vento_rajada_max_ms_max,
+            vento_velocidade_ms_soma, vento_velocidade_ms_n, vento_velocidade_ms_min, vento_velocidade_ms_max
+        )
+        SELECT
+            v_resolucao,
+            codigo_wmo,
+            intensidade_chuva,
+            date_trunc(v_campo, inicio_periodo),
+            SUM(total_registros),
+            SUM(precipitacao_mm_soma), SUM(precipitacao_mm_n), MIN(precipitacao_mm_min), MAX(precipitacao_mm_max),
+            SUM(pressao_estacao_mb_soma), SUM(pressao_estacao_mb_n), MIN(pressao_estacao_mb_min), MAX(pressao_estacao_mb_max),
+            SUM(pressao_max_mb_soma), SUM(pressao_max_mb_n), MIN(pressao_max_mb_min), MAX(pressao_max_mb_max),
+            SUM(pressao_min_mb_soma), SUM(pressao_min_mb_n), MIN(pressao_min_mb_min), MAX(pressao_min_mb_max),
+            SUM(radiacao_global_kjm2_soma), SUM(radiacao_global_kjm2_n), MIN(radiacao_global_kjm2_min), MAX(radiacao_global_kjm2_max),
+            SUM(temperatura_ar_c_soma), SUM(temperatura_ar_c_n), MIN(temperatura_ar_c_min), MAX(temperatura_ar_c_max),
+            SUM(temperatura_orvalho_c_soma), SUM(temperatura_orvalho_c_n), MIN(temperatura_orvalho_c_min), MAX(temperatura_orvalho_c_max),
+            SUM(temperatura_max_c_soma), SUM(temperatura_max_c_n), MIN(temperatura_max_c_min), MAX(temperatura_max_c_max),
+            SUM(temperatura_min_c_soma), SUM(temperatura_min_c_n), MIN(temperatura_min_c_min), MAX(temperatura_min_c_max),
+            SUM(temperatura_orvalho_max_c_soma), SUM(temperatura_orvalho_max_c_n), MIN(temperatura_orvalho_max_c_min), MAX(temperatura_orvalho_max_c_max),
+            SUM(temperatura_orvalho_min_c_soma), SUM(temperatura_orvalho_min_c_n), MIN(temperatura_orvalho_min_c_min), MAX(temperatura_orvalho_min_c_max),
+            SUM(umidade_rel_max_pct_soma), SUM(umidade_rel_max_pct_n), MIN(umidade_rel_max_pct_min), MAX(umidade_rel_max_pct_max),
+            SUM(umidade_rel_min_pct_soma), SUM(umidade_rel_min_pct_n), MIN(umidade_rel_min_pct_min), MAX(umidade_rel_min_pct_max),
+            SUM(umidade_rel_horaria_pct_soma), SUM(umidade_rel_horaria_pct_n), MIN(umidade_rel_horaria_pct_min), MAX(umidade_rel_horaria_pct_max),
+            SUM(vento_direcao_graus_soma), SUM(vento_direcao_graus_n), MIN(vento_direcao_graus_min), MAX(vento_direcao_graus_max),
+            SUM(vento_rajada_max_ms_soma), SUM(vento_rajada_max_ms_n), MIN(vento_rajada_max_ms_min), MAX(vento_rajada_max_ms_max),
+            SUM(vento_velocidade_ms_soma), SUM(vento_velocidade_ms_n), MIN(vento_velocidade_ms_min), MAX(vento_velocidade_ms_max)
+        FROM rollup_dados_meteorologicos
+        WHERE resolucao = 'dia'
+          AND (p_codigo_wmo IS NULL OR codigo_wmo = p_codigo_wmo)
+          AND inicio_periodo >= v_inicio
+          AND inicio_periodo < v_fim
+        GROUP BY codigo_wmo, intensidade_chuva, date_trunc(v_campo, inicio_periodo);
+
+        GET DIAGNOSTICS v_linhas = ROW_COUNT;
+        v_total := v_total + v_linhas;
+    END LOOP;
+
+    RETURN v_total;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION atualizar_rollups(VARCHAR, TIMESTAMP, TIMESTAMP) IS 'Recalcula os rollups dia/semana/mes que cobrem o intervalo (NULL = todas as estações)';
+
+-- ============================================================
+-- Escolhe a resolução mais grossa cujo período cabe no intervalo pedido.
+-- No Grafana, passe o $__interval do painel:
+--   escolher_resolucao_rollup(($__interval_ms || ' milliseconds')::INTERVAL)
+-- ============================================================
+CREATE OR REPLACE FUNCTION escolher_resolucao_rollup(p_intervalo INTERVAL)
+RETURNS TEXT AS $$
+    SELECT CASE
+        WHEN p_intervalo >= INTERVAL '1 month' THEN 'mes'
+        WHEN p_intervalo >= INTERVAL '7 days' THEN 'semana'
+        WHEN p_intervalo >= INTERVAL '1 day' THEN 'dia'
+        ELSE 'hora'
+    END;
+$$ LANGUAGE sql IMMUTABLE;
+
+-- ============================================================
+-- Série temporal de uma variável na resolução adequada ao intervalo.
+-- Retorna média, mínimo, máximo e contagem por período e intensidade,
+-- usando o rollup quando possível e os dados horários caso contrário.
+--
+-- Exemplo (painel do Grafana):
+--   SELECT time, valor, intensidade_chuva
+--   FROM serie_rollup('pressao_estacao_mb', $__timeFrom()::timestamp, $__timeTo()::timestamp,
+--                     ($__interval_ms || ' milliseconds')::interval)
+-- ============================================================
+CREATE OR REPLACE FUNCTION serie_rollup(
+    p_variavel TEXT,
+    p_inicio TIMESTAMP,
+    p_fim TIMESTAMP,
+    p_intervalo INTERVAL DEFAULT INTERVAL '1 hour',
+    p_codigo_wmo VARCHAR DEFAULT NULL
+)
+RETURNS TABLE (
+    "time" TIMESTAMP,
+    intensidade_chuva VARCHAR,
+    valor DOUBLE PRECISION,
+    minimo DOUBLE PRECISION,
+    maximo DOUBLE PRECISION,
+    n BIGINT,
+    resolucao TEXT
+) AS $$
+DECLARE
+    v_resolucao TEXT := escolher_resolucao_rollup(p_intervalo);
+    v_campo TEXT := campo_resolucao_rollup(escolher_resolucao_rollup(p_intervalo));
+BEGIN
+    -- Valida o nome da variável contra as colunas do rollup (evita SQL dinâmico arbitrário)
+    IF NOT EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_name = 'rollup_dados_meteorologicos'
+          AND column_name = p_variavel || '_soma'
+    ) THEN
+        RAISE EXCEPTION 'Variável desconhecida para rollup: %', p_variavel;
+    END IF;
+
+    IF v_resolucao = 'hora' THEN
+        RETURN QUERY EXECUTE format(
+            'SELECT date_trunc(''hour'', dm.timestamp_utc), dm.intensidade_chuva,
+                    AVG(dm.%1$I)::DOUBLE PRECISION, MIN(dm.%1$I)::DOUBLE PRECISION,
+                    MAX(dm.%1$I)::DOUBLE PRECISION, COUNT(dm.%1$I), %2$L::TEXT
+             FROM dados_meteorologicos dm
+             WHERE dm.timestamp_utc >= $1 AND dm.timestamp_utc < $2
+               AND ($3 IS NULL OR dm.codigo_wmo = $3)
+               AND dm.intensidade_chuva IS NOT NULL
+               AND dm.%1$I IS NOT NULL
+               AND (NOT $4 OR dm.%1$I <> 0)
+             GROUP BY 1, 2
+             ORDER BY 1',
+            p_variavel, v_resolucao
+        ) USING p_inicio, p_fim, p_codigo_wmo, zero_sem_leitura_rollup(p_variavel);
+    ELSE
+        RETURN QUERY EXECUTE format(
+            'SELECT r.inicio_periodo, r.intensidade_chuva,
+                    SUM(r.%1$I) / NULLIF(SUM(r.%2$I), 0), MIN(r.%3$I), MAX(r.%4$I),
+                    SUM(r.%2$I)::BIGINT, %5$L::TEXT
+             FROM rollup_dados_meteorologicos r
+             WHERE r.resolucao = %5$L
+               AND r.inicio_periodo >= date_trunc(%6$L, $1) AND r.inicio_periodo < $2
+               AND ($3 IS NULL OR r.codigo_wmo = $3)
+               AND r.intensidade_chuva <> ''nao_classificado''
+             GROUP BY 1, 2
+             HAVING SUM(r.%2$I) > 0
+             ORDER BY 1',
+            p_variavel || '_soma', p_variavel || '_n', p_variavel || '_min', p_variavel || '_max',
+            v_resolucao, v_campo
+        ) USING p_inicio, p_fim, p_codigo_wmo;
+    END IF;
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+COMMENT ON FUNCTION serie_rollup(TEXT, TIMESTAMP, TIMESTAMP, INTERVAL, VARCHAR) IS 'Série temporal de uma variável na resolução mais grossa que cabe no intervalo do painel';
+
+-- ============================================================
+-- View com as médias já calculadas (soma / contagem)
+-- ============================================================
+CREATE OR REPLACE VIEW vw_rollup_dados_meteorologicos AS
+SELECT
+    resolucao,
+    codigo_wmo,
+    intensidade_chuva,
+    inicio_periodo,
+    total_registros,
+    precipitacao_mm_soma / NULLIF(precipitacao_mm_n, 0) AS precipitacao_mm_media,
+    pressao_estacao_mb_soma / NULLIF(pressao_estacao_mb_n, 0) AS pressao_estacao_mb_media,
+    pressao_max_mb_soma / NULLIF(pressao_max_mb_n, 0) AS pressao_max_mb_media,
+    pressao_min_mb_soma / NULLIF(pressao_min_mb_n, 0) AS pressao_min_mb_media,
+    radiacao_global_kjm2_soma / NULLIF(radiacao_global_kjm2_n, 0) AS radiacao_global_kjm2_media,
+    temperatura_ar_c_soma / NULLIF(temperatura_ar_c_n, 0) AS temperatura_ar_c_media,
+    temperatura_orvalho_c_soma / NULLIF(temperatura_orvalho_c_n, 0) AS temperatura_orvalho_c_media,
+    temperatura_max_c_soma / NULLIF(temperatura_max_c_n, 0) AS temperatura_max_c_media,
+    temperatura_min_c_soma / NULLIF(temperatura_min_c_n, 0) AS temperatura_min_c_media,
+    temperatura_orvalho_max_c_soma / NULLIF(temperatura_orvalho_max_c_n, 0) AS temperatura_orvalho_max_c_media,
+    temperatura_orvalho_min_c_soma / NULLIF(temperatura_orvalho_min_c_n, 0) AS temperatura_orvalho_min_c_media,
+    umidade_rel_max_pct_soma / NULLIF(umidade_rel_max_pct_n, 0) AS umidade_rel_max_pct_media,
+    umidade_rel_min_pct_soma / NULLIF(umidade_rel_min_pct_n, 0) AS umidade_rel_min_pct_media,
+    umidade_rel_horaria_pct_soma / NULLIF(umidade_rel_horaria_pct_n, 0) AS umidade_rel_horaria_pct_media,
+    vento_direcao_graus_soma / NULLIF(vento_direcao_graus_n, 0) AS vento_direcao_graus_media,
+    vento_rajada_max_ms_soma / NULLIF(vento_rajada_max_ms_n, 0) AS vento_rajada_max_ms_media,
+    vento_velocidade_ms_soma / NULLIF(vento_velocidade_ms_n, 0) AS vento_velocidade_ms_media
+FROM rollup_dados_meteorologicos;
+
+COMMENT ON VIEW vw_rollup_dados_meteorologicos IS 'Rollups com médias por variável (soma / contagem)';
+
+-- Carga inicial a partir dos dados já existentes
+SELECT atualizar_rollups(NULL, MIN(timestamp_utc), MAX(timestamp_utc))
+FROM dados_meteorologicos;
@@ -0,0 +1,155 @@
+-- ============================================================
+-- MEDIANAS PARA IMPUTAÇÃO DE VALORES AUSENTES
+-- Medianas por estação e mês, usadas no treino (notebook 03) e na inferência
+-- ============================================================
+-- Medidas ausentes eram preenchidas com constantes (1013 mb, 25 °C, 70 %)
+-- na API e com 0 no notebook de treino. Esta tabela guarda a mediana de
+-- cada variável por (estação, mês), com os níveis de fallback:
+--
+--   (codigo_wmo, mes)  mediana da estação naquele mês
+--   (codigo_wmo, 0)    mediana da estação em todos os meses
+--   ('*', mes)         mediana de todas as estações naquele mês
+--   ('*', 0)           mediana global
+--
+-- A função atualizar_medianas_imputacao() recalcula as medianas a partir de
+-- dados_meteorologicos: só das estações recém-ingeridas (chamada pela API ao
+-- fim de cada ingestão) ou tudo, inclusive o nível '*' (POST /imputation/refresh).
+-- A view vw_dados_imputados aplica a mesma regra da API (services/imputation.py):
+-- máximas/mínimas ausentes usam a medida horária, depois a mediana do nível
+-- mais específico disponível. Precipitação e radiação ausentes valem 0
+-- (sem chuva / noite), não a mediana.
+
+CREATE TABLE IF NOT EXISTS medianas_imputacao (
+    codigo_wmo VARCHAR(10) NOT NULL,    -- '*' = todas as estações
+    mes SMALLINT NOT NULL,              -- 1..12, 0 = todos os meses
+    n_registros INTEGER NOT NULL DEFAULT 0,
+
+    pressao_estacao_mb DOUBLE PRECISION,
+    pressao_max_mb DOUBLE PRECISION,
+    pressao_min_mb DOUBLE PRECISION,
+    temperatura_ar_c DOUBLE PRECISION,
+    temperatura_orvalho_c DOUBLE PRECISION,
+    temperatura_max_c DOUBLE PRECISION,
+    temperatura_min_c DOUBLE PRECISION,
+    temperatura_orvalho_max_c DOUBLE PRECISION,
+    temperatura_orvalho_min_c DOUBLE PRECISION,
+    umidade_rel_max_pct DOUBLE PRECISION,
+    umidade_rel_min_pct DOUBLE PRECISION,
+    umidade_rel_horaria_pct DOUBLE PRECISION,
+    vento_direcao_graus DOUBLE PRECISION,
+    vento_rajada_max_ms DOUBLE PRECISION,
+    vento_velocidade_ms DOUBLE PRECISION,
+
+    atualizado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+
+    CONSTRAINT pk_medianas_imputacao PRIMARY KEY (codigo_wmo, mes),
+    CONSTRAINT ck_medianas_mes CHECK (mes BETWEEN 0 AND 12)
+);
+
+COMMENT ON TABLE medianas_imputacao IS 'Medianas por estação/mês para preencher medidas ausentes (treino e inferência)';
+COMMENT ON COLUMN medianas_imputacao.codigo_wmo IS 'Código WMO da estação, ou * para todas as estações';
+COMMENT ON COLUMN medianas_imputacao.mes IS 'Mês (1-12), ou 0 para todos os meses';
+
+-- ============================================================
+-- Recalcula as medianas de uma estação (níveis (estação, mês) e
+-- (estação, 0)) ou, com p_codigo_wmo NULL, de todas as estações e também
+-- os níveis '*'. Um único GROUPING SETS produz os níveis de fallback.
+-- Retorna o número de linhas gravadas.
+-- ============================================================
+CREATE OR REPLACE FUNCTION atualizar_medianas_imputacao(p_codigo_wmo VARCHAR DEFAULT NULL)
+RETURNS INTEGER AS $$
+DECLARE
+    v_linhas INTEGER;
+BEGIN
+    -- Serializa recálculos concorrentes (duas ingestões terminando juntas)
+    PERFORM pg_advisory_xact_lock(hashtext('atualizar_medianas_imputacao'));
+
+    DELETE FROM medianas_imputacao
+    WHERE p_codigo_wmo IS NULL OR codigo_wmo = p_codigo_wmo;
+
+    INSERT INTO medianas_imputacao (
+        codigo_wmo, mes, n_registros,
+        pressao_estacao_mb, pressao_max_mb, pressao_min_mb,
+        temperatura_ar_c, temperatura_orvalho_c, temperatura_max_c, temperatura_min_c,
+        temperatura_orvalho_max_c, temperatura_orvalho_min_c,
+        umidade_rel_max_pct, umidade_rel_min_pct, umidade_rel_horaria_pct,
+        vento_direcao_graus, vento_rajada_max_ms, vento_velocidade_ms
+    )
+    SELECT
+        COALESCE(codigo_wmo, '*'),
+        COALESCE(mes, 0),
+        COUNT(*),
+        percentile_cont(0.5) WITHIN GROUP (ORDER BY pressao_estacao_mb),
+        percentile_cont(0.5) WITHIN GROUP (ORDER BY pressao_max_mb),
+        percentile_cont(0.5) WITHIN GROUP (ORDER BY pressao_min_mb),
+        percentile_cont(0.5) WITHIN GROUP (ORDER BY temperatura_ar_c),
+        percentile_cont(0.5) WITHIN GROUP (ORDER BY temperatura_orvalho_c),
+        percentile_cont(0.5) WITHIN GROUP (ORDER BY temperatura_max_c),
+        percentile_cont(0.5) WITHIN GROUP (ORDER BY temperatura_min_c),
+        percentile_cont(0.5) WITHIN GROUP (ORDER BY temperatura_orvalho_max_c),
+        percentile_cont(0.5) WITHIN GROUP (ORDER BY temperatura_orvalho_min_c),
+        percentile_cont(0.5) WITHIN GROUP (ORDER BY umidade_rel_max_pct),
+        percentile_cont(0.5) WITHIN GROUP (ORDER BY umidade_rel_min_pct),
+        percentile_cont(0.5) WITHIN GROUP (ORDER BY umidade_rel_horaria_pct),
+        percentile_cont(0.5) WITHIN GROUP (ORDER BY vento_direcao_graus),
+        percentile_cont(0.5) WITHIN GROUP (ORDER BY vento_rajada_max_ms),
+        percentile_cont(0.5) WITHIN GROUP (ORDER BY vento_velocidade_ms)
+    FROM (
+        SELECT dm.*, EXTRACT(MONTH FROM dm.timestamp_utc)::SMALLINT AS mes
+        FROM dados_meteorologicos dm
+        WHERE p_codigo_wmo IS NULL OR dm.codigo_wmo = p_codigo_wmo
+    ) d
+    GROUP BY GROUPING SETS ((codigo_wmo, mes), (codigo_wmo), (mes), ())
+    -- Com uma estação só, os níveis '*' ficam como estão (dependem de todas)
+    HAVING COUNT(*) > 0 AND (p_codigo_wmo IS NULL OR GROUPING(codigo_wmo) = 0);
+
+    GET DIAGNOSTICS v_linhas = ROW_COUNT;
+    RETURN v_linhas;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION atualizar_medianas_imputacao(VARCHAR) IS 'Recalcula as medianas de imputação de uma estação (NULL = todas, inclusive os níveis *)';
+
+-- ============================================================
+-- Dados horários com os ausentes preenchidos pela mesma regra da API.
+-- Exportação de treino: SELECT ... FROM vw_dados_imputados
+-- ============================================================
+CREATE OR REPLACE VIEW vw_dados_imputados AS
+SELECT
+    dm.id,
+    dm.codigo_wmo,
+    dm.timestamp_utc,
+    dm.data,
+    dm.hora_utc,
+    COALESCE(dm.precipitacao_mm, 0)::DOUBLE PRECISION AS precipitacao_mm,
+    COALESCE(dm.pressao_estacao_mb, em.pressao_estacao_mb, e.pressao_estacao_mb, m.pressao_estacao_mb, g.pressao_estacao_mb, 0)::DOUBLE PRECISION AS pressao_estacao_mb,
+    COALESCE(dm.pressao_max_mb, dm.pressao_estacao_mb, em.pressao_max_mb, e.pressao_max_mb, m.pressao_max_mb, g.pressao_max_mb, 0)::DOUBLE PRECISION AS pressao_max_mb,
+    COALESCE(dm.pressao_min_mb, dm.pressao_estacao_mb, em.pressao_min_mb, e.pressao_min_mb, m.pressao_min_mb, g.pressao_min_mb, 0)::DOUBLE PRECISION AS pressao_min_mb,
+    COALESCE(dm.radiacao_global_kjm2, 0)::DOUBLE PRECISION AS radiacao_global_kjm2,
+    COALESCE(dm.temperatura_ar_c, em.temperatura_ar_c, e.temperatura_ar_c, m.temperatura_ar_c, g.temperatura_ar_c, 0)::DOUBLE PRECISION AS temperatura_ar_c,
+    COALESCE(dm.temperatura_orvalho_c, em.temperatura_orvalho_c, e.temperatura_orvalho_c, m.temperatura_orvalho_c, g.temperatura_orvalho_c, 0)::DOUBLE PRECISION AS temperatura_orvalho_c,
+    COALESCE(dm.temperatura_max_c, dm.temperatura_ar_c, em.temperatura_max_c, e.temperatura_max_c, m.temperatura_max_c, g.temperatura_max_c, 0)::DOUBLE PRECISION AS temperatura_max_c,
+    COALESCE(dm.temperatura_min_c, dm.temperatura_ar_c, em.temperatura_min_c, e.temperatura_min_c, m.temperatura_min_c, g.temperatura_min_c, 0)::DOUBLE PRECISION AS temperatura_min_c,
+    COALESCE(dm.temperatura_orvalho_max_c, dm.temperatura_orvalho_c, em.temperatura_orvalho_max_c, e.temperatura_orvalho_max_c, m.temperatura_orvalho_max_c, g.temperatura_orvalho_max_c, 0)::DOUBLE PRECISION AS temperatura_orvalho_max_c,
+    COALESCE(dm.temperatura_orvalho_min_c, dm.temperatura_orvalho_c, em.temperatura_orvalho_min_c, e.temperatura_orvalho_min_c, m.temperatura_orvalho_min_c, g.temperatura_orvalho_min_c, 0)::DOUBLE PRECISION AS temperatura_orvalho_min_c,
+    COALESCE(dm.umidade_rel_max_pct, dm.umidade_rel_horaria_pct, em.umidade_rel_max_pct, e.umidade_rel_max_pct, m.umidade_rel_max_pct, g.umidade_rel_max_pct, 0)::DOUBLE PRECISION AS umidade_rel_max_pct,
+    COALESCE(dm.umidade_rel_min_pct, dm.umidade_rel_horaria_pct, em.umidade_rel_min_pct, e.umidade_rel_min_pct, m.umidade_rel_min_pct, g.umidade_rel_min_pct, 0)::DOUBLE PRECISION AS umidade_rel_min_pct,
+    COALESCE(dm.umidade_rel_horaria_pct, em.umidade_rel_horaria_pct, e.umidade_rel_horaria_pct, m.umidade_rel_horaria_pct, g.umidade_rel_horaria_pct, 0)::DOUBLE PRECISION AS umidade_rel_horaria_pct,
+    COALESCE(dm.vento_direcao_graus, em.vento_direcao_graus, e.vento_direcao_graus, m.vento_direcao_graus, g.vento_direcao_graus, 0)::DOUBLE PRECISION AS vento_direcao_graus,
+    COALESCE(dm.vento_rajada_max_ms, dm.vento_velocidade_ms, em.vento_rajada_max_ms, e.vento_rajada_max_ms, m.vento_rajada_max_ms, g.vento_rajada_max_ms, 0)::DOUBLE PRECISION AS vento_rajada_max_ms,
+    COALESCE(dm.vento_velocidade_ms, em.vento_velocidade_ms, e.vento_velocidade_ms, m.vento_velocidade_ms, g.vento_velocidade_ms, 0)::DOUBLE PRECISION AS vento_velocidade_ms,
+    dm.intensidade_chuva
+FROM dados_meteorologicos dm
+LEFT JOIN medianas_imputacao em
+    ON em.codigo_wmo = dm.codigo_wmo AND em.mes = EXTRACT(MONTH FROM dm.timestamp_utc)
+LEFT JOIN medianas_imputacao e
+    ON e.codigo_wmo = dm.codigo_wmo AND e.mes = 0
+LEFT JOIN medianas_imputacao m
+    ON m.codigo_wmo = '*' AND m.mes = EXTRACT(MONTH FROM dm.timestamp_utc)
+LEFT JOIN medianas_imputacao g
+    ON g.codigo_wmo = '*' AND g.mes = 0;
+
+COMMENT ON VIEW vw_dados_imputados IS 'dados_meteorologicos com ausentes preenchidos (horária para max/min, medianas estação/mês, 0)';
+
+-- Carga inicial (no-op em banco vazio)
+SELECT atualizar_medianas_imputacao();
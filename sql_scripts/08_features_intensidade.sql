@@ -0,0 +1,113 @@
+-- ============================================================
+-- FEATURE STORE DO MODELO DE INTENSIDADE DE CHUVA
+-- Vetor de features de cada observação, na ordem esperada pelo modelo
+-- ============================================================
+-- O treino (notebook 03) e a predição em lote (/predict-from-db) derivavam
+-- as 19 features a cada execução (EXTRACT de ano/mês/dia/hora/dia da semana,
+-- máximas/mínimas substituídas pela medida horária, ausentes preenchidos).
+-- features_intensidade guarda o vetor pronto, na ordem de FEATURE_ORDER
+-- (services/feature_store.py), junto do rótulo intensidade_chuva:
+-- ler uma matriz de features é um SELECT das 19 colunas.
+--
+-- A função atualizar_features_intensidade() recalcula um intervalo a partir
+-- de vw_dados_imputados (07_medianas_imputacao.sql) e é chamada pela API ao
+-- fim de cada ingestão, depois das medianas, para as estações/períodos
+-- recebidos. dia_semana segue a convenção do Python (segunda = 0), a mesma
+-- da inferência.
+
+CREATE TABLE IF NOT EXISTS features_intensidade (
+    codigo_wmo VARCHAR(10) NOT NULL,
+    timestamp_utc TIMESTAMP NOT NULL,
+
+    precipitacao_mm DOUBLE PRECISION NOT NULL,
+    pressao_estacao_mb DOUBLE PRECISION NOT NULL,
+    pressao_max_mb DOUBLE PRECISION NOT NULL,
+    pressao_min_mb DOUBLE PRECISION NOT NULL,
+    temperatura_ar_c DOUBLE PRECISION NOT NULL,
+    temperatura_max_c DOUBLE PRECISION NOT NULL,
+    temperatura_min_c DOUBLE PRECISION NOT NULL,
+    umidade_rel_horaria_pct DOUBLE PRECISION NOT NULL,
+    umidade_rel_max_pct DOUBLE PRECISION NOT NULL,
+    umidade_rel_min_pct DOUBLE PRECISION NOT NULL,
+    vento_velocidade_ms DOUBLE PRECISION NOT NULL,
+    vento_direcao_graus DOUBLE PRECISION NOT NULL,
+    vento_rajada_max_ms DOUBLE PRECISION NOT NULL,
+    radiacao_global_kjm2 DOUBLE PRECISION NOT NULL,
+    ano SMALLINT NOT NULL,
+    mes SMALLINT NOT NULL,
+    dia SMALLINT NOT NULL,
+    hora SMALLINT NOT NULL,
+    dia_semana SMALLINT NOT NULL,
+
+    intensidade_chuva VARCHAR(20),          -- rótulo (NULL = não classificado)
+    atualizado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+
+    CONSTRAINT pk_features_intensidade PRIMARY KEY (codigo_wmo, timestamp_utc)
+);
+
+-- Treino e predição em lote leem por intervalo de tempo (todas as estações)
+CREATE INDEX IF NOT EXISTS idx_features_intensidade_timestamp
+    ON features_intensidade(timestamp_utc);
+
+COMMENT ON TABLE features_intensidade IS 'Features do modelo de intensidade por observação (ordem de FEATURE_ORDER), mantidas na ingestão';
+COMMENT ON COLUMN features_intensidade.dia_semana IS 'Dia da semana, segunda = 0 (datetime.weekday do Python)';
+
+-- ============================================================
+-- Recalcula as features de [p_inicio, p_fim] de uma estação (ou de todas,
+-- quando p_codigo_wmo é NULL). Sem intervalo, recalcula todo o período.
+-- As linhas do intervalo são apagadas e reinseridas, então reprocessar o
+-- mesmo arquivo ou mudar as medianas não deixa features antigas.
+-- ============================================================
+CREATE OR REPLACE FUNCTION atualizar_features_intensidade(
+    p_codigo_wmo VARCHAR DEFAULT NULL,
+    p_inicio TIMESTAMP DEFAULT NULL,
+    p_fim TIMESTAMP DEFAULT NULL
+)
+RETURNS INTEGER AS $$
+DECLARE
+    v_inicio TIMESTAMP := COALESCE(p_inicio, '-infinity'::TIMESTAMP);
+    v_fim TIMESTAMP := COALESCE(p_fim, 'infinity'::TIMESTAMP);
+    v_linhas INTEGER;
+BEGIN
+    DELETE FROM features_intensidade
+    WHERE (p_codigo_wmo IS NULL OR codigo_wmo = p_codigo_wmo)
+      AND timestamp_utc BETWEEN v_inicio AND v_fim;
+
+    INSERT INTO features_intensidade (
+        codigo_wmo, timestamp_utc,
+        precipitacao_mm,
+        pressao_estacao_mb, pressao_max_mb, pressao_min_mb,
+        temperatura_ar_c, temperatura_max_c, temperatura_min_c,
+        umidade_rel_horaria_pct, umidade_rel_max_pct, umidade_rel_min_pct,
+        vento_velocidade_ms, vento_direcao_graus, vento_rajada_max_ms,
+        radiacao_global_kjm2,
+        ano, mes, dia, hora, dia_semana,
+        intensidade_chuva
+    )
+    SELECT
+        codigo_wmo, timestamp_utc,
+        precipitacao_mm,
+        pressao_estacao_mb, pressao_max_mb, pressao_min_mb,
+        temperatura_ar_c, temperatura_max_c, temperatura_min_c,
+        umidade_rel_horaria_pct, umidade_rel_max_pct, umidade_rel_min_pct,
+        vento_velocidade_ms, vento_direcao_graus, vento_rajada_max_ms,
+        radiacao_global_kjm2,
+        EXTRACT(YEAR FROM timestamp_utc)::SMALLINT,
+        EXTRACT(MONTH FROM timestamp_utc)::SMALLINT,
+        EXTRACT(DAY FROM timestamp_utc)::SMALLINT,
+        EXTRACT(HOUR FROM timestamp_utc)::SMALLINT,
+        (EXTRACT(ISODOW FROM timestamp_utc) - 1)::SMALLINT,
+        intensidade_chuva
+    FROM vw_dados_imputados
+    WHERE (p_codigo_wmo IS NULL OR codigo_wmo = p_codigo_wmo)
+      AND timestamp_utc BETWEEN v_inicio AND v_fim;
+
+    GET DIAGNOSTICS v_linhas = ROW_COUNT;
+    RETURN v_linhas;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION atualizar_features_intensidade(VARCHAR, TIMESTAMP, TIMESTAMP) IS 'Recalcula as features do intervalo (NULL = todas as estações / todo o período)';
+
+-- Carga inicial (no-op em banco vazio)
+SELECT atualizar_features_intensidade();
@@ -0,0 +1,55 @@
+-- ============================================================
+-- PONTUAÇÃO EM LOTE DAS OBSERVAÇÕES (predicoes_intensidade)
+-- Uma predição por observação e versão do modelo, gravada uma única vez
+-- ============================================================
+-- O /predict-from-db predizia as últimas 24h a cada chamada e gravava as
+-- predições com timestamp_utc = CURRENT_TIMESTAMP: chamadas repetidas
+-- duplicavam linhas e a predição não apontava para a observação.
+--
+-- A pontuação em lote (services/batch_scoring.py) lê de features_intensidade
+-- só as linhas recalculadas depois da watermark da versão do modelo, em ordem
+-- de (atualizado_em, codigo_wmo, timestamp_utc), e grava cada predição com
+-- timestamp_utc = horário da observação e modelo_versao = run_id do MLflow.
+-- A chave (codigo_wmo, timestamp_utc, modelo_versao) torna a gravação
+-- idempotente (ON CONFLICT DO UPDATE) e a watermark avança na mesma transação
+-- das predições do bloco.
+--
+-- Predições avulsas (/predict) continuam com modelo_versao NULL e não entram
+-- na chave (NULLs são distintos no índice único).
+
+ALTER TABLE predicoes_intensidade ADD COLUMN IF NOT EXISTS modelo_versao VARCHAR(100);
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_predicoes_observacao_modelo
+    ON predicoes_intensidade(codigo_wmo, timestamp_utc, modelo_versao);
+
+COMMENT ON COLUMN predicoes_intensidade.modelo_versao IS 'Versão do modelo (run_id do MLflow) nas predições da pontuação em lote; NULL nas predições avulsas';
+
+-- Leitura das features recalculadas depois da watermark (keyset)
+CREATE INDEX IF NOT EXISTS idx_features_intensidade_atualizacao
+    ON features_intensidade(atualizado_em, codigo_wmo, timestamp_utc);
+
+-- ============================================================
+-- Watermark da pontuação por versão do modelo: a última linha de
+-- features_intensidade pontuada, na ordem (atualizado_em, codigo_wmo,
+-- timestamp_utc). Uma versão nova herda a linha do run_pai (ou do ancestral
+-- mais próximo já pontuado); sem ancestral, começa pelas observações a partir
+-- de pontuar_desde (PONTUACAO_INICIO ou os últimos PONTUACAO_JANELA_DIAS dias),
+-- em vez de repontuar todo o histórico a cada geração. Apagar a linha de uma
+-- versão faz a pontuação recomeçar.
+-- ============================================================
+CREATE TABLE IF NOT EXISTS pontuacao_watermark (
+    modelo_versao VARCHAR(100) PRIMARY KEY,
+    modelo_usado VARCHAR(100),
+    atualizado_em TIMESTAMP NOT NULL,
+    codigo_wmo VARCHAR(10) NOT NULL,
+    timestamp_utc TIMESTAMP NOT NULL,
+    pontuar_desde TIMESTAMP,
+    linhas_pontuadas BIGINT NOT NULL DEFAULT 0,
+    ultima_execucao TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Bancos criados antes da coluna pontuar_desde
+ALTER TABLE pontuacao_watermark ADD COLUMN IF NOT EXISTS pontuar_desde TIMESTAMP;
+
+COMMENT ON TABLE pontuacao_watermark IS 'Última observação de features_intensidade pontuada por versão do modelo';
+COMMENT ON COLUMN pontuacao_watermark.pontuar_desde IS 'Observações (timestamp_utc) anteriores não são pontuadas por esta versão; NULL = todo o histórico';
@@ -0,0 +1,90 @@
+-- Variante compacta de dados_meteorologicos (otimizada para armazenamento)
+-- Não é executada automaticamente: fica em subpasta de sql_scripts/.
+-- Requer 01_schema.sql (tabela estacoes e função criar_particoes_mensais).
+--
+-- Diferenças em relação a dados_meteorologicos:
+-- - medidas em REAL (4 bytes) no lugar de DECIMAL (numeric de tamanho variável);
+-- - umidade e direção do vento (valores inteiros no INMET) em SMALLINT;
+-- - intensidade como ENUM (4 bytes) no lugar de VARCHAR;
+-- - apenas timestamp_utc (data e hora_utc são derivadas na view de compatibilidade);
+-- - colunas ordenadas por alinhamento (8 → 4 → 2 bytes → tamanho variável) para evitar padding;
+-- - índice BRIN em timestamp_utc (dados chegam em ordem temporal) no lugar de B-tree.
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_type WHERE typname = 'intensidade_chuva_tipo') THEN
+        CREATE TYPE intensidade_chuva_tipo AS ENUM ('sem_chuva', 'leve', 'moderada', 'forte');
+    END IF;
+END $$;
+
+CREATE TABLE IF NOT EXISTS dados_meteorologicos_compacto (
+    timestamp_utc TIMESTAMP NOT NULL,
+
+    precipitacao_mm REAL,
+    pressao_estacao_mb REAL,
+    pressao_max_mb REAL,
+    pressao_min_mb REAL,
+    radiacao_global_kjm2 REAL,
+    temperatura_ar_c REAL,
+    temperatura_orvalho_c REAL,
+    temperatura_max_c REAL,
+    temperatura_min_c REAL,
+    temperatura_orvalho_max_c REAL,
+    temperatura_orvalho_min_c REAL,
+    vento_rajada_max_ms REAL,
+    vento_velocidade_ms REAL,
+    intensidade_chuva intensidade_chuva_tipo,
+
+    umidade_rel_max_pct SMALLINT,
+    umidade_rel_min_pct SMALLINT,
+    umidade_rel_horaria_pct SMALLINT,
+    vento_direcao_graus SMALLINT,
+
+    codigo_wmo VARCHAR(10) NOT NULL REFERENCES estacoes(codigo_wmo),
+
+    CONSTRAINT pk_dados_meteorologicos_compacto PRIMARY KEY (codigo_wmo, timestamp_utc)
+) PARTITION BY RANGE (timestamp_utc);
+
+SELECT criar_particoes_mensais(
+    'dados_meteorologicos_compacto',
+    date_trunc('month', CURRENT_TIMESTAMP::TIMESTAMP) - INTERVAL '24 months',
+    date_trunc('month', CURRENT_TIMESTAMP::TIMESTAMP) + INTERVAL '3 months'
+);
+
+-- BRIN: poucas páginas de índice por partição; eficiente porque as linhas
+-- são inseridas em ordem de timestamp_utc
+CREATE INDEX IF NOT EXISTS idx_compacto_timestamp_brin
+    ON dados_meteorologicos_compacto USING BRIN (timestamp_utc) WITH (pages_per_range = 32);
+CREATE INDEX IF NOT EXISTS idx_compacto_precipitacao_brin
+    ON dados_meteorologicos_compacto USING BRIN (precipitacao_mm);
+
+-- View com as mesmas colunas de dados_meteorologicos, para as consultas existentes
+CREATE OR REPLACE VIEW vw_dados_meteorologicos_compacto AS
+SELECT
+    codigo_wmo,
+    timestamp_utc::DATE AS data,
+    timestamp_utc::TIME AS hora_utc,
+    timestamp_utc,
+    precipitacao_mm,
+    pressao_estacao_mb,
+    pressao_max_mb,
+    pressao_min_mb,
+    radiacao_global_kjm2,
+    temperatura_ar_c,
+    temperatura_orvalho_c,
+    temperatura_max_c,
+    temperatura_min_c,
+    temperatura_orvalho_max_c,
+    temperatura_orvalho_min_c,
+    umidade_rel_max_pct,
+    umidade_rel_min_pct,
+    umidade_rel_horaria_pct,
+    vento_direcao_graus,
+    vento_rajada_max_ms,
+    vento_velocidade_ms,
+    intensidade_chuva::TEXT AS intensidade_chuva
+FROM dados_meteorologicos_compacto;
+
+COMMENT ON TABLE dados_meteorologicos_compacto IS 'Variante compacta de dados_meteorologicos: REAL/SMALLINT, intensidade ENUM, timestamp único e índices BRIN';
+COMMENT ON COLUMN dados_meteorologicos_compacto.intensidade_chuva IS 'Classificação: sem_chuva, leve, moderada, forte (ENUM)';
+COMMENT ON VIEW vw_dados_meteorologicos_compacto IS 'dados_meteorologicos_compacto com as colunas e tipos de texto do schema original';
@@ -0,0 +1,64 @@
+-- Copia dados_meteorologicos para dados_meteorologicos_compacto
+-- Pode ser executado novamente: linhas existentes são atualizadas.
+--
+-- Uso:
+--   .\executar_sql.ps1 sql_scripts/compacto/01_schema_compacto.sql
+--   .\executar_sql.ps1 sql_scripts/compacto/02_migrar_para_compacto.sql
+
+BEGIN;
+
+SELECT criar_particoes_mensais('dados_meteorologicos_compacto', MIN(timestamp_utc), MAX(timestamp_utc))
+FROM dados_meteorologicos;
+
+-- Inserção em ordem de timestamp_utc: mantém a correlação física que o BRIN usa
+INSERT INTO dados_meteorologicos_compacto (
+    timestamp_utc, codigo_wmo,
+    precipitacao_mm, pressao_estacao_mb, pressao_max_mb, pressao_min_mb,
+    radiacao_global_kjm2, temperatura_ar_c, temperatura_orvalho_c,
+    temperatura_max_c, temperatura_min_c, temperatura_orvalho_max_c,
+    temperatura_orvalho_min_c, vento_rajada_max_ms, vento_velocidade_ms,
+    intensidade_chuva,
+    umidade_rel_max_pct, umidade_rel_min_pct, umidade_rel_horaria_pct,
+    vento_direcao_graus
+)
+SELECT
+    timestamp_utc, codigo_wmo,
+    precipitacao_mm, pressao_estacao_mb, pressao_max_mb, pressao_min_mb,
+    radiacao_global_kjm2, temperatura_ar_c, temperatura_orvalho_c,
+    temperatura_max_c, temperatura_min_c, temperatura_orvalho_max_c,
+    temperatura_orvalho_min_c, vento_rajada_max_ms, vento_velocidade_ms,
+    intensidade_chuva::intensidade_chuva_tipo,
+    ROUND(umidade_rel_max_pct)::SMALLINT,
+    ROUND(umidade_rel_min_pct)::SMALLINT,
+    ROUND(umidade_rel_horaria_pct)::SMALLINT,
+    ROUND(vento_direcao_graus)::SMALLINT
+FROM dados_meteorologicos
+ORDER BY timestamp_utc, codigo_wmo
+ON CONFLICT (codigo_wmo, timestamp_utc) DO UPDATE SET
+    precipitacao_mm = EXCLUDED.precipitacao_mm,
+    pressao_estacao_mb = EXCLUDED.pressao_estacao_mb,
+    pressao_max_mb = EXCLUDED.pressao_max_mb,
+    pressao_min_mb = EXCLUDED.pressao_min_mb,
+    radiacao_global_kjm2 = EXCLUDED.radiacao_global_kjm2,
+    temperatura_ar_c = EXCLUDED.temperatura_ar_c,
+    temperatura_orvalho_c = EXCLUDED.temperatura_orvalho_c,
+    temperatura_max_c = EXCLUDED.temperatura_max_c,
+    temperatura_min_c = EXCLUDED.temperatura_min_c,
+    temperatura_orvalho_max_c = EXCLUDED.temperatura_orvalho_max_c,
+    temperatura_orvalho_min_c = EXCLUDED.temperatura_orvalho_min_c,
+    vento_rajada_max_ms = EXCLUDED.vento_rajada_max_ms,
+    vento_velocidade_ms = EXCLUDED.vento_velocidade_ms,
+    intensidade_chuva = EXCLUDED.intensidade_chuva,
+    umidade_rel_max_pct = EXCLUDED.umidade_rel_max_pct,
+    umidade_rel_min_pct = EXCLUDED.umidade_rel_min_pct,
+    umidade_rel_horaria_pct = EXCLUDED.umidade_rel_horaria_pct,
+    vento_direcao_graus = EXCLUDED.vento_direcao_graus;
+
+COMMIT;
+
+-- Atualiza estatísticas e o resumo dos BRIN
+VACUUM ANALYZE dados_meteorologicos_compacto;
+
+SELECT
+    (SELECT COUNT(*) FROM dados_meteorologicos) AS registros_origem,
+    (SELECT COUNT(*) FROM dados_meteorologicos_compacto) AS registros_compacto;
@@ -0,0 +1,97 @@
+-- Benchmark: tamanho e varredura de dados_meteorologicos x dados_meteorologicos_compacto
+-- Execute após 02_migrar_para_compacto.sql.
+--
+-- Uso:
+--   .\executar_sql.ps1 sql_scripts/compacto/03_benchmark_compacto.sql
+
+-- ============================================================
+-- 1. Tamanho em disco (somando todas as partições)
+-- ============================================================
+SELECT
+    t.tabela,
+    (SELECT COUNT(*) FROM pg_partition_tree(t.tabela) WHERE isleaf) AS particoes,
+    pg_size_pretty(SUM(pg_table_size(p.relid))) AS dados,
+    pg_size_pretty(SUM(pg_indexes_size(p.relid))) AS indices,
+    pg_size_pretty(SUM(pg_total_relation_size(p.relid))) AS total,
+    ROUND(SUM(pg_total_relation_size(p.relid))::NUMERIC
+          / NULLIF(SUM(GREATEST(c.reltuples, 0)), 0)) AS bytes_por_linha
+FROM (VALUES
+    ('dados_meteorologicos'::REGCLASS),
+    ('dados_meteorologicos_compacto'::REGCLASS)
+) AS t(tabela)
+CROSS JOIN LATERAL pg_partition_tree(t.tabela) p
+JOIN pg_class c ON c.oid = p.relid
+WHERE p.isleaf
+GROUP BY t.tabela;
+
+-- Tamanho de cada índice (somado entre partições)
+SELECT
+    pt.tabela::TEXT AS tabela,
+    pg_partition_root(i.indexrelid)::TEXT AS indice,
+    pg_size_pretty(SUM(pg_relation_size(i.indexrelid))) AS tamanho
+FROM (VALUES
+    ('dados_meteorologicos'::REGCLASS),
+    ('dados_meteorologicos_compacto'::REGCLASS)
+) AS pt(tabela)
+CROSS JOIN LATERAL pg_partition_tree(pt.tabela) p
+JOIN pg_index i ON i.indrelid = p.relid
+GROUP BY 1, 2
+ORDER BY 1, 2;
+
+-- ============================================================
+-- 2. Varreduras (tempo e buffers lidos)
+-- ============================================================
+
+-- 2.1 Agregação sobre toda a tabela (leitura sequencial completa)
+EXPLAIN (ANALYZE, BUFFERS, TIMING OFF)
+SELECT intensidade_chuva, COUNT(*), AVG(temperatura_ar_c), AVG(umidade_rel_horaria_pct)
+FROM dados_meteorologicos
+GROUP BY intensidade_chuva;
+
+EXPLAIN (ANALYZE, BUFFERS, TIMING OFF)
+SELECT intensidade_chuva, COUNT(*), AVG(temperatura_ar_c), AVG(umidade_rel_horaria_pct)
+FROM dados_meteorologicos_compacto
+GROUP BY intensidade_chuva;
+
+-- 2.2 Intervalo de uma semana (B-tree x BRIN)
+EXPLAIN (ANALYZE, BUFFERS, TIMING OFF)
+SELECT DATE(timestamp_utc), AVG(pressao_estacao_mb), SUM(precipitacao_mm)
+FROM dados_meteorologicos
+WHERE timestamp_utc >= (SELECT MIN(timestamp_utc) FROM dados_meteorologicos) + INTERVAL '30 days'
+  AND timestamp_utc <  (SELECT MIN(timestamp_utc) FROM dados_meteorologicos) + INTERVAL '37 days'
+GROUP BY 1;
+
+EXPLAIN (ANALYZE, BUFFERS, TIMING OFF)
+SELECT DATE(timestamp_utc), AVG(pressao_estacao_mb), SUM(precipitacao_mm)
+FROM dados_meteorologicos_compacto
+WHERE timestamp_utc >= (SELECT MIN(timestamp_utc) FROM dados_meteorologicos_compacto) + INTERVAL '30 days'
+  AND timestamp_utc <  (SELECT MIN(timestamp_utc) FROM dados_meteorologicos_compacto) + INTERVAL '37 days'
+GROUP BY 1;
+
+-- 2.3 Uma estação em um mês (chave primária nas duas variantes)
+EXPLAIN (ANALYZE, BUFFERS, TIMING OFF)
+SELECT timestamp_utc, precipitacao_mm, intensidade_chuva
+FROM dados_meteorologicos
+WHERE codigo_wmo = (SELECT MIN(codigo_wmo) FROM estacoes)
+  AND timestamp_utc >= (SELECT date_trunc('month', MIN(timestamp_utc)) FROM dados_meteorologicos)
+  AND timestamp_utc <  (SELECT date_trunc('month', MIN(timestamp_utc)) + INTERVAL '1 month' FROM dados_meteorologicos);
+
+EXPLAIN (ANALYZE, BUFFERS, TIMING OFF)
+SELECT timestamp_utc, precipitacao_mm, intensidade_chuva
+FROM dados_meteorologicos_compacto
+WHERE codigo_wmo = (SELECT MIN(codigo_wmo) FROM estacoes)
+  AND timestamp_utc >= (SELECT date_trunc('month', MIN(timestamp_utc)) FROM dados_meteorologicos_compacto)
+  AND timestamp_utc <  (SELECT date_trunc('month', MIN(timestamp_utc)) + INTERVAL '1 month' FROM dados_meteorologicos_compacto);
+
+-- 2.4 Chuva forte (filtro por intensidade e precipitação)
+EXPLAIN (ANALYZE, BUFFERS, TIMING OFF)
+SELECT codigo_wmo, COUNT(*)
+FROM dados_meteorologicos
+WHERE intensidade_chuva = 'forte' AND precipitacao_mm > 10
+GROUP BY codigo_wmo;
+
+EXPLAIN (ANALYZE, BUFFERS, TIMING OFF)
+SELECT codigo_wmo, COUNT(*)
+FROM dados_meteorologicos_compacto
+WHERE intensidade_chuva = 'forte' AND precipitacao_mm > 10
+GROUP BY codigo_wmo;
@@ -0,0 +1,214 @@
+-- Migração: converte dados_meteorologicos em tabela particionada por mês
+-- Use apenas em bancos criados antes do particionamento; instalações novas
+-- já recebem a tabela particionada pelo 01_schema.sql.
+--
+-- Uso:
+--   .\executar_sql.ps1 sql_scripts/migracoes/01_particionar_dados_meteorologicos.sql
+--
+-- A tabela antiga é removida com CASCADE (as views dependentes também), então
+-- ao final execute novamente 02_views.sql, 04_views_grafana.sql,
+-- 05_setup_ml_grafana.sql e 06_rollups_grafana.sql.
+
+BEGIN;
+
+-- Impede escrita durante a cópia
+LOCK TABLE dados_meteorologicos IN SHARE MODE;
+
+-- 1. Renomeia a tabela antiga e os objetos que teriam nomes em conflito
+ALTER TABLE dados_meteorologicos RENAME TO dados_meteorologicos_legado;
+ALTER SEQUENCE IF EXISTS dados_meteorologicos_id_seq RENAME TO dados_meteorologicos_legado_id_seq;
+ALTER INDEX IF EXISTS idx_dados_timestamp RENAME TO idx_dados_legado_timestamp;
+ALTER INDEX IF EXISTS idx_dados_intensidade RENAME TO idx_dados_legado_intensidade;
+ALTER INDEX IF EXISTS idx_dados_precipitacao RENAME TO idx_dados_legado_precipitacao;
+
+-- 2. Funções de partições: cópia literal de 01_schema.sql (mantenha as duas
+--    iguais; bancos migrados usam esta definição até rodarem 01_schema.sql)
+
+-- Cria as partições mensais que cobrem [p_inicio, p_fim].
+-- Partições se chamam <tabela>_pAAAA_MM. Retorna quantas foram criadas.
+-- Pode ser chamada a cada lote por vários processos: quando falta alguma
+-- partição, a criação é serializada por um advisory lock da tabela e cada
+-- mês é conferido de novo depois do lock.
+-- Um mês desanexado (desanexar_particoes_antigas) não é reanexado aqui: a
+-- ingestão falha com erro explícito em vez de trazer de volta, sem aviso, um
+-- mês arquivado (e validá-lo inteiro dentro da transação da ingestão).
+-- A reanexação é explícita: anexar_particao_mensal (POST /partitions/attach).
+CREATE OR REPLACE FUNCTION criar_particoes_mensais(
+    p_tabela TEXT,
+    p_inicio TIMESTAMP,
+    p_fim TIMESTAMP
+)
+RETURNS INTEGER AS $$
+DECLARE
+    v_mes TIMESTAMP;
+    v_nome TEXT;
+    v_total INTEGER := 0;
+BEGIN
+    IF p_inicio IS NULL OR p_fim IS NULL THEN
+        RETURN 0;
+    END IF;
+
+    -- Caso comum: todas as partições já existem e estão anexadas (sem lock)
+    IF NOT EXISTS (
+        SELECT 1
+        FROM generate_series(date_trunc('month', p_inicio), p_fim, INTERVAL '1 month') AS m(mes)
+        WHERE NOT EXISTS (
+            SELECT 1 FROM pg_inherits
+            WHERE inhrelid = to_regclass(format('%s_p%s', p_tabela, to_char(m.mes, 'YYYY_MM')))
+              AND inhparent = to_regclass(p_tabela)
+        )
+    ) THEN
+        RETURN 0;
+    END IF;
+
+    -- Processos concorrentes esperam aqui e encontram as partições já criadas
+    PERFORM pg_advisory_xact_lock(hashtext('criar_particoes_mensais:' || p_tabela));
+
+    v_mes := date_trunc('month', p_inicio);
+    WHILE v_mes <= p_fim LOOP
+        v_nome := format('%s_p%s', p_tabela, to_char(v_mes, 'YYYY_MM'));
+
+        IF to_regclass(v_nome) IS NULL THEN
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                v_nome, p_tabela, v_mes, v_mes + INTERVAL '1 month'
+            );
+            v_total := v_total + 1;
+        ELSIF NOT EXISTS (
+            SELECT 1 FROM pg_inherits
+            WHERE inhrelid = to_regclass(v_nome) AND inhparent = to_regclass(p_tabela)
+        ) THEN
+            RAISE EXCEPTION 'A partição % está desanexada; reanexe-a com POST /partitions/attach antes de gravar nesse mês', v_nome
+                USING ERRCODE = 'object_not_in_prerequisite_state';
+        END IF;
+
+        v_mes := v_mes + INTERVAL '1 month';
+    END LOOP;
+
+    RETURN v_total;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION criar_particoes_mensais(TEXT, TIMESTAMP, TIMESTAMP) IS 'Cria as partições mensais <tabela>_pAAAA_MM que cobrem o intervalo (erro se algum mês estiver desanexado)';
+
+-- Reanexa a partição desanexada do mês de p_mes. Retorna FALSE se ela já
+-- estava anexada. O ATTACH valida todas as linhas da partição (varredura
+-- completa), por isso só roda quando pedido explicitamente.
+CREATE OR REPLACE FUNCTION anexar_particao_mensal(
+    p_tabela TEXT,
+    p_mes TIMESTAMP
+)
+RETURNS BOOLEAN AS $$
+DECLARE
+    v_mes TIMESTAMP := date_trunc('month', p_mes);
+    v_nome TEXT := format('%s_p%s', p_tabela, to_char(date_trunc('month', p_mes), 'YYYY_MM'));
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext('criar_particoes_mensais:' || p_tabela));
+
+    IF to_regclass(v_nome) IS NULL THEN
+        RAISE EXCEPTION 'A partição % não existe', v_nome
+            USING ERRCODE = 'undefined_table';
+    END IF;
+    IF EXISTS (
+        SELECT 1 FROM pg_inherits
+        WHERE inhrelid = to_regclass(v_nome) AND inhparent = to_regclass(p_tabela)
+    ) THEN
+        RETURN FALSE;
+    END IF;
+
+    EXECUTE format(
+        'ALTER TABLE %I ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+        p_tabela, v_nome, v_mes, v_mes + INTERVAL '1 month'
+    );
+    RETURN TRUE;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION anexar_particao_mensal(TEXT, TIMESTAMP) IS 'Reanexa a partição mensal <tabela>_pAAAA_MM desanexada (POST /partitions/attach)';
+
+-- 3. Nova tabela particionada (mesmas colunas, id BIGSERIAL, chave natural como PK)
+CREATE TABLE dados_meteorologicos (
+    id BIGSERIAL,
+    codigo_wmo VARCHAR(10) NOT NULL REFERENCES estacoes(codigo_wmo),
+    data DATE NOT NULL,
+    hora_utc TIME NOT NULL,
+    timestamp_utc TIMESTAMP NOT NULL,
+    precipitacao_mm DECIMAL(8, 2),
+    pressao_estacao_mb DECIMAL(8, 2),
+    pressao_max_mb DECIMAL(8, 2),
+    pressao_min_mb DECIMAL(8, 2),
+    radiacao_global_kjm2 DECIMAL(10, 2),
+    temperatura_ar_c DECIMAL(5, 2),
+    temperatura_orvalho_c DECIMAL(5, 2),
+    temperatura_max_c DECIMAL(5, 2),
+    temperatura_min_c DECIMAL(5, 2),
+    temperatura_orvalho_max_c DECIMAL(5, 2),
+    temperatura_orvalho_min_c DECIMAL(5, 2),
+    umidade_rel_max_pct DECIMAL(5, 2),
+    umidade_rel_min_pct DECIMAL(5, 2),
+    umidade_rel_horaria_pct DECIMAL(5, 2),
+    vento_direcao_graus DECIMAL(6, 2),
+    vento_rajada_max_ms DECIMAL(5, 2),
+    vento_velocidade_ms DECIMAL(5, 2),
+    intensidade_chuva VARCHAR(20),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT pk_dados_meteorologicos PRIMARY KEY (codigo_wmo, timestamp_utc)
+) PARTITION BY RANGE (timestamp_utc);
+
+-- 4. Partições para todo o histórico e três meses à frente
+SELECT criar_particoes_mensais('dados_meteorologicos', MIN(timestamp_utc), MAX(timestamp_utc))
+FROM dados_meteorologicos_legado;
+
+SELECT criar_particoes_mensais(
+    'dados_meteorologicos',
+    date_trunc('month', CURRENT_TIMESTAMP::TIMESTAMP),
+    date_trunc('month', CURRENT_TIMESTAMP::TIMESTAMP) + INTERVAL '3 months'
+);
+
+-- 5. Copia os dados (em ordem de partição, para escrita sequencial)
+INSERT INTO dados_meteorologicos (
+    id, codigo_wmo, data, hora_utc, timestamp_utc,
+    precipitacao_mm, pressao_estacao_mb, pressao_max_mb, pressao_min_mb,
+    radiacao_global_kjm2, temperatura_ar_c, temperatura_orvalho_c,
+    temperatura_max_c, temperatura_min_c, temperatura_orvalho_max_c,
+    temperatura_orvalho_min_c, umidade_rel_max_pct, umidade_rel_min_pct,
+    umidade_rel_horaria_pct, vento_direcao_graus, vento_rajada_max_ms,
+    vento_velocidade_ms, intensidade_chuva, created_at
+)
+SELECT
+    id, codigo_wmo, data, hora_utc, timestamp_utc,
+    precipitacao_mm, pressao_estacao_mb, pressao_max_mb, pressao_min_mb,
+    radiacao_global_kjm2, temperatura_ar_c, temperatura_orvalho_c,
+    temperatura_max_c, temperatura_min_c, temperatura_orvalho_max_c,
+    temperatura_orvalho_min_c, umidade_rel_max_pct, umidade_rel_min_pct,
+    umidade_rel_horaria_pct, vento_direcao_graus, vento_rajada_max_ms,
+    vento_velocidade_ms, intensidade_chuva, created_at
+FROM dados_meteorologicos_legado
+ORDER BY timestamp_utc, codigo_wmo
+ON CONFLICT (codigo_wmo, timestamp_utc) DO NOTHING;
+
+SELECT setval(
+    'dados_meteorologicos_id_seq',
+    COALESCE((SELECT MAX(id) FROM dados_meteorologicos), 0) + 1,
+    false
+);
+
+-- 6. Índices (criados em cada partição automaticamente)
+CREATE INDEX IF NOT EXISTS idx_dados_timestamp ON dados_meteorologicos(timestamp_utc);
+CREATE INDEX IF NOT EXISTS idx_dados_intensidade ON dados_meteorologicos(intensidade_chuva);
+CREATE INDEX IF NOT EXISTS idx_dados_precipitacao ON dados_meteorologicos(precipitacao_mm);
+
+COMMENT ON TABLE dados_meteorologicos IS 'Dados meteorológicos horários coletados das estações (particionada por mês)';
+COMMENT ON COLUMN dados_meteorologicos.intensidade_chuva IS 'Classificação: sem_chuva, leve, moderada, forte';
+COMMENT ON COLUMN dados_meteorologicos.timestamp_utc IS 'Timestamp combinado de data e hora UTC para facilitar consultas temporais';
+
+-- 7. Remove a tabela antiga (e as views que dependiam dela)
+DROP TABLE dados_meteorologicos_legado CASCADE;
+
+COMMIT;
+
+ANALYZE dados_meteorologicos;
+
+SELECT
+    (SELECT COUNT(*) FROM dados_meteorologicos) AS registros_migrados,
+    (SELECT COUNT(*) FROM pg_inherits WHERE inhparent = 'dados_meteorologicos'::regclass) AS particoes;